@@ -16,7 +16,10 @@
 
 """The craft tool to create ubuntu images."""
 
-from imagecraft.application import Imagecraft
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from imagecraft.application import Imagecraft
 
 try:
     from ._version import __version__
@@ -29,3 +32,13 @@ except ImportError:  # pragma: no cover
         __version__ = "dev"
 
 __all__ = ["__version__", "Imagecraft"]
+
+
+def __getattr__(name: str) -> Any:  # noqa: ANN401
+    # The application pulls in the whole craft-application stack, so only import
+    # it when it's actually needed.
+    if name == "Imagecraft":
+        from imagecraft.application import Imagecraft  # noqa: PLC0415
+
+        return Imagecraft
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
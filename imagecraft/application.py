@@ -16,16 +16,20 @@
 
 """Main Imagecraft Application."""
 
+import os
+
+import craft_cli
 from craft_application import Application, AppMetadata
 from typing_extensions import override
 
-from imagecraft import plugins
-from imagecraft.models import project
+from imagecraft import command_cache, userns
+from imagecraft.models import config, project
 
 APP_METADATA = AppMetadata(
     name="imagecraft",
     summary="A tool to create Ubuntu bootable images",
     ProjectClass=project.Project,
+    ConfigModel=config.ImagecraftConfig,
     enable_for_grammar=True,
     check_supported_base=True,
 )
@@ -39,10 +43,48 @@ class Imagecraft(Application):
         # pylint: disable=import-outside-toplevel
         from craft_parts.features import Features  # noqa: PLC0415
 
+        from imagecraft import plugins  # noqa: PLC0415
+
         Features(enable_partitions=True, enable_overlay=True)
         plugins.setup_plugins()
 
+    @override
+    def _create_dispatcher(self) -> craft_cli.Dispatcher:
+        dispatcher = super()._create_dispatcher()
+        # Record the commands, for help and completion without the application.
+        command_cache.save(
+            self.app.name,
+            self.command_groups,
+            summary=str(self.app.summary),
+            global_arguments=self._global_arguments,
+            docs_base_url=self.app.versioned_docs_url,
+            app_config=self.app_config,
+        )
+        return dispatcher
+
     @override
     def _configure_services(self, provider_name: str | None) -> None:
         super()._configure_services(provider_name)
         self.services.update_kwargs("image", project_dir=self.project_dir)
+
+    @override
+    def _pre_run(self, dispatcher: craft_cli.Dispatcher) -> None:
+        super()._pre_run(dispatcher)
+        if self._needs_user_namespace(dispatcher):
+            userns.reexec_in_user_namespace()
+
+    def _needs_user_namespace(self, dispatcher: craft_cli.Dispatcher) -> bool:
+        """Whether a rootless build must enter a user namespace to run the command.
+
+        Only commands running the lifecycle on this host need one. In managed mode,
+        builds run as root in the build instance.
+        """
+        if not self.services.get("config").get("rootless"):
+            return False
+        if os.geteuid() == 0 or userns.in_user_namespace():
+            return False
+        build_environment = self.services.get("config").get("build_environment")
+        return bool(
+            getattr(dispatcher.parsed_args(), "destructive_mode", False)
+            or (build_environment and build_environment.lower().strip() == "host")
+        )
@@ -0,0 +1,206 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Overlay base layers taken from a root filesystem.
+
+A project can start from a root filesystem, given as a tarball or a directory,
+instead of an empty base layer. The root filesystem is extracted once per host
+into a cache keyed by its digest, and shared by every project that uses it.
+Overlays only ever mount a base layer as a read-only lower directory.
+
+Prime directories then only hold what parts changed on top of the base layer,
+with OCI whiteouts for the files they removed from it. The base layer and the
+prime directories are merged into the content of the partitions at pack time.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+from collections.abc import Collection
+from pathlib import Path, PurePosixPath
+
+from craft_cli import CraftError, emit
+
+from imagecraft.pack import checkpoint
+from imagecraft.subprocesses import run
+
+_SOURCES_INDEX = "sources.json"
+
+_WHITEOUT_PREFIX = ".wh."
+_OPAQUE_MARKER = ".wh..wh..opq"
+
+
+def get_source_digest(source: Path, cache_dir: Path) -> str:
+    """Get the SHA-256 digest of a root filesystem tarball or directory.
+
+    The digests of tarballs are kept in the cache by path, size and modification
+    time, so that a tarball is only read again once it changes.
+
+    :param source: the tarball or directory.
+    :param cache_dir: the directory of the cached base layers.
+    """
+    if source.is_dir():
+        return checkpoint.get_tree_digest(source).hex()
+
+    st = source.stat()
+    index_path = cache_dir / _SOURCES_INDEX
+    try:
+        index = json.loads(index_path.read_text())
+    except (OSError, ValueError):
+        index = {}
+    key = str(source.resolve())
+    entry = index.get(key, {})
+    if entry.get("size") == st.st_size and entry.get("mtime_ns") == st.st_mtime_ns:
+        return str(entry["digest"])
+
+    emit.progress(f"Computing the digest of {source.name!r}")
+    with source.open("rb") as tarball:
+        digest = hashlib.file_digest(tarball, "sha256").hexdigest()
+    index[key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "digest": digest}
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    temp_path = index_path.with_suffix(".tmp")
+    temp_path.write_text(json.dumps(index, indent=2, sort_keys=True))
+    temp_path.replace(index_path)
+    return digest
+
+
+def get_base_layer(source: Path, cache_dir: Path) -> tuple[Path, str]:
+    """Get the cached base layer of a root filesystem, extracting it if needed.
+
+    :param source: the tarball or directory of the root filesystem.
+    :param cache_dir: the directory of the cached base layers.
+    :returns: The directory of the base layer and its digest.
+    :raises CraftError: If the root filesystem is missing or can't be extracted.
+    """
+    if not source.exists():
+        raise CraftError(
+            f"Base layer {str(source)!r} does not exist.",
+            resolution="Set 'base-layer' to a root filesystem tarball or directory.",
+        )
+    digest = get_source_digest(source, cache_dir)
+    layer_dir = cache_dir / digest
+    if layer_dir.is_dir():
+        emit.debug(f"Using cached base layer {str(layer_dir)!r}")
+        return layer_dir, digest
+
+    emit.progress(f"Extracting base layer {source.name!r}")
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    # Extract next to the cache entry, then move it in place, so that concurrent
+    # builds never see a partial base layer.
+    temp_dir = Path(tempfile.mkdtemp(prefix=f".{digest}-", dir=cache_dir))
+    # The root of the tarball or directory, if it has one, sets its own mode.
+    temp_dir.chmod(0o755)
+    try:
+        if source.is_dir():
+            run("cp", "--archive", "--reflink=auto", f"{source}/.", temp_dir)
+        else:
+            run(
+                "tar",
+                "--extract",
+                "--numeric-owner",
+                "--same-permissions",
+                "--xattrs",
+                "--xattrs-include=*",
+                "--file",
+                source,
+                "--directory",
+                temp_dir,
+            )
+        temp_dir.rename(layer_dir)
+    except subprocess.CalledProcessError as err:
+        raise CraftError(
+            f"Cannot extract base layer {str(source)!r}.",
+            details=err.stderr,
+        ) from err
+    except OSError:
+        # Another build extracted the same base layer first.
+        if not layer_dir.is_dir():
+            raise
+    finally:
+        if temp_dir.exists():
+            shutil.rmtree(temp_dir)
+    return layer_dir, digest
+
+
+def _is_directory(path: Path) -> bool:
+    return path.is_dir() and not path.is_symlink()
+
+
+def _remove(path: Path) -> None:
+    if _is_directory(path):
+        shutil.rmtree(path)
+    elif path.is_symlink() or path.exists():
+        path.unlink()
+
+
+def _clear(directory: Path) -> None:
+    if _is_directory(directory):
+        for child in directory.iterdir():
+            _remove(child)
+
+
+def merge_content(
+    layer_dir: Path,
+    prime_dir: Path,
+    dest: Path,
+    *,
+    mount: str,
+    nested_mounts: Collection[str] = (),
+) -> None:
+    """Write the content of a partition: the base layer, with a prime directory on top.
+
+    :param layer_dir: the base layer.
+    :param prime_dir: the prime directory of the partition, whose OCI whiteouts
+        remove files of the base layer.
+    :param dest: the directory to write the content to, replaced if it exists.
+    :param mount: where the partition is mounted, the subtree of the base layer it
+        holds.
+    :param nested_mounts: where other partitions are mounted within this one. They
+        are left empty.
+    """
+    emit.progress(f"Merging the base layer into {str(dest)!r}")
+    _remove(dest)
+    dest.mkdir(parents=True)
+    mount_path = PurePosixPath(mount)
+    source = layer_dir / mount_path.relative_to("/")
+    if source.is_dir():
+        run("cp", "--archive", "--reflink=auto", f"{source}/.", dest)
+    for nested in nested_mounts:
+        _clear(dest / PurePosixPath(nested).relative_to(mount_path))
+    if not prime_dir.is_dir():
+        return
+
+    whiteouts: list[Path] = []
+    for dirpath, dirnames, filenames in os.walk(prime_dir):
+        relative = Path(dirpath).relative_to(prime_dir)
+        for name in [*dirnames, *filenames]:
+            target = dest / relative / name
+            if name == _OPAQUE_MARKER:
+                _clear(target.parent)
+                whiteouts.append(target)
+            elif name.startswith(_WHITEOUT_PREFIX):
+                _remove(target.with_name(name.removeprefix(_WHITEOUT_PREFIX)))
+                whiteouts.append(target)
+            elif _is_directory(target) != _is_directory(Path(dirpath, name)):
+                # An entry of another type replaces the one of the base layer.
+                _remove(target)
+
+    run("cp", "--archive", "--reflink=auto", f"{prime_dir}/.", dest)
+    for whiteout in whiteouts:
+        whiteout.unlink()
@@ -14,28 +14,112 @@
 # You should have received a copy of the GNU General Public License along
 # with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-"""Command-line application entry point."""
+"""Command-line application entry point.
 
-from typing import Any
+Heavy dependencies (craft-application, craft-parts, pydantic...) are imported
+inside the functions that need them, so that cheap introspection such as
+``imagecraft --version`` doesn't pay for loading them. Help texts and shell
+completion are produced from the command cache, once the application recorded
+its commands there.
+"""
 
-from craft_application import ServiceFactory
-from craft_cli import Dispatcher
+import logging
+import os
+import sys
+from typing import TYPE_CHECKING, Any
 
-from imagecraft.application import Imagecraft
+if TYPE_CHECKING:
+    from craft_cli import Dispatcher
+
+    from imagecraft.application import Imagecraft
+
+_VERSION_ARGS = (["--version"], ["-V"])
+_HELP_OPTIONS = ("--help", "-h")
+# Set in the environment to skip the command cache.
+_NO_CACHE_ENV = "IMAGECRAFT_NO_COMMAND_CACHE"
 
 
 def run() -> int:
     """Command-line interface entrypoint."""
+    args = sys.argv[1:]
+    if args in _VERSION_ARGS:
+        return _print_version()
+    if _is_help_request(args) and (status := _print_cached_help(args)) is not None:
+        return status
+
     app = _create_app()
 
     return app.run()
 
 
+def _print_version() -> int:
+    """Print the application version without loading the application."""
+    from imagecraft import __version__  # noqa: PLC0415
+
+    print(f"imagecraft {__version__}")
+    return 0
+
+
+def _is_help_request(args: list[str]) -> bool:
+    """Whether the arguments ask for help, as an option or as the command."""
+    if os.environ.get(_NO_CACHE_ENV):
+        return False
+    command = next((arg for arg in args if not arg.startswith("-")), None)
+    return command == "help" or any(arg in _HELP_OPTIONS for arg in args)
+
+
+def _print_cached_help(args: list[str]) -> int | None:
+    """Print the help requested by the arguments, from the command cache.
+
+    Invalid arguments are reported the way the application reports them.
+
+    :returns: The exit status, or None if the commands aren't cached or the
+        arguments don't ask for help, for the application to run them.
+    """
+    # pylint: disable=import-outside-toplevel
+    import craft_cli  # noqa: PLC0415
+
+    from imagecraft import __version__, command_cache  # noqa: PLC0415
+
+    dispatcher = command_cache.load_dispatcher()
+    if dispatcher is None:
+        return None
+
+    root_logger = logging.getLogger()
+    handlers = list(root_logger.handlers)
+    craft_cli.emit.init(
+        craft_cli.EmitterMode.QUIET,
+        "imagecraft",
+        f"Starting imagecraft, version {__version__}",
+    )
+    try:
+        dispatcher.pre_parse_args(args)
+        dispatcher.load_command(None)
+    except craft_cli.ProvideHelpException as err:
+        print(err, file=sys.stderr)  # to stderr, as the application does
+        return 0
+    except craft_cli.ArgumentParsingError as err:
+        print(err, file=sys.stderr)
+        return os.EX_USAGE
+    finally:
+        craft_cli.emit.ended_ok()
+
+    # The arguments didn't ask for help after all. Reset the emitter, and the
+    # logging handler it added, so the application can set them up again.
+    for handler in set(root_logger.handlers) - set(handlers):
+        root_logger.removeHandler(handler)
+    craft_cli.messages.Emitter.__init__(craft_cli.emit)
+    return None
+
+
 def register_services() -> None:
     """Register Imagecraft' services.
 
     :returns: None
     """
+    # pylint: disable=import-outside-toplevel
+    from craft_application import ServiceFactory  # noqa: PLC0415
+
     ServiceFactory.register(
         "lifecycle",
         "ImagecraftLifecycleService",
@@ -45,16 +129,28 @@ def register_services() -> None:
         "package", "ImagecraftPackService", module="imagecraft.services.pack"
     )
     ServiceFactory.register("image", "ImageService", module="imagecraft.services.image")
+    ServiceFactory.register(
+        "provider", "ImagecraftProviderService", module="imagecraft.services.provider"
+    )
     ServiceFactory.register(
         "project", "ImagecraftProjectService", module="imagecraft.services.project"
     )
 
 
-def _create_app() -> Imagecraft:
+def _create_app() -> "Imagecraft":
     # pylint: disable=import-outside-toplevel
     # Import these here so that the script that generates the docs for the
-    # commands doesn't need to know *too much* of the application.
+    # commands doesn't need to know *too much* of the application, and so that
+    # cheap commands don't load the application at all.
+    from craft_application import ServiceFactory  # noqa: PLC0415
+
     from .application import APP_METADATA, Imagecraft  # noqa: PLC0415
+    from .commands import (  # noqa: PLC0415
+        ApplyDeltaCommand,
+        AssembleImageCommand,
+        InspectCommand,
+        PackCommand,
+    )
 
     register_services()
 
@@ -62,11 +158,24 @@ def _create_app() -> Imagecraft:
         app=APP_METADATA,
     )  # type: ignore[assignment]
 
-    return Imagecraft(app=APP_METADATA, services=services, extra_loggers={"imagecraft"})
+    app = Imagecraft(app=APP_METADATA, services=services, extra_loggers={"imagecraft"})
+    app.add_command_group("Lifecycle", [PackCommand])
+    app.add_command_group(
+        "Image", [AssembleImageCommand, ApplyDeltaCommand, InspectCommand]
+    )
+    return app
+
+
+def get_app_info() -> tuple["Dispatcher", dict[str, Any]]:
+    """Retrieve application info. Used by craft-cli's completion module.
+
+    The dispatcher is rebuilt from the command cache if the commands are cached.
+    """
+    from imagecraft import command_cache  # noqa: PLC0415
 
+    if (dispatcher := command_cache.load_dispatcher()) is not None:
+        return dispatcher, {}
 
-def get_app_info() -> tuple[Dispatcher, dict[str, Any]]:
-    """Retrieve application info. Used by craft-cli's completion module."""
     app = _create_app()
     dispatcher = app._create_dispatcher()  # noqa: SLF001 (private member access)  # pyright: ignore[reportPrivateUsage]
 
@@ -0,0 +1,239 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""A cache of the commands of the application, for help and shell completion.
+
+The commands, their arguments and the global arguments are recorded the first
+time the application builds its dispatcher, in the user cache directory, per
+imagecraft version and state of the modules that define the commands, so that
+commands changed without a new version, as in an editable install, are recorded
+again. Help texts and completion are then produced from a dispatcher
+of stand-in commands rebuilt from the cache, without loading craft-application,
+craft-parts or the imagecraft services.
+
+This module only imports craft-cli, and must stay that way.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pathlib
+from collections.abc import Sequence
+from typing import Any
+
+import craft_cli
+
+from imagecraft import __version__
+
+_CACHE_FORMAT = "imagecraft-commands/1"
+
+# The installed imagecraft package, where the commands package and the command
+# groups of cli.py define the commands.
+_PACKAGE_DIR = pathlib.Path(__file__).parent
+
+
+def _get_commands_digest() -> str:
+    """Get a digest of the modification times and sizes of the command modules."""
+    hasher = hashlib.sha256()
+    modules = [
+        *sorted((_PACKAGE_DIR / "commands").rglob("*.py")),
+        _PACKAGE_DIR / "cli.py",
+    ]
+    for path in modules:
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        relative = path.relative_to(_PACKAGE_DIR)
+        hasher.update(f"{relative} {stat.st_mtime_ns} {stat.st_size}\n".encode())
+    return hasher.hexdigest()[:16]
+
+
+def get_cache_path() -> pathlib.Path:
+    """Get the path of the command cache of the running imagecraft commands."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or pathlib.Path.home() / ".cache"
+    return pathlib.Path(
+        cache_home,
+        "imagecraft",
+        f"commands-{__version__}-{_get_commands_digest()}.json",
+    )
+
+
+def _marshal_action(action: argparse.Action) -> dict[str, Any]:
+    return {
+        "option_strings": list(action.option_strings),
+        "dest": action.dest,
+        "nargs": action.nargs,
+        "flag": action.nargs == 0,
+        "choices": [str(choice) for choice in action.choices]
+        if action.choices
+        else None,
+        "required": action.required,
+        "help": action.help,
+        "metavar": action.metavar,
+        "path": action.type is pathlib.Path,
+    }
+
+
+def _marshal_command(
+    command_class: type[craft_cli.BaseCommand], app_config: dict[str, Any]
+) -> dict[str, Any]:
+    parser = argparse.ArgumentParser(add_help=False)
+    command_class(app_config).fill_parser(parser)  # type: ignore[arg-type]
+    return {
+        "name": command_class.name,
+        "help_msg": command_class.help_msg,
+        "overview": command_class.overview,
+        "common": command_class.common,
+        "hidden": command_class.hidden,
+        "arguments": [_marshal_action(action) for action in parser._actions],  # noqa: SLF001
+    }
+
+
+def save(
+    appname: str,
+    command_groups: Sequence[craft_cli.CommandGroup],
+    *,
+    summary: str,
+    global_arguments: Sequence[craft_cli.GlobalArgument],
+    docs_base_url: str | None,
+    app_config: dict[str, Any],
+) -> None:
+    """Record the commands of the application, unless they already are.
+
+    :param appname: the name of the application.
+    :param command_groups: the command groups of the dispatcher.
+    :param summary: the summary of the application, for help texts.
+    :param global_arguments: the global arguments added by the application.
+    :param docs_base_url: the base address of the documentation.
+    :param app_config: the configuration commands are created with.
+    """
+    cache_path = get_cache_path()
+    if cache_path.exists():
+        return
+    data = {
+        "format": _CACHE_FORMAT,
+        "appname": appname,
+        "summary": summary,
+        "docs_base_url": docs_base_url,
+        "global_arguments": [
+            {
+                "name": argument.name,
+                "type": argument.type,
+                "short_option": argument.short_option,
+                "long_option": argument.long_option,
+                "help_message": argument.help_message,
+                "choices": argument.choices,
+            }
+            for argument in global_arguments
+        ],
+        "command_groups": [
+            {
+                "name": group.name,
+                "ordered": group.ordered,
+                "commands": [
+                    _marshal_command(command_class, app_config)
+                    for command_class in group.commands
+                ],
+            }
+            for group in command_groups
+        ],
+    }
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+        temp_path.write_text(json.dumps(data, indent=2))
+        temp_path.replace(cache_path)
+    except OSError as error:
+        craft_cli.emit.debug(f"Could not write the command cache: {error}")
+
+
+def _get_help(text: str | None) -> str | None:
+    # craft-cli hides arguments whose help is argparse.SUPPRESS itself, not an
+    # equal string.
+    return argparse.SUPPRESS if text == argparse.SUPPRESS else text
+
+
+def _unmarshal_command(data: dict[str, Any]) -> type[craft_cli.BaseCommand]:
+    """Create a stand-in command, that only fills its parser like the original."""
+
+    def fill_parser(
+        _self: craft_cli.BaseCommand, parser: argparse.ArgumentParser
+    ) -> None:
+        for argument in data["arguments"]:
+            kwargs: dict[str, Any] = {"help": _get_help(argument["help"])}
+            if argument["flag"]:
+                kwargs.update(action="store_const", const=True)
+            else:
+                kwargs.update(
+                    nargs=argument["nargs"],
+                    choices=argument["choices"],
+                    metavar=argument["metavar"],
+                    type=pathlib.Path if argument["path"] else str,
+                )
+            if argument["option_strings"]:
+                kwargs.update(dest=argument["dest"], required=argument["required"])
+                parser.add_argument(*argument["option_strings"], **kwargs)
+            else:
+                parser.add_argument(argument["dest"], **kwargs)
+
+    return type(
+        data["name"],
+        (craft_cli.BaseCommand,),
+        {
+            "name": data["name"],
+            "help_msg": data["help_msg"],
+            "overview": data["overview"],
+            "common": data["common"],
+            "hidden": data["hidden"],
+            "fill_parser": fill_parser,
+        },
+    )
+
+
+def load_dispatcher() -> craft_cli.Dispatcher | None:
+    """Rebuild the dispatcher of the application from the cache.
+
+    :returns: A dispatcher of stand-in commands, which can't run, or None if the
+        commands aren't cached.
+    """
+    cache_path = get_cache_path()
+    try:
+        data = json.loads(cache_path.read_text())
+        if data["format"] != _CACHE_FORMAT:
+            return None
+        return craft_cli.Dispatcher(
+            data["appname"],
+            [
+                craft_cli.CommandGroup(
+                    group["name"],
+                    [_unmarshal_command(command) for command in group["commands"]],
+                    ordered=group["ordered"],
+                )
+                for group in data["command_groups"]
+            ],
+            summary=data["summary"],
+            extra_global_args=[
+                craft_cli.GlobalArgument(
+                    **{**argument, "help_message": _get_help(argument["help_message"])}
+                )
+                for argument in data["global_arguments"]
+            ],
+            docs_base_url=data["docs_base_url"],
+        )
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
@@ -0,0 +1,300 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Commands operating on packed images."""
+
+import argparse
+import json
+import stat
+import sys
+import textwrap
+from collections.abc import Sequence
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from craft_application.commands import AppCommand
+from craft_cli import ArgumentParsingError, emit
+
+from imagecraft.inspection import DiskImage, Entry, EntryType, FilesystemReader
+from imagecraft.pack import chunkstore, delta
+
+
+class AssembleImageCommand(AppCommand):
+    """Reassemble an image from a chunk index and a chunk store."""
+
+    name = "assemble-image"
+    help_msg = "Reassemble an image from its chunk index"
+    overview = textwrap.dedent(
+        """
+        Reassemble an image from the chunk index written by pack when the
+        chunk_store_dir setting is set.
+
+        Chunks are read from the given seed images when they hold them, such as
+        a previous release of the same image, and from the chunk store otherwise.
+        """
+    )
+
+    def fill_parser(self, parser: argparse.ArgumentParser) -> None:
+        """Add arguments specific to assemble-image."""
+        parser.add_argument(
+            "index", type=Path, help="Path to the chunk index of the image"
+        )
+        parser.add_argument("output", type=Path, help="Path of the image to write")
+        parser.add_argument(
+            "--store",
+            type=Path,
+            required=True,
+            help="Path to the chunk store",
+        )
+        parser.add_argument(
+            "--seed",
+            type=Path,
+            action="append",
+            default=[],
+            dest="seeds",
+            help="Path to an image sharing chunks with the assembled one. "
+            "Can be given several times.",
+        )
+
+    def run(self, parsed_args: argparse.Namespace) -> None:
+        """Run the command."""
+        index = chunkstore.ChunkIndex.read(parsed_args.index)
+        emit.progress(f"Assembling {parsed_args.output}")
+        fetched = chunkstore.assemble_image(
+            index, parsed_args.store, parsed_args.output, seeds=parsed_args.seeds
+        )
+        emit.message(
+            f"Assembled {parsed_args.output}, reading {fetched} of "
+            f"{index.stored_size} bytes from the chunk store"
+        )
+
+
+class ApplyDeltaCommand(AppCommand):
+    """Rebuild an image from a previous image and a delta."""
+
+    name = "apply-delta"
+    help_msg = "Apply a delta to a previous image"
+    overview = textwrap.dedent(
+        """
+        Rebuild an image from the delta written by pack --delta-from and the
+        previous image the delta was generated from.
+
+        Every range of the rebuilt image is checked against the digest recorded
+        in the delta.
+        """
+    )
+
+    def fill_parser(self, parser: argparse.ArgumentParser) -> None:
+        """Add arguments specific to apply-delta."""
+        parser.add_argument("delta", type=Path, help="Path to the delta")
+        parser.add_argument(
+            "source", type=Path, help="Path to the image the delta applies to"
+        )
+        parser.add_argument("output", type=Path, help="Path of the image to write")
+
+    def run(self, parsed_args: argparse.Namespace) -> None:
+        """Run the command."""
+        emit.progress(f"Applying {parsed_args.delta} to {parsed_args.source}")
+        delta.apply_delta(parsed_args.delta, parsed_args.source, parsed_args.output)
+        emit.message(f"Wrote {parsed_args.output}")
+
+
+class InspectCommand(AppCommand):
+    """Show the partitions and files of an image without mounting it."""
+
+    name = "inspect"
+    help_msg = "Show the partitions and files of an image"
+    overview = textwrap.dedent(
+        """
+        Show the partition table of an image, the filesystem of one of its
+        partitions, or a path in that filesystem. Directories are listed and
+        other paths described. A path can also be printed with --cat, or copied
+        out of the image with --extract.
+
+        Partitions are selected by GPT name or by number. The image is read
+        directly, without privileges or loop devices. ext2, ext3, ext4 and FAT
+        filesystems are supported.
+        """
+    )
+
+    def fill_parser(self, parser: argparse.ArgumentParser) -> None:
+        """Add arguments specific to inspect."""
+        parser.add_argument("image", type=Path, help="Path to the image")
+        parser.add_argument(
+            "partition", nargs="?", help="Name or number of a partition"
+        )
+        parser.add_argument(
+            "path", nargs="?", help="Path in the filesystem of the partition"
+        )
+        action = parser.add_mutually_exclusive_group()
+        action.add_argument(
+            "--cat", action="store_true", help="Print the content of the file"
+        )
+        action.add_argument(
+            "--extract",
+            type=Path,
+            metavar="dest",
+            help="Copy the file or directory to dest",
+        )
+        parser.add_argument(
+            "--format",
+            choices=["table", "json"],
+            default="table",
+            help="Output format",
+        )
+
+    def run(self, parsed_args: argparse.Namespace) -> None:
+        """Run the command."""
+        if parsed_args.path is None and (parsed_args.cat or parsed_args.extract):
+            raise ArgumentParsingError("--cat and --extract need a path")
+
+        with DiskImage(parsed_args.image) as image:
+            if parsed_args.partition is None:
+                self._show_partitions(image, parsed_args.format)
+                return
+
+            filesystem = image.open_filesystem(
+                image.get_partition(parsed_args.partition)
+            )
+            path = parsed_args.path or "/"
+            if parsed_args.cat:
+                for data in filesystem.read(path):
+                    sys.stdout.buffer.write(data)
+                sys.stdout.buffer.flush()
+            elif parsed_args.extract:
+                filesystem.extract(path, parsed_args.extract)
+                emit.message(f"Extracted {path} to {parsed_args.extract}")
+            else:
+                self._show_path(filesystem, path, parsed_args.format)
+
+    @staticmethod
+    def _show_partitions(image: DiskImage, output_format: str) -> None:
+        table = image.partition_table
+        partitions: list[dict[str, Any]] = []
+        for partition in table.partitions:
+            filesystem = image.detect_filesystem(partition)
+            partitions.append(
+                {
+                    "number": partition.number,
+                    "name": partition.name,
+                    "offset": partition.offset,
+                    "size": partition.size,
+                    "type": partition.type,
+                    "uuid": partition.uuid,
+                    "filesystem": _filesystem_info(filesystem) if filesystem else None,
+                }
+            )
+
+        if output_format == "json":
+            info = {
+                "schema": table.schema.value,
+                "sector-size": table.sector_size,
+                "disk-id": table.disk_id,
+                "partitions": partitions,
+            }
+            emit.message(json.dumps(info, indent=2))
+            return
+
+        emit.message(
+            f"Partition table: {table.schema.value}, sector size "
+            f"{table.sector_size}, disk ID {table.disk_id}"
+        )
+        rows = [
+            [
+                str(p["number"]),
+                p["name"] or "",
+                str(p["offset"]),
+                str(p["size"]),
+                p["type"],
+                p["filesystem"]["type"] if p["filesystem"] else "",
+                p["filesystem"]["label"] if p["filesystem"] else "",
+            ]
+            for p in partitions
+        ]
+        emit.message(
+            _format_table(
+                ["Number", "Name", "Offset", "Size", "Type", "Filesystem", "Label"],
+                rows,
+            )
+        )
+
+    @staticmethod
+    def _show_path(filesystem: FilesystemReader, path: str, output_format: str) -> None:
+        entry = filesystem.lookup(path, follow_symlinks=False)
+        if entry.type == EntryType.SYMLINK and path.endswith("/"):
+            entry = filesystem.lookup(path)
+        is_root = path.strip("/") == ""
+        entries = filesystem.listdir(path) if entry.type == EntryType.DIRECTORY else []
+
+        if output_format == "json":
+            info = _entry_info(entry)
+            if is_root:
+                info["filesystem"] = _filesystem_info(filesystem)
+            if entry.type == EntryType.DIRECTORY:
+                info["entries"] = [_entry_info(child) for child in entries]
+            emit.message(json.dumps(info, indent=2))
+            return
+
+        if is_root:
+            emit.message(
+                f"Filesystem: {filesystem.fstype}, label {filesystem.label!r}, "
+                f"UUID {filesystem.uuid}"
+            )
+        if entry.type != EntryType.DIRECTORY:
+            entries = [entry]
+        emit.message("\n".join(_format_entry(child) for child in entries))
+
+
+def _filesystem_info(filesystem: FilesystemReader) -> dict[str, str]:
+    return {
+        "type": filesystem.fstype,
+        "label": filesystem.label,
+        "uuid": filesystem.uuid,
+    }
+
+
+def _entry_info(entry: Entry) -> dict[str, Any]:
+    return {
+        "name": entry.name,
+        "type": entry.type.value,
+        "size": entry.size,
+        "mode": f"{stat.S_IMODE(entry.mode):04o}",
+        "uid": entry.uid,
+        "gid": entry.gid,
+        "mtime": entry.mtime,
+        "target": entry.target,
+    }
+
+
+def _format_entry(entry: Entry) -> str:
+    """Format an entry like ``ls -l`` does."""
+    mtime = datetime.fromtimestamp(entry.mtime, tz=UTC).strftime("%Y-%m-%d %H:%M")
+    name = f"{entry.name} -> {entry.target}" if entry.target else entry.name
+    return (
+        f"{stat.filemode(entry.mode)} {entry.uid:>5} {entry.gid:>5} "
+        f"{entry.size:>10} {mtime} {name}"
+    )
+
+
+def _format_table(headers: Sequence[str], rows: Sequence[Sequence[str]]) -> str:
+    widths = [max(len(row[i]) for row in [headers, *rows]) for i in range(len(headers))]
+    return "\n".join(
+        "  ".join(
+            cell.ljust(width) for cell, width in zip(row, widths, strict=True)
+        ).rstrip()
+        for row in [headers, *rows]
+    )
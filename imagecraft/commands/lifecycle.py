@@ -0,0 +1,67 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Lifecycle commands overridden by imagecraft."""
+
+import argparse
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, cast
+
+from craft_application.commands import lifecycle
+from craft_cli import ArgumentParsingError
+from typing_extensions import override
+
+if TYPE_CHECKING:
+    from imagecraft.services.pack import ImagecraftPackService
+
+
+class PackCommand(lifecycle.PackCommand):
+    """Pack command, able to generate deltas against previous images."""
+
+    @override
+    def _fill_parser(self, parser: argparse.ArgumentParser) -> None:
+        super()._fill_parser(parser)
+        parser.add_argument(
+            "--delta-from",
+            type=Path,
+            metavar="old-image",
+            help="Previous image of the volume, or a directory of previous "
+            "<volume>.img images, to write a delta against. Requires "
+            "--destructive-mode",
+        )
+
+    @override
+    def _run(
+        self,
+        parsed_args: argparse.Namespace,
+        step_name: str | None = None,
+        **kwargs: Any,
+    ) -> None:
+        # The previous images are on the host, out of reach of a managed build.
+        if getattr(parsed_args, "delta_from", None) and self._use_provider(parsed_args):
+            raise ArgumentParsingError(
+                "--delta-from can only be used with --destructive-mode"
+            )
+        super()._run(parsed_args, step_name, **kwargs)
+
+    @override
+    def _run_real(
+        self, parsed_args: argparse.Namespace, step_name: str | None = None
+    ) -> None:
+        if delta_from := getattr(parsed_args, "delta_from", None):
+            package = cast("ImagecraftPackService", self._services.get("package"))
+            package.set_delta_from(delta_from.resolve())
+        super()._run_real(parsed_args, step_name)
@@ -83,3 +83,7 @@ class PartitionError(ImagecraftError):
 
 class MBRPartitionError(PartitionError):
     """Raised when an error occurs with an MBR partition table."""
+
+
+class InspectError(ImagecraftError):
+    """Raised when the content of an image cannot be read."""
@@ -0,0 +1,39 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Read-only inspection of packed images, without privileges or loop devices."""
+
+from imagecraft.inspection.disk import (
+    DiskImage,
+    Partition,
+    PartitionTable,
+    read_partition_table,
+)
+from imagecraft.inspection.filesystem import Entry, EntryType, FilesystemReader
+from imagecraft.inspection.verify import Difference, compare_tree
+
+__all__ = [
+    "Difference",
+    "DiskImage",
+    "Entry",
+    "EntryType",
+    "FilesystemReader",
+    "Partition",
+    "PartitionTable",
+    "compare_tree",
+    "read_partition_table",
+]
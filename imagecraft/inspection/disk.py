@@ -0,0 +1,282 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""In-process, read-only access to disk images.
+
+Images are memory-mapped, and their partition tables parsed without sfdisk, so
+they can be inspected without privileges or loop devices.
+"""
+
+import mmap
+import struct
+import uuid
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from types import TracebackType
+
+from typing_extensions import Self
+
+from imagecraft.errors import InspectError, PartitionError
+from imagecraft.inspection import extfs, fatfs
+from imagecraft.inspection.filesystem import FilesystemReader
+from imagecraft.models.volume import PartitionSchema
+
+_MBR_SECTOR_SIZE = 512
+_MBR_SIGNATURE = b"\x55\xaa"
+_MBR_ENTRIES_OFFSET = 446
+_MBR_DISK_ID_OFFSET = 440
+_MBR_PRIMARY_SLOTS = 4
+_MBR_FIRST_LOGICAL = 5
+_MBR_EXTENDED_TYPES = (0x05, 0x0F, 0x85)
+_MBR_PROTECTIVE_TYPE = 0xEE
+
+_GPT_SIGNATURE = b"EFI PART"
+_GPT_SECTOR_SIZES = (512, 4096)
+
+
+@dataclass(frozen=True)
+class Partition:
+    """A partition of a disk image.
+
+    :param number: partition number, as used in device names.
+    :param name: GPT partition name, None for MBR partitions.
+    :param offset: offset of the partition in the image, in bytes.
+    :param size: size of the partition in bytes.
+    :param type: GPT type GUID, or MBR type as a hexadecimal byte.
+    :param uuid: GPT partition GUID, None for MBR partitions.
+    """
+
+    number: int
+    name: str | None
+    offset: int
+    size: int
+    type: str
+    uuid: str | None = None
+
+
+@dataclass(frozen=True)
+class PartitionTable:
+    """The partition table of a disk image.
+
+    :param schema: the partitioning schema. Hybrid tables are described by their
+        GPT.
+    :param disk_id: GPT disk GUID, or MBR disk identifier.
+    """
+
+    schema: PartitionSchema
+    sector_size: int
+    disk_id: str
+    partitions: list[Partition]
+
+
+def _read_gpt(image: mmap.mmap) -> PartitionTable | None:
+    for sector_size in _GPT_SECTOR_SIZES:
+        header = image[sector_size : sector_size + 92]
+        if header[:8] == _GPT_SIGNATURE:
+            break
+    else:
+        return None
+
+    (header_size, header_crc) = struct.unpack_from("<II", header, 12)
+    header = image[sector_size : sector_size + header_size]
+    if zlib.crc32(header[:16] + b"\0\0\0\0" + header[20:]) != header_crc:
+        raise PartitionError("Corrupt GPT: bad header checksum.")
+    disk_guid = uuid.UUID(bytes_le=header[56:72])
+    entries_lba, entry_count, entry_size = struct.unpack_from("<QII", header, 72)
+
+    partitions: list[Partition] = []
+    entries_offset = entries_lba * sector_size
+    for index in range(entry_count):
+        entry = image[
+            entries_offset + index * entry_size : entries_offset
+            + (index + 1) * entry_size
+        ]
+        if len(entry) < 128 or not any(entry[:16]):  # noqa: PLR2004 (entry size)
+            continue
+        first_lba, last_lba = struct.unpack_from("<QQ", entry, 32)
+        partitions.append(
+            Partition(
+                number=index + 1,
+                name=entry[56:128].decode("utf-16-le").split("\0")[0],
+                offset=first_lba * sector_size,
+                size=(last_lba - first_lba + 1) * sector_size,
+                type=str(uuid.UUID(bytes_le=entry[:16])).upper(),
+                uuid=str(uuid.UUID(bytes_le=entry[16:32])).upper(),
+            )
+        )
+
+    mbr = _read_mbr_entries(image, 0)
+    hybrid = any(t not in (0, _MBR_PROTECTIVE_TYPE) for t, _, _ in mbr)
+    return PartitionTable(
+        schema=PartitionSchema.HYBRID if hybrid else PartitionSchema.GPT,
+        sector_size=sector_size,
+        disk_id=str(disk_guid).upper(),
+        partitions=partitions,
+    )
+
+
+def _read_mbr_entries(image: mmap.mmap, lba: int) -> list[tuple[int, int, int]]:
+    """Read the (type, relative start, sector count) entries of an MBR or EBR."""
+    sector = image[lba * _MBR_SECTOR_SIZE : (lba + 1) * _MBR_SECTOR_SIZE]
+    if sector[510:512] != _MBR_SIGNATURE:
+        raise PartitionError(f"No partition table found at sector {lba}.")
+    entries: list[tuple[int, int, int]] = []
+    for slot in range(_MBR_PRIMARY_SLOTS):
+        offset = _MBR_ENTRIES_OFFSET + 16 * slot
+        part_type = sector[offset + 4]
+        start, count = struct.unpack_from("<II", sector, offset + 8)
+        entries.append((part_type, start, count))
+    return entries
+
+
+def _read_mbr(image: mmap.mmap) -> PartitionTable:
+    partitions: list[Partition] = []
+    for slot, (part_type, start, count) in enumerate(_read_mbr_entries(image, 0)):
+        if not part_type:
+            continue
+        partitions.append(
+            Partition(
+                number=slot + 1,
+                name=None,
+                offset=start * _MBR_SECTOR_SIZE,
+                size=count * _MBR_SECTOR_SIZE,
+                type=f"{part_type:02X}",
+            )
+        )
+        if part_type in _MBR_EXTENDED_TYPES:
+            partitions.extend(_read_logical_partitions(image, start))
+
+    (disk_id,) = struct.unpack_from("<I", image, _MBR_DISK_ID_OFFSET)
+    return PartitionTable(
+        schema=PartitionSchema.MBR,
+        sector_size=_MBR_SECTOR_SIZE,
+        disk_id=f"0x{disk_id:08x}",
+        partitions=partitions,
+    )
+
+
+def _read_logical_partitions(image: mmap.mmap, extended_start: int) -> list[Partition]:
+    """Follow the chain of extended boot records of an extended partition."""
+    partitions: list[Partition] = []
+    ebr = extended_start
+    seen: set[int] = set()
+    while ebr not in seen:
+        seen.add(ebr)
+        (part_type, start, count), (_, next_start, _), *_ = _read_mbr_entries(
+            image, ebr
+        )
+        if part_type:
+            partitions.append(
+                Partition(
+                    number=_MBR_FIRST_LOGICAL + len(partitions),
+                    name=None,
+                    offset=(ebr + start) * _MBR_SECTOR_SIZE,
+                    size=count * _MBR_SECTOR_SIZE,
+                    type=f"{part_type:02X}",
+                )
+            )
+        if not next_start:
+            break
+        ebr = extended_start + next_start
+    return partitions
+
+
+def read_partition_table(image: mmap.mmap) -> PartitionTable:
+    """Parse the partition table of a memory-mapped disk image.
+
+    :raises PartitionError: If the image has no valid partition table.
+    """
+    return _read_gpt(image) or _read_mbr(image)
+
+
+class DiskImage:
+    """A disk image, memory-mapped read-only.
+
+    Use as a context manager, or close it when done. Readers obtained from the
+    image must not be used once it is closed.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        try:
+            with path.open("rb") as image_file:
+                self._image = mmap.mmap(image_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as err:
+            raise InspectError(
+                f"Cannot open image {str(path)!r}.", details=str(err)
+            ) from err
+        try:
+            self.partition_table = read_partition_table(self._image)
+        except Exception:
+            self._image.close()
+            raise
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Unmap the image."""
+        self._image.close()
+
+    def get_partition(self, key: str) -> Partition:
+        """Get a partition by GPT name or by number.
+
+        :raises InspectError: If no partition matches.
+        """
+        partitions = self.partition_table.partitions
+        partition = next((p for p in partitions if p.name == key), None) or next(
+            (p for p in partitions if str(p.number) == key), None
+        )
+        if partition is None:
+            raise InspectError(f"No partition {key!r} in {str(self.path)!r}.")
+        return partition
+
+    def open_filesystem(self, partition: Partition) -> FilesystemReader:
+        """Get a reader for the filesystem of a partition.
+
+        :raises InspectError: If the partition holds no supported filesystem.
+        """
+        if partition.offset + partition.size > len(self._image):
+            raise InspectError(
+                f"Partition {partition.number} extends past the end of the image."
+            )
+        reader: type[FilesystemReader]
+        if extfs.is_ext(self._image, partition.offset):
+            reader = extfs.ExtReader
+        elif fatfs.is_fat(self._image, partition.offset):
+            reader = fatfs.FatReader
+        else:
+            raise InspectError(
+                f"Partition {partition.number} holds no supported filesystem."
+            )
+        return reader(self._image, partition.offset, partition.size)
+
+    def detect_filesystem(self, partition: Partition) -> FilesystemReader | None:
+        """Get a reader for the filesystem of a partition, None if there is none."""
+        try:
+            return self.open_filesystem(partition)
+        except InspectError:
+            return None
@@ -0,0 +1,263 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Read-only reader of ext2, ext3 and ext4 filesystems.
+
+Files are located through the inode tables and read through extent trees or, for
+filesystems without the extents feature, classic block maps. Journals are not
+replayed, so a filesystem must have been cleanly unmounted to be read reliably,
+as packed images are.
+"""
+
+import struct
+import uuid
+from collections.abc import Iterator
+from mmap import mmap
+
+from imagecraft.errors import InspectError
+from imagecraft.inspection.filesystem import Entry, EntryType, FilesystemReader
+
+SUPERBLOCK_OFFSET = 1024
+MAGIC = 0xEF53
+_MAGIC_OFFSET = SUPERBLOCK_OFFSET + 0x38
+
+_ROOT_INODE = 2
+
+_COMPAT_HAS_JOURNAL = 0x4
+_INCOMPAT_EXTENTS = 0x40
+_INCOMPAT_64BIT = 0x80
+
+_EXTENTS_FL = 0x80000
+_INLINE_DATA_FL = 0x10000000
+
+_EXTENT_MAGIC = 0xF30A
+# Extents longer than this are uninitialized and read as zeros.
+_EXTENT_INIT_MAX_LEN = 32768
+
+_I_BLOCK_OFFSET = 40
+_I_BLOCK_SIZE = 60
+_DIRECT_BLOCKS = 12
+
+_S_IFMT = 0o170000
+_ENTRY_TYPES = {
+    0o040000: EntryType.DIRECTORY,
+    0o100000: EntryType.FILE,
+    0o120000: EntryType.SYMLINK,
+}
+
+# Largest piece of a file returned at once.
+_READ_SIZE = 1 << 20
+
+
+def is_ext(image: bytes | mmap, offset: int) -> bool:
+    """Whether an ext filesystem starts at an offset of an image."""
+    magic = image[offset + _MAGIC_OFFSET : offset + _MAGIC_OFFSET + 2]
+    return magic == MAGIC.to_bytes(2, "little")
+
+
+class ExtReader(FilesystemReader):
+    """Reader of an ext2, ext3 or ext4 filesystem."""
+
+    def __init__(self, image: mmap, offset: int, size: int) -> None:
+        super().__init__(image, offset, size)
+        sb = self._read_bytes(SUPERBLOCK_OFFSET, 1024)
+        (magic,) = struct.unpack_from("<H", sb, 0x38)
+        if magic != MAGIC:
+            raise InspectError("Not an ext filesystem.")
+        (
+            self._first_data_block,
+            log_block_size,
+        ) = struct.unpack_from("<II", sb, 0x14)
+        (self._inodes_per_group,) = struct.unpack_from("<I", sb, 0x28)
+        (rev_level,) = struct.unpack_from("<I", sb, 0x4C)
+        (inode_size,) = struct.unpack_from("<H", sb, 0x58)
+        compat, incompat = struct.unpack_from("<II", sb, 0x5C)
+        (desc_size,) = struct.unpack_from("<H", sb, 0xFE)
+
+        self._block_size = 1024 << log_block_size
+        self._inode_size = inode_size if rev_level else 128
+        self._desc_size = desc_size if incompat & _INCOMPAT_64BIT else 32
+        self.uuid = str(uuid.UUID(bytes=sb[0x68:0x78]))
+        self.label = sb[0x78:0x88].split(b"\0")[0].decode(errors="replace")
+        if incompat & _INCOMPAT_EXTENTS:
+            self.fstype = "ext4"
+        elif compat & _COMPAT_HAS_JOURNAL:
+            self.fstype = "ext3"
+        else:
+            self.fstype = "ext2"
+
+    def _block(self, number: int, count: int = 1) -> bytes:
+        return self._read_bytes(number * self._block_size, count * self._block_size)
+
+    def _inode(self, number: int) -> bytes:
+        group, index = divmod(number - 1, self._inodes_per_group)
+        descriptor = self._read_bytes(
+            (self._first_data_block + 1) * self._block_size + group * self._desc_size,
+            self._desc_size,
+        )
+        (table,) = struct.unpack_from("<I", descriptor, 0x8)
+        if self._desc_size >= 64:  # noqa: PLR2004 (64-bit descriptors)
+            (table_hi,) = struct.unpack_from("<I", descriptor, 0x28)
+            table |= table_hi << 32
+        return self._read_bytes(
+            table * self._block_size + index * self._inode_size, self._inode_size
+        )
+
+    def _entry(self, name: str, number: int) -> Entry:
+        inode = self._inode(number)
+        mode, uid, size, _, _, mtime, _, gid = struct.unpack_from("<HHIIIIIH", inode)
+        (size_hi,) = struct.unpack_from("<I", inode, 0x6C)
+        uid_hi, gid_hi = struct.unpack_from("<HH", inode, 0x78)
+        entry_type = _ENTRY_TYPES.get(mode & _S_IFMT, EntryType.OTHER)
+        size |= size_hi << 32
+        target = None
+        if entry_type == EntryType.SYMLINK:
+            target = self._read_symlink(inode, size).decode(errors="surrogateescape")
+        return Entry(
+            name=name,
+            type=entry_type,
+            size=size,
+            mode=mode,
+            uid=uid | uid_hi << 16,
+            gid=gid | gid_hi << 16,
+            mtime=mtime,
+            target=target,
+            ref=number,
+        )
+
+    def _read_symlink(self, inode: bytes, size: int) -> bytes:
+        (flags,) = struct.unpack_from("<I", inode, 0x20)
+        # Short targets are stored in the inode itself.
+        if not flags & _EXTENTS_FL and size < _I_BLOCK_SIZE:
+            return inode[_I_BLOCK_OFFSET : _I_BLOCK_OFFSET + size]
+        return b"".join(self._read_inode(inode, size))
+
+    def _extent_runs(self, node: bytes) -> Iterator[tuple[int, int | None, int]]:
+        """Yield (logical block, physical block, count) runs of an extent tree.
+
+        The physical block is None for uninitialized extents.
+        """
+        magic, entries, _, depth = struct.unpack_from("<HHHH", node)
+        if magic != _EXTENT_MAGIC:
+            raise InspectError(f"Corrupt {self.fstype} filesystem: bad extent header.")
+        for index in range(entries):
+            offset = 12 + 12 * index
+            if depth == 0:
+                logical, length, start_hi, start_lo = struct.unpack_from(
+                    "<IHHI", node, offset
+                )
+                if length > _EXTENT_INIT_MAX_LEN:
+                    yield logical, None, length - _EXTENT_INIT_MAX_LEN
+                else:
+                    yield logical, start_hi << 32 | start_lo, length
+            else:
+                _, leaf_lo, leaf_hi = struct.unpack_from("<IIH", node, offset)
+                yield from self._extent_runs(self._block(leaf_hi << 32 | leaf_lo))
+
+    def _map_runs(self, pointer: int, depth: int, logical: int) -> Iterator[int]:
+        """Yield the physical blocks mapped by an indirect block of a block map."""
+        per_block = self._block_size // 4
+        span = per_block ** (depth - 1)
+        children = struct.unpack_from(f"<{per_block}I", self._block(pointer))
+        for index, child in enumerate(children):
+            if not child:
+                continue
+            if depth == 1:
+                yield logical + index, child
+            else:
+                yield from self._map_runs(child, depth - 1, logical + index * span)
+
+    def _block_map_runs(self, inode: bytes) -> Iterator[tuple[int, int | None, int]]:
+        """Yield (logical block, physical block, count) runs of a block map."""
+        pointers = struct.unpack_from("<15I", inode, _I_BLOCK_OFFSET)
+        per_block = self._block_size // 4
+        blocks = [(i, p) for i, p in enumerate(pointers[:_DIRECT_BLOCKS]) if p]
+        logical = _DIRECT_BLOCKS
+        for depth, pointer in enumerate(pointers[_DIRECT_BLOCKS:], start=1):
+            if pointer:
+                blocks.extend(self._map_runs(pointer, depth, logical))
+            logical += per_block**depth
+
+        run: list[int] | None = None
+        for logical, physical in blocks:
+            if run and logical == run[0] + run[2] and physical == run[1] + run[2]:
+                run[2] += 1
+                continue
+            if run:
+                yield run[0], run[1], run[2]
+            run = [logical, physical, 1]
+        if run:
+            yield run[0], run[1], run[2]
+
+    def _read_inode(self, inode: bytes, size: int) -> Iterator[bytes]:
+        (flags,) = struct.unpack_from("<I", inode, 0x20)
+        if flags & _INLINE_DATA_FL:
+            raise InspectError(
+                f"Cannot read {self.fstype} filesystem: inline data is not supported."
+            )
+        if flags & _EXTENTS_FL:
+            i_block = inode[_I_BLOCK_OFFSET : _I_BLOCK_OFFSET + _I_BLOCK_SIZE]
+            runs = sorted(self._extent_runs(i_block))
+        else:
+            runs = list(self._block_map_runs(inode))
+
+        position = 0
+        for logical, physical, count in runs:
+            start = logical * self._block_size
+            if start >= size:
+                break
+            yield from _zeros(start - position)
+            end = min(start + count * self._block_size, size)
+            if physical is None:
+                yield from _zeros(end - start)
+            else:
+                base = physical * self._block_size - start
+                for offset in range(start, end, _READ_SIZE):
+                    length = min(_READ_SIZE, end - offset)
+                    yield self._read_bytes(base + offset, length)
+            position = end
+        yield from _zeros(size - position)
+
+    def root(self) -> Entry:
+        """Get the root directory."""
+        return self._entry("/", _ROOT_INODE)
+
+    def _list(self, directory: Entry) -> list[Entry]:
+        data = b"".join(self._read_inode(self._inode(directory.ref), directory.size))
+        entries: list[Entry] = []
+        offset = 0
+        while offset + 8 <= len(data):
+            number, rec_len, name_len = struct.unpack_from("<IHB", data, offset)
+            if rec_len < 8:  # noqa: PLR2004 (size of a directory entry header)
+                raise InspectError(
+                    f"Corrupt {self.fstype} filesystem: bad directory entry."
+                )
+            name = data[offset + 8 : offset + 8 + name_len]
+            if number and name not in (b".", b".."):
+                entries.append(
+                    self._entry(name.decode(errors="surrogateescape"), number)
+                )
+            offset += rec_len
+        return entries
+
+    def _read(self, entry: Entry) -> Iterator[bytes]:
+        return self._read_inode(self._inode(entry.ref), entry.size)
+
+
+def _zeros(size: int) -> Iterator[bytes]:
+    for offset in range(0, size, _READ_SIZE):
+        yield bytes(min(_READ_SIZE, size - offset))
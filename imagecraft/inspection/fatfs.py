@@ -0,0 +1,274 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Read-only reader of FAT12, FAT16 and FAT32 filesystems, with long file names."""
+
+import calendar
+import struct
+from collections.abc import Iterator
+from mmap import mmap
+
+from imagecraft.errors import InspectError
+from imagecraft.inspection.filesystem import Entry, EntryType, FilesystemReader
+
+_BOOT_SIGNATURE = b"\x55\xaa"
+_SECTOR_SIZES = (512, 1024, 2048, 4096)
+
+# Cluster counts from which FAT16 and FAT32 are used, as in the FAT specification.
+_FAT16_MIN_CLUSTERS = 4085
+_FAT32_MIN_CLUSTERS = 65525
+_END_OF_CHAIN = {12: 0xFF8, 16: 0xFFF8, 32: 0x0FFFFFF8}
+
+_DIRENT_SIZE = 32
+_ATTR_READ_ONLY = 0x01
+_ATTR_VOLUME_ID = 0x08
+_ATTR_DIRECTORY = 0x10
+_ATTR_LONG_NAME = 0x0F
+_ATTR_LONG_NAME_MASK = 0x3F
+_LAST_LONG_ENTRY = 0x40
+_DELETED = 0xE5
+# A leading 0x05 in a short name stands for 0xE5.
+_KANJI_E5 = 0x05
+_LOWERCASE_BASE = 0x08
+_LOWERCASE_EXT = 0x10
+
+
+def is_fat(image: bytes | mmap, offset: int) -> bool:
+    """Whether a FAT filesystem starts at an offset of an image."""
+    boot = image[offset : offset + 512]
+    if len(boot) < 512 or boot[510:512] != _BOOT_SIGNATURE:  # noqa: PLR2004
+        return False
+    bytes_per_sector, sectors_per_cluster = struct.unpack_from("<HB", boot, 11)
+    return (
+        boot[0] in (0xEB, 0xE9)
+        and bytes_per_sector in _SECTOR_SIZES
+        and sectors_per_cluster > 0
+        and sectors_per_cluster & (sectors_per_cluster - 1) == 0
+    )
+
+
+def _dos_time(date: int, time: int) -> int:
+    """Convert a FAT date and time to seconds since the epoch."""
+    if not date:
+        return 0
+    return calendar.timegm(
+        (
+            1980 + (date >> 9),
+            date >> 5 & 0xF,
+            date & 0x1F,
+            time >> 11,
+            time >> 5 & 0x3F,
+            (time & 0x1F) * 2,
+            0,
+            0,
+            0,
+        )
+    )
+
+
+def _short_name(raw: bytes, flags: int) -> str:
+    base = bytearray(raw[:8].rstrip(b" "))
+    if base and base[0] == _KANJI_E5:
+        base[0] = _DELETED
+    name = base.decode("cp437")
+    ext = raw[8:11].rstrip(b" ").decode("cp437")
+    if flags & _LOWERCASE_BASE:
+        name = name.lower()
+    if flags & _LOWERCASE_EXT:
+        ext = ext.lower()
+    return f"{name}.{ext}" if ext else name
+
+
+def _short_name_checksum(raw: bytes) -> int:
+    checksum = 0
+    for byte in raw[:11]:
+        checksum = ((checksum >> 1) | (checksum & 1) << 7) + byte & 0xFF
+    return checksum
+
+
+def _make_entry(raw: bytes, name: str) -> Entry:
+    """Make an entry from a short directory entry.
+
+    FAT has no owners or Unix permissions. Entries are owned by root, with mode
+    0755 for directories and 0644 for files, or 0444 for read-only files.
+    """
+    attr = raw[11]
+    cluster_hi, mtime, mdate, cluster_lo, size = struct.unpack_from("<HHHHI", raw, 20)
+    if attr & _ATTR_DIRECTORY:
+        entry_type, mode, size = EntryType.DIRECTORY, 0o40755, 0
+    elif attr & _ATTR_READ_ONLY:
+        entry_type, mode = EntryType.FILE, 0o100444
+    else:
+        entry_type, mode = EntryType.FILE, 0o100644
+    return Entry(
+        name=name,
+        type=entry_type,
+        size=size,
+        mode=mode,
+        uid=0,
+        gid=0,
+        mtime=_dos_time(mdate, mtime),
+        ref=cluster_hi << 16 | cluster_lo,
+    )
+
+
+class FatReader(FilesystemReader):
+    """Reader of a FAT filesystem."""
+
+    posix_metadata = False
+    case_sensitive = False
+
+    def __init__(self, image: mmap, offset: int, size: int) -> None:
+        super().__init__(image, offset, size)
+        if not is_fat(image, offset):
+            raise InspectError("Not a FAT filesystem.")
+        boot = self._read_bytes(0, 512)
+        (
+            self._sector_size,
+            self._sectors_per_cluster,
+            reserved_sectors,
+            fat_count,
+            root_entries,
+            total_sectors,
+            _,
+            fat_sectors,
+        ) = struct.unpack_from("<HBHBHHBH", boot, 11)
+        total_sectors = total_sectors or struct.unpack_from("<I", boot, 32)[0]
+        fat_sectors = fat_sectors or struct.unpack_from("<I", boot, 36)[0]
+
+        root_sectors = -(-root_entries * _DIRENT_SIZE // self._sector_size)
+        self._fat_offset = reserved_sectors * self._sector_size
+        self._root_offset = (
+            self._fat_offset + fat_count * fat_sectors * self._sector_size
+        )
+        self._root_size = root_sectors * self._sector_size
+        self._data_offset = self._root_offset + self._root_size
+        self._cluster_size = self._sectors_per_cluster * self._sector_size
+        self._clusters = (
+            total_sectors - self._data_offset // self._sector_size
+        ) // self._sectors_per_cluster
+
+        if self._clusters < _FAT16_MIN_CLUSTERS:
+            self._bits = 12
+        elif self._clusters < _FAT32_MIN_CLUSTERS:
+            self._bits = 16
+        else:
+            self._bits = 32
+        self.fstype = f"fat{self._bits}"
+
+        # The extended boot record moved in FAT32 to make room for more fields.
+        ebr = 64 if self._bits == 32 else 36  # noqa: PLR2004
+        self._root_cluster = struct.unpack_from("<I", boot, 44)[0] if ebr == 64 else 0  # noqa: PLR2004
+        (volume_id,) = struct.unpack_from("<I", boot, ebr + 3)
+        self.uuid = f"{volume_id >> 16:04X}-{volume_id & 0xFFFF:04X}"
+        label = boot[ebr + 7 : ebr + 18].rstrip(b" ").decode("cp437")
+        self.label = "" if label == "NO NAME" else label
+
+    def _fat_entry(self, cluster: int) -> int:
+        if self._bits == 12:  # noqa: PLR2004
+            (value,) = struct.unpack(
+                "<H", self._read_bytes(self._fat_offset + cluster * 3 // 2, 2)
+            )
+            return value >> 4 if cluster & 1 else value & 0xFFF
+        if self._bits == 16:  # noqa: PLR2004
+            return struct.unpack(
+                "<H", self._read_bytes(self._fat_offset + cluster * 2, 2)
+            )[0]
+        (value,) = struct.unpack(
+            "<I", self._read_bytes(self._fat_offset + cluster * 4, 4)
+        )
+        return value & 0x0FFFFFFF
+
+    def _chain(self, cluster: int) -> Iterator[int]:
+        """Yield the clusters of a chain."""
+        for _ in range(self._clusters):
+            if not 2 <= cluster < self._clusters + 2:  # noqa: PLR2004 (first cluster)
+                return
+            yield cluster
+            cluster = self._fat_entry(cluster)
+            if cluster >= _END_OF_CHAIN[self._bits]:
+                return
+        raise InspectError(f"Corrupt {self.fstype} filesystem: cluster chain loops.")
+
+    def _cluster(self, cluster: int) -> bytes:
+        return self._read_bytes(
+            self._data_offset + (cluster - 2) * self._cluster_size, self._cluster_size
+        )
+
+    def root(self) -> Entry:
+        """Get the root directory."""
+        return Entry(
+            name="/",
+            type=EntryType.DIRECTORY,
+            size=0,
+            mode=0o40755,
+            uid=0,
+            gid=0,
+            mtime=0,
+            ref=self._root_cluster,
+        )
+
+    def _list(self, directory: Entry) -> list[Entry]:
+        if directory.ref:
+            data = b"".join(self._cluster(c) for c in self._chain(directory.ref))
+        else:
+            # Fixed-size root directory of FAT12 and FAT16.
+            data = self._read_bytes(self._root_offset, self._root_size)
+
+        entries: list[Entry] = []
+        long_name: list[bytes] = []
+        long_checksum = None
+        for offset in range(0, len(data), _DIRENT_SIZE):
+            raw = data[offset : offset + _DIRENT_SIZE]
+            if raw[0] == 0:
+                break
+            attr = raw[11]
+            if raw[0] == _DELETED:
+                long_name = []
+                continue
+            if attr & _ATTR_LONG_NAME_MASK == _ATTR_LONG_NAME:
+                if raw[0] & _LAST_LONG_ENTRY:
+                    long_name = []
+                long_name.insert(0, raw[1:11] + raw[14:26] + raw[28:32])
+                long_checksum = raw[13]
+                continue
+            if attr & _ATTR_VOLUME_ID:
+                long_name = []
+                continue
+
+            name = _short_name(raw, raw[12])
+            if long_name and long_checksum == _short_name_checksum(raw):
+                name = b"".join(long_name).decode("utf-16-le").split("\0")[0]
+            long_name = []
+            if name in (".", ".."):
+                continue
+
+            entries.append(_make_entry(raw, name))
+        return entries
+
+    def _read(self, entry: Entry) -> Iterator[bytes]:
+        remaining = entry.size
+        for cluster in self._chain(entry.ref):
+            if remaining <= 0:
+                break
+            data = self._cluster(cluster)[:remaining]
+            remaining -= len(data)
+            yield data
+        if remaining > 0:
+            raise InspectError(
+                f"Corrupt {self.fstype} filesystem: {entry.name!r} is truncated."
+            )
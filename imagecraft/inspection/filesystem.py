@@ -0,0 +1,256 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Read-only access to the files of a filesystem in an image."""
+
+import abc
+import enum
+import os
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from mmap import mmap
+from pathlib import Path, PurePosixPath
+
+from craft_cli import emit
+
+from imagecraft.errors import InspectError
+
+# Same limit as Linux's MAXSYMLINKS.
+_MAX_SYMLINKS = 40
+
+
+class EntryType(enum.Enum):
+    """Types of filesystem entries."""
+
+    FILE = "file"
+    DIRECTORY = "directory"
+    SYMLINK = "symlink"
+    OTHER = "other"
+
+
+@dataclass(frozen=True)
+class Entry:
+    """A file, directory or other entry of a filesystem.
+
+    :param name: name of the entry in its directory.
+    :param type: type of the entry.
+    :param size: size of the entry's content in bytes.
+    :param mode: file mode, including the file type bits.
+    :param uid: owner of the entry.
+    :param gid: group of the entry.
+    :param mtime: modification time, in seconds since the epoch.
+    :param target: target of a symlink.
+    :param ref: reader-specific reference to the entry's content.
+    """
+
+    name: str
+    type: EntryType
+    size: int
+    mode: int
+    uid: int
+    gid: int
+    mtime: int
+    target: str | None = None
+    ref: int = field(default=0, repr=False, compare=False)
+
+
+class FilesystemReader(abc.ABC):
+    """Read-only reader of a filesystem in a memory-mapped image.
+
+    :param image: the memory-mapped image.
+    :param offset: offset of the filesystem in the image.
+    :param size: size of the filesystem in bytes.
+    """
+
+    fstype: str
+    label: str
+    uuid: str
+
+    posix_metadata = True
+    """Whether the filesystem stores Unix modes, owners and symlinks."""
+
+    case_sensitive = True
+    """Whether names in the filesystem are case-sensitive."""
+
+    def __init__(self, image: mmap, offset: int, size: int) -> None:
+        self._image = image
+        self._offset = offset
+        self._size = size
+
+    def _read_bytes(self, offset: int, size: int) -> bytes:
+        """Read bytes at an offset of the filesystem.
+
+        :raises InspectError: If the range is outside of the filesystem.
+        """
+        if offset < 0 or offset + size > self._size:
+            raise InspectError(
+                f"Corrupt {self.fstype} filesystem: read of {size} bytes at offset "
+                f"{offset} is out of bounds."
+            )
+        start = self._offset + offset
+        return self._image[start : start + size]
+
+    @abc.abstractmethod
+    def root(self) -> Entry:
+        """Get the root directory."""
+
+    @abc.abstractmethod
+    def _list(self, directory: Entry) -> list[Entry]:
+        """List the entries of a directory, without '.' and '..'."""
+
+    @abc.abstractmethod
+    def _read(self, entry: Entry) -> Iterator[bytes]:
+        """Read the content of a file."""
+
+    def _match(self, entry: Entry, name: str) -> bool:
+        """Whether a directory entry has the given name."""
+        if self.case_sensitive:
+            return entry.name == name
+        return entry.name.casefold() == name.casefold()
+
+    def lookup(self, path: str, *, follow_symlinks: bool = True) -> Entry:
+        """Find the entry at a path.
+
+        Symlinks are resolved within the filesystem, with absolute targets
+        relative to its root.
+
+        :param follow_symlinks: whether to resolve a symlink at the end of the path.
+        :raises InspectError: If the path doesn't exist.
+        """
+        root = self.root()
+        parents = [root]
+        remaining = list(PurePosixPath("/", path).parts[1:])
+        links = 0
+        while remaining:
+            part = remaining.pop(0)
+            if part == ".":
+                continue
+            if part == "..":
+                if len(parents) > 1:
+                    parents.pop()
+                continue
+            directory = parents[-1]
+            if directory.type != EntryType.DIRECTORY:
+                raise InspectError(f"Not a directory: {path!r}")
+            entry = next(
+                (e for e in self._list(directory) if self._match(e, part)), None
+            )
+            if entry is None:
+                raise InspectError(f"No such file or directory: {path!r}")
+            if entry.type == EntryType.SYMLINK and (remaining or follow_symlinks):
+                links += 1
+                if links > _MAX_SYMLINKS:
+                    raise InspectError(f"Too many levels of symbolic links: {path!r}")
+                target = PurePosixPath(entry.target or "")
+                if target.is_absolute():
+                    parents = [root]
+                remaining = [p for p in target.parts if p != "/"] + remaining
+                continue
+            parents.append(entry)
+        return parents[-1]
+
+    def listdir(self, path: str) -> list[Entry]:
+        """List the entries of the directory at a path, sorted by name.
+
+        :raises InspectError: If the path isn't a directory.
+        """
+        directory = self.lookup(path)
+        if directory.type != EntryType.DIRECTORY:
+            raise InspectError(f"Not a directory: {path!r}")
+        return sorted(self._list(directory), key=lambda e: e.name)
+
+    def read(self, path: str) -> Iterator[bytes]:
+        """Read the content of the file at a path, in pieces.
+
+        :raises InspectError: If the path isn't a regular file.
+        """
+        return self.read_entry(self.lookup(path))
+
+    def read_entry(self, entry: Entry) -> Iterator[bytes]:
+        """Read the content of a file, in pieces.
+
+        :raises InspectError: If the entry isn't a regular file.
+        """
+        if entry.type != EntryType.FILE:
+            raise InspectError(f"Not a regular file: {entry.name!r}")
+        return self._read(entry)
+
+    def walk(self, path: str = "/") -> Iterator[tuple[str, Entry]]:
+        """Yield the path and entry of everything under a directory, parents first.
+
+        Symlinks are not followed.
+
+        :raises InspectError: If the path isn't a directory.
+        """
+        directory = self.lookup(path)
+        if directory.type != EntryType.DIRECTORY:
+            raise InspectError(f"Not a directory: {path!r}")
+        yield from self._walk(PurePosixPath("/", path), directory)
+
+    def _walk(
+        self, base: PurePosixPath, directory: Entry
+    ) -> Iterator[tuple[str, Entry]]:
+        for entry in sorted(self._list(directory), key=lambda e: e.name):
+            entry_path = base / entry.name
+            yield str(entry_path), entry
+            if entry.type == EntryType.DIRECTORY:
+                yield from self._walk(entry_path, entry)
+
+    def extract(self, path: str, dest: Path) -> None:
+        """Copy a file, or a directory and everything under it, out of the filesystem.
+
+        Permissions and modification times are kept, but not owners or setuid and
+        setgid bits. Device nodes, FIFOs and sockets are skipped.
+
+        :param path: the path to extract.
+        :param dest: the path to write it to.
+        """
+        entry = self.lookup(path)
+        if entry.type != EntryType.DIRECTORY:
+            self._extract_entry(entry, dest)
+            return
+
+        # Directory permissions are applied last, so read-only directories can be
+        # filled first.
+        directories = [(entry, dest)]
+        dest.mkdir(parents=True, exist_ok=True)
+        base = PurePosixPath("/", path)
+        for entry_path, child in self.walk(path):
+            child_dest = dest / PurePosixPath(entry_path).relative_to(base)
+            if child.type == EntryType.DIRECTORY:
+                child_dest.mkdir(exist_ok=True)
+                directories.append((child, child_dest))
+            else:
+                self._extract_entry(child, child_dest)
+        for directory, directory_dest in reversed(directories):
+            directory_dest.chmod(directory.mode & 0o777)
+            os.utime(directory_dest, (directory.mtime, directory.mtime))
+
+    def _extract_entry(self, entry: Entry, dest: Path) -> None:
+        match entry.type:
+            case EntryType.FILE:
+                with dest.open("wb") as dest_file:
+                    for data in self._read(entry):
+                        dest_file.write(data)
+            case EntryType.SYMLINK:
+                dest.symlink_to(entry.target or "")
+                return
+            case _:
+                emit.debug(f"Skipping special file {entry.name!r}")
+                return
+        dest.chmod(entry.mode & 0o777)
+        os.utime(dest, (entry.mtime, entry.mtime))
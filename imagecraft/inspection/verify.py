@@ -0,0 +1,173 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Comparison of a filesystem in an image with the directory it was populated from."""
+
+import hashlib
+import os
+import stat
+from collections.abc import Collection, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+
+from imagecraft.inspection.filesystem import Entry, EntryType, FilesystemReader
+
+_READ_SIZE = 1 << 20
+
+
+@dataclass(frozen=True)
+class Difference:
+    """An entry of a content directory that doesn't match the filesystem.
+
+    :param path: absolute path of the entry in the filesystem.
+    :param reason: how the entry differs.
+    """
+
+    path: str
+    reason: str
+
+    def __str__(self) -> str:
+        return f"{self.path}: {self.reason}"
+
+
+def _source_type(mode: int) -> EntryType:
+    if stat.S_ISREG(mode):
+        return EntryType.FILE
+    if stat.S_ISDIR(mode):
+        return EntryType.DIRECTORY
+    if stat.S_ISLNK(mode):
+        return EntryType.SYMLINK
+    return EntryType.OTHER
+
+
+def _walk_source(content_dir: Path, *, follow_symlinks: bool) -> Iterator[Path]:
+    """Yield everything under a directory, parents first and sorted by name."""
+    for dirpath, dirnames, filenames in os.walk(
+        content_dir, followlinks=follow_symlinks
+    ):
+        dirnames.sort()
+        directory = Path(dirpath)
+        for name in sorted([*dirnames, *filenames]):
+            yield directory / name
+
+
+def _compare_metadata(entry: Entry, source: Path, st: os.stat_result) -> str | None:
+    """Compare the mode, owner and symlink target of an entry with its source."""
+    if stat.S_IMODE(entry.mode) != stat.S_IMODE(st.st_mode):
+        return (
+            f"mode is {stat.S_IMODE(entry.mode):04o} instead of "
+            f"{stat.S_IMODE(st.st_mode):04o}"
+        )
+    if (entry.uid, entry.gid) != (st.st_uid, st.st_gid):
+        return f"owner is {entry.uid}:{entry.gid} instead of {st.st_uid}:{st.st_gid}"
+    if entry.type == EntryType.SYMLINK and entry.target != (
+        target := str(source.readlink())
+    ):
+        return f"symlink target is {entry.target!r} instead of {target!r}"
+    return None
+
+
+def _contents_match(filesystem: FilesystemReader, entry: Entry, source: Path) -> bool:
+    image_digest = hashlib.sha256()
+    for data in filesystem.read_entry(entry):
+        image_digest.update(data)
+    source_digest = hashlib.sha256()
+    with source.open("rb") as source_file:
+        while data := source_file.read(_READ_SIZE):
+            source_digest.update(data)
+    return image_digest.digest() == source_digest.digest()
+
+
+def compare_tree(
+    filesystem: FilesystemReader,
+    content_dir: Path,
+    *,
+    skip: Collection[str] = (),
+) -> list[Difference]:
+    """Compare a filesystem with the directory it was populated from.
+
+    Every entry of the directory must be in the filesystem, with the same type
+    and content. On filesystems storing Unix metadata, modes, owners and symlink
+    targets must match too. Other filesystems, such as FAT, are compared with the
+    targets of symlinks, which is how their content is copied. Entries only found
+    in the filesystem, such as lost+found, are ignored.
+
+    File contents are hashed concurrently.
+
+    :param filesystem: the filesystem to check.
+    :param content_dir: the directory the filesystem was populated from.
+    :param skip: absolute paths to leave out, with everything under them.
+    :returns: The differences, in path order.
+    """
+
+    def key(path: str) -> str:
+        return path if filesystem.case_sensitive else path.casefold()
+
+    entries = {key(path): entry for path, entry in filesystem.walk()}
+    skipped = [PurePosixPath(path) for path in skip]
+    differences: list[Difference] = []
+    files: list[tuple[str, Entry, Path]] = []
+
+    for source in _walk_source(
+        content_dir, follow_symlinks=not filesystem.posix_metadata
+    ):
+        path = PurePosixPath("/", source.relative_to(content_dir).as_posix())
+        if any(path == s or s in path.parents for s in skipped):
+            continue
+        entry = entries.get(key(str(path)))
+        if entry is None:
+            differences.append(Difference(str(path), "missing from the image"))
+            continue
+        try:
+            st = source.lstat() if filesystem.posix_metadata else source.stat()
+        except FileNotFoundError:
+            differences.append(Difference(str(path), "dangling symlink"))
+            continue
+
+        source_type = _source_type(st.st_mode)
+        if entry.type != source_type:
+            differences.append(
+                Difference(
+                    str(path),
+                    f"is a {entry.type.value} instead of a {source_type.value}",
+                )
+            )
+            continue
+        if filesystem.posix_metadata and (
+            reason := _compare_metadata(entry, source, st)
+        ):
+            differences.append(Difference(str(path), reason))
+        if entry.type != EntryType.FILE:
+            continue
+        if entry.size != st.st_size:
+            differences.append(
+                Difference(str(path), f"size is {entry.size} instead of {st.st_size}")
+            )
+        else:
+            files.append((str(path), entry, source))
+
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        matches = executor.map(
+            lambda file: _contents_match(filesystem, file[1], file[2]), files
+        )
+        differences.extend(
+            Difference(path, "content differs")
+            for (path, _, _), match in zip(files, matches, strict=True)
+            if not match
+        )
+
+    return sorted(differences, key=lambda d: d.path)
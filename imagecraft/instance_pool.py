@@ -0,0 +1,336 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""A pool of warm build instances shared by managed-mode builds.
+
+Pooled instances belong to a build base and architecture rather than to a
+project. Each is set up once, snapshotted, and restored to its snapshot before
+every build, so builds start from a clean instance without paying for its setup.
+The pool is shared by concurrent builds through a locked state file.
+"""
+
+import contextlib
+import fcntl
+import json
+import os
+import re
+import subprocess
+import time
+from collections.abc import Collection, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Protocol
+
+from craft_cli import emit
+from craft_providers import ProviderError
+from craft_providers.lxd import LXC, LXDInstance
+from craft_providers.multipass import Multipass, MultipassInstance
+
+from imagecraft.subprocesses import run
+
+SNAPSHOT_NAME = "clean"
+
+_STATE_FILE = "instance-pool.json"
+_LOCK_FILE = "instance-pool.lock"
+
+
+class PoolBackend(Protocol):
+    """Operations of a provider on the instances of a pool."""
+
+    def list_instances(self) -> Collection[str]:
+        """Get the names of the existing instances."""
+
+    def snapshot(self, instance_name: str) -> None:
+        """Save the current state of an instance as its clean state."""
+
+    def restore(self, instance_name: str) -> None:
+        """Bring an instance back to its clean state, with nothing mounted."""
+
+    def delete(self, instance_name: str) -> None:
+        """Delete an instance and its snapshot."""
+
+
+class LXDPoolBackend:
+    """Pool operations on LXD instances, using LXD snapshots."""
+
+    def __init__(self, *, project: str, remote: str = "local") -> None:
+        self._project = project
+        self._remote = remote
+        self._lxc = LXC()
+
+    def list_instances(self) -> Collection[str]:
+        """Get the names of the instances of the LXD project."""
+        return self._lxc.list_names(project=self._project, remote=self._remote)
+
+    def snapshot(self, instance_name: str) -> None:
+        """Take the clean snapshot of an instance, replacing any previous one."""
+        run(
+            "lxc",
+            "--project",
+            self._project,
+            "snapshot",
+            "--reuse",
+            f"{self._remote}:{instance_name}",
+            SNAPSHOT_NAME,
+        )
+
+    def restore(self, instance_name: str) -> None:
+        """Restore the clean snapshot of an instance."""
+        run(
+            "lxc",
+            "--project",
+            self._project,
+            "restore",
+            f"{self._remote}:{instance_name}",
+            SNAPSHOT_NAME,
+        )
+        # Snapshots keep the devices of the instance, including the mount of the
+        # project it was set up with.
+        LXDInstance(
+            name=instance_name, project=self._project, remote=self._remote
+        ).unmount_all()
+
+    def delete(self, instance_name: str) -> None:
+        """Delete an instance with its snapshots."""
+        self._lxc.delete(
+            instance_name=instance_name,
+            force=True,
+            project=self._project,
+            remote=self._remote,
+        )
+
+
+class MultipassPoolBackend:
+    """Pool operations on Multipass instances, using Multipass snapshots.
+
+    Multipass only snapshots and restores stopped instances.
+    """
+
+    def __init__(self) -> None:
+        self._multipass = Multipass()
+
+    def list_instances(self) -> Collection[str]:
+        """Get the names of the Multipass instances."""
+        return self._multipass.list()
+
+    def snapshot(self, instance_name: str) -> None:
+        """Take the clean snapshot of an instance, replacing any previous one."""
+        self._multipass.stop(instance_name=instance_name)
+        run(
+            "multipass",
+            "delete",
+            "--purge",
+            f"{instance_name}.{SNAPSHOT_NAME}",
+            check=False,
+        )
+        run("multipass", "snapshot", "--name", SNAPSHOT_NAME, instance_name)
+
+    def restore(self, instance_name: str) -> None:
+        """Restore the clean snapshot of an instance."""
+        self._multipass.stop(instance_name=instance_name)
+        run("multipass", "restore", "--destructive", f"{instance_name}.{SNAPSHOT_NAME}")
+        MultipassInstance(name=instance_name).unmount_all()
+
+    def delete(self, instance_name: str) -> None:
+        """Delete an instance with its snapshots."""
+        self._multipass.delete(instance_name=instance_name, purge=True)
+
+
+@dataclass(frozen=True)
+class PooledInstance:
+    """An instance leased from the pool.
+
+    :param name: name of the instance.
+    :param key: the build base and architecture the instance is for.
+    :param warm: whether the instance is set up and has a clean snapshot. Cold
+        instances don't exist yet, and are snapshotted once set up.
+    """
+
+    name: str
+    key: str
+    warm: bool
+
+
+def get_pool_key(distribution: str, series: str, build_on: str) -> str:
+    """Get the key of the pooled instances for a build base and architecture."""
+    return re.sub(r"[^a-z0-9]+", "-", f"{distribution}-{series}-{build_on}".lower())
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class InstancePool:
+    """Warm build instances, keyed by build base and architecture.
+
+    :param backend: the provider operations on instances.
+    :param state_dir: directory of the state file of the pool.
+    :param prefix: prefix of the names of pooled instances.
+    :param size: maximum number of instances per key.
+    :param idle_expiry: seconds after which an unused instance is deleted.
+    """
+
+    def __init__(
+        self,
+        backend: PoolBackend,
+        state_dir: Path,
+        *,
+        prefix: str,
+        size: int,
+        idle_expiry: float,
+    ) -> None:
+        self._backend = backend
+        self._state_dir = state_dir
+        self._prefix = prefix
+        self._size = size
+        self._idle_expiry = idle_expiry
+
+    @contextlib.contextmanager
+    def _locked_state(self) -> Iterator[dict[str, dict[str, Any]]]:
+        """Hold the pool lock, yielding the state to read and update."""
+        self._state_dir.mkdir(parents=True, exist_ok=True)
+        state_path = self._state_dir / _STATE_FILE
+        with (self._state_dir / _LOCK_FILE).open("w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                state = json.loads(state_path.read_text())
+            except (FileNotFoundError, json.JSONDecodeError):
+                state = {}
+            yield state
+            temp_path = state_path.with_suffix(".tmp")
+            temp_path.write_text(json.dumps(state, indent=2, sort_keys=True))
+            temp_path.replace(state_path)
+
+    def acquire(self, key: str) -> PooledInstance | None:
+        """Lease an instance for a build, restored to its clean state.
+
+        Idle instances are expired first. A warm instance is preferred, then a
+        new one if the pool has room for it.
+
+        :param key: the build base and architecture, from :func:`get_pool_key`.
+        :returns: The leased instance, or None if every instance of the key is in
+            use and the pool is full.
+        """
+        with self._locked_state() as state:
+            existing = set(self._backend.list_instances())
+            self._expire(state, existing)
+            # Forget instances deleted behind the pool's back. Leased cold ones
+            # are still being created.
+            for name in [
+                name
+                for name, entry in state.items()
+                if entry["lease"] is None and name not in existing
+            ]:
+                del state[name]
+            members = {
+                name: entry for name, entry in state.items() if entry["key"] == key
+            }
+            free = [
+                name
+                for name, entry in sorted(members.items())
+                if entry["lease"] is None and entry["warm"] and name in existing
+            ]
+            if free:
+                instance = PooledInstance(free[0], key, warm=True)
+            elif len(members) < self._size:
+                names = (f"{self._prefix}-{key}-{index}" for index in range(self._size))
+                name = next(name for name in names if name not in state)
+                instance = PooledInstance(name, key, warm=False)
+            else:
+                return None
+            state[instance.name] = {
+                "key": key,
+                "warm": instance.warm,
+                "lease": os.getpid(),
+                "last_used": time.time(),
+            }
+
+        if instance.warm:
+            emit.progress(f"Restoring pooled instance {instance.name!r}")
+            try:
+                self._backend.restore(instance.name)
+            except (subprocess.CalledProcessError, ProviderError) as error:
+                emit.debug(f"Cannot restore {instance.name!r}: {error}")
+                self.discard(instance)
+                return self.acquire(key)
+        return instance
+
+    def mark_warm(self, instance: PooledInstance) -> PooledInstance:
+        """Snapshot a cold instance once set up, making it warm.
+
+        :returns: The instance, now warm.
+        """
+        emit.progress(f"Saving the clean state of pooled instance {instance.name!r}")
+        self._backend.snapshot(instance.name)
+        with self._locked_state() as state:
+            state[instance.name]["warm"] = True
+        return PooledInstance(instance.name, instance.key, warm=True)
+
+    def release(self, instance: PooledInstance) -> None:
+        """Return a leased instance to the pool.
+
+        Cold instances, whose setup didn't complete, are deleted instead.
+        """
+        if not instance.warm:
+            self.discard(instance)
+            return
+        with self._locked_state() as state:
+            state[instance.name].update(lease=None, last_used=time.time())
+
+    def discard(self, instance: PooledInstance) -> None:
+        """Delete an instance and remove it from the pool."""
+        with contextlib.suppress(subprocess.CalledProcessError, ProviderError):
+            if instance.name in self._backend.list_instances():
+                self._backend.delete(instance.name)
+        with self._locked_state() as state:
+            state.pop(instance.name, None)
+
+    def _expire(self, state: dict[str, dict[str, Any]], existing: set[str]) -> None:
+        """Delete instances that are idle for too long or beyond the pool size.
+
+        Leases held by processes that are gone are dropped, and cold instances
+        without a lease, whose setup was interrupted, are deleted.
+        """
+        now = time.time()
+        for entry in state.values():
+            if entry["lease"] is not None and not _is_alive(entry["lease"]):
+                entry["lease"] = None
+
+        kept: dict[str, int] = {}
+        # Most recently used first, so the pool shrinks by its oldest instances.
+        for name, entry in sorted(
+            state.items(), key=lambda item: -item[1]["last_used"]
+        ):
+            if entry["lease"] is not None:
+                kept[entry["key"]] = kept.get(entry["key"], 0) + 1
+                continue
+            idle = now - entry["last_used"] > self._idle_expiry
+            if idle or not entry["warm"] or kept.get(entry["key"], 0) >= self._size:
+                if name in existing:
+                    emit.debug(f"Deleting pooled instance {name!r}")
+                    with contextlib.suppress(
+                        subprocess.CalledProcessError, ProviderError
+                    ):
+                        self._backend.delete(name)
+                del state[name]
+            else:
+                kept[entry["key"]] = kept.get(entry["key"], 0) + 1
@@ -24,6 +24,8 @@ from imagecraft.models.project import (
 
 from imagecraft.models.volume import (
     FileSystem,
+    FilesystemOptions,
+    FilesystemPreset,
     BaseVolume,
     GPTVolume,
     MBRVolume,
@@ -32,9 +34,13 @@ from imagecraft.models.volume import (
     GPTStructureItem,
 )
 from imagecraft.models.grammar import get_grammar_aware_volume_keywords
+from imagecraft.models.config import ImagecraftConfig
 
 __all__ = [
     "FileSystem",
+    "FilesystemOptions",
+    "FilesystemPreset",
+    "ImagecraftConfig",
     "Project",
     "Platform",
     "GPTVolume",
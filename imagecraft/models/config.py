@@ -0,0 +1,115 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Imagecraft configuration model.
+
+Items in this model can be set through ``IMAGECRAFT_<ITEM>`` environment variables
+or, when running as a snap, through ``snap set imagecraft <item>=<value>``.
+"""
+
+from craft_application import ConfigModel
+
+
+class ImagecraftConfig(ConfigModel):
+    """Imagecraft-specific configuration items."""
+
+    project_cache_dir: str | None = None
+    """Directory in which to keep grammar-resolved volumes and filesystems.
+
+    When set, the resolved volumes and filesystems of a project are stored on disk
+    so that subsequent invocations can skip grammar processing and validation.
+    """
+
+    native_grub_config: bool = False
+    """Write grub.cfg natively instead of running update-grub in the image.
+
+    Kernels and initrds are found in the packed root filesystem, and filesystem
+    UUIDs are read from the partitions just created. No scripts run in the chroot.
+    """
+
+    chroot_free_bootloader: bool = False
+    """Provision the bootloader before partitions are formatted.
+
+    EFI boot files are copied into the ESP content and BIOS boot code is written
+    to the disk image directly, so GRUB isn't installed from a chroot of the packed
+    image. Falls back to the chroot installation when the root filesystem lacks the
+    needed GRUB files.
+    """
+
+    reproducible_seed: str | None = None
+    """Seed from which the identifiers of packed images are derived.
+
+    Setting a seed, or the ``SOURCE_DATE_EPOCH`` environment variable, enables
+    reproducible mode: disk and partition GUIDs, filesystem UUIDs, volume IDs and
+    hash seeds are derived from the seed and the project name, and timestamps are
+    clamped to ``SOURCE_DATE_EPOCH``. Builds of the same inputs then produce
+    byte-identical images.
+    """
+
+    chunk_store_dir: str | None = None
+    """Directory of a chunk store to split packed images into.
+
+    When set, pack splits each image into content-defined chunks, adds the chunks
+    missing from the store, and writes a ``<image>.chunks.json`` index next to the
+    image. Images are reassembled with ``imagecraft assemble-image``.
+    """
+
+    fatal_filesystem_checks: bool = False
+    """Fail pack when a packed filesystem is inconsistent.
+
+    Pack checks every filesystem it creates with ``e2fsck -fn`` or ``fsck.fat -n``.
+    Errors are reported as warnings unless this is set.
+    """
+
+    verify_contents: bool = False
+    """Check packed partitions against their prime directories.
+
+    After pack, every partition is read from the packed image, without loop
+    devices, and compared with its prime directory: paths, file types and contents,
+    and on ext filesystems modes, owners and symlink targets too.
+    """
+
+    max_parallel_parts: int = 4
+    """Maximum number of parts to pull or build at the same time.
+
+    Pull and build steps of parts that don't come after one another run
+    concurrently, each part in its own process. Parts that write to the volume
+    devices, and parts that fetch stage packages or snaps, still run one at a time.
+    Set to 1 to run every step in sequence, in the main process.
+    """
+
+    rootless: bool = False
+    """Build without root privileges.
+
+    Builds on the host run in a user namespace, where the current user is root and
+    its subordinate IDs from ``/etc/subuid`` and ``/etc/subgid`` are the other
+    users. Partitions are formatted and checked at their offset in the image files
+    instead of through loop devices, and the bootloader is provisioned without a
+    chroot.
+    """
+
+    instance_pool_size: int = 0
+    """Number of warm build instances to keep per build base and architecture.
+
+    When set, managed-mode builds run in pooled instances instead of an instance
+    per project. Pooled instances are set up once, with the build packages of the
+    imagecraft plugins, snapshotted, and restored to their snapshot before each
+    build. Builds that find every pooled instance in use get an instance of their
+    own.
+    """
+
+    instance_pool_idle_mins: int = 1440
+    """Minutes after which an unused pooled instance is deleted."""
@@ -82,7 +82,7 @@ BuildBaseT = typing.Annotated[
 ]
 
 
-VolumeDictT = Annotated[dict[VolumeName, Volume], Field(min_length=1, max_length=1)]
+VolumeDictT = Annotated[dict[VolumeName, Volume], Field(min_length=1)]
 
 
 def _validate_filesystem(filesystem: list[dict[str, Any]]) -> list[dict[str, Any]]:
@@ -124,7 +124,7 @@ class Project(BaseProject):
     """The base layer the image is built on.
 
     The value ``bare`` denotes that the project will start with an empty directory and,
-    if overlays are used, an empty base layer.
+    if overlays are used, an empty base layer, unless ``base-layer`` is set.
     """
 
     build_base: BuildBaseT  # type: ignore[reportIncompatibleVariableOverride]
@@ -150,6 +150,22 @@ class Project(BaseProject):
 
     """
 
+    base_layer: str | None = Field(
+        default=None,
+        description="A root filesystem tarball or directory to start the image from.",
+        examples=["ubuntu-base-24.04-base-amd64.tar.gz"],
+    )
+    """A root filesystem tarball or directory to start the image from.
+
+    The path is relative to the project directory. The root filesystem is used as
+    the base layer of overlays, and is packed with the content of the partitions
+    mounted on top of it. It is extracted once per host into a cache shared by
+    all projects, so that projects with the same base don't bootstrap it through
+    parts. The content of the partitions is merged from it in the work directory,
+    and kept there between packs while the base layer and the prime directories
+    are unchanged.
+    """
+
     volumes: VolumeDictT = Field(
         description="The structure and properties of the image.",
         examples=[
@@ -158,7 +174,7 @@ class Project(BaseProject):
     )
     """The structure and properties of the image.
 
-    This key expects a single entry defining the image's schema and partitions.
+    Each entry defines a separate image, with its own schema and partitions.
     """
 
     filesystems: FilesystemsDictT = Field(
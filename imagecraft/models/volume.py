@@ -183,6 +183,159 @@ class Role(str, enum.Enum):
     """The partition stores data preserved across factory resets."""
 
 
+class FilesystemPreset(str, enum.Enum):
+    """Named sets of filesystem options."""
+
+    FAST_BUILD = "fast-build"
+    """Defer the initialization of inode tables and the journal to the first mount.
+
+    Formatting only writes the metadata in use, so it is quick and the image stays
+    sparse. The kernel initializes the rest in the background once the filesystem
+    is mounted.
+    """
+
+    FLASH_OPTIMIZED = "flash-optimized"
+    """Initialize the filesystem completely, with fewer inodes and reserved blocks.
+
+    4 KiB blocks, an inode per 16 KiB and 1% of reserved blocks keep the metadata
+    small, and nothing is left for the device to write in the background at first
+    boot.
+    """
+
+
+_FILESYSTEM_PRESETS: dict[FilesystemPreset, dict[str, typing.Any]] = {
+    FilesystemPreset.FAST_BUILD: {
+        "lazy_itable_init": True,
+        "lazy_journal_init": True,
+    },
+    FilesystemPreset.FLASH_OPTIMIZED: {
+        "block_size": 4096,
+        "bytes_per_inode": 16384,
+        "reserved_blocks_percent": 1,
+        "lazy_itable_init": False,
+        "lazy_journal_init": False,
+    },
+}
+
+_EXT_OPTIONS = (
+    "block_size",
+    "bytes_per_inode",
+    "inode_count",
+    "reserved_blocks_percent",
+    "journal_size",
+    "lazy_itable_init",
+    "lazy_journal_init",
+    "metadata_csum",
+)
+_FAT_OPTIONS = ("cluster_size",)
+
+
+def _validate_cluster_size(value: int) -> int:
+    if value & (value - 1):
+        raise ValueError("cluster size must be a power of two.")
+    return value
+
+
+class FilesystemOptions(CraftBaseModel):
+    """Options to format the filesystem of a structure with."""
+
+    preset: FilesystemPreset | None = Field(
+        default=None,
+        description="A named set of options, overridden by the other options.",
+        examples=["fast-build", "flash-optimized"],
+    )
+    """A named set of options, overridden by the other options.
+
+    Presets only set options of ext filesystems.
+    """
+
+    block_size: Literal[1024, 2048, 4096] | None = Field(
+        default=None,
+        description="The size of the blocks of an ext filesystem, in bytes.",
+        examples=[4096],
+    )
+
+    bytes_per_inode: int | None = Field(
+        default=None,
+        description="The number of bytes of an ext filesystem per inode.",
+        examples=[16384],
+        ge=1024,
+        le=1 << 26,
+    )
+    """The number of bytes of an ext filesystem per inode.
+
+    The larger the ratio, the smaller the inode tables, and the fewer files the
+    filesystem can hold.
+    """
+
+    inode_count: int | None = Field(
+        default=None,
+        description="The number of inodes of an ext filesystem.",
+        examples=[65536],
+        ge=16,
+    )
+    """The number of inodes of an ext filesystem, instead of a ratio."""
+
+    reserved_blocks_percent: float | None = Field(
+        default=None,
+        description="The percentage of the blocks of an ext filesystem reserved for root.",
+        examples=[0, 1],
+        ge=0,
+        le=50,
+    )
+
+    journal_size: int | None = Field(
+        default=None,
+        description="The size of the journal of an ext filesystem, in mebibytes.",
+        examples=[16, 64],
+        ge=1,
+    )
+
+    lazy_itable_init: bool | None = Field(
+        default=None,
+        description="Leave the inode tables of an ext filesystem to be initialized on mount.",
+        examples=[True],
+    )
+
+    lazy_journal_init: bool | None = Field(
+        default=None,
+        description="Leave the journal of an ext filesystem to be initialized on mount.",
+        examples=[True],
+    )
+
+    metadata_csum: bool | None = Field(
+        default=None,
+        description="Whether the metadata of an ext4 filesystem has checksums.",
+        examples=[False],
+    )
+
+    cluster_size: (
+        Annotated[int, Field(ge=512, le=65536), AfterValidator(_validate_cluster_size)]
+        | None
+    ) = Field(
+        default=None,
+        description="The size of the clusters of a FAT filesystem, in bytes.",
+        examples=[4096],
+    )
+    """The size of the clusters of a FAT filesystem, in bytes.
+
+    The size must be a power of two from 512 to 65536, and leave the filesystem
+    with a number of clusters its FAT type supports.
+    """
+
+    def resolve(self) -> Self:
+        """Get the options with the values of the preset filled in."""
+        if self.preset is None:
+            return self
+        return self.model_copy(
+            update={
+                name: value
+                for name, value in _FILESYSTEM_PRESETS[self.preset].items()
+                if getattr(self, name) is None
+            }
+        )
+
+
 class StructureItem(CraftBaseModel):
     """A single structure inside a volume."""
 
@@ -235,6 +388,23 @@ class StructureItem(CraftBaseModel):
     Labels must be unique to their volume.
     """
 
+    filesystem_options: FilesystemOptions | None = Field(
+        default=None,
+        description="Options to format the filesystem of the partition with.",
+        examples=[
+            {"preset": "fast-build"},
+            {
+                "block-size": 4096,
+                "bytes-per-inode": 65536,
+                "reserved-blocks-percent": 0,
+            },
+        ],
+    )
+    """Options to format the filesystem of the partition with.
+
+    Options left unset keep the defaults of ``mke2fs`` or ``mkfs.fat``.
+    """
+
     content: None = Field(
         default=None,
         deprecated="Imagecraft does not support the content field.",
@@ -274,6 +444,26 @@ class StructureItem(CraftBaseModel):
             self.filesystem_label = self.name
         return self
 
+    @model_validator(mode="after")
+    def _validate_filesystem_options(self) -> Self:
+        options = self.filesystem_options
+        if options is None:
+            return self
+        supported = _FAT_OPTIONS if "fat" in self.filesystem.value else _EXT_OPTIONS
+        if self.filesystem != FileSystem.EXT4:
+            supported = tuple(name for name in supported if name != "metadata_csum")
+        unsupported = [
+            name.replace("_", "-")
+            for name in (*_EXT_OPTIONS, *_FAT_OPTIONS)
+            if name not in supported and getattr(options, name) is not None
+        ]
+        if unsupported:
+            raise ValueError(
+                f"{self.filesystem.value} filesystems don't support the "
+                f"{humanize_list(unsupported, 'and', sort=False)} filesystem options."
+            )
+        return self
+
 
 class MBRStructureItem(StructureItem):
     """An item on an MBR-schema volume."""
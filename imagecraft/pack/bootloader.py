@@ -0,0 +1,391 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Chroot-free bootloader provisioning.
+
+The bootloader is placed in copies of the partitions' content directories before
+they are formatted, instead of running grub-install in a chroot of the packed image.
+Filesystem UUIDs are chosen up front so that the GRUB configuration can refer to
+filesystems that don't exist yet.
+"""
+
+import shutil
+import struct
+import subprocess
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from craft_cli import emit
+from craft_parts.filesystem_mounts import FilesystemMount
+from craft_platforms import DebianArchitecture
+
+from imagecraft import errors
+from imagecraft.models.volume import PartitionSchema, Volume
+from imagecraft.pack import diskutil, grubcfg
+from imagecraft.subprocesses import run
+
+SECTOR_SIZE = 512
+
+
+@dataclass(frozen=True)
+class _EfiBinaries:
+    """Names of the EFI boot files for an architecture."""
+
+    suffix: str
+    grub_target: str
+
+
+_ARCH_TO_EFI: dict[str, _EfiBinaries] = {
+    DebianArchitecture.AMD64: _EfiBinaries(suffix="x64", grub_target="x86_64-efi"),
+    DebianArchitecture.ARM64: _EfiBinaries(suffix="aa64", grub_target="arm64-efi"),
+}
+
+# The signed GRUB EFI binary looks for its configuration in this ESP directory.
+_EFI_VENDOR_DIR = "EFI/ubuntu"
+
+_GRUB_BIOS_TARGET = "i386-pc"
+_GRUB_BIOS_ARCHS = {DebianArchitecture.AMD64, DebianArchitecture.I386}
+_GRUB_BIOS_MODULES = ["biosdisk", "part_msdos", "ext2", "fat", "search_fs_uuid"]
+
+# Offsets in boot.img, from GRUB's include/grub/i386/pc/boot.h.
+_BOOT_BPB_START = 0x3
+_BOOT_BPB_END = 0x5A
+_BOOT_KERNEL_SECTOR = 0x5C
+_BOOT_DRIVE_CHECK = 0x66
+_BOOT_WINDOWS_NT_MAGIC = 0x1B8
+_BOOT_PART_END = 0x1FE
+_MBR_PARTITION_TABLE = 0x1BE
+_MBR_PARTITION_ENTRY_SIZE = 16
+_MBR_SIGNATURE = b"\x55\xaa"
+
+# core.img is loaded right after diskboot.img, at GRUB_BOOT_I386_PC_KERNEL_SEG.
+_CORE_LOAD_SEGMENT = 0x800 + (SECTOR_SIZE >> 4)
+_BLOCKLIST = struct.Struct("<QHH")
+
+
+@dataclass
+class BootloaderSetup:
+    """The result of provisioning a bootloader into content directories.
+
+    :param uuids: filesystem UUIDs to create partitions with, by
+        'volume/structure' key.
+    :param boot_img: for BIOS targets, boot.img to write to the MBR.
+    :param core_img: for BIOS targets, core.img to write to the post-MBR gap.
+    """
+
+    uuids: dict[str, str] = field(default_factory=dict)
+    boot_img: Path | None = None
+    core_img: Path | None = None
+
+    def install(self, image_path: Path) -> None:
+        """Write the parts of the bootloader that live outside filesystems."""
+        if self.boot_img and self.core_img:
+            write_bios_boot(
+                image_path=image_path,
+                boot_img=self.boot_img.read_bytes(),
+                core_img=self.core_img.read_bytes(),
+            )
+
+
+def _mount_devices(filesystem_mount: FilesystemMount) -> dict[str, str]:
+    """Map mount points to 'volume/structure' keys."""
+    return {
+        entry.mount.rstrip("/") or "/": entry.device.strip("()").removeprefix("volume/")
+        for entry in filesystem_mount
+    }
+
+
+def get_boot_devices(filesystem_mount: FilesystemMount) -> set[str]:
+    """Get the partitions the bootloader may be placed in, by 'volume/structure' key.
+
+    Their content directories are written to by :func:`prepare_bootloader`.
+    """
+    devices = _mount_devices(filesystem_mount)
+    return {devices[mount] for mount in ("/", "/boot", "/boot/efi") if mount in devices}
+
+
+def prepare_bootloader(
+    *,
+    volume_name: str,
+    volume: Volume,
+    arch: str,
+    filesystem_mount: FilesystemMount,
+    content_dirs: Mapping[str, Path],
+    workdir: Path,
+    reproducibility: diskutil.Reproducibility | None = None,
+    keep_uuids: Mapping[str, str] | None = None,
+) -> BootloaderSetup | None:
+    """Place the bootloader in the content directories of the root volume.
+
+    The content directories of the partitions returned by :func:`get_boot_devices`
+    are written to, so they must be copies of the prime directories.
+
+    :param volume_name: name of the volume holding the root filesystem.
+    :param volume: the volume holding the root filesystem.
+    :param arch: architecture the image is built for.
+    :param filesystem_mount: order in which partitions are mounted.
+    :param content_dirs: content directory of every partition, by
+        'volume/structure' key.
+    :param workdir: directory for intermediate files.
+    :param reproducibility: inputs the filesystem UUIDs are derived from, random
+        if not supplied.
+    :param keep_uuids: filesystem UUIDs to keep, by 'volume/structure' key, such
+        as those of partitions left by an interrupted pack.
+    :returns: The setup to complete once partitions are formatted, or None if the
+        bootloader can't be provisioned without a chroot.
+    """
+    devices = _mount_devices(filesystem_mount)
+    root_key = devices.get("/")
+    if root_key is None:
+        return None
+    boot_key = devices.get("/boot", root_key)
+    rootfs_dir = content_dirs[root_key]
+    boot_dir = content_dirs[boot_key] if boot_key != root_key else rootfs_dir / "boot"
+    grub_prefix = "/grub" if boot_key != root_key else "/boot/grub"
+
+    structures = {f"{volume_name}/{s.name}": s for s in volume.structure}
+    keep_uuids = keep_uuids or {}
+    uuids = {
+        key: keep_uuids.get(key)
+        or diskutil.generate_filesystem_uuid(
+            structures[key].filesystem,
+            reproducibility=reproducibility.scoped(*key.split("/"))
+            if reproducibility
+            else None,
+        )
+        for key in {root_key, boot_key}
+        if key in structures
+    }
+    if len(uuids) != len({root_key, boot_key}):
+        # The root or boot filesystem lives on another volume.
+        return None
+
+    config = grubcfg.NativeConfig(
+        schema=volume.volume_schema,
+        root=grubcfg.Filesystem(
+            uuid=uuids[root_key], fstype=structures[root_key].filesystem.value
+        ),
+        boot=grubcfg.Filesystem(
+            uuid=uuids[boot_key], fstype=structures[boot_key].filesystem.value
+        ),
+    )
+    setup = BootloaderSetup(uuids=uuids)
+
+    if volume.volume_schema == PartitionSchema.MBR:
+        bios_files = (
+            _prepare_bios(
+                rootfs_dir=rootfs_dir,
+                boot_dir=boot_dir,
+                workdir=workdir,
+                boot_uuid=uuids[boot_key],
+                grub_prefix=grub_prefix,
+            )
+            if arch in _GRUB_BIOS_ARCHS
+            else None
+        )
+        if bios_files is None:
+            return None
+        setup.boot_img, setup.core_img = bios_files
+    else:
+        esp_key = devices.get("/boot/efi", "")
+        efi_ready = (
+            esp_key in content_dirs
+            and arch in _ARCH_TO_EFI
+            and _prepare_efi(
+                rootfs_dir=rootfs_dir,
+                esp_dir=content_dirs[esp_key],
+                binaries=_ARCH_TO_EFI[arch],
+                boot_uuid=uuids[boot_key],
+                grub_prefix=grub_prefix,
+            )
+        )
+        if not efi_ready:
+            return None
+
+    grubcfg.write_grub_config(rootfs_dir, config, boot_dir=boot_dir)
+    return setup
+
+
+def _first_existing(*paths: Path) -> Path | None:
+    return next((path for path in paths if path.is_file()), None)
+
+
+def _stub_config(boot_uuid: str, grub_prefix: str) -> str:
+    """Get the configuration that sends an early GRUB to the real grub.cfg."""
+    return (
+        f"search.fs_uuid {boot_uuid} root\n"
+        f"set prefix=($root)'{grub_prefix}'\n"
+        "configfile $prefix/grub.cfg\n"
+    )
+
+
+def _prepare_efi(
+    *,
+    rootfs_dir: Path,
+    esp_dir: Path,
+    binaries: _EfiBinaries,
+    boot_uuid: str,
+    grub_prefix: str,
+) -> bool:
+    """Copy the signed shim and GRUB from the root filesystem into the ESP.
+
+    The layout matches 'grub-install --uefi-secure-boot': shim is both the
+    vendor entry and the removable-media fallback loader.
+
+    :returns: False if the root filesystem lacks the signed boot files.
+    """
+    suffix = binaries.suffix
+    shim_dir = rootfs_dir / "usr/lib/shim"
+    shim = _first_existing(
+        shim_dir / f"shim{suffix}.efi.signed.latest",
+        shim_dir / f"shim{suffix}.efi.signed",
+    )
+    grub = _first_existing(
+        rootfs_dir
+        / f"usr/lib/grub/{binaries.grub_target}-signed/grub{suffix}.efi.signed"
+    )
+    if shim is None or grub is None:
+        emit.debug("Signed shim or GRUB not found in the root filesystem")
+        return False
+
+    vendor_dir = esp_dir / _EFI_VENDOR_DIR
+    fallback_dir = esp_dir / "EFI/BOOT"
+    vendor_dir.mkdir(parents=True, exist_ok=True)
+    fallback_dir.mkdir(parents=True, exist_ok=True)
+
+    shutil.copyfile(shim, vendor_dir / f"shim{suffix}.efi")
+    shutil.copyfile(shim, fallback_dir / f"BOOT{suffix.upper()}.EFI")
+    shutil.copyfile(grub, vendor_dir / f"grub{suffix}.efi")
+    if mok_manager := _first_existing(
+        shim_dir / f"mm{suffix}.efi.signed", shim_dir / f"mm{suffix}.efi"
+    ):
+        shutil.copyfile(mok_manager, vendor_dir / f"mm{suffix}.efi")
+        shutil.copyfile(mok_manager, fallback_dir / f"mm{suffix}.efi")
+    if fallback := _first_existing(
+        shim_dir / f"fb{suffix}.efi.signed", shim_dir / f"fb{suffix}.efi"
+    ):
+        shutil.copyfile(fallback, fallback_dir / f"fb{suffix}.efi")
+    if boot_csv := _first_existing(shim_dir / f"BOOT{suffix.upper()}.CSV"):
+        shutil.copyfile(boot_csv, vendor_dir / boot_csv.name)
+
+    (vendor_dir / "grub.cfg").write_text(_stub_config(boot_uuid, grub_prefix))
+    return True
+
+
+def _prepare_bios(
+    *,
+    rootfs_dir: Path,
+    boot_dir: Path,
+    workdir: Path,
+    boot_uuid: str,
+    grub_prefix: str,
+) -> tuple[Path, Path] | None:
+    """Build core.img and copy the GRUB modules into the boot filesystem.
+
+    core.img is built by grub-mkimage from the modules shipped in the root
+    filesystem, so the host only needs the grub-mkimage tool.
+
+    :returns: The paths of boot.img and core.img, or None if they can't be built.
+    """
+    modules_dir = rootfs_dir / "usr/lib/grub" / _GRUB_BIOS_TARGET
+    boot_img = modules_dir / "boot.img"
+    if not boot_img.is_file() or shutil.which("grub-mkimage") is None:
+        emit.debug("GRUB BIOS modules or grub-mkimage not available")
+        return None
+
+    grub_modules_dir = boot_dir / "grub" / _GRUB_BIOS_TARGET
+    grub_modules_dir.mkdir(parents=True, exist_ok=True)
+    for pattern in ("*.mod", "*.lst"):
+        for module in modules_dir.glob(pattern):
+            shutil.copyfile(module, grub_modules_dir / module.name)
+
+    load_cfg = workdir / "load.cfg"
+    load_cfg.write_text(
+        f"search.fs_uuid {boot_uuid} root\nset prefix=($root)'{grub_prefix}'\n"
+    )
+    core_img = workdir / "core.img"
+    try:
+        run(
+            "grub-mkimage",
+            f"--directory={modules_dir}",
+            f"--format={_GRUB_BIOS_TARGET}",
+            f"--config={load_cfg}",
+            f"--prefix={grub_prefix}",
+            f"--output={core_img}",
+            *_GRUB_BIOS_MODULES,
+        )
+    except subprocess.CalledProcessError as err:
+        raise errors.GRUBInstallError("Failed to build GRUB core image") from err
+    return boot_img, core_img
+
+
+def write_bios_boot(*, image_path: Path, boot_img: bytes, core_img: bytes) -> None:
+    """Write boot.img to the MBR and core.img to the gap after it.
+
+    This does what grub-bios-setup does for an embedded core image: the MBR's
+    partition table and disk signature are kept, boot.img is pointed at sector 1,
+    and the blocklist in the first sector of core.img is set to load the rest of
+    core.img from the sectors that follow.
+    """
+    core_sectors = -(-len(core_img) // SECTOR_SIZE)
+    core = bytearray(core_img.ljust(core_sectors * SECTOR_SIZE, b"\0"))
+
+    with image_path.open("r+b") as image:
+        mbr = image.read(SECTOR_SIZE)
+        first_partition = min(
+            (
+                lba
+                for offset in range(4)
+                if (
+                    lba := struct.unpack_from(
+                        "<I",
+                        mbr,
+                        _MBR_PARTITION_TABLE + offset * _MBR_PARTITION_ENTRY_SIZE + 8,
+                    )[0]
+                )
+            ),
+            default=None,
+        )
+        if first_partition is not None and 1 + core_sectors > first_partition:
+            raise errors.GRUBInstallError(
+                f"GRUB core image needs {core_sectors} sectors but only "
+                f"{first_partition - 1} are free before the first partition"
+            )
+
+        boot = bytearray(boot_img[:SECTOR_SIZE])
+        boot[_BOOT_BPB_START:_BOOT_BPB_END] = mbr[_BOOT_BPB_START:_BOOT_BPB_END]
+        boot[_BOOT_WINDOWS_NT_MAGIC:_BOOT_PART_END] = mbr[
+            _BOOT_WINDOWS_NT_MAGIC:_BOOT_PART_END
+        ]
+        boot[_BOOT_PART_END:SECTOR_SIZE] = _MBR_SIGNATURE
+        struct.pack_into("<Q", boot, _BOOT_KERNEL_SECTOR, 1)
+        # Trust the BIOS-provided boot drive, as grub-bios-setup does for disks.
+        boot[_BOOT_DRIVE_CHECK : _BOOT_DRIVE_CHECK + 2] = b"\x90\x90"
+
+        _BLOCKLIST.pack_into(
+            core,
+            SECTOR_SIZE - _BLOCKLIST.size,
+            2,
+            core_sectors - 1,
+            _CORE_LOAD_SEGMENT,
+        )
+
+        image.seek(0)
+        image.write(boot)
+        image.write(core)
+
+    emit.debug(f"Wrote GRUB boot and core images ({core_sectors} sectors)")
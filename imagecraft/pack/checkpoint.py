@@ -0,0 +1,290 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Checkpoints of packed images, to resume pack after a failure.
+
+A journal next to each temporary image records the digest of the layout the
+image was partitioned with and, for each partition, the digest of what it was
+populated from and whether it was completed. A later pack reuses an image whose
+layout is unchanged, and skips its completed partitions whose content is too.
+
+Content digests cover what the content directory of a partition was made from,
+such as its prime directory and the base layer it was merged with, rather than
+the directory itself, which may be a copy made by this pack. Prime directories
+are identified by the metadata of their entries, not their data: reading a whole
+root filesystem on every pack would cost more than the partitions it saves. A
+file rewritten with the same size and modification time goes unnoticed, as with
+``make`` and ``rsync``.
+
+Directories that pack writes content to, such as merged base layers, record the
+digest of their source next to them, so that a later pack keeps them when their
+source is unchanged instead of writing them again.
+"""
+
+import hashlib
+import json
+import os
+import stat
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from craft_cli import emit
+
+from imagecraft.models import FileSystem, Volume
+from imagecraft.pack import diskutil
+
+JOURNAL_FORMAT = "imagecraft-pack-journal/1"
+JOURNAL_SUFFIX = ".journal.json"
+SOURCE_SUFFIX = ".source"
+
+# Files up to this size are identified by their data rather than their mtime.
+_HASHED_FILE_SIZE = 4 << 20
+
+
+@dataclass
+class PartitionCheckpoint:
+    """Progress of a partition of an image.
+
+    :param content: digest of what the partition is populated from.
+    :param complete: whether the partition was formatted and populated.
+    :param fs_uuid: UUID the filesystem was created with, if chosen by pack.
+    """
+
+    content: str
+    complete: bool = False
+    fs_uuid: str | None = None
+
+
+@dataclass
+class Journal:
+    """The checkpoints of an image, saved next to it.
+
+    :param path: path of the journal file.
+    :param layout: digest of the layout the image was partitioned with.
+    :param partitions: the checkpoint of each partition, by structure name.
+    """
+
+    path: Path
+    layout: str
+    partitions: dict[str, PartitionCheckpoint] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: Path) -> "Journal | None":
+        """Load a journal, None if it is missing or unreadable."""
+        try:
+            data = json.loads(path.read_text())
+            if data["format"] != JOURNAL_FORMAT:
+                return None
+            return cls(
+                path=path,
+                layout=data["layout"],
+                partitions={
+                    name: PartitionCheckpoint(**checkpoint)
+                    for name, checkpoint in data["partitions"].items()
+                },
+            )
+        except (OSError, ValueError, KeyError, TypeError) as error:
+            emit.debug(f"Ignoring journal {str(path)!r}: {error}")
+            return None
+
+    def save(self) -> None:
+        """Write the journal, replacing the previous one atomically."""
+        data = {
+            "format": JOURNAL_FORMAT,
+            "layout": self.layout,
+            "partitions": {
+                name: {
+                    "content": checkpoint.content,
+                    "complete": checkpoint.complete,
+                    "fs_uuid": checkpoint.fs_uuid,
+                }
+                for name, checkpoint in self.partitions.items()
+            },
+        }
+        temp_path = self.path.with_name(self.path.name + ".tmp")
+        temp_path.write_text(json.dumps(data, indent=2, sort_keys=True, default=str))
+        temp_path.replace(self.path)
+
+    def is_complete(self, name: str, content: str) -> bool:
+        """Whether a partition was completed from the same content."""
+        checkpoint = self.partitions.get(name)
+        return (
+            checkpoint is not None
+            and checkpoint.complete
+            and checkpoint.content == content
+        )
+
+    def start(self, name: str, content: str) -> None:
+        """Record that a partition is being formatted, before touching it."""
+        self.partitions[name] = PartitionCheckpoint(content=content)
+        self.save()
+
+    def complete(self, name: str, content: str, fs_uuid: str | None = None) -> None:
+        """Record that a partition was formatted and populated."""
+        self.partitions[name] = PartitionCheckpoint(
+            content=content, complete=True, fs_uuid=fs_uuid
+        )
+        self.save()
+
+    def invalidate(self, name: str) -> None:
+        """Forget a partition, so that it is formatted again."""
+        if self.partitions.pop(name, None) is not None:
+            self.save()
+
+    @property
+    def fs_uuids(self) -> dict[str, str]:
+        """The UUIDs chosen for the filesystems of the image, by structure name."""
+        return {
+            name: checkpoint.fs_uuid
+            for name, checkpoint in self.partitions.items()
+            if checkpoint.fs_uuid
+        }
+
+
+def get_journal_path(image_path: Path) -> Path:
+    """Get the path of the journal of an image."""
+    return image_path.with_name(image_path.name + JOURNAL_SUFFIX)
+
+
+def get_layout_digest(
+    volume: Volume,
+    *,
+    sector_size: int,
+    reproducibility: diskutil.Reproducibility | None,
+) -> str:
+    """Get the digest of what an image is created from."""
+    data = {
+        "volume": volume.marshal(),
+        "sector_size": sector_size,
+        "reproducibility": (
+            {"seed": reproducibility.seed, "epoch": reproducibility.epoch}
+            if reproducibility
+            else None
+        ),
+    }
+    return hashlib.sha256(
+        json.dumps(data, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def get_content_digest(
+    source: str,
+    *,
+    fstype: FileSystem,
+    label: str | None,
+    options: Mapping[str, object] | None = None,
+) -> str:
+    """Get the digest of what a partition is populated from.
+
+    :param source: the digest of what the content directory of the partition was
+        made from.
+    :param fstype: the filesystem of the partition.
+    :param label: the label of the filesystem.
+    :param options: other inputs of the formatting, such as its UUID.
+    """
+    return get_inputs_digest(
+        {
+            "source": source,
+            "fstype": fstype.value,
+            "label": label,
+            "options": options or {},
+        }
+    )
+
+
+def get_inputs_digest(*inputs: object) -> str:
+    """Get the digest of inputs that serialize to JSON, such as other digests."""
+    return hashlib.sha256(
+        json.dumps(inputs, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def get_metadata_digest(directory: Path) -> str:
+    """Get the digest of the metadata of a directory tree.
+
+    The digest covers the path, mode, owner, group, size and modification time of
+    every entry, and the target of symlinks. A missing directory has the digest
+    of an empty one.
+    """
+    digest = hashlib.sha256()
+    for dirpath, dirnames, filenames in os.walk(directory):
+        dirnames.sort()
+        parent = Path(dirpath)
+        for name in sorted([*dirnames, *filenames]):
+            path = parent / name
+            st = path.lstat()
+            relative = path.relative_to(directory).as_posix()
+            digest.update(
+                f"{relative}\0{st.st_mode:o}\0{st.st_uid}\0{st.st_gid}\0"
+                f"{st.st_size}\0{st.st_mtime_ns}\0{st.st_rdev}\0".encode()
+            )
+            if stat.S_ISLNK(st.st_mode):
+                digest.update(f"{path.readlink()}\0".encode())
+    return digest.hexdigest()
+
+
+def _get_source_path(directory: Path) -> Path:
+    return directory.with_name(f".{directory.name}{SOURCE_SUFFIX}")
+
+
+def get_recorded_source(directory: Path) -> str | None:
+    """Get the digest of what a directory was written from, None if unknown."""
+    if not directory.is_dir():
+        return None
+    try:
+        return _get_source_path(directory).read_text()
+    except OSError:
+        return None
+
+
+def record_source(directory: Path, source: str) -> None:
+    """Record the digest of what a directory was written from, once written."""
+    _get_source_path(directory).write_text(source)
+
+
+def forget_source(directory: Path) -> None:
+    """Forget what a directory was written from, before writing it again."""
+    _get_source_path(directory).unlink(missing_ok=True)
+
+
+def get_tree_digest(directory: Path) -> bytes:
+    """Get the SHA-256 digest of a directory tree.
+
+    The digest covers the path, mode, owner and group of every entry, the target
+    of symlinks, the data of files up to a few MiB, and the size and modification
+    time of larger files.
+    """
+    digest = hashlib.sha256()
+    for dirpath, dirnames, filenames in os.walk(directory):
+        dirnames.sort()
+        parent = Path(dirpath)
+        for name in sorted([*dirnames, *filenames]):
+            path = parent / name
+            st = path.lstat()
+            relative = path.relative_to(directory).as_posix()
+            digest.update(
+                f"{relative}\0{st.st_mode:o}\0{st.st_uid}\0{st.st_gid}\0".encode()
+            )
+            if stat.S_ISLNK(st.st_mode):
+                digest.update(f"{path.readlink()}\0".encode())
+            elif not stat.S_ISREG(st.st_mode):
+                digest.update(f"{st.st_rdev}\0".encode())
+            elif st.st_size <= _HASHED_FILE_SIZE:
+                digest.update(hashlib.sha256(path.read_bytes()).digest())
+            else:
+                digest.update(f"{st.st_size}\0{st.st_mtime_ns}\0".encode())
+    return digest.digest()
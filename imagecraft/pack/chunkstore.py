@@ -0,0 +1,353 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Content-defined chunking of images into a deduplicating chunk store.
+
+An image is split into chunks whose boundaries depend on the content around
+them, so that images sharing most of their data share most of their chunks.
+Each chunk is compressed with zstd and stored under its SHA-256 digest. An index
+lists the chunks making up the image, and an image is reassembled from its index,
+the chunk store and optionally seed images that already hold some of the chunks.
+
+Filesystem data in a disk image only ever moves by whole blocks, so boundaries
+are chosen at block granularity: a chunk ends after a block whose CRC matches a
+boundary pattern. Holes and runs of zero blocks aren't stored.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+from collections.abc import Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+import zstandard
+from craft_cli import CraftError, emit
+
+from imagecraft.pack import diskutil
+
+INDEX_FORMAT = "imagecraft-chunk-index/1"
+INDEX_SUFFIX = ".chunks.json"
+
+BLOCK_SIZE = 4096
+MIN_CHUNK_BLOCKS = 4
+MAX_CHUNK_BLOCKS = 64
+# A block ends a chunk when the top bits of its CRC are zero. With 4 bits, chunks
+# average MIN_CHUNK_BLOCKS + 16 blocks, or 80 KiB.
+_BOUNDARY_SHIFT = 28
+
+# Images are split into segments that are chunked concurrently. Segment
+# boundaries are always chunk boundaries, at the same offsets in every image.
+_SEGMENT_SIZE = 16 << 20
+
+_ZSTD_LEVEL = 9
+_ZERO_BLOCK = bytes(BLOCK_SIZE)
+
+
+@dataclass(frozen=True)
+class Chunk:
+    """A range of an image.
+
+    :param offset: offset of the chunk in the image.
+    :param size: size of the chunk in bytes.
+    :param digest: SHA-256 digest of the chunk's content, or None if the chunk
+        is all zeros.
+    """
+
+    offset: int
+    size: int
+    digest: str | None
+
+
+@dataclass(frozen=True)
+class ChunkIndex:
+    """The list of chunks making up an image."""
+
+    size: int
+    chunks: list[Chunk]
+
+    def write(self, path: Path) -> None:
+        """Write the index to a file."""
+        data = {
+            "format": INDEX_FORMAT,
+            "size": self.size,
+            "chunks": [[c.offset, c.size, c.digest] for c in self.chunks],
+        }
+        path.write_text(json.dumps(data, separators=(",", ":")))
+
+    @classmethod
+    def read(cls, path: Path) -> "ChunkIndex":
+        """Read an index from a file.
+
+        :raises CraftError: If the file is not a chunk index.
+        """
+        try:
+            data = json.loads(path.read_text())
+            index_format = data["format"]
+            index = cls(
+                size=int(data["size"]),
+                chunks=[
+                    Chunk(offset=offset, size=size, digest=digest)
+                    for offset, size, digest in data["chunks"]
+                ],
+            )
+        except (OSError, ValueError, KeyError, TypeError) as err:
+            raise CraftError(
+                f"Cannot read chunk index {str(path)!r}.", details=str(err)
+            ) from err
+        if index_format != INDEX_FORMAT:
+            raise CraftError(
+                f"Cannot read chunk index {str(path)!r}.",
+                details=f"Unknown index format {index_format!r}.",
+            )
+        return index
+
+    @property
+    def stored_size(self) -> int:
+        """Number of bytes of the image held in chunks, excluding zeros."""
+        return sum(chunk.size for chunk in self.chunks if chunk.digest)
+
+
+def chunk_path(store_dir: Path, digest: str) -> Path:
+    """Get the path of a chunk in a chunk store."""
+    return store_dir / digest[:4] / f"{digest}.zst"
+
+
+def _segments(fd: int, size: int) -> list[tuple[int, int]]:
+    """Split the data of a file into ranges that are chunked independently."""
+    segments: list[tuple[int, int]] = []
+    for start, end in diskutil.data_extents(fd, size, alignment=BLOCK_SIZE):
+        offset = start
+        while offset < end:
+            segment_end = min(offset - offset % _SEGMENT_SIZE + _SEGMENT_SIZE, end)
+            segments.append((offset, segment_end))
+            offset = segment_end
+    return segments
+
+
+def _chunk_data(offset: int, data: bytes) -> Iterator[Chunk]:
+    """Split data read at offset into chunks, with zero runs as digest-less chunks."""
+    view = memoryview(data)
+    chunk_start = 0
+    chunk_is_zero = False
+    for block_start in range(0, len(data), BLOCK_SIZE):
+        block = view[block_start : block_start + BLOCK_SIZE]
+        is_zero = block == _ZERO_BLOCK[: len(block)]
+        if block_start > chunk_start and is_zero != chunk_is_zero:
+            chunk_data = view[chunk_start:block_start]
+            yield _make_chunk(offset + chunk_start, chunk_data, is_zero=chunk_is_zero)
+            chunk_start = block_start
+        chunk_is_zero = is_zero
+        if is_zero:
+            continue
+
+        blocks = (block_start - chunk_start) // BLOCK_SIZE + 1
+        if blocks >= MAX_CHUNK_BLOCKS or (
+            blocks >= MIN_CHUNK_BLOCKS and zlib.crc32(block) >> _BOUNDARY_SHIFT == 0
+        ):
+            block_end = block_start + len(block)
+            chunk_data = view[chunk_start:block_end]
+            yield _make_chunk(offset + chunk_start, chunk_data, is_zero=False)
+            chunk_start = block_end
+    if chunk_start < len(data):
+        chunk_data = view[chunk_start:]
+        yield _make_chunk(offset + chunk_start, chunk_data, is_zero=chunk_is_zero)
+
+
+def _make_chunk(offset: int, data: memoryview, *, is_zero: bool) -> Chunk:
+    digest = None if is_zero else hashlib.sha256(data).hexdigest()
+    return Chunk(offset=offset, size=len(data), digest=digest)
+
+
+def _store_chunk(store_dir: Path, digest: str, data: memoryview) -> bool:
+    """Compress a chunk into the store, unless it is already there.
+
+    :returns: Whether the chunk was added.
+    """
+    path = chunk_path(store_dir, digest)
+    if path.exists():
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    compressed = zstandard.ZstdCompressor(level=_ZSTD_LEVEL).compress(data)
+    # Write atomically, as stores are shared between concurrent builds.
+    with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as tmp:
+        tmp.write(compressed)
+    Path(tmp.name).replace(path)
+    return True
+
+
+def _chunk_segment(
+    image_path: Path, start: int, end: int, store_dir: Path | None
+) -> tuple[list[Chunk], int]:
+    """Chunk a segment of an image, storing the chunks if a store is given.
+
+    :returns: The chunks, and the number of chunks added to the store.
+    """
+    with image_path.open("rb") as image:
+        image.seek(start)
+        data = image.read(end - start)
+    chunks = list(_chunk_data(start, data))
+    added = 0
+    if store_dir is not None:
+        view = memoryview(data)
+        for chunk in chunks:
+            if chunk.digest is not None:
+                chunk_data = view[
+                    chunk.offset - start : chunk.offset - start + chunk.size
+                ]
+                added += _store_chunk(store_dir, chunk.digest, chunk_data)
+    return chunks, added
+
+
+def _merge_zero_chunks(size: int, chunks: Sequence[Chunk]) -> list[Chunk]:
+    """Fill the gaps between chunks with zero chunks, merging adjacent zero chunks."""
+    merged: list[Chunk] = []
+
+    def add(chunk: Chunk) -> None:
+        last = merged[-1] if merged else None
+        if chunk.digest is None and last is not None and last.digest is None:
+            merged[-1] = Chunk(last.offset, last.size + chunk.size, None)
+        else:
+            merged.append(chunk)
+
+    offset = 0
+    for chunk in chunks:
+        if chunk.offset > offset:
+            add(Chunk(offset, chunk.offset - offset, None))
+        add(chunk)
+        offset = chunk.offset + chunk.size
+    if offset < size:
+        add(Chunk(offset, size - offset, None))
+    return merged
+
+
+def chunk_image(image_path: Path, store_dir: Path | None = None) -> ChunkIndex:
+    """Split an image into content-defined chunks.
+
+    Segments of the image are chunked concurrently.
+
+    :param image_path: the image to chunk.
+    :param store_dir: chunk store to add the chunks to. If None, chunks are only
+        indexed, as for a seed image.
+    :returns: The index of the image.
+    """
+    size = image_path.stat().st_size
+    with image_path.open("rb") as image:
+        segments = _segments(image.fileno(), size)
+
+    # Each worker holds a segment in memory.
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        results = list(
+            executor.map(
+                lambda segment: _chunk_segment(image_path, *segment, store_dir),
+                segments,
+            )
+        )
+
+    chunks = [chunk for segment_chunks, _ in results for chunk in segment_chunks]
+    index = ChunkIndex(size=size, chunks=_merge_zero_chunks(size, chunks))
+    if store_dir is not None:
+        added = sum(added for _, added in results)
+        emit.debug(
+            f"Chunked {image_path} into {len(index.chunks)} chunks, "
+            f"{added} of them new to {store_dir}"
+        )
+    return index
+
+
+@dataclass(frozen=True)
+class _Source:
+    path: Path
+    offset: int
+
+
+def _read_seed_chunk(source: _Source, chunk: Chunk) -> bytes | None:
+    with source.path.open("rb") as seed:
+        seed.seek(source.offset)
+        data = seed.read(chunk.size)
+    return data if hashlib.sha256(data).hexdigest() == chunk.digest else None
+
+
+def _read_stored_chunk(store_dir: Path, chunk: Chunk) -> bytes:
+    digest = str(chunk.digest)
+    path = chunk_path(store_dir, digest)
+    try:
+        data = zstandard.ZstdDecompressor().decompress(path.read_bytes())
+    except (OSError, zstandard.ZstdError) as err:
+        raise CraftError(
+            f"Cannot read chunk {digest} from {str(store_dir)!r}.", details=str(err)
+        ) from err
+    if hashlib.sha256(data).hexdigest() != digest:
+        raise CraftError(
+            f"Chunk {digest} in {str(store_dir)!r} is corrupt.",
+            resolution="Remove the chunk from the store and chunk its image again.",
+        )
+    return data
+
+
+def assemble_image(
+    index: ChunkIndex,
+    store_dir: Path,
+    output: Path,
+    *,
+    seeds: Sequence[Path] = (),
+) -> int:
+    """Reassemble an image from its index.
+
+    Chunks are taken from the seed images when they hold them, and from the chunk
+    store otherwise. Zero chunks are left as holes.
+
+    :param index: the index of the image to assemble.
+    :param store_dir: the chunk store.
+    :param output: path of the image to write.
+    :param seeds: images expected to share chunks with the assembled image.
+    :returns: The number of bytes read from the chunk store.
+    :raises CraftError: If a chunk is missing or corrupt.
+    """
+    sources: dict[str, _Source] = {}
+    for seed in seeds:
+        for chunk in chunk_image(seed).chunks:
+            if chunk.digest:
+                sources.setdefault(chunk.digest, _Source(seed, chunk.offset))
+
+    output.unlink(missing_ok=True)
+    with output.open("wb") as image:
+        image.truncate(index.size)
+        fd = image.fileno()
+
+        def write_chunk(chunk: Chunk) -> int:
+            source = sources.get(str(chunk.digest))
+            data = _read_seed_chunk(source, chunk) if source else None
+            fetched = 0
+            if data is None:
+                data = _read_stored_chunk(store_dir, chunk)
+                fetched = len(data)
+            os.pwrite(fd, data, chunk.offset)
+            return fetched
+
+        with ThreadPoolExecutor() as executor:
+            fetched = sum(
+                executor.map(write_chunk, [c for c in index.chunks if c.digest])
+            )
+
+    emit.debug(
+        f"Assembled {output}: {fetched} of {index.stored_size} bytes "
+        f"read from {store_dir}"
+    )
+    return fetched
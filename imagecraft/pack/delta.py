@@ -0,0 +1,357 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Partition-aware binary deltas between two images of a volume.
+
+A delta turns a source image, such as the previous release of a volume, into a
+target image. Partitions of both images are paired the way inspection finds them,
+by GPT name, or by number for MBR partitions, and each block of a target partition
+is compared with the block at the same offset in the source partition, wherever
+the partition sits on disk. Blocks outside partitions are compared with the same
+offset in the source image.
+
+Only the allocated extents of the target image are read. Unchanged blocks become
+copy operations, and the others are stored zstd-compressed in the delta. Zero
+blocks and holes are left out, as they are holes in the applied image too.
+"""
+
+import hashlib
+import json
+import os
+import struct
+from collections.abc import Iterator, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+import zstandard
+from craft_cli import CraftError, emit
+
+from imagecraft import inspection
+from imagecraft.errors import PartitionError
+from imagecraft.pack import diskutil
+
+DELTA_FORMAT = "imagecraft-delta/1"
+DELTA_SUFFIX = ".delta"
+
+BLOCK_SIZE = 4096
+
+_MAGIC = b"IMGCDLT1"
+_HEADER_LENGTH = struct.Struct("<Q")
+
+# Images are compared in segments, concurrently. Segments never straddle a
+# partition boundary.
+_SEGMENT_SIZE = 16 << 20
+
+_COPY_SIZE = 1 << 20
+_ZSTD_LEVEL = 9
+_ZERO_BLOCK = bytes(BLOCK_SIZE)
+
+
+@dataclass(frozen=True)
+class Operation:
+    """A range of the target image.
+
+    :param offset: offset of the range in the target image.
+    :param size: size of the range in bytes.
+    :param source_offset: offset in the source image to copy the range from, or
+        None if the range's data is stored in the delta.
+    :param digest: SHA-256 digest of the range in the target image.
+    """
+
+    offset: int
+    size: int
+    source_offset: int | None
+    digest: str
+
+
+@dataclass(frozen=True)
+class Delta:
+    """The operations turning a source image into a target image."""
+
+    source_size: int
+    target_size: int
+    operations: list[Operation]
+
+    @property
+    def data_size(self) -> int:
+        """Number of bytes of the target image stored in the delta."""
+        return sum(op.size for op in self.operations if op.source_offset is None)
+
+
+@dataclass(frozen=True)
+class _Segment:
+    """A range of the target image, and where it lies in the source image.
+
+    :param source_offset: offset in the source image matching ``start``, or None
+        if the range has no counterpart.
+    :param source_size: number of bytes available in the source from
+        ``source_offset`` without leaving the paired partition.
+    """
+
+    start: int
+    end: int
+    source_offset: int | None
+    source_size: int
+
+
+def _read_partition_extents(image_path: Path) -> dict[str, tuple[int, int]]:
+    """Get the byte offset and size of every partition of an image.
+
+    Partitions are keyed the way inspection finds them: by GPT name, or by number
+    when they have none, as MBR partitions.
+    """
+    try:
+        with inspection.DiskImage(image_path) as image:
+            return {
+                partition.name or str(partition.number): (
+                    partition.offset,
+                    partition.size,
+                )
+                for partition in image.partition_table.partitions
+            }
+    except PartitionError as err:
+        raise CraftError(
+            f"Cannot read the partition table of {str(image_path)!r}.",
+            details=str(err),
+        ) from err
+
+
+def _segments(
+    fd: int,
+    size: int,
+    *,
+    partitions: Mapping[str, tuple[int, int]],
+    source_partitions: Mapping[str, tuple[int, int]],
+    source_size: int,
+) -> list[_Segment]:
+    """Split the allocated extents of the target image into segments."""
+    # Target ranges with their counterpart in the source image.
+    pairs: list[tuple[int, int, int | None, int]] = []
+    for name, (start, part_size) in partitions.items():
+        source_start, source_part_size = source_partitions.get(name, (None, 0))
+        pairs.append((start, start + part_size, source_start, source_part_size))
+    pairs.sort()
+    boundaries = sorted({b for start, end, _, _ in pairs for b in (start, end)})
+
+    def locate(offset: int) -> tuple[int | None, int]:
+        for start, end, source_start, source_part_size in pairs:
+            if start <= offset < end:
+                if source_start is None:
+                    return None, 0
+                delta = offset - start
+                return source_start + delta, max(source_part_size - delta, 0)
+        # Outside partitions: the partition tables, and gaps between partitions.
+        return offset, max(source_size - offset, 0)
+
+    segments: list[_Segment] = []
+    for start, end in diskutil.data_extents(fd, size, alignment=BLOCK_SIZE):
+        offset = start
+        while offset < end:
+            segment_end = min(offset - offset % _SEGMENT_SIZE + _SEGMENT_SIZE, end)
+            segment_end = next(
+                (b for b in boundaries if offset < b < segment_end), segment_end
+            )
+            segments.append(_Segment(offset, segment_end, *locate(offset)))
+            offset = segment_end
+    return segments
+
+
+def _diff_segment(target: Path, source: Path, segment: _Segment) -> list[Operation]:
+    """Compare a segment of the target image with the source image, block by block."""
+    with target.open("rb") as image:
+        image.seek(segment.start)
+        data = image.read(segment.end - segment.start)
+    source_data = b""
+    if segment.source_offset is not None:
+        with source.open("rb") as image:
+            image.seek(segment.source_offset)
+            source_data = image.read(min(len(data), segment.source_size))
+
+    view = memoryview(data)
+    source_view = memoryview(source_data)
+    operations: list[Operation] = []
+    run_start: int | None = None
+    run_is_copy = False
+    digest = hashlib.sha256()
+
+    def end_run(run_end: int) -> None:
+        if run_start is None:
+            return
+        source_offset = None
+        if run_is_copy and segment.source_offset is not None:
+            source_offset = segment.source_offset + run_start
+        operations.append(
+            Operation(
+                offset=segment.start + run_start,
+                size=run_end - run_start,
+                source_offset=source_offset,
+                digest=digest.hexdigest(),
+            )
+        )
+
+    for block_start in range(0, len(data), BLOCK_SIZE):
+        block_end = min(block_start + BLOCK_SIZE, len(data))
+        block = view[block_start:block_end]
+        if block == _ZERO_BLOCK[: len(block)]:
+            end_run(block_start)
+            run_start = None
+            continue
+        is_copy = block == source_view[block_start:block_end]
+        if run_start is None or is_copy != run_is_copy:
+            end_run(block_start)
+            run_start, run_is_copy, digest = block_start, is_copy, hashlib.sha256()
+        digest.update(block)
+    end_run(len(data))
+    return operations
+
+
+def _write_delta(delta: Delta, target: Path, output: Path) -> None:
+    header = json.dumps(
+        {
+            "format": DELTA_FORMAT,
+            "source-size": delta.source_size,
+            "target-size": delta.target_size,
+            "operations": [
+                [op.offset, op.size, op.source_offset, op.digest]
+                for op in delta.operations
+            ],
+        },
+        separators=(",", ":"),
+    ).encode()
+    with output.open("wb") as delta_file, target.open("rb") as image:
+        delta_file.write(_MAGIC + _HEADER_LENGTH.pack(len(header)) + header)
+        compressor = zstandard.ZstdCompressor(level=_ZSTD_LEVEL, threads=-1)
+        with compressor.stream_writer(delta_file, closefd=False) as writer:
+            for op in delta.operations:
+                if op.source_offset is not None:
+                    continue
+                for start in range(op.offset, op.offset + op.size, _COPY_SIZE):
+                    end = min(start + _COPY_SIZE, op.offset + op.size)
+                    writer.write(os.pread(image.fileno(), end - start, start))
+
+
+def generate_delta(source: Path, target: Path, output: Path) -> Delta:
+    """Write a delta turning the source image into the target image.
+
+    Segments of the target image are compared with the source concurrently.
+
+    :param source: the previous image of the volume.
+    :param target: the newly packed image of the volume.
+    :param output: path of the delta to write.
+    :returns: The operations of the delta.
+    :raises CraftError: If the partition table of an image cannot be read.
+    """
+    source_size = source.stat().st_size
+    target_size = target.stat().st_size
+    with target.open("rb") as image:
+        segments = _segments(
+            image.fileno(),
+            target_size,
+            partitions=_read_partition_extents(target),
+            source_partitions=_read_partition_extents(source),
+            source_size=source_size,
+        )
+
+    # Each worker holds a segment of both images in memory.
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        results = executor.map(
+            lambda segment: _diff_segment(target, source, segment), segments
+        )
+        operations = [op for segment_ops in results for op in segment_ops]
+
+    delta = Delta(
+        source_size=source_size, target_size=target_size, operations=operations
+    )
+    _write_delta(delta, target, output)
+    emit.debug(
+        f"Wrote delta {output} from {source}: {delta.data_size} bytes of "
+        f"{target} stored, the rest copied from the source"
+    )
+    return delta
+
+
+def _read_header(delta_file: BinaryIO, path: Path) -> Delta:
+    error = f"Cannot read delta {str(path)!r}."
+    if delta_file.read(len(_MAGIC)) != _MAGIC:
+        raise CraftError(error, details="Not an imagecraft delta.")
+    try:
+        (length,) = _HEADER_LENGTH.unpack(delta_file.read(_HEADER_LENGTH.size))
+        data = json.loads(delta_file.read(length))
+        delta_format = data["format"]
+        delta = Delta(
+            source_size=int(data["source-size"]),
+            target_size=int(data["target-size"]),
+            operations=[
+                Operation(offset, size, source_offset, digest)
+                for offset, size, source_offset, digest in data["operations"]
+            ],
+        )
+    except (struct.error, ValueError, KeyError, TypeError) as err:
+        raise CraftError(error, details=str(err)) from err
+    if delta_format != DELTA_FORMAT:
+        raise CraftError(error, details=f"Unknown delta format {delta_format!r}.")
+    return delta
+
+
+def _read_operations(
+    delta: Delta, payload: BinaryIO, source: BinaryIO
+) -> Iterator[tuple[Operation, bytes]]:
+    for op in delta.operations:
+        if op.source_offset is None:
+            data = b""
+            while len(data) < op.size and (chunk := payload.read(op.size - len(data))):
+                data += chunk
+        else:
+            data = os.pread(source.fileno(), op.size, op.source_offset)
+        yield op, data
+
+
+def apply_delta(delta_path: Path, source: Path, output: Path) -> None:
+    """Apply a delta to its source image, writing the target image.
+
+    :param delta_path: the delta to apply.
+    :param source: the image the delta was generated from.
+    :param output: path of the image to write.
+    :raises CraftError: If the delta is unreadable, doesn't apply to the source,
+        or produces data not matching the target image.
+    """
+    with delta_path.open("rb") as delta_file:
+        delta = _read_header(delta_file, delta_path)
+        if source.stat().st_size != delta.source_size:
+            raise CraftError(
+                f"Delta {str(delta_path)!r} does not apply to {str(source)!r}.",
+                details=f"Expected a source image of {delta.source_size} bytes.",
+            )
+
+        output.unlink(missing_ok=True)
+        with (
+            zstandard.ZstdDecompressor().stream_reader(delta_file) as payload,
+            source.open("rb") as source_image,
+            output.open("wb") as image,
+        ):
+            image.truncate(delta.target_size)
+            for op, data in _read_operations(delta, payload, source_image):
+                if hashlib.sha256(data).hexdigest() != op.digest:
+                    raise CraftError(
+                        f"Applying delta {str(delta_path)!r} to {str(source)!r} "
+                        f"produced unexpected data at offset {op.offset}.",
+                        resolution="Check that the source image is the one the "
+                        "delta was generated from.",
+                    )
+                os.pwrite(image.fileno(), data, op.offset)
+    emit.debug(f"Applied delta {delta_path} to {source}, writing {output}")
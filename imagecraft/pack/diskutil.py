@@ -14,14 +14,21 @@
 
 """Disk-related utility functions."""
 
+import contextlib
+import os
+import re
 import subprocess
+import tempfile
+import time
+import uuid
+from collections.abc import Iterator, Sequence
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Literal, cast
 
 from craft_cli import CraftError, emit
 
-from imagecraft.models import FileSystem
+from imagecraft.models import FileSystem, FilesystemOptions
 from imagecraft.subprocesses import run
 
 # pylint: disable=no-member
@@ -30,6 +37,37 @@ from imagecraft.subprocesses import run
 FatT = Literal["fat", "vfat"]
 ExtT = Literal["ext3", "ext4"]
 
+CONTENT_TARBALL_NAME = "rootfs.tar"
+"""Name of a tarball that populates an ext partition, next to its marker.
+
+mke2fs reads the tarball directly, so the tree never needs to be unpacked on disk.
+"""
+
+CONTENT_TARBALL_MARKER = ".imagecraft-content-tarball"
+"""Name of the file recording that a content directory holds a content tarball.
+
+It is written by the parts that produce the tarball, such as the mmdebstrap plugin
+with ``mmdebstrap-format: tar``. A content tarball is only used next to it.
+"""
+
+# First e2fsprogs release whose mke2fs can populate a filesystem from a tarball.
+_MKE2FS_TARBALL_VERSION = (1, 47, 1)
+
+# Namespace of the name-based UUIDs derived for reproducible images.
+_REPRODUCIBLE_NAMESPACE = uuid.uuid5(
+    uuid.NAMESPACE_URL, "https://canonical.com/imagecraft"
+)
+
+# Unit of mkfs.fat's --offset option, the logical sector size it uses for images.
+_FAT_SECTOR_SIZE = 512
+
+# Inode times rewritten in reproducible ext filesystems.
+_TIME_FIELDS = ("atime", "mtime", "ctime")
+
+# Timestamp used when only a seed is given: 1980-01-01, the earliest date FAT
+# can represent.
+_DEFAULT_EPOCH = 315532800
+
 
 # Conversion functions
 
@@ -80,9 +118,101 @@ class DiskSize:
         return bytes_to_sectors(bytes_=self.bytesize, sector_size=self.sector_size)
 
 
+# Reproducible output
+
+
+@dataclass(frozen=True)
+class Reproducibility:
+    """Inputs from which identifiers and timestamps of an image are derived.
+
+    Two builds with the same seed and epoch give the same disk and partition
+    GUIDs, filesystem UUIDs, volume IDs, hash seeds and timestamps.
+    """
+
+    seed: str
+    """String every identifier is derived from."""
+
+    epoch: int
+    """Timestamp, in seconds since the Unix epoch, that files are clamped to."""
+
+    def scoped(self, *names: str) -> "Reproducibility":
+        """Get the reproducibility inputs for a part of the image, such as a volume."""
+        return Reproducibility(seed="/".join((self.seed, *names)), epoch=self.epoch)
+
+    def uuid(self, *names: str) -> uuid.UUID:
+        """Derive a UUID for the named identifier."""
+        return uuid.uuid5(_REPRODUCIBLE_NAMESPACE, "/".join((self.seed, *names)))
+
+    @property
+    def environment(self) -> dict[str, str]:
+        """Environment variables that make formatting tools deterministic."""
+        return {
+            "SOURCE_DATE_EPOCH": str(self.epoch),
+            # Used by e2fsprogs for the times stored in the superblock.
+            "E2FSPROGS_FAKE_TIME": str(self.epoch),
+            # Content is copied in glob order.
+            "LC_ALL": "C",
+        }
+
+
+def get_reproducibility(
+    *, seed: str | None, project_name: str
+) -> Reproducibility | None:
+    """Get the reproducibility inputs of a project, if reproducible mode is enabled.
+
+    Reproducible mode is enabled by setting a seed or the SOURCE_DATE_EPOCH
+    environment variable. Without a seed, identifiers are derived from the epoch.
+
+    :param seed: the configured reproducibility seed, if any.
+    :param project_name: name of the project, so that different projects don't
+        share identifiers.
+    :raises CraftError: If SOURCE_DATE_EPOCH is not a timestamp.
+    """
+    source_date_epoch = os.environ.get("SOURCE_DATE_EPOCH")
+    if seed is None and source_date_epoch is None:
+        return None
+
+    epoch = _DEFAULT_EPOCH
+    if source_date_epoch is not None:
+        try:
+            epoch = int(source_date_epoch)
+        except ValueError:
+            raise CraftError(
+                f"Invalid SOURCE_DATE_EPOCH: {source_date_epoch!r}",
+                resolution="Set SOURCE_DATE_EPOCH to a number of seconds since the Unix epoch.",
+            ) from None
+
+    return Reproducibility(
+        seed=f"{project_name}:{seed if seed is not None else epoch}", epoch=epoch
+    )
+
+
+def clamp_timestamps(content_dir: Path, epoch: int) -> None:
+    """Clamp the access and modification times of a directory tree to ``epoch``.
+
+    Files newer than the epoch get the epoch as both timestamps, older files get
+    their modification time as access time.
+    """
+    for path in (content_dir, *content_dir.rglob("*")):
+        mtime = min(int(path.lstat().st_mtime), epoch)
+        os.utime(path, (mtime, mtime), follow_symlinks=False)
+
+
 # Image file operations
 
 
+@dataclass(frozen=True)
+class PartitionExtent:
+    """Location of a partition in a disk image.
+
+    Tools are pointed at a partition of an image file with its extent, so that no
+    loop device is needed to format or check it.
+    """
+
+    offset: int
+    size: int
+
+
 def create_zero_image(*, imagepath: Path, disk_size: DiskSize) -> None:
     """Create an empty image.
 
@@ -97,12 +227,37 @@ def create_zero_image(*, imagepath: Path, disk_size: DiskSize) -> None:
         image_file.truncate(disk_size.bytesize)
 
 
+def data_extents(fd: int, size: int, *, alignment: int) -> Iterator[tuple[int, int]]:
+    """Yield the (start, end) ranges of a file that aren't holes.
+
+    :param fd: file descriptor of the file.
+    :param size: size of the file.
+    :param alignment: ranges are widened to multiples of this size.
+    """
+    offset = 0
+    while offset < size:
+        try:
+            start = os.lseek(fd, offset, os.SEEK_DATA)
+        except OSError:
+            # No data past offset.
+            return
+        end = min(os.lseek(fd, start, os.SEEK_HOLE), size)
+        start -= start % alignment
+        end = min(end + -end % alignment, size)
+        yield start, end
+        offset = end
+
+
 def _format_populate_ext_partition(
     *,
     fstype: ExtT,
     content_dir: Path | None,
     partitionpath: Path,
     label: str | None = None,
+    fs_uuid: str | None = None,
+    reproducibility: Reproducibility | None = None,
+    extent: PartitionExtent | None = None,
+    options: FilesystemOptions | None = None,
 ) -> None:
     """Format a partition/device as EXT3/4 and embed content.
 
@@ -110,29 +265,211 @@ def _format_populate_ext_partition(
     :param content_dir: Directory containing contents for partition, or None.
     :param partitionpath: Path to partition file or block device.
     :param label: Ext Filesystem label, empty if not supplied.
+    :param fs_uuid: Filesystem UUID, random if not supplied.
+    :param reproducibility: Inputs for a deterministic hash seed and timestamps.
+    :param extent: Location of the partition in ``partitionpath``, if it is a
+        disk image.
+    :param options: Resolved formatting options, the defaults of mke2fs if not
+        supplied.
     :raises CalledProcessError: If mke2fs fails.
     """
     mke2fs_args: list[str | Path] = ["-t", fstype]
+    extended_options: list[str] = []
+    if options is not None:
+        mke2fs_args.extend(_get_mke2fs_options(options))
+        extended_options.extend(_get_mke2fs_extended_options(options))
 
     if content_dir is not None:
-        mke2fs_args.extend(["-d", content_dir])
+        mke2fs_args.extend(["-d", _get_ext_content_source(content_dir)])
 
     if label is not None:
         mke2fs_args.extend(["-L", label])
 
+    if fs_uuid is not None:
+        mke2fs_args.extend(["-U", fs_uuid])
+
+    if extent is not None:
+        extended_options.append(f"offset={extent.offset}")
+
+    if reproducibility is not None:
+        extended_options.append(f"hash_seed={reproducibility.uuid('hash-seed')}")
+
+    if extended_options:
+        mke2fs_args.extend(["-E", ",".join(extended_options)])
+
     mke2fs_args.append(partitionpath)
 
+    if extent is not None:
+        mke2fs_args.append(f"{extent.size // 1024}k")
+
     with emit.open_stream(f"Creating {fstype} partition (label: {label!r})") as stream:
-        run("mke2fs", *mke2fs_args, stdout=stream, stderr=stream)
+        run(
+            "mke2fs",
+            *mke2fs_args,
+            stdout=stream,
+            stderr=stream,
+            env=_get_environment(reproducibility),
+        )
+
+    if reproducibility is not None and content_dir is not None:
+        _reset_ext_times(
+            partitionpath=_get_e2fsprogs_path(partitionpath, extent),
+            content_dir=content_dir,
+            reproducibility=reproducibility,
+        )
+
+
+def _get_mke2fs_options(options: FilesystemOptions) -> list[str]:
+    """Get the mke2fs arguments of formatting options, other than extended ones."""
+    args: list[str] = []
+    if options.block_size is not None:
+        args.extend(["-b", str(options.block_size)])
+    if options.bytes_per_inode is not None:
+        args.extend(["-i", str(options.bytes_per_inode)])
+    if options.inode_count is not None:
+        args.extend(["-N", str(options.inode_count)])
+    if options.reserved_blocks_percent is not None:
+        args.extend(["-m", f"{options.reserved_blocks_percent:g}"])
+    if options.journal_size is not None:
+        args.extend(["-J", f"size={options.journal_size}"])
+    if options.metadata_csum is not None:
+        args.extend(
+            ["-O", "metadata_csum" if options.metadata_csum else "^metadata_csum"]
+        )
+    return args
 
 
-def _format_populate_fat_partition(  # pylint: disable=too-many-arguments
+def _get_mke2fs_extended_options(options: FilesystemOptions) -> list[str]:
+    """Get the mke2fs extended options, given with -E, of formatting options."""
+    extended_options: list[str] = []
+    if options.lazy_itable_init is not None:
+        extended_options.append(f"lazy_itable_init={int(options.lazy_itable_init)}")
+    if options.lazy_journal_init is not None:
+        extended_options.append(f"lazy_journal_init={int(options.lazy_journal_init)}")
+    return extended_options
+
+
+def _get_e2fsprogs_path(path: Path, extent: PartitionExtent | None) -> Path | str:
+    """Get the path e2fsprogs tools open a partition of a disk image with."""
+    return path if extent is None else f"{path}?offset={extent.offset}"
+
+
+def _reset_ext_times(
+    *, partitionpath: Path | str, content_dir: Path, reproducibility: Reproducibility
+) -> None:
+    """Set the times of every inode copied from a content directory.
+
+    mke2fs copies the times of source files. They are rewritten with debugfs, so
+    that the content directory isn't modified: modification and access times are
+    clamped to the epoch, and the change time, which can't be set from user
+    space, is set to it. Partitions populated from a tarball get their times from
+    the tarball instead.
+
+    :raises CraftError: If a path has a newline, which debugfs can't be given.
+    :raises CalledProcessError: If debugfs fails.
+    """
+    if not content_dir.is_dir() or is_content_tarball(content_dir):
+        return
+    paths = sorted(content_dir.rglob("*"))
+    ctime = hex(reproducibility.epoch)
+    script: list[str] = []
+    for path in [content_dir, *paths]:
+        relative = str(path.relative_to(content_dir))
+        if "\n" in relative:
+            raise CraftError(
+                f"Cannot set reproducible times of {str(path)!r}: its path has a newline."
+            )
+        # debugfs reads a doubled quote within quotes as a literal one.
+        quoted = relative.replace('"', '""')
+        name = "/" if path == content_dir else f"/{quoted}"
+        mtime = hex(min(int(path.lstat().st_mtime), reproducibility.epoch))
+        # The extra fields hold nanoseconds, reset before the times themselves.
+        script.extend(f'sif "{name}" {field}_extra 0' for field in _TIME_FIELDS)
+        script.append(f'sif "{name}" atime {mtime}')
+        script.append(f'sif "{name}" mtime {mtime}')
+        script.append(f'sif "{name}" ctime {ctime}')
+    with emit.open_stream("Setting reproducible inode times") as stream:
+        run(
+            "debugfs",
+            "-w",
+            "-f",
+            "-",
+            partitionpath,
+            input="".join(f"{line}\n" for line in script),
+            stdout=subprocess.DEVNULL,
+            stderr=stream,
+            env=_get_environment(reproducibility),
+        )
+
+
+def is_content_tarball(content_dir: Path) -> bool:
+    """Whether a content directory holds a content tarball, next to its marker.
+
+    :raises CraftError: If the directory has the marker of a content tarball,
+        but holds other content or no tarball.
+    """
+    if not (content_dir / CONTENT_TARBALL_MARKER).is_file():
+        return False
+    tarball = content_dir / CONTENT_TARBALL_NAME
+    if not tarball.is_file():
+        raise CraftError(
+            f"Content tarball {CONTENT_TARBALL_NAME!r} not found in {content_dir}."
+        )
+    extra = sorted(
+        path.name
+        for path in content_dir.iterdir()
+        if path.name not in (CONTENT_TARBALL_NAME, CONTENT_TARBALL_MARKER)
+    )
+    if extra:
+        raise CraftError(
+            f"Cannot add content to the partition populated from {tarball}.",
+            details=f"Other content found: {', '.join(extra)}",
+            resolution="Organize the other parts into a different partition, or "
+            "produce a directory tree instead of a tarball.",
+        )
+    return True
+
+
+def _get_ext_content_source(content_dir: Path) -> Path:
+    """Get the path mke2fs should populate a partition from.
+
+    A content directory holding a content tarball is populated from that tarball,
+    otherwise from the directory itself.
+
+    :raises CraftError: If a tarball must be used but mke2fs is too old to read it.
+    """
+    if not is_content_tarball(content_dir):
+        return content_dir
+    tarball = content_dir / CONTENT_TARBALL_NAME
+
+    version_output = run(
+        "mke2fs", "-V", stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+    )
+    match = re.search(r"mke2fs (\d+)\.(\d+)(?:\.(\d+))?", version_output.stdout)
+    version = tuple(int(part or 0) for part in match.groups()) if match else ()
+    if version < _MKE2FS_TARBALL_VERSION:
+        required = ".".join(str(part) for part in _MKE2FS_TARBALL_VERSION)
+        raise CraftError(
+            f"Cannot populate a partition from {CONTENT_TARBALL_NAME!r}.",
+            details=f"mke2fs {required} or newer is required to read tarballs.",
+            resolution="Use a build base with a newer e2fsprogs, or produce a directory tree.",
+        )
+
+    emit.debug(f"Populating partition from tarball {tarball}")
+    return tarball
+
+
+def _format_populate_fat_partition(  # noqa: PLR0913 # pylint: disable=too-many-arguments
     *,
     fattype: FatT,
     fatsize: int | None,
     content_dir: Path | None,
     partitionpath: Path,
     label: str | None = None,
+    fs_uuid: str | None = None,
+    reproducibility: Reproducibility | None = None,
+    extent: PartitionExtent | None = None,
+    options: FilesystemOptions | None = None,
 ) -> None:
     """Format a partition/device as FAT and copy content.
 
@@ -141,22 +478,45 @@ def _format_populate_fat_partition(  # pylint: disable=too-many-arguments
     :param content_dir: Directory containing contents for partition, or None.
     :param partitionpath: Path to partition file or block device.
     :param label: Fat Filesystem label, empty if not supplied.
+    :param fs_uuid: Volume ID in the XXXX-XXXX form, random if not supplied.
+    :param reproducibility: Inputs for deterministic timestamps.
+    :param extent: Location of the partition in ``partitionpath``, if it is a
+        disk image.
+    :param options: Resolved formatting options, the defaults of mkfs.fat if not
+        supplied.
     :raises CalledProcessError: If mkfs.xxx or mcopy fails.
     """
     mkdosfs_args: list[str | Path] = []
 
+    if extent is not None:
+        mkdosfs_args.extend(["--offset", str(extent.offset // _FAT_SECTOR_SIZE)])
+
     if fatsize is not None:
         mkdosfs_args.extend(["-F", str(fatsize)])
 
+    if options is not None and options.cluster_size is not None:
+        sectors = max(options.cluster_size // _FAT_SECTOR_SIZE, 1)
+        mkdosfs_args.extend(["-s", str(sectors)])
+
     if label is not None:
         mkdosfs_args.extend(["-n", label])
 
+    if fs_uuid is not None:
+        mkdosfs_args.extend(["-i", fs_uuid.replace("-", "")])
+
     mkdosfs_args.append(partitionpath)
 
+    if extent is not None:
+        mkdosfs_args.append(str(extent.size // 1024))
+
+    env = _get_environment(reproducibility)
     with emit.open_stream(f"Creating {fattype} partition (label: {label!r})") as stream:
-        run("mkfs." + fattype, *mkdosfs_args, stdout=stream, stderr=stream)
+        run("mkfs." + fattype, *mkdosfs_args, stdout=stream, stderr=stream, env=env)
 
-    if content_dir is not None and any(content_dir.iterdir()):
+    mtools_image = _get_mtools_image(partitionpath, extent)
+    if content_dir is None or not any(content_dir.iterdir()):
+        return
+    with _clamped_content(content_dir, reproducibility) as source_dir:
         # If we invoke mcopy directly, the sh wrapper will quote the
         # source path because it contains a wildcard. This will confuse
         # mcopy. Instead, we wrap the call in bash to get it to
@@ -164,9 +524,84 @@ def _format_populate_fat_partition(  # pylint: disable=too-many-arguments
         # empty.
         # Note that the documentation for mcopy's -i flag can be hard to find - some is here:
         # https://www.gnu.org/software/mtools/manual/mtools.html#drive-letters
-        mcopy_cmd = f"mcopy -n -o -s -i{str(partitionpath)} {content_dir}/* ::"
+        # In reproducible mode, -m keeps the (clamped) modification times.
+        mcopy_flags = "-n -o -s -m" if reproducibility else "-n -o -s"
+        mcopy_cmd = f"mcopy {mcopy_flags} -i{str(mtools_image)} {source_dir}/* ::"
         with emit.open_stream("Copying files to partition") as stream:
-            run("bash", "-c", mcopy_cmd, stdout=stream, stderr=stream)
+            run("bash", "-c", mcopy_cmd, stdout=stream, stderr=stream, env=env)
+
+
+@contextlib.contextmanager
+def _clamped_content(
+    content_dir: Path, reproducibility: Reproducibility | None
+) -> Iterator[Path]:
+    """Get a copy of a content directory with its timestamps clamped, if reproducible.
+
+    mtools can only copy the times of source files, so they are clamped in a
+    temporary copy rather than in the content directory.
+    """
+    if reproducibility is None:
+        yield content_dir
+        return
+    with tempfile.TemporaryDirectory(prefix="imagecraft-content-") as temp_dir:
+        run("cp", "--archive", "--reflink=auto", f"{content_dir}/.", temp_dir)
+        clamp_timestamps(Path(temp_dir), reproducibility.epoch)
+        yield Path(temp_dir)
+
+
+def _get_mtools_image(path: Path, extent: PartitionExtent | None) -> Path | str:
+    """Get the image argument mtools open a partition of a disk image with."""
+    return path if extent is None else f"{path}@@{extent.offset}"
+
+
+def mark_fat_read_only(
+    device_path: Path, paths: Sequence[str], *, extent: PartitionExtent | None = None
+) -> None:
+    """Set the read-only attribute of files in a FAT filesystem.
+
+    FAT stores no permissions, so this is how files nobody may write to are
+    carried over.
+
+    :param device_path: Path to the block device or image file.
+    :param paths: Absolute paths of the files in the filesystem.
+    :param extent: Location of the filesystem in ``device_path``, if it is a disk
+        image.
+    :raises CalledProcessError: If mattrib fails.
+    """
+    if not paths:
+        return
+    with emit.open_stream("Marking read-only files") as stream:
+        run(
+            "mattrib",
+            f"-i{_get_mtools_image(device_path, extent)}",
+            "+r",
+            *(f"::{path}" for path in paths),
+            stdout=stream,
+            stderr=stream,
+        )
+
+
+def _get_environment(reproducibility: Reproducibility | None) -> dict[str, str] | None:
+    """Get the environment to run formatting tools in, None to inherit it."""
+    if reproducibility is None:
+        return None
+    return {**os.environ, **reproducibility.environment}
+
+
+def generate_filesystem_uuid(
+    fstype: FileSystem, *, reproducibility: Reproducibility | None = None
+) -> str:
+    """Generate a UUID for a filesystem, in the form blkid reports it.
+
+    ext filesystems use a standard UUID, FAT filesystems a 32-bit volume ID.
+
+    :param reproducibility: Inputs to derive the UUID from, random if not supplied.
+    """
+    source = reproducibility.uuid("filesystem") if reproducibility else uuid.uuid4()
+    if "fat" in fstype.value:
+        volume_id = source.hex[:8].upper()
+        return f"{volume_id[:4]}-{volume_id[4:]}"
+    return str(source)
 
 
 def format_device(
@@ -175,6 +610,10 @@ def format_device(
     fstype: FileSystem,
     label: str | None = None,
     content_dir: Path | None = None,
+    fs_uuid: str | None = None,
+    reproducibility: Reproducibility | None = None,
+    extent: PartitionExtent | None = None,
+    options: FilesystemOptions | None = None,
 ) -> None:
     """Format and populate an existing block device or image file.
 
@@ -186,17 +625,36 @@ def format_device(
     :param label: Optional filesystem label.
     :param content_dir: Optional directory whose contents are copied into the
         filesystem after formatting.
+    :param fs_uuid: Optional filesystem UUID, as returned by
+        :func:`generate_filesystem_uuid`.
+    :param reproducibility: Inputs the partition's identifiers and timestamps are
+        derived from, for a byte-identical result. Timestamps of the content are
+        clamped to its epoch in the filesystem, ``content_dir`` is left as it is.
+    :param extent: Location of the partition in ``device_path``, to format a
+        partition of a disk image in place, without a loop device.
+    :param options: Options to format the filesystem with, with the values of
+        their preset.
     :raises CraftError: If the device does not exist or the filesystem is unsupported.
     """
     if not device_path.exists():
         raise CraftError(f"Device {device_path} does not exist")
 
+    if options is not None:
+        options = options.resolve()
+
+    if reproducibility is not None and fs_uuid is None:
+        fs_uuid = generate_filesystem_uuid(fstype, reproducibility=reproducibility)
+
     if fstype.value.startswith("ext"):
         _format_populate_ext_partition(
             fstype=cast(ExtT, fstype.value),
             content_dir=content_dir,
             partitionpath=device_path,
             label=label,
+            fs_uuid=fs_uuid,
+            reproducibility=reproducibility,
+            extent=extent,
+            options=options,
         )
         return
 
@@ -216,12 +674,90 @@ def format_device(
             content_dir=content_dir,
             partitionpath=device_path,
             label=label,
+            fs_uuid=fs_uuid,
+            reproducibility=reproducibility,
+            extent=extent,
+            options=options,
         )
         return
 
     raise CraftError(f"Unsupported filesystem: {fstype}")
 
 
+@dataclass(frozen=True)
+class FilesystemCheck:
+    """Result of a read-only consistency check of a filesystem.
+
+    :param passed: whether no errors were found.
+    :param output: combined output of the checker.
+    :param duration: time the check took, in seconds.
+    """
+
+    passed: bool
+    output: str
+    duration: float
+
+
+def check_filesystem(
+    device_path: Path,
+    fstype: FileSystem,
+    *,
+    extent: PartitionExtent | None = None,
+) -> FilesystemCheck:
+    """Check the consistency of a filesystem without modifying it.
+
+    Runs ``e2fsck -fn`` on ext filesystems and ``fsck.fat -n`` on FAT ones.
+
+    :param device_path: Path to the block device or image file.
+    :param fstype: The type of the filesystem.
+    :param extent: Location of the filesystem in ``device_path``, if it is a disk
+        image. fsck.fat can't read at an offset, so FAT filesystems are copied
+        out of the image to be checked.
+    :raises CraftError: If the filesystem is unsupported.
+    """
+    start = time.monotonic()
+    if fstype.value.startswith("ext"):
+        path = _get_e2fsprogs_path(device_path, extent)
+        result = run("e2fsck", "-f", "-n", path, check=False, stderr=subprocess.STDOUT)
+    elif "fat" in fstype.value:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = device_path
+            if extent is not None:
+                path = Path(tmp, "partition.img")
+                _copy_extent(device_path, path, extent)
+            result = run("fsck.fat", "-n", path, check=False, stderr=subprocess.STDOUT)
+    else:
+        raise CraftError(f"Unsupported filesystem: {fstype}")
+
+    return FilesystemCheck(
+        passed=result.returncode == 0,
+        output=result.stdout.strip(),
+        duration=time.monotonic() - start,
+    )
+
+
+def _copy_extent(source: Path, dest: Path, extent: PartitionExtent) -> None:
+    """Copy a partition of a disk image into a new sparse file, skipping holes."""
+    offset = extent.offset
+    end = offset + extent.size
+    with source.open("rb") as source_file, dest.open("wb") as dest_file:
+        dest_file.truncate(extent.size)
+        fd = source_file.fileno()
+        for extent_start, extent_end in data_extents(fd, end, alignment=1):
+            position = max(extent_start, offset)
+            while position < extent_end:
+                copied = os.copy_file_range(
+                    fd,
+                    dest_file.fileno(),
+                    extent_end - position,
+                    position,
+                    position - offset,
+                )
+                if not copied:
+                    break
+                position += copied
+
+
 def format_populate_partition(
     *,
     fstype: FileSystem,
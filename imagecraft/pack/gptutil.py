@@ -71,12 +71,15 @@ def _create_gpt_layout(
     imagepath: Path,
     sector_size: int,
     layout: GPTVolume,
+    reproducibility: diskutil.Reproducibility | None = None,
 ) -> None:
     """Partition image.
 
     :param imagepath: Path to image file.
     :param sector_size: Sector size in bytes.
     :param layout: Disk layout to create.
+    :param reproducibility: Inputs to derive the disk and partition GUIDs from,
+        random if not supplied.
     :raises CalledProcessError: If sfdisk fails.
     """
     if sector_size not in SUPPORTED_SECTOR_SIZES:
@@ -87,6 +90,8 @@ def _create_gpt_layout(
         "unit": "sectors",
         "sector-size": str(sector_size),
     }
+    if reproducibility is not None:
+        header["label-id"] = str(reproducibility.uuid("disk")).upper()
     partitions: list[dict[str, str | None]] = []
     # Manage start position to avoid sfdisk automatic 1MiB alignment
     start = NON_MBR_START_OFFSET
@@ -105,6 +110,10 @@ def _create_gpt_layout(
             partition["bootable"] = None
         if hasattr(structure_item, "id") and structure_item.id is not None:
             partition["uuid"] = str(structure_item.id)
+        elif reproducibility is not None:
+            partition["uuid"] = str(
+                reproducibility.uuid("partition", structure_item.name)
+            ).upper()
         if (
             hasattr(structure_item, "partition_number")
             and structure_item.partition_number is not None
@@ -166,12 +175,14 @@ def create_empty_gpt_image(
     imagepath: Path,
     sector_size: int,
     layout: GPTVolume,
+    reproducibility: diskutil.Reproducibility | None = None,
 ) -> None:
     """Create a zeroed image file with a GPT partition table, but no filesystems or data.
 
     :param imagepath: Path to image file.
     :param sector_size: Sector size in bytes.
     :param layout: Disk layout to create.
+    :param reproducibility: Inputs to derive the disk and partition GUIDs from.
     """
     image_bytes = image_size(sector_size=sector_size, layout=layout)
     disk_size = diskutil.DiskSize(bytesize=image_bytes, sector_size=sector_size)
@@ -185,6 +196,7 @@ def create_empty_gpt_image(
         imagepath=imagepath,
         sector_size=sector_size,
         layout=layout,
+        reproducibility=reproducibility,
     )
 
 
@@ -0,0 +1,233 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Native generation of grub.cfg, without running update-grub."""
+
+import re
+import shlex
+from dataclasses import dataclass
+from pathlib import Path
+
+from craft_cli import emit
+
+from imagecraft.models.volume import PartitionSchema
+
+_KERNEL_PREFIXES = ("vmlinuz-", "vmlinux-")
+_INITRD_PATTERNS = ("initrd.img-{version}", "initrd-{version}.img")
+
+_PARTITION_MODULES: dict[PartitionSchema, tuple[str, ...]] = {
+    PartitionSchema.GPT: ("part_gpt",),
+    PartitionSchema.MBR: ("part_msdos",),
+    PartitionSchema.HYBRID: ("part_gpt", "part_msdos"),
+}
+
+# GRUB modules able to read a filesystem, by blkid type.
+_FILESYSTEM_MODULES = {
+    "ext2": "ext2",
+    "ext3": "ext2",
+    "ext4": "ext2",
+    "vfat": "fat",
+}
+
+_DEFAULT_TIMEOUT = "5"
+
+
+@dataclass(frozen=True)
+class Filesystem:
+    """Identity of a filesystem on a freshly created partition."""
+
+    uuid: str
+    fstype: str
+
+
+@dataclass(frozen=True)
+class Kernel:
+    """A kernel found in the boot directory, with its initrd if any."""
+
+    version: str
+    kernel: str
+    initrd: str | None
+
+
+@dataclass(frozen=True)
+class NativeConfig:
+    """Everything needed to write grub.cfg for an image.
+
+    :param schema: partition schema of the volume holding the boot filesystem.
+    :param root: filesystem mounted at ``/``.
+    :param boot: filesystem holding the kernels. Same as ``root`` unless ``/boot``
+        is a separate partition.
+    """
+
+    schema: PartitionSchema
+    root: Filesystem
+    boot: Filesystem
+
+    @property
+    def separate_boot(self) -> bool:
+        """Whether /boot lives on its own filesystem."""
+        return self.boot != self.root
+
+
+def _version_key(version: str) -> list[tuple[int, str]]:
+    """Sort versions like ``sort -V``, so that 6.8.0-10 comes after 6.8.0-9."""
+    return [
+        (int(part), "") if part.isdigit() else (-1, part)
+        for part in re.split(r"(\d+)", version)
+        if part
+    ]
+
+
+def find_kernels(boot_dir: Path) -> list[Kernel]:
+    """Find the kernels and initrds in a boot directory, newest first."""
+    kernels: list[Kernel] = []
+    if not boot_dir.is_dir():
+        return kernels
+
+    for path in boot_dir.iterdir():
+        prefix = next((p for p in _KERNEL_PREFIXES if path.name.startswith(p)), None)
+        if prefix is None or not path.is_file():
+            continue
+        version = path.name.removeprefix(prefix)
+        initrd = next(
+            (
+                name
+                for pattern in _INITRD_PATTERNS
+                if (boot_dir / (name := pattern.format(version=version))).is_file()
+            ),
+            None,
+        )
+        kernels.append(Kernel(version=version, kernel=path.name, initrd=initrd))
+
+    return sorted(kernels, key=lambda k: _version_key(k.version), reverse=True)
+
+
+def read_grub_defaults(root: Path) -> dict[str, str]:
+    """Read GRUB settings from /etc/default/grub and /etc/default/grub.d/*.cfg.
+
+    Only plain assignments are understood. Values computed by the shell, such as
+    Ubuntu's default GRUB_DISTRIBUTOR, are ignored.
+    """
+    defaults_file = root / "etc/default/grub"
+    files = [defaults_file] if defaults_file.is_file() else []
+    files.extend(sorted((root / "etc/default/grub.d").glob("*.cfg")))
+
+    settings: dict[str, str] = {}
+    for path in files:
+        for line in path.read_text().splitlines():
+            key, sep, value = line.strip().partition("=")
+            if not sep or not key.startswith("GRUB_") or "`" in value or "$(" in value:
+                continue
+            try:
+                words = shlex.split(value, comments=True)
+            except ValueError:
+                emit.debug(f"Ignoring unparsable GRUB setting in {path}: {line}")
+                continue
+            settings[key] = " ".join(words)
+    return settings
+
+
+def _read_distributor(root: Path, settings: dict[str, str]) -> str:
+    if distributor := settings.get("GRUB_DISTRIBUTOR"):
+        return distributor
+    os_release = root / "etc/os-release"
+    if os_release.is_file():
+        for line in os_release.read_text().splitlines():
+            if line.startswith("NAME="):
+                return " ".join(shlex.split(line.removeprefix("NAME=")))
+    return "Ubuntu"
+
+
+def render_grub_config(
+    root: Path, config: NativeConfig, *, boot_dir: Path | None = None
+) -> str:
+    """Render grub.cfg for the root filesystem mounted at ``root``.
+
+    Entries mirror those of update-grub: one per kernel, newest first and
+    default, each followed by a recovery entry unless GRUB_DISABLE_RECOVERY is
+    set.
+
+    :param boot_dir: directory holding the kernels, if not ``root``'s /boot.
+    """
+    settings = read_grub_defaults(root)
+    distributor = _read_distributor(root, settings)
+    cmdline = settings.get("GRUB_CMDLINE_LINUX", "")
+    cmdline_default = settings.get("GRUB_CMDLINE_LINUX_DEFAULT", "")
+    recovery = settings.get("GRUB_DISABLE_RECOVERY", "false") != "true"
+    boot_prefix = "" if config.separate_boot else "/boot"
+    default = settings.get("GRUB_DEFAULT", "0")
+    os_class = (distributor.split() or ["ubuntu"])[0].lower()
+
+    modules = [
+        *_PARTITION_MODULES[config.schema],
+        _FILESYSTEM_MODULES.get(config.boot.fstype, "ext2"),
+    ]
+    lines = [
+        "# Generated by imagecraft. Do not edit.",
+        # Only numeric defaults are supported without a grubenv.
+        f"set default={default if default.isdigit() else '0'}",
+        f"set timeout={settings.get('GRUB_TIMEOUT', _DEFAULT_TIMEOUT)}",
+        *(f"insmod {module}" for module in modules),
+        f"search --no-floppy --fs-uuid --set=root {config.boot.uuid}",
+    ]
+
+    def menuentry(title: str, kernel: Kernel, args: str) -> list[str]:
+        linux_args = " ".join(
+            filter(None, [f"root=UUID={config.root.uuid}", "ro", args])
+        )
+        quoted_title = title.replace("'", "'\\''")
+        classes = f"--class {os_class} --class gnu-linux --class os"
+        entry = [
+            f"menuentry '{quoted_title}' {classes} {{",
+            "\tinsmod gzio",
+            f"\tlinux\t{boot_prefix}/{kernel.kernel} {linux_args}",
+        ]
+        if kernel.initrd:
+            entry.append(f"\tinitrd\t{boot_prefix}/{kernel.initrd}")
+        entry.append("}")
+        return entry
+
+    for kernel in find_kernels(boot_dir or root / "boot"):
+        title = f"{distributor}, with Linux {kernel.version}"
+        lines.extend(
+            menuentry(title, kernel, " ".join(filter(None, [cmdline, cmdline_default])))
+        )
+        if recovery:
+            lines.extend(
+                menuentry(
+                    f"{title} (recovery mode)",
+                    kernel,
+                    " ".join(filter(None, ["single", cmdline])),
+                )
+            )
+
+    return "\n".join(lines) + "\n"
+
+
+def write_grub_config(
+    root: Path, config: NativeConfig, *, boot_dir: Path | None = None
+) -> Path:
+    """Write /boot/grub/grub.cfg in the root filesystem mounted at ``root``.
+
+    :param boot_dir: directory holding the kernels, if not ``root``'s /boot. The
+        configuration is written to its grub directory.
+    :returns: The path of the written file.
+    """
+    grub_cfg = (boot_dir or root / "boot") / "grub/grub.cfg"
+    grub_cfg.parent.mkdir(parents=True, exist_ok=True)
+    grub_cfg.write_text(render_grub_config(root, config, boot_dir=boot_dir))
+    emit.debug(f"Wrote native GRUB configuration to {grub_cfg}")
+    return grub_cfg
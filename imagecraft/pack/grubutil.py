@@ -14,7 +14,9 @@
 
 """GRUB utils."""
 
+import contextlib
 import subprocess
+from collections.abc import Mapping
 from pathlib import Path
 
 from craft_cli import emit
@@ -27,7 +29,7 @@ from imagecraft.models.volume import (
     PartitionSchema,
     StructureList,
 )
-from imagecraft.pack import mbrutil
+from imagecraft.pack import grubcfg, mbrutil
 from imagecraft.pack.chroot import Chroot, Mount
 from imagecraft.pack.image import Image
 from imagecraft.subprocesses import run
@@ -42,11 +44,18 @@ _GRUB_BIOS_TARGET = "i386-pc"
 _GRUB_BIOS_ARCHS = {DebianArchitecture.AMD64, DebianArchitecture.I386}
 
 
-def _grub_install(grub_target: str, loop_dev: str) -> None:
+def _grub_install(
+    grub_target: str,
+    loop_dev: str,
+    *,
+    native_config: grubcfg.NativeConfig | None = None,
+) -> None:
     """Install grub in the image.
 
     :param grub_target: target platform to install grub for.
     :param loop_dev: loop device to install grub on
+    :param native_config: if set, grub.cfg is written from these settings instead
+        of running update-grub.
     """
     check_grub_install = ["grub-install", "-V"]
     if grub_target == _GRUB_BIOS_TARGET:
@@ -101,13 +110,18 @@ def _grub_install(grub_target: str, loop_dev: str) -> None:
         )
         return
 
+    commands = [grub_install_command]
+    if native_config is None:
+        commands.extend(
+            [
+                divert_os_prober_command,
+                update_grub_command,
+                undivert_os_prober_command,
+            ]
+        )
+
     try:
-        for cmd in [
-            grub_install_command,
-            divert_os_prober_command,
-            update_grub_command,
-            undivert_os_prober_command,
-        ]:
+        for cmd in commands:
             res = run(*cmd, stderr=subprocess.STDOUT)
             if res.stdout:
                 emit.debug(res.stdout)
@@ -116,9 +130,19 @@ def _grub_install(grub_target: str, loop_dev: str) -> None:
     except FileNotFoundError as err:
         raise errors.GRUBInstallError("Missing tool to install grub") from err
 
+    if native_config is not None:
+        grubcfg.write_grub_config(Path("/"), native_config)
+
 
 def setup_grub(
-    image: Image, workdir: Path, arch: str, filesystem_mount: FilesystemMount
+    image: Image,
+    workdir: Path,
+    arch: str,
+    filesystem_mount: FilesystemMount,
+    *,
+    loop_dev: str | None = None,
+    loop_paths: Mapping[str, str] | None = None,
+    native_config: bool = False,
 ) -> None:
     """Setups GRUB in the image.
 
@@ -126,6 +150,13 @@ def setup_grub(
     :param workdir: working directory
     :param arch: architecture the image is built for
     :param filesystem_mount: order in which partitions should be mounted
+    :param loop_dev: loop device the image is already attached to. If unset, the
+        image is attached for the duration of the installation.
+    :param loop_paths: loop device paths of all attached volumes and partitions,
+        as returned by ``ImageService.get_loop_paths``. Used to resolve mounts of
+        partitions that live on other volumes.
+    :param native_config: write grub.cfg from the kernels found in the image and
+        the filesystems just created, instead of running update-grub.
 
     """
     emit.progress("Setting up GRUB in the image")
@@ -158,9 +189,15 @@ def setup_grub(
     mount_dir = workdir / "mount"
     mount_dir.mkdir(exist_ok=True)
 
-    with image.attach_loopdev() as loop_dev:
+    attach_cm = contextlib.nullcontext(loop_dev) if loop_dev else image.attach_loopdev()
+    with attach_cm as image_loop_dev:
         mounts: list[Mount] = [
-            *_image_mounts(loop_dev, image.volume.structure, filesystem_mount),
+            *_image_mounts(
+                image_loop_dev,
+                image.volume.structure,
+                filesystem_mount,
+                loop_paths=loop_paths,
+            ),
             Mount(
                 fstype="devtmpfs",
                 src="devtmpfs-build",
@@ -180,11 +217,22 @@ def setup_grub(
         ]
         chroot = Chroot(path=mount_dir, mounts=mounts)
 
+        config = None
+        if native_config:
+            config = _native_config(
+                image_loop_dev,
+                image.volume.volume_schema,
+                image.volume.structure,
+                filesystem_mount,
+                loop_paths=loop_paths,
+            )
+
         try:
             chroot.execute(
                 target=_grub_install,
                 grub_target=grub_target,
-                loop_dev=loop_dev,
+                loop_dev=image_loop_dev,
+                native_config=config,
             )
         except errors.ChrootMountError as err:
             # Ignore mounting errors indicating the rootfs does not have
@@ -193,31 +241,85 @@ def setup_grub(
 
 
 def _image_mounts(
-    loop_dev: str, structure: StructureList, filesystem_mount: FilesystemMount
+    loop_dev: str,
+    structure: StructureList,
+    filesystem_mount: FilesystemMount,
+    *,
+    loop_paths: Mapping[str, str] | None = None,
 ) -> list[Mount]:
     """Generate a list of mounts for the structure, based on the given filesystem_mount.
 
     :param loop_dev: loop device the disk is associated to
     :param structure: StructureList describing the partition layout of the image
     :param filesystem_mount: order in which partitions should be mounted
+    :param loop_paths: optional mapping of 'volume/structure' keys to partition
+        devices, taking precedence over the partitions of ``loop_dev``
     """
-    image_mounts: list[Mount] = []
-
-    for entry in filesystem_mount:
-        partition_name = _partition_name_from_device(entry.device)
-        partnum = _part_num(partition_name, structure)
-        if partnum is None:
-            raise errors.ImageError(
-                message=f"Cannot find a partition named {partition_name}"
-            )
-        image_mounts.append(
-            Mount(
-                fstype=None,
-                src=f"{loop_dev}p{partnum}",
-                relative_mountpoint=entry.mount,
-            )
+    return [
+        Mount(
+            fstype=None,
+            src=_device_path(loop_dev, entry.device, structure, loop_paths),
+            relative_mountpoint=entry.mount,
         )
-    return image_mounts
+        for entry in filesystem_mount
+    ]
+
+
+def _device_path(
+    loop_dev: str,
+    device: str,
+    structure: StructureList,
+    loop_paths: Mapping[str, str] | None,
+) -> str:
+    """Get the partition device backing a filesystem mount entry."""
+    device_key = device.strip("()").removeprefix("volume/")
+    if loop_paths and device_key in loop_paths:
+        return loop_paths[device_key]
+    partition_name = _partition_name_from_device(device)
+    partnum = _part_num(partition_name, structure)
+    if partnum is None:
+        raise errors.ImageError(
+            message=f"Cannot find a partition named {partition_name}"
+        )
+    return f"{loop_dev}p{partnum}"
+
+
+def _native_config(
+    loop_dev: str,
+    schema: PartitionSchema,
+    structure: StructureList,
+    filesystem_mount: FilesystemMount,
+    *,
+    loop_paths: Mapping[str, str] | None = None,
+) -> grubcfg.NativeConfig:
+    """Collect the settings to write grub.cfg without running update-grub.
+
+    The root and boot filesystems are identified from the partitions backing the
+    ``/`` and ``/boot`` mounts.
+    """
+    devices = {
+        entry.mount.rstrip("/") or "/": _device_path(
+            loop_dev, entry.device, structure, loop_paths
+        )
+        for entry in filesystem_mount
+    }
+    root = _probe_filesystem(devices["/"])
+    boot = _probe_filesystem(devices["/boot"]) if "/boot" in devices else root
+    return grubcfg.NativeConfig(schema=schema, root=root, boot=boot)
+
+
+def _probe_filesystem(device: str) -> grubcfg.Filesystem:
+    """Read the UUID and type of the filesystem on a device."""
+    try:
+        res = run("blkid", "-o", "export", device)
+    except subprocess.CalledProcessError as err:
+        raise errors.GRUBInstallError(
+            f"Cannot identify filesystem on {device}"
+        ) from err
+    values = dict(line.split("=", 1) for line in res.stdout.splitlines() if "=" in line)
+    if "UUID" not in values:
+        raise errors.GRUBInstallError(f"No filesystem UUID found on {device}")
+    return grubcfg.Filesystem(uuid=values["UUID"], fstype=values.get("TYPE", ""))
 
 
 def _part_num(name: str, structure: StructureList) -> int | None:
@@ -43,15 +43,19 @@ _EBR_OVERHEAD_SECTORS = 2048
 
 def _create_sfdisk_lines(
     partitions: list[dict[str, Any]],
+    label_id: str | None = None,
 ) -> list[str]:
     """Create sfdisk command lines for an MBR partition table.
 
     :param partitions: List of partition attribute dicts.
+    :param label_id: Disk identifier, random if not supplied.
     """
     stdin_lines: list[str] = [
         "label: dos",
         "unit: sectors",
     ]
+    if label_id is not None:
+        stdin_lines.append(f"label-id: {label_id}")
     for entry in partitions:
         fields: list[str] = []
         for key, value in entry.items():
@@ -69,12 +73,15 @@ def _create_mbr_layout(
     imagepath: Path,
     sector_size: int,
     layout: MBRVolume,
+    reproducibility: diskutil.Reproducibility | None = None,
 ) -> None:
     """Write the MBR partition table to an image file.
 
     :param imagepath: Path to image file.
     :param sector_size: Sector size in bytes.
     :param layout: Disk layout to create.
+    :param reproducibility: Inputs to derive the disk identifier from, random if
+        not supplied.
     :raises MBRPartitionError: If the sector size is unsupported or sfdisk fails.
     """
     if sector_size not in SUPPORTED_SECTOR_SIZES:
@@ -140,7 +147,8 @@ def _create_mbr_layout(
             partitions.append(logical_entry)
             logical_start += logical_sectors + _EBR_OVERHEAD_SECTORS
 
-    stdin_lines: str = "\n".join(_create_sfdisk_lines(partitions))
+    label_id = f"0x{reproducibility.uuid('disk').hex[:8]}" if reproducibility else None
+    stdin_lines: str = "\n".join(_create_sfdisk_lines(partitions, label_id))
     emit.trace(f"Stdin for sfdisk:\n{stdin_lines}")
     emit.progress("Partitioning the image")
     emit.debug(f"Running command: {['sfdisk', str(imagepath)]}")
@@ -174,12 +182,14 @@ def create_empty_mbr_image(
     imagepath: Path,
     sector_size: int,
     layout: MBRVolume,
+    reproducibility: diskutil.Reproducibility | None = None,
 ) -> None:
     """Create a zeroed image file with an MBR partition table, but no filesystems or data.
 
     :param imagepath: Path to image file.
     :param sector_size: Sector size in bytes.
     :param layout: Disk layout to create.
+    :param reproducibility: Inputs to derive the disk identifier from.
     """
     image_bytes = get_image_size(sector_size=sector_size, layout=layout)
     disk_size = diskutil.DiskSize(bytesize=image_bytes, sector_size=sector_size)
@@ -187,7 +197,12 @@ def create_empty_mbr_image(
     emit.trace(f"Image size: {image_bytes} bytes")
 
     diskutil.create_zero_image(imagepath=imagepath, disk_size=disk_size)
-    _create_mbr_layout(imagepath=imagepath, sector_size=sector_size, layout=layout)
+    _create_mbr_layout(
+        imagepath=imagepath,
+        sector_size=sector_size,
+        layout=layout,
+        reproducibility=reproducibility,
+    )
 
 
 def verify_partition_tables(imagepath: Path) -> None:
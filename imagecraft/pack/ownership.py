@@ -0,0 +1,134 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Ownership and permissions of the content of partitions in rootless builds.
+
+In a user namespace, files are reported with the owners of the namespace, and
+files owned by IDs the namespace doesn't map are reported as owned by the kernel's
+overflow IDs, usually nobody and nogroup. The ownership of a content directory is
+recorded before its partition is populated, so that such files are caught rather
+than written to the image with the wrong owner, and so that permissions are
+carried to filesystems that can't store them as such.
+"""
+
+import os
+import stat
+from collections.abc import Mapping
+from dataclasses import dataclass
+from pathlib import Path
+
+from craft_cli import CraftError
+
+_OVERFLOW_UID_PATH = Path("/proc/sys/kernel/overflowuid")
+_OVERFLOW_GID_PATH = Path("/proc/sys/kernel/overflowgid")
+_UID_MAP_PATH = Path("/proc/self/uid_map")
+_GID_MAP_PATH = Path("/proc/self/gid_map")
+
+_DEFAULT_OVERFLOW_ID = 65534
+
+# Number of unmapped paths listed in errors.
+_MAX_REPORTED = 20
+
+
+@dataclass(frozen=True)
+class Ownership:
+    """Owner and mode of a file.
+
+    :param uid: owner of the file, as seen in the namespace.
+    :param gid: group of the file, as seen in the namespace.
+    :param mode: file mode, including the file type bits.
+    """
+
+    uid: int
+    gid: int
+    mode: int
+
+    @property
+    def read_only(self) -> bool:
+        """Whether the file is a regular file that nobody may write to."""
+        return stat.S_ISREG(self.mode) and not self.mode & 0o222
+
+
+def record_ownership(content_dir: Path) -> dict[str, Ownership]:
+    """Record the owner and mode of everything in a content directory.
+
+    Symlinks are recorded themselves, not their targets.
+
+    :returns: The ownership of each entry, by absolute path in the partition.
+    :raises CraftError: If an entry is owned by a user or group that isn't mapped
+        in the current user namespace.
+    """
+    ownership: dict[str, Ownership] = {}
+    for dirpath, dirnames, filenames in os.walk(content_dir):
+        directory = Path(dirpath)
+        for name in [*dirnames, *filenames]:
+            path = directory / name
+            st = path.lstat()
+            key = f"/{path.relative_to(content_dir).as_posix()}"
+            ownership[key] = Ownership(st.st_uid, st.st_gid, st.st_mode)
+
+    _check_mapped(ownership, content_dir)
+    return ownership
+
+
+def _read_id(path: Path) -> int:
+    try:
+        return int(path.read_text())
+    except (OSError, ValueError):
+        return _DEFAULT_OVERFLOW_ID
+
+
+def _is_mapped(inner_id: int, map_path: Path) -> bool:
+    """Whether an ID of the current user namespace maps to an ID outside of it."""
+    try:
+        lines = map_path.read_text().splitlines()
+    except OSError:
+        return True
+    for line in lines:
+        start, _, count = (int(field) for field in line.split())
+        if start <= inner_id < start + count:
+            return True
+    return False
+
+
+def _check_mapped(ownership: Mapping[str, Ownership], content_dir: Path) -> None:
+    overflow_uid = _read_id(_OVERFLOW_UID_PATH)
+    overflow_gid = _read_id(_OVERFLOW_GID_PATH)
+    # Files owned by the overflow IDs are legitimate if the IDs are mapped.
+    unmapped_uid = not _is_mapped(overflow_uid, _UID_MAP_PATH)
+    unmapped_gid = not _is_mapped(overflow_gid, _GID_MAP_PATH)
+    if not unmapped_uid and not unmapped_gid:
+        return
+
+    unmapped = sorted(
+        path
+        for path, owner in ownership.items()
+        if (unmapped_uid and owner.uid == overflow_uid)
+        or (unmapped_gid and owner.gid == overflow_gid)
+    )
+    if unmapped:
+        raise CraftError(
+            f"Files in {str(content_dir)!r} are owned by IDs outside of the user "
+            "namespace.",
+            details="\n".join(unmapped[:_MAX_REPORTED]),
+            resolution="Add subordinate IDs for the build user to /etc/subuid and "
+            "/etc/subgid, and clean the project.",
+        )
+
+
+def get_read_only_files(ownership: Mapping[str, Ownership]) -> list[str]:
+    """Get the regular files that nobody may write to, sorted by path."""
+    return sorted(path for path, owner in ownership.items() if owner.read_only)
@@ -14,19 +14,25 @@
 # You should have received a copy of the GNU General Public License along
 # with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from craft_parts.plugins import register
-from craft_parts.plugins.plugins import PluginType
+from typing import TYPE_CHECKING
 
-from .mmdebstrap_plugin import MmdebstrapPlugin
-from .snap_preseed_plugin import SnapPreseedPlugin
-from .uc_prepare_plugin import UcPreparePlugin
+if TYPE_CHECKING:
+    from craft_parts.plugins.plugins import PluginType
 
 
-def get_app_plugins() -> dict[str, PluginType]:
+def get_app_plugins() -> dict[str, "PluginType"]:
     """Get Imagecraft-specific craft-parts plugins.
 
+    Plugin modules are imported here rather than at module level so that they are
+    only loaded when a command actually needs them.
+
     :returns: A dict mapping plugin names to plugins
     """
+    # pylint: disable=import-outside-toplevel
+    from .mmdebstrap_plugin import MmdebstrapPlugin  # noqa: PLC0415
+    from .snap_preseed_plugin import SnapPreseedPlugin  # noqa: PLC0415
+    from .uc_prepare_plugin import UcPreparePlugin  # noqa: PLC0415
+
     return {
         "mmdebstrap": MmdebstrapPlugin,
         "snap-preseed": SnapPreseedPlugin,
@@ -36,4 +42,6 @@ def get_app_plugins() -> dict[str, PluginType]:
 
 def setup_plugins() -> None:
     """Register plugins specific to imagecraft."""
+    from craft_parts.plugins import register  # noqa: PLC0415
+
     register(get_app_plugins())
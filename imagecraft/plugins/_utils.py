@@ -16,12 +16,91 @@
 
 """Shared plugin utilities."""
 
+import shlex
+from pathlib import Path
+
 from craft_application.models.constraints import PROJECT_NAME_COMPILED_REGEX
 
 VALID_RISKS = ["stable", "candidate", "beta", "edge"]
 MAX_LEN = 40
 MAX_CHANNEL_PARTS = 3
 
+# Shell function that fetches a snap into the snap cache and links it into a
+# part. Downloaded snaps are stored as <snap-id>_<revision>.{snap,assert}, and a
+# ref file records which revision a snap name, channel and architecture resolved
+# to, so the snap is still available when the store can't be reached. A snap
+# pinned in a revisions manifest is fetched at that revision instead. Every snap
+# is checked against the sha3-384 digest in its snap-revision assertion before it
+# is used.
+_FETCH_SNAP_FUNCTION = """\
+fetch_snap() {
+  local cache=$1 arch=$2 name=$3 channel=$4 dest=$5 revisions=${6:-} ref tmp key expected actual rev=
+  local -a source
+  if [ -n "$revisions" ]; then
+    rev=$(awk -v snap="$name" '$1 == snap { print $2; exit }' "$revisions")
+  fi
+  if [ -n "$rev" ]; then
+    source=(--revision="$rev")
+    ref="$cache/refs/${name}_r${rev}_$arch"
+  else
+    source=(--channel="$channel")
+    ref="$cache/refs/${name}_${channel//\\//_}_$arch"
+  fi
+  tmp=$(mktemp -d "$cache/.download.XXXXXX")
+  if UBUNTU_STORE_ARCH="$arch" snap download "$name" "${source[@]}" \\
+      --target-directory="$tmp" --basename=snap; then
+    key="$(sed -n 's/^snap-id: //p' "$tmp/snap.assert" | head -n1)_$(sed -n 's/^snap-revision: //p' "$tmp/snap.assert" | head -n1)"
+    mv "$tmp/snap.assert" "$cache/$key.assert"
+    mv "$tmp/snap.snap" "$cache/$key.snap"
+    echo "$key" > "$ref.$$" && mv "$ref.$$" "$ref"
+  elif [ -f "$ref" ]; then
+    echo "Using cached $name from ${rev:+revision }${rev:-$channel}" >&2
+    key=$(cat "$ref")
+  else
+    rm -rf "$tmp"
+    echo "Cannot download $name and no cached copy is available" >&2
+    return 1
+  fi
+  rm -rf "$tmp"
+  expected=$(sed -n 's/^snap-sha3-384: //p' "$cache/$key.assert" | head -n1)
+  actual=$(openssl dgst -sha3-384 -binary "$cache/$key.snap" | base64 -w0 | tr '+/' '-_' | tr -d '=')
+  if [ "$expected" != "$actual" ]; then
+    echo "Cached snap $cache/$key.snap does not match its assertion" >&2
+    rm -f "$cache/$key.snap"
+    return 1
+  fi
+  ln -f "$cache/$key.snap" "$dest.snap" 2>/dev/null || cp "$cache/$key.snap" "$dest.snap"
+  cp "$cache/$key.assert" "$dest.assert"
+}"""
+
+# Shell function that lists the snaps of the ``snaps`` header of a model
+# assertion, as ``name channel`` lines. Like ``snap prepare-image``, a channel
+# given for the whole image replaces the default channel of the model, keeping
+# its track when only a risk is given.
+_MODEL_SNAPS_FUNCTION = """\
+model_snaps() {
+  awk -v channel="$2" '
+    function flush() {
+      if (name == "") return
+      if (channel == "") resolved = default_channel
+      else if (channel ~ /\\//) resolved = channel
+      else if (split(default_channel, parts, "/") > 1) resolved = parts[1] "/" channel
+      else resolved = channel
+      print name, (resolved == "" ? "stable" : resolved)
+      name = ""; default_channel = ""
+    }
+    /^snaps:/ { in_snaps = 1; next }
+    in_snaps && /^[^ ]/ { flush(); in_snaps = 0 }
+    in_snaps && /^  -/ { flush() }
+    in_snaps && /^    name: / { name = $2 }
+    in_snaps && /^    default-channel: / { default_channel = $2 }
+    END { flush() }
+  ' "$1"
+}"""
+
+# Arguments of the prefetched snaps of the model, only known once it is parsed.
+MODEL_SNAP_ARGS = '"${model_snap_args[@]}"'
+
 
 def validate_snap_refs(snaps: list[str]) -> list[str]:
     """Validate a list of snap references."""
@@ -60,3 +139,87 @@ def resolve_snap(snap: str) -> str:
         name, channel = snap.split("@", 1)
         snap = f"{name.strip()}={channel.strip()}"
     return snap
+
+
+def get_snap_prefetch_commands(
+    snaps: list[str],
+    *,
+    cache_dir: str,
+    target_dir: Path,
+    arch: str,
+    channel: str | None,
+    model: str | None = None,
+    revisions: str | None = None,
+) -> tuple[list[str], list[str]]:
+    """Get the commands that download snaps concurrently through a snap cache.
+
+    Snap references are fetched in parallel into ``cache_dir`` and linked into
+    ``target_dir``, as are the snaps listed by the ``snaps`` header of the model
+    assertion that aren't in the snap list. Snaps pinned in the ``revisions``
+    manifest are fetched at their revision. Local ``.snap`` paths are left as
+    they are.
+
+    :returns: The commands to run before ``snap prepare-image``, and the
+        ``--snap`` and ``--assert`` arguments that refer to the fetched files.
+        With a model, they end with :data:`MODEL_SNAP_ARGS`, which
+        :func:`join_command` leaves for the shell to expand.
+    """
+    quoted_cache = shlex.quote(cache_dir)
+    commands = [
+        _FETCH_SNAP_FUNCTION,
+        f"rm -rf {target_dir}",
+        f"mkdir -p {quoted_cache}/refs {target_dir}",
+        "fetch_pids=()",
+    ]
+    # The manifest is passed last, so fetch_snap resolves pinned revisions.
+    pinned = f" {shlex.quote(revisions)}" if revisions else ""
+    args: list[str] = []
+    names: set[str] = set()
+
+    for snap in snaps:
+        if snap.endswith(".snap"):
+            # Local snaps are named like name_version_arch.snap.
+            names.add(Path(snap).stem.partition("_")[0])
+            args.append(f"--snap={snap}")
+            continue
+
+        name, _, snap_channel = snap.partition("@")
+        name = name.strip()
+        names.add(name)
+        dest = target_dir / name
+        fetch_args = [
+            cache_dir,
+            arch,
+            name,
+            snap_channel.strip() or channel or "stable",
+        ]
+        commands.append(
+            f"fetch_snap {shlex.join(fetch_args)} {dest}{pinned} & fetch_pids+=($!)"
+        )
+        args.extend([f"--snap={dest}.snap", f"--assert={dest}.assert"])
+
+    if model:
+        quoted_model = shlex.quote(model)
+        dest = f'{target_dir}/"$name"'
+        commands.extend(
+            [
+                _MODEL_SNAPS_FUNCTION,
+                "model_snap_args=()",
+                f"if [ -f {quoted_model} ]; then",
+                "  while read -r name snap_channel; do",
+                f'    case " {" ".join(sorted(names))} " in *" $name "*) continue ;; esac',
+                f'    fetch_snap {quoted_cache} {shlex.quote(arch)} "$name" "$snap_channel" {dest}{pinned} & fetch_pids+=($!)',
+                f"    model_snap_args+=(--snap={dest}.snap --assert={dest}.assert)",
+                f"  done < <(model_snaps {quoted_model} {shlex.quote(channel or '')})",
+                "fi",
+            ]
+        )
+        args.append(MODEL_SNAP_ARGS)
+
+    commands.append('for pid in "${fetch_pids[@]}"; do wait "$pid"; done')
+    return commands, args
+
+
+def join_command(cmd: list[str]) -> str:
+    """Join a command line, leaving :data:`MODEL_SNAP_ARGS` for the shell to expand."""
+    return " ".join(arg if arg == MODEL_SNAP_ARGS else shlex.quote(arg) for arg in cmd)
@@ -16,13 +16,50 @@
 
 """The mmdebstrap plugin."""
 
+import hashlib
+import json
+import shlex
+import urllib.parse
 from typing import Literal, cast
 
 import distro
 from craft_parts.plugins import Plugin
 from craft_parts.plugins.properties import PluginProperties
+from pydantic import ByteSize, ValidationInfo, field_validator
 from typing_extensions import override
 
+from imagecraft.pack.diskutil import CONTENT_TARBALL_MARKER, CONTENT_TARBALL_NAME
+
+# URI schemes accepted by apt that make sense for a bootstrap mirror.
+_MIRROR_SCHEMES = {"http", "https", "file", "copy"}
+
+# Where apt keeps downloaded packages inside the bootstrapped tree.
+_APT_ARCHIVES_DIR = "/var/cache/apt/archives"
+
+# Where mmdebstrap writes the options passed with --dpkgopt inside the tree.
+_DPKG_CONFIG_FILE = "/etc/dpkg/dpkg.cfg.d/99mmdebstrap"
+
+# mmdebstrap's hook directory that runs dpkg and apt under eatmydata.
+_EATMYDATA_HOOK_DIR = "/usr/share/mmdebstrap/hooks/eatmydata"
+
+# Bump when the snapshot content for the same inputs changes.
+_SNAPSHOT_FORMAT_VERSION = 2
+
+# Snapshots keep file capabilities, such as those of ping, and ACLs, so that a
+# restored tree matches a fresh bootstrap.
+_SNAPSHOT_TAR_OPTIONS = "--zstd --numeric-owner --xattrs --xattrs-include='*' --acls"
+
+# Documentation and locales left out of the tree in fast I/O mode. Copyright
+# files are kept for license compliance.
+_DPKG_PATH_FILTERS = [
+    "path-exclude=/usr/share/doc/*",
+    "path-include=/usr/share/doc/*/copyright",
+    "path-exclude=/usr/share/man/*",
+    "path-exclude=/usr/share/info/*",
+    "path-exclude=/usr/share/locale/*",
+    "path-include=/usr/share/locale/locale.alias",
+]
+
 
 class MmdebstrapPluginProperties(PluginProperties, frozen=True):
     """Properties for the mmdebstrap plugin."""
@@ -43,6 +80,34 @@ class MmdebstrapPluginProperties(PluginProperties, frozen=True):
         "standard",
     ] = "apt"
     mmdebstrap_packages: list[str] = []
+    mmdebstrap_cache_dir: str | None = None
+    mmdebstrap_mirrors: list[str] = []
+    mmdebstrap_format: Literal["dir", "tar"] = "dir"
+    mmdebstrap_fast_io: bool = False
+    mmdebstrap_snapshot_dir: str | None = None
+    mmdebstrap_snapshot_max_size: ByteSize = ByteSize(10 << 30)
+
+    @field_validator("mmdebstrap_cache_dir", "mmdebstrap_snapshot_dir")
+    @classmethod
+    def _validate_absolute_dir(
+        cls, directory: str | None, info: ValidationInfo
+    ) -> str | None:
+        if directory is not None and not directory.startswith("/"):
+            key = info.field_name.replace("_", "-") if info.field_name else "directory"
+            raise ValueError(f"{key} must be an absolute path")
+        return directory
+
+    @field_validator("mmdebstrap_mirrors")
+    @classmethod
+    def _validate_mirrors(cls, mirrors: list[str]) -> list[str]:
+        for mirror in mirrors:
+            scheme = urllib.parse.urlparse(mirror).scheme
+            if scheme not in _MIRROR_SCHEMES:
+                raise ValueError(
+                    f"Invalid mirror {mirror!r}: the URI scheme must be one of "
+                    f"{', '.join(sorted(_MIRROR_SCHEMES))}"
+                )
+        return mirrors
 
 
 class MmdebstrapPlugin(Plugin):
@@ -61,6 +126,37 @@ class MmdebstrapPlugin(Plugin):
     - mmdebstrap-packages
       (list of strings)
       Additional packages to include in the bootstrap.
+
+    - mmdebstrap-cache-dir
+      (string)
+      Absolute path to a directory where downloaded packages are kept and
+      reused across builds.
+
+    - mmdebstrap-mirrors
+      (list of strings)
+      Mirrors to bootstrap from instead of the default Ubuntu archive. Supports
+      http://, https://, file:// and copy:// URIs.
+
+    - mmdebstrap-format
+      (string)
+      Either 'dir' (default) to produce a directory tree, or 'tar' to produce a
+      single rootfs.tar that populates an ext partition directly at pack time.
+      No other part may add content to that partition.
+
+    - mmdebstrap-fast-io
+      (boolean)
+      Skip per-file fsync calls in dpkg and apt and leave documentation and
+      locales out of the tree. Default is false.
+
+    - mmdebstrap-snapshot-dir
+      (string)
+      Absolute path to a directory where completed bootstrap trees are stored
+      and reused when the inputs and the mirrors' InRelease files are unchanged.
+
+    - mmdebstrap-snapshot-max-size
+      (string)
+      Size cap of the snapshot directory. The least recently used snapshots are
+      evicted above it. Default is 10GiB.
     """
 
     properties_class = MmdebstrapPluginProperties
@@ -73,7 +169,13 @@ class MmdebstrapPlugin(Plugin):
     @override
     def get_build_packages(self) -> set[str]:
         """Return a set of required packages to install in the build environment."""
-        return {"mmdebstrap"}
+        options = cast(MmdebstrapPluginProperties, self._options)
+        packages = {"mmdebstrap"}
+        if options.mmdebstrap_fast_io:
+            packages.add("eatmydata")
+        if options.mmdebstrap_snapshot_dir:
+            packages.update({"curl", "zstd"})
+        return packages
 
     @override
     def get_build_environment(self) -> dict[str, str]:
@@ -90,15 +192,168 @@ class MmdebstrapPlugin(Plugin):
             f"--arch={self._part_info.target_arch}",
             "--mode=root",
             f"--variant={options.mmdebstrap_variant}",
-            "--format=dir",
+            f"--format={options.mmdebstrap_format}",
         ]
 
         if options.mmdebstrap_packages:
             cmd.append(f"--include={','.join(options.mmdebstrap_packages)}")
 
+        if options.mmdebstrap_cache_dir:
+            cmd.extend(self._get_cache_options(options.mmdebstrap_cache_dir))
+
+        if options.mmdebstrap_fast_io:
+            cmd.extend(self._get_fast_io_options())
+
+        if options.mmdebstrap_format == "tar":
+            # The tarball can't be cleaned up afterwards, so leave device nodes and
+            # default sources out of it in the first place.
+            cmd.extend(
+                [
+                    "--skip=output/dev",
+                    shlex.quote(
+                        "--customize-hook="
+                        'rm -rf "$1"/etc/apt/sources.list.d/* "$1"/etc/apt/sources.list'
+                    ),
+                ]
+            )
+
         suite = options.mmdebstrap_suite or self._get_build_base_suite()
-        cmd.append(f'{suite} "$CRAFT_PART_INSTALL" {self._get_default_mirror()}')
-        return [" ".join(cmd), *self._get_cleanup_commands()]
+        mirrors = options.mmdebstrap_mirrors or [self._get_default_mirror()]
+        quoted_mirrors = " ".join(shlex.quote(mirror) for mirror in mirrors)
+        if options.mmdebstrap_format == "tar":
+            cmd.append(
+                f'{suite} "$CRAFT_PART_INSTALL"/{CONTENT_TARBALL_NAME} {quoted_mirrors}'
+            )
+            bootstrap_commands = [
+                " ".join(cmd),
+                f'touch "$CRAFT_PART_INSTALL"/{CONTENT_TARBALL_MARKER}',
+            ]
+        else:
+            cmd.append(f'{suite} "$CRAFT_PART_INSTALL" {quoted_mirrors}')
+            bootstrap_commands = [" ".join(cmd), *self._get_cleanup_commands()]
+
+        if options.mmdebstrap_snapshot_dir:
+            bootstrap_commands = self._get_snapshot_commands(
+                bootstrap_commands, suite=suite, mirrors=mirrors
+            )
+
+        return [*bootstrap_commands, self._get_sync_command()]
+
+    @staticmethod
+    def _get_cache_options(cache_dir: str) -> list[str]:
+        """Get the options to share downloaded packages through a host directory.
+
+        Packages in the cache are copied into apt's archive before the download
+        phase. apt verifies each one against the hashes in the archive index and
+        only downloads packages that are missing or don't match. Once the tree is
+        customized, the archive is synced back into the cache and emptied, so the
+        packages don't end up in the image.
+        """
+        quoted_dir = shlex.quote(cache_dir)
+        hooks = [
+            ("setup", f'mkdir -p {quoted_dir} "$1"{_APT_ARCHIVES_DIR}/'),
+            ("setup", f"sync-in {quoted_dir} {_APT_ARCHIVES_DIR}/"),
+            ("customize", f"sync-out {_APT_ARCHIVES_DIR} {quoted_dir}"),
+            ("customize", f'rm -f "$1"{_APT_ARCHIVES_DIR}/*.deb'),
+        ]
+        return [
+            # Keep downloaded packages in the archive until they are synced out.
+            "--skip=download/empty",
+            "--skip=essential/unlink",
+            *(shlex.quote(f"--{kind}-hook={hook}") for kind, hook in hooks),
+        ]
+
+    @staticmethod
+    def _get_fast_io_options() -> list[str]:
+        """Get the options that trade durability for speed during the bootstrap.
+
+        The tree is packed into an image afterwards, so per-file durability buys
+        nothing. dpkg skips its fsync calls with force-unsafe-io and the eatmydata
+        hook turns the remaining ones from dpkg and apt into no-ops. The unsafe
+        option is dropped from the tree's dpkg configuration once the tree is
+        customized, while the path filters stay in place for later installs.
+        """
+        drop_unsafe_io = (
+            f'[ ! -e "$1"{_DPKG_CONFIG_FILE} ] || '
+            f'sed -i /^force-unsafe-io$/d "$1"{_DPKG_CONFIG_FILE}'
+        )
+        return [
+            f"--hook-dir={_EATMYDATA_HOOK_DIR}",
+            "--dpkgopt=force-unsafe-io",
+            *(
+                shlex.quote(f"--dpkgopt={path_filter}")
+                for path_filter in _DPKG_PATH_FILTERS
+            ),
+            shlex.quote(f"--customize-hook={drop_unsafe_io}"),
+        ]
+
+    def _get_snapshot_commands(
+        self, bootstrap_commands: list[str], *, suite: str, mirrors: list[str]
+    ) -> list[str]:
+        """Wrap the bootstrap so that it is skipped when a snapshot is available.
+
+        Snapshots are compressed tarballs of the completed install directory. They
+        are keyed by every input that affects the tree and by the digest of each
+        mirror's InRelease file, so a change in the archive triggers a fresh
+        bootstrap. If an InRelease file can't be fetched, the bootstrap runs
+        without a snapshot. Snapshot mtimes track their last use, and the least
+        recently used ones are evicted once the directory exceeds the size cap.
+        """
+        options = cast(MmdebstrapPluginProperties, self._options)
+        snapshot_dir = shlex.quote(cast(str, options.mmdebstrap_snapshot_dir))
+        inputs = {
+            "version": _SNAPSHOT_FORMAT_VERSION,
+            "suite": suite,
+            "variant": options.mmdebstrap_variant,
+            "packages": sorted(options.mmdebstrap_packages),
+            "arch": self._part_info.target_arch,
+            "mirrors": mirrors,
+            "format": options.mmdebstrap_format,
+            "fast-io": options.mmdebstrap_fast_io,
+        }
+        inputs_key = hashlib.sha256(
+            json.dumps(inputs, sort_keys=True).encode()
+        ).hexdigest()[:32]
+        release_urls = " ".join(
+            shlex.quote(
+                f"{mirror.replace('copy://', 'file://', 1)}/dists/{suite}/InRelease"
+            )
+            for mirror in mirrors
+        )
+
+        fetch_releases = f'for url in {release_urls}; do curl -fsSL "$url"; done'
+        evict_old = (
+            f'if [ "$total" -gt {options.mmdebstrap_snapshot_max_size} ] '
+            '&& [ "$old" != "$snapshot" ]; then rm -f "$old"; fi'
+        )
+
+        return [
+            "snapshot=",
+            f"if release=$({fetch_releases} | sha256sum | cut -c1-32); then",
+            f'  snapshot={snapshot_dir}/{inputs_key}-"$release".tar.zst',
+            "fi",
+            'if [ -n "$snapshot" ] && [ -f "$snapshot" ]; then',
+            '  touch "$snapshot"',
+            f'  tar {_SNAPSHOT_TAR_OPTIONS} -xpf "$snapshot" -C "$CRAFT_PART_INSTALL"',
+            "else",
+            *(f"  {command}" for command in bootstrap_commands),
+            '  if [ -n "$snapshot" ]; then',
+            f"    mkdir -p {snapshot_dir}",
+            f'    tar {_SNAPSHOT_TAR_OPTIONS} -cpf "$snapshot.$$" -C "$CRAFT_PART_INSTALL" .',
+            '    mv "$snapshot.$$" "$snapshot"',
+            "    total=0",
+            f"    for old in $(ls -1t {snapshot_dir}/*.tar.zst); do",
+            '      total=$((total + $(stat -c %s "$old")))',
+            f"      {evict_old}",
+            "    done",
+            "  fi",
+            "fi",
+        ]
+
+    @staticmethod
+    def _get_sync_command() -> str:
+        # flush the whole filesystem once instead of fsyncing every file
+        return 'sync -f "$CRAFT_PART_INSTALL"'
 
     def _get_cleanup_commands(self) -> list[str]:
         # unmount any leftover mounts
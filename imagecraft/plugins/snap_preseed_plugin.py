@@ -16,14 +16,18 @@
 
 """The snap-preseed plugin."""
 
-import shlex
 from typing import Literal, cast
 
 from craft_parts.plugins import Plugin, PluginProperties
 from pydantic import field_validator, model_validator
 from typing_extensions import Self, override
 
-from ._utils import resolve_snap, validate_snap_refs
+from ._utils import (
+    get_snap_prefetch_commands,
+    join_command,
+    resolve_snap,
+    validate_snap_refs,
+)
 
 
 class SnapPreseedPluginProperties(PluginProperties, frozen=True):
@@ -38,6 +42,7 @@ class SnapPreseedPluginProperties(PluginProperties, frozen=True):
     snap_preseed_assertions: list[str] = []
     snap_preseed_revisions: str | None = None
     snap_preseed_write_revisions: str | bool = False
+    snap_preseed_snap_cache_dir: str | None = None
 
     @model_validator(mode="after")
     def _snaps_or_model_assert(self) -> Self:
@@ -48,6 +53,13 @@ class SnapPreseedPluginProperties(PluginProperties, frozen=True):
             )
         return self
 
+    @field_validator("snap_preseed_snap_cache_dir")
+    @classmethod
+    def _validate_snap_cache_dir(cls, cache_dir: str | None) -> str | None:
+        if cache_dir is not None and not cache_dir.startswith("/"):
+            raise ValueError("snap-preseed-snap-cache-dir must be an absolute path")
+        return cache_dir
+
     @field_validator("snap_preseed_snaps")
     @classmethod
     def _validate_snap_refs(cls, snaps: list[str]) -> list[str]:
@@ -67,6 +79,9 @@ class SnapPreseedPlugin(Plugin):
     @override
     def get_build_packages(self) -> set[str]:
         """Return a set of required packages to install in the build environment."""
+        options = cast(SnapPreseedPluginProperties, self._options)
+        if options.snap_preseed_snap_cache_dir:
+            return {"openssl"}
         return set()
 
     @override
@@ -106,10 +121,23 @@ class SnapPreseedPlugin(Plugin):
             f"--assert={assertion}" for assertion in options.snap_preseed_assertions
         )
 
-        cmd.extend(
-            f"--snap={resolve_snap(snap)}" for snap in options.snap_preseed_snaps
-        )
+        prefetch_commands: list[str] = []
+        if options.snap_preseed_snap_cache_dir:
+            prefetch_commands, snap_args = get_snap_prefetch_commands(
+                options.snap_preseed_snaps,
+                cache_dir=options.snap_preseed_snap_cache_dir,
+                target_dir=self._part_info.part_build_dir / "snaps",
+                arch=self._part_info.target_arch,
+                channel=options.snap_preseed_channel,
+                model=options.snap_preseed_model_assert,
+                revisions=options.snap_preseed_revisions,
+            )
+            cmd.extend(snap_args)
+        else:
+            cmd.extend(
+                f"--snap={resolve_snap(snap)}" for snap in options.snap_preseed_snaps
+            )
 
         cmd.append(options.snap_preseed_model_assert)
         cmd.append(str(self._part_info.part_install_dir))
-        return [shlex.join(cmd)]
+        return [*prefetch_commands, join_command(cmd)]
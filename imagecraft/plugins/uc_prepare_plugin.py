@@ -17,13 +17,19 @@
 """The uc-prepare plugin."""
 
 import shlex
+from pathlib import Path
 from typing import Literal, cast
 
 from craft_parts.plugins import Plugin, PluginProperties
-from pydantic import field_validator, model_validator
+from pydantic import ValidationInfo, field_validator, model_validator
 from typing_extensions import Self, override
 
-from ._utils import resolve_snap, validate_snap_refs
+from ._utils import (
+    get_snap_prefetch_commands,
+    join_command,
+    resolve_snap,
+    validate_snap_refs,
+)
 
 
 class UcPreparePluginProperties(PluginProperties, frozen=True):
@@ -38,6 +44,8 @@ class UcPreparePluginProperties(PluginProperties, frozen=True):
     uc_prepare_assertions: list[str] = []
     uc_prepare_revisions: str | None = None
     uc_prepare_write_revisions: str | bool = False
+    uc_prepare_snap_cache_dir: str | None = None
+    uc_prepare_seed_cache_dir: str | None = None
     uc_prepare_preseed: bool = False
     uc_prepare_preseed_sign_key: str | None = None
     uc_prepare_apparmor_features_dir: str | None = None
@@ -61,6 +69,16 @@ class UcPreparePluginProperties(PluginProperties, frozen=True):
             )
         return self
 
+    @field_validator("uc_prepare_snap_cache_dir", "uc_prepare_seed_cache_dir")
+    @classmethod
+    def _validate_cache_dir(
+        cls, cache_dir: str | None, info: ValidationInfo
+    ) -> str | None:
+        if cache_dir is not None and not cache_dir.startswith("/"):
+            key = info.field_name.replace("_", "-") if info.field_name else "cache-dir"
+            raise ValueError(f"{key} must be an absolute path")
+        return cache_dir
+
     @field_validator("uc_prepare_snaps")
     @classmethod
     def _validate_snap_refs(cls, snaps: list[str]) -> list[str]:
@@ -81,12 +99,15 @@ class UcPreparePlugin(Plugin):
     def get_build_packages(self) -> set[str]:
         """Return a set of required packages to install in the build environment."""
         options = cast(UcPreparePluginProperties, self._options)
+        packages: set[str] = set()
         if (
             options.uc_prepare_preseed
             and self._part_info.host_arch != self._part_info.target_arch
         ):
-            return {"qemu-user-static"}
-        return set()
+            packages.add("qemu-user-static")
+        if options.uc_prepare_snap_cache_dir:
+            packages.add("openssl")
+        return packages
 
     @override
     def get_build_environment(self) -> dict[str, str]:
@@ -120,6 +141,7 @@ class UcPreparePlugin(Plugin):
         if options.uc_prepare_revisions:
             cmd.append(f"--revisions={options.uc_prepare_revisions}")
 
+        revisions_path: Path | None = None
         if options.uc_prepare_write_revisions:
             revisions_path = self._part_info.part_install_dir / (
                 "seed.manifest"
@@ -134,15 +156,154 @@ class UcPreparePlugin(Plugin):
             f"--assert={assertion}" for assertion in options.uc_prepare_assertions
         )
 
-        cmd.extend(f"--snap={resolve_snap(snap)}" for snap in options.uc_prepare_snaps)
+        prefetch_commands: list[str] = []
+        if options.uc_prepare_snap_cache_dir:
+            prefetch_commands, snap_args = get_snap_prefetch_commands(
+                options.uc_prepare_snaps,
+                cache_dir=options.uc_prepare_snap_cache_dir,
+                target_dir=self._part_info.part_build_dir / "snaps",
+                arch=self._part_info.target_arch,
+                channel=options.uc_prepare_channel,
+                model=options.uc_prepare_model_assert,
+                revisions=options.uc_prepare_revisions,
+            )
+            cmd.extend(snap_args)
+        else:
+            cmd.extend(
+                f"--snap={resolve_snap(snap)}" for snap in options.uc_prepare_snaps
+            )
 
         prepare_dir = self._part_info.part_build_dir / "prepare-image"
         cmd.append(options.uc_prepare_model_assert)
         cmd.append(str(prepare_dir))
 
+        if options.uc_prepare_seed_cache_dir:
+            return [
+                *prefetch_commands,
+                *self._get_seed_reuse_commands(
+                    cmd,
+                    cache_dir=Path(options.uc_prepare_seed_cache_dir),
+                    prepare_dir=prepare_dir,
+                    revisions_path=revisions_path,
+                ),
+            ]
+
         return [
+            *prefetch_commands,
             # snap prepare-image command will fail if prepare_dir is non-empty
             f"rm -rf {prepare_dir} {self._part_info.part_install_dir}/system-seed",
-            shlex.join(cmd),
+            join_command(cmd),
             f"mv {prepare_dir}/system-seed {self._part_info.part_install_dir}/",
         ]
+
+    def _get_seed_reuse_commands(
+        self,
+        cmd: list[str],
+        *,
+        cache_dir: Path,
+        prepare_dir: Path,
+        revisions_path: Path | None,
+    ) -> list[str]:
+        """Wrap 'snap prepare-image' so that an unchanged seed is reused.
+
+        The seed of the last build is kept in a per-part cache directory with a
+        digest of its inputs: the prepare-image command line, the model assertion,
+        the extra assertions, the local snaps and the resolved revision of every
+        snap of the seed. When the digest matches, prepare-image is skipped and the
+        cached seed is copied, reflinked where the filesystem supports it.
+
+        Revisions are resolved without the store, from the assertions of
+        prefetched snaps, then from the revisions manifest. If a snap of the model
+        or of the snap list can't be resolved, the seed is neither reused nor kept.
+        """
+        options = cast(UcPreparePluginProperties, self._options)
+        install_dir = self._part_info.part_install_dir
+        seed_cache = cache_dir / self._part_info.part_name
+        input_files = [
+            options.uc_prepare_model_assert,
+            *options.uc_prepare_assertions,
+            *(snap for snap in options.uc_prepare_snaps if snap.endswith(".snap")),
+        ]
+        hashed_inputs = [
+            f"echo {shlex.quote(shlex.join(cmd))}",
+            f"cat {shlex.join(input_files)}",
+            'printf "%s" "$seed_revisions"',
+        ]
+
+        restore_revisions = save_revisions = ":"
+        if revisions_path is not None:
+            restore_revisions = f"cp {seed_cache}/seed.manifest {revisions_path}"
+            save_revisions = f"cp {revisions_path} {seed_cache}/seed.manifest"
+
+        return [
+            *self._get_seed_revisions_commands(),
+            'seed_inputs=""',
+            'if [ -n "$seed_revisions" ]; then',
+            f"  seed_inputs=$({{ {'; '.join(hashed_inputs)}; }} | sha256sum | cut -d' ' -f1)",
+            "fi",
+            f"rm -rf {install_dir}/system-seed",
+            f'if [ -n "$seed_inputs" ] && [ "$(cat {seed_cache}/inputs 2>/dev/null)" = "$seed_inputs" ]; then',
+            f"  cp -a --reflink=auto {seed_cache}/system-seed {install_dir}/",
+            f"  {restore_revisions}",
+            "else",
+            # snap prepare-image command will fail if prepare_dir is non-empty
+            f"  rm -rf {prepare_dir} {seed_cache}",
+            f"  {join_command(cmd)}",
+            '  if [ -n "$seed_inputs" ]; then',
+            f"    mkdir -p {seed_cache}",
+            f"    cp -a --reflink=auto {prepare_dir}/system-seed {seed_cache}/",
+            f"    {save_revisions}",
+            f'    echo "$seed_inputs" > {seed_cache}/inputs',
+            "  fi",
+            f"  mv {prepare_dir}/system-seed {install_dir}/",
+            "fi",
+        ]
+
+    def _get_seed_revisions_commands(self) -> list[str]:
+        """Get the commands that resolve the revision of every snap of the seed.
+
+        The snaps of the seed are those of the snap list and those the model
+        assertion lists under its ``snaps`` header. Models without that header
+        imply snaps that can't be listed, so their revisions are never resolved.
+
+        :returns: Commands that set ``seed_revisions`` to the sorted ``name
+            revision`` lines of the snaps, or to nothing if any can't be resolved.
+        """
+        options = cast(UcPreparePluginProperties, self._options)
+        model = shlex.quote(options.uc_prepare_model_assert)
+        names = sorted(
+            {
+                snap.partition("@")[0].strip()
+                for snap in options.uc_prepare_snaps
+                if not snap.endswith(".snap")
+            }
+        )
+        sources: list[str] = []
+        if options.uc_prepare_snap_cache_dir:
+            snaps_dir = self._part_info.part_build_dir / "snaps"
+            sources.append(
+                f'if [ -f {snaps_dir}/"$snap".assert ]; then '
+                f"rev=$(sed -n 's/^snap-revision: //p' {snaps_dir}/\"$snap\".assert | head -n1)"
+            )
+        if options.uc_prepare_revisions:
+            revisions = shlex.quote(options.uc_prepare_revisions)
+            sources.append(
+                f'{"elif" if sources else "if"} grep -q "^$snap " {revisions}; then '
+                f"rev=$(awk -v snap=\"$snap\" '$1 == snap {{ print $2; exit }}' {revisions})"
+            )
+        if not sources:
+            return [
+                'seed_revisions=""',
+                'echo "Snap revisions are not pinned, the seed is not reused" >&2',
+            ]
+
+        return [
+            "seed_revisions=$(",
+            f"  if ! grep -q '^snaps:' {model}; then exit 1; fi",
+            f"  for snap in $({{ printf '%s\\n' {shlex.join(names)}; sed -n 's/^    name: //p' {model}; }} | sort -u); do",
+            f"    rev=; {'; '.join(sources)}; fi",
+            '    if [ -z "$rev" ]; then echo "Revision of $snap is not pinned, the seed is not reused" >&2; exit 1; fi',
+            '    echo "$snap $rev"',
+            "  done",
+            ') || seed_revisions=""',
+        ]
@@ -16,25 +16,28 @@
 
 import atexit
 import contextlib
+import functools
 import json
 import pathlib
 import shutil
 import subprocess
 import time
 from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, cast
 
 from craft_application import AppMetadata, AppService, ServiceFactory
 from craft_cli import CraftError, emit
 
-from imagecraft.models import Project
+from imagecraft.inspection import DiskImage
+from imagecraft.models import Project, Volume
 from imagecraft.models.volume import (
     GPTVolume,
     HybridVolume,
     MBRVolume,
     PartitionSchema,
 )
-from imagecraft.pack import gptutil, mbrutil
+from imagecraft.pack import checkpoint, diskutil, gptutil, mbrutil
 from imagecraft.subprocesses import run
 
 _LOSETUP_BIN = "losetup"
@@ -54,6 +57,7 @@ class ImageService(AppService):
         self._project_dir = project_dir
         self._sector_size = gptutil.SECTOR_SIZE_512
         self._images: dict[str, pathlib.Path] | None = None
+        self._journals: dict[str, checkpoint.Journal] = {}
         self._loop_devices: dict[str, str] = {}
         self._atexit_registered = False
 
@@ -73,38 +77,98 @@ class ImageService(AppService):
         imagecraft.yaml. The images are partitioned, but the partitions are not
         formatted. This is the state of the images that will be available during the
         parts lifecycle.
+
+        An image left by an interrupted pack is kept if its journal shows it was
+        created with the same layout, so that pack can resume where it stopped.
         """
         if self._images is not None:
             return self._images
 
         project = cast(Project, self._services.get("project").get())
-        self._images = {}
+        reproducibility = diskutil.get_reproducibility(
+            seed=self._services.get("config").get("reproducible_seed"),
+            project_name=project.name,
+        )
 
-        for name, volume in project.volumes.items():
-            # Use predictable hidden names for temporary images.
-            image_path = self._project_dir / f".{name}.img.tmp"
-            match volume.volume_schema:
-                case PartitionSchema.GPT:
-                    gptutil.create_empty_gpt_image(
-                        imagepath=image_path,
-                        sector_size=self._sector_size,
-                        layout=volume,
-                    )
-                case PartitionSchema.MBR:
-                    mbrutil.create_empty_mbr_image(
-                        imagepath=image_path,
-                        sector_size=self._sector_size,
-                        layout=volume,
-                    )
-                case _:
-                    # Reaching this case is a bug.
-                    raise NotImplementedError(
-                        f"Creating images with partition schema {volume.volume_schema} unimplemented."
-                    )
-            self._images[name] = image_path
+        # Volumes are independent images, so they are created concurrently.
+        with ThreadPoolExecutor(max_workers=len(project.volumes)) as executor:
+            create_image = functools.partial(
+                self._create_image, reproducibility=reproducibility
+            )
+            image_paths = list(
+                executor.map(
+                    create_image, project.volumes.keys(), project.volumes.values()
+                )
+            )
+        self._images = dict(zip(project.volumes, image_paths, strict=True))
 
         return self._images
 
+    def _create_image(
+        self,
+        name: str,
+        volume: Volume,
+        *,
+        reproducibility: diskutil.Reproducibility | None,
+    ) -> pathlib.Path:
+        """Create the partitioned image file for a single volume."""
+        # Use predictable hidden names for temporary images.
+        image_path = self._project_dir / f".{name}.img.tmp"
+        volume_reproducibility = (
+            reproducibility.scoped(name) if reproducibility else None
+        )
+        journal_path = checkpoint.get_journal_path(image_path)
+        layout = checkpoint.get_layout_digest(
+            volume,
+            sector_size=self._sector_size,
+            reproducibility=volume_reproducibility,
+        )
+        journal = checkpoint.Journal.load(journal_path)
+        if image_path.exists() and journal is not None and journal.layout == layout:
+            emit.progress(f"Resuming the interrupted pack of volume {name!r}")
+            self._journals[name] = journal
+            return image_path
+
+        match volume.volume_schema:
+            case PartitionSchema.GPT:
+                gptutil.create_empty_gpt_image(
+                    imagepath=image_path,
+                    sector_size=self._sector_size,
+                    layout=volume,
+                    reproducibility=volume_reproducibility,
+                )
+            case PartitionSchema.MBR:
+                mbrutil.create_empty_mbr_image(
+                    imagepath=image_path,
+                    sector_size=self._sector_size,
+                    layout=volume,
+                    reproducibility=volume_reproducibility,
+                )
+            case _:
+                # Reaching this case is a bug.
+                raise NotImplementedError(
+                    f"Creating images with partition schema {volume.volume_schema} unimplemented."
+                )
+        journal = checkpoint.Journal(path=journal_path, layout=layout)
+        journal.save()
+        self._journals[name] = journal
+        return image_path
+
+    def get_journal(self, name: str) -> checkpoint.Journal:
+        """Return the checkpoint journal of a created image.
+
+        Images this service didn't create get a journal that no layout matches,
+        so they aren't resumed from.
+
+        :raises ValueError: If images have not been created yet.
+        """
+        if name not in self._journals:
+            image_path = self.get_images()[name]
+            self._journals[name] = checkpoint.Journal(
+                path=checkpoint.get_journal_path(image_path), layout=""
+            )
+        return self._journals[name]
+
     def _get_all_loop_devices(self) -> list[dict[str, Any]]:
         """Return a list of all loop devices on the system."""
         try:
@@ -126,48 +190,21 @@ class ImageService(AppService):
         if self._images is None:
             raise ValueError("Images must be created before attaching.")
 
-        all_devices = self._get_all_loop_devices()
+        if self._services.get("config").get("rootless"):
+            emit.debug("Rootless build: partitions are used at their offsets instead")
+            return self._loop_devices
 
-        for name, image_path in self._images.items():
-            attached_device: str | None = None
+        all_devices = self._get_all_loop_devices()
+        images = self._images
 
-            # 1. Check for existing devices pointing to this file.
-            for dev in all_devices:
-                back_file = pathlib.Path(dev["back-file"])
-                try:
-                    if image_path.samefile(back_file):
-                        attached_device = dev["name"]
-                        emit.debug(
-                            f"Reusing existing loop device {attached_device} for {image_path}"
-                        )
-                        break
-                except FileNotFoundError:
-                    # Stale inode: file deleted and recreated.
-                    if back_file == image_path:
-                        emit.debug(
-                            f"Detaching stale loop device {dev['name']} for {image_path}"
-                        )
-                        run(_LOSETUP_BIN, "-d", dev["name"])
-
-            # 2. Attach a fresh device if none was found/reused.
-            if not attached_device:
-                try:
-                    attached_device = run(
-                        _LOSETUP_BIN,
-                        "--find",
-                        "--show",
-                        "--partscan",
-                        str(image_path),
-                    ).stdout.strip()
-                    emit.debug(f"Attached {image_path} as {attached_device}")
-                except subprocess.CalledProcessError as err:
-                    raise CraftError(
-                        f"Failed to attach loop device for {image_path}.",
-                        details=str(err),
-                        resolution="Ensure loop devices are available and you have sufficient permissions (sudo).",
-                    ) from err
-
-            self._loop_devices[name] = attached_device
+        with ThreadPoolExecutor(max_workers=len(images)) as executor:
+            devices = list(
+                executor.map(
+                    lambda path: self._attach_image(path, all_devices),
+                    images.values(),
+                )
+            )
+        self._loop_devices.update(zip(images, devices, strict=True))
 
         if not self._atexit_registered:
             atexit.register(self.detach_images)
@@ -175,6 +212,45 @@ class ImageService(AppService):
 
         return self._loop_devices
 
+    def _attach_image(
+        self, image_path: pathlib.Path, all_devices: list[dict[str, Any]]
+    ) -> str:
+        """Attach a single image, reusing an existing loop device if possible."""
+        # 1. Check for existing devices pointing to this file.
+        for dev in all_devices:
+            back_file = pathlib.Path(dev["back-file"])
+            try:
+                if image_path.samefile(back_file):
+                    emit.debug(
+                        f"Reusing existing loop device {dev['name']} for {image_path}"
+                    )
+                    return cast(str, dev["name"])
+            except FileNotFoundError:
+                # Stale inode: file deleted and recreated.
+                if back_file == image_path:
+                    emit.debug(
+                        f"Detaching stale loop device {dev['name']} for {image_path}"
+                    )
+                    run(_LOSETUP_BIN, "-d", dev["name"])
+
+        # 2. Attach a fresh device if none was found/reused.
+        try:
+            attached_device = run(
+                _LOSETUP_BIN,
+                "--find",
+                "--show",
+                "--partscan",
+                str(image_path),
+            ).stdout.strip()
+        except subprocess.CalledProcessError as err:
+            raise CraftError(
+                f"Failed to attach loop device for {image_path}.",
+                details=str(err),
+                resolution="Ensure loop devices are available and you have sufficient permissions (sudo).",
+            ) from err
+        emit.debug(f"Attached {image_path} as {attached_device}")
+        return attached_device
+
     def detach_images(self) -> None:
         """Detach all attached loop devices.
 
@@ -201,7 +277,7 @@ class ImageService(AppService):
                         f"Failed to detach loop device {device} after 10 seconds."
                     )
 
-    def _get_partition_numbers(
+    def get_partition_numbers(
         self, volume: GPTVolume | MBRVolume | HybridVolume
     ) -> dict[str, int]:
         """Return a mapping of partition name to disk partition number for a volume.
@@ -243,13 +319,56 @@ class ImageService(AppService):
         for vol_name, loop_dev in self._loop_devices.items():
             mapping[vol_name] = loop_dev
             volume = project.volumes[vol_name]
-            part_numbers = self._get_partition_numbers(volume)
+            part_numbers = self.get_partition_numbers(volume)
             for structure in volume.structure:
                 part_num = part_numbers[structure.name]
                 mapping[f"{vol_name}/{structure.name}"] = f"{loop_dev}p{part_num}"
 
         return mapping
 
+    def get_partition_extents(self) -> Mapping[str, diskutil.PartitionExtent]:
+        """Return the location of every partition in the created images.
+
+        Keys use the format 'volume_name/structure_name'. Extents are read from the
+        partition tables of the images, so no loop device is needed.
+        """
+        if self._images is None:
+            return {}
+
+        project = cast(Project, self._services.get("project").get())
+        extents: dict[str, diskutil.PartitionExtent] = {}
+        for vol_name, image_path in self._images.items():
+            volume = project.volumes[vol_name]
+            part_numbers = self.get_partition_numbers(volume)
+            with DiskImage(image_path) as disk:
+                partitions = {p.number: p for p in disk.partition_table.partitions}
+            for structure in volume.structure:
+                partition = partitions[part_numbers[structure.name]]
+                extents[f"{vol_name}/{structure.name}"] = diskutil.PartitionExtent(
+                    offset=partition.offset, size=partition.size
+                )
+        return extents
+
+    def get_partition_devices(
+        self,
+    ) -> Mapping[str, tuple[pathlib.Path, diskutil.PartitionExtent | None]]:
+        """Return the path to open each partition at, with its extent in that path.
+
+        Partitions are reached through their loop device, with no extent, or at
+        their extent in the image file in rootless builds.
+        """
+        if self._services.get("config").get("rootless"):
+            images = self._images or {}
+            return {
+                key: (images[key.split("/")[0]], extent)
+                for key, extent in self.get_partition_extents().items()
+            }
+        return {
+            key: (pathlib.Path(path), None)
+            for key, path in self.get_loop_paths().items()
+            if "/" in key
+        }
+
     def verify_images(self) -> None:
         """Verify the integrity of all created images."""
         if self._images is None:
@@ -264,6 +383,65 @@ class ImageService(AppService):
                 case PartitionSchema.MBR:
                     mbrutil.verify_partition_tables(image_path)
 
+    def check_filesystems(self) -> Mapping[str, diskutil.FilesystemCheck]:
+        """Check the consistency of every filesystem of the created images.
+
+        Partitions are checked concurrently, and the result of each check is
+        reported with its duration.
+
+        :returns: The result of each check, by 'volume/structure' key.
+        :raises CraftError: If a check fails and the fatal_filesystem_checks
+            setting is set.
+        """
+        devices = self.get_partition_devices()
+        if not devices:
+            return {}
+
+        project = cast(Project, self._services.get("project").get())
+        filesystems = {
+            f"{volume_name}/{item.name}": item.filesystem
+            for volume_name, volume in project.volumes.items()
+            for item in volume.structure
+        }
+
+        def _check(key: str) -> diskutil.FilesystemCheck:
+            device_path, extent = devices[key]
+            return diskutil.check_filesystem(
+                device_path, filesystems[key], extent=extent
+            )
+
+        emit.progress("Checking filesystems")
+        with ThreadPoolExecutor(max_workers=len(filesystems)) as executor:
+            checks = dict(
+                zip(filesystems, executor.map(_check, filesystems), strict=True)
+            )
+
+        for key, check in checks.items():
+            result = "clean" if check.passed else "errors found"
+            emit.progress(
+                f"Checked {key} ({filesystems[key].value}) in "
+                f"{check.duration:.1f}s: {result}",
+                permanent=True,
+            )
+            if not check.passed:
+                emit.debug(check.output)
+
+        failed = [key for key, check in checks.items() if not check.passed]
+        for key in failed:
+            # Damaged partitions are formatted again if pack is run again.
+            volume_name, structure_name = key.split("/")
+            if volume_name in self._journals:
+                self._journals[volume_name].invalidate(structure_name)
+        if failed and self._services.get("config").get("fatal_filesystem_checks"):
+            raise CraftError(
+                f"Filesystem check failed for {', '.join(failed)}.",
+                details="\n\n".join(checks[key].output for key in failed),
+                resolution="Check the content of the affected partitions.",
+            )
+        if failed:
+            emit.progress("Warning: the packed filesystems have errors", permanent=True)
+        return checks
+
     def finalize_images(self, dest: pathlib.Path) -> Mapping[str, pathlib.Path]:
         """Move hidden image files to their final destination.
 
@@ -274,10 +452,16 @@ class ImageService(AppService):
         """
         images = dict(self.get_images())
         dest.mkdir(parents=True, exist_ok=True)
-        for name, hidden_path in list(images.items()):
+
+        def _finalize(name: str, hidden_path: pathlib.Path) -> pathlib.Path:
             final_path = dest / f"{name}.img"
             shutil.move(str(hidden_path), final_path)
+            checkpoint.get_journal_path(hidden_path).unlink(missing_ok=True)
             emit.debug(f"Finalized image {name!r} -> {final_path}")
-            images[name] = final_path
+            return final_path
+
+        with ThreadPoolExecutor(max_workers=len(images) or 1) as executor:
+            final_paths = list(executor.map(_finalize, images.keys(), images.values()))
         self._images = None
-        return images
+        self._journals.clear()
+        return dict(zip(images, final_paths, strict=True))
@@ -17,26 +17,209 @@
 """Imagecraft Lifecycle service."""
 
 import hashlib
+import json
+import logging
+import multiprocessing
+import pickle
+import shutil
+from collections.abc import Collection, Mapping, Sequence
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from multiprocessing.connection import Connection
 from pathlib import Path
-from typing import cast
+from typing import Any, cast
 
 import craft_platforms
 from craft_application import LifecycleService
-from craft_cli import CraftError
-from craft_parts import Action, callbacks
+from craft_application.errors import PartsLifecycleError
+from craft_application.services.lifecycle import ACTION_MESSAGES
+from craft_cli import CraftError, emit
+from craft_parts import Action, PartsError, Step, callbacks
+from craft_parts.executor import ExecutionContext
 from craft_parts.executor.errors import EnvironmentChangedError
-from craft_parts.infos import ProjectInfo
+from craft_parts.infos import ProjectInfo, StepInfo
 from craft_parts.plugins import Plugin
 from craft_parts.plugins.plugins import PluginGroup
 from typing_extensions import override
 
-from imagecraft import models, plugins
+from imagecraft import base_layer, models, plugins
 from imagecraft.services.image import ImageService
 
+# Steps whose actions write only to the directories of their part.
+_CONCURRENT_STEPS = (Step.PULL, Step.BUILD)
+
+# Parts run concurrently in forked worker processes, which inherit the lifecycle
+# manager without pickling it. craft-parts changes the working directory of the
+# process to prepare build environments, so parts can't share a process.
+_WORKER_CONTEXT = multiprocessing.get_context("fork")
+
+# Keys of the scripts a part runs instead of, or around, its plugin.
+_OVERRIDE_KEYS = ("override-pull", "override-build", "override-stage", "override-prime")
+
+# Record of the volume layout the parts were last run with, in the work directory.
+_LAYOUT_FILE = "layout.json"
+
+
+def _mentions(value: Any, text: str) -> bool:  # noqa: ANN401
+    """Whether a part definition contains a text, in its keys or values."""
+    if isinstance(value, str):
+        return text in value
+    if isinstance(value, Mapping):
+        return any(
+            _mentions(item, text)
+            for item in (*value.keys(), *value.values())  # pyright: ignore[reportUnknownArgumentType]
+        )
+    if isinstance(value, Sequence):
+        return any(_mentions(item, text) for item in value)  # pyright: ignore[reportUnknownVariableType]
+    return False
+
+
+def _uses_volume_devices(part: Mapping[str, Any]) -> bool:
+    """Whether a part gets the volume devices in its environment.
+
+    Scripts may reach the devices through files they source or commands they
+    run, so any part with an override script gets them, as does any part that
+    refers to the CRAFT_VOLUME_* variables elsewhere, such as in its build
+    environment.
+    """
+    return any(part.get(key) for key in _OVERRIDE_KEYS) or _mentions(
+        part, "CRAFT_VOLUME_"
+    )
+
+
+def _get_partition_parts(
+    parts: Mapping[str, Any], partitions: Collection[str]
+) -> set[str]:
+    """Get the parts that refer to any of the partitions, as in ``(volume/pc/efi)``."""
+    return {
+        name
+        for name, part in parts.items()
+        if any(_mentions(part, f"({partition})") for partition in partitions)
+    }
+
+
+def _get_dependencies(parts: Mapping[str, Mapping[str, Any]]) -> dict[str, set[str]]:
+    """Get the parts each part comes after, directly or not."""
+    dependencies: dict[str, set[str]] = {}
+
+    def _resolve(name: str) -> set[str]:
+        if name not in dependencies:
+            # Set first, so that a cycle, which craft-parts rejects, ends here.
+            dependencies[name] = set()
+            for after in parts.get(name, {}).get("after", []):
+                dependencies[name] |= {after, *_resolve(after)}
+        return dependencies[name]
+
+    for name in parts:
+        _resolve(name)
+    return dependencies
+
+
+def _get_action_batches(actions: Sequence[Action]) -> list[list[Action]]:
+    """Split actions into runs of pull and build actions, and other single actions.
+
+    Only the actions of a run may be executed concurrently. Other steps write to
+    the shared stage, prime and overlay directories, so they run one at a time.
+    """
+    batches: list[list[Action]] = []
+    for action in actions:
+        if (
+            action.step in _CONCURRENT_STEPS
+            and batches
+            and batches[-1][0].step in _CONCURRENT_STEPS
+        ):
+            batches[-1].append(action)
+        else:
+            batches.append([action])
+    return batches
+
+
+def _get_action_message(action: Action) -> str:
+    """Get the progress message of an action."""
+    message = f"{ACTION_MESSAGES[action.step][action.action_type]} {action.part_name}"
+    return f"{message} ({action.reason})" if action.reason else message
+
+
+def _execute(aex: ExecutionContext, actions: Sequence[Action]) -> None:
+    """Execute actions in sequence."""
+    for action in actions:
+        emit.progress(_get_action_message(action))
+        with emit.open_stream() as stream:
+            aex.execute(action, stdout=stream, stderr=stream)
+
+
+class _PipeHandler(logging.Handler):
+    """A logging handler that sends the records of a worker to the main process."""
+
+    def __init__(self, conn: Connection) -> None:
+        super().__init__()
+        self._conn = conn
+
+    @override
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            # Arguments and tracebacks may not be picklable, so send the text.
+            message = self.format(record)
+            self._conn.send(
+                (
+                    "log",
+                    logging.makeLogRecord(
+                        {
+                            **record.__dict__,
+                            "msg": message,
+                            "args": None,
+                            "exc_info": None,
+                            "exc_text": None,
+                        }
+                    ),
+                )
+            )
+        except Exception:  # noqa: BLE001
+            self.handleError(record)
+
+
+def _get_picklable_error(error: BaseException) -> BaseException:
+    """Get an error that can be raised in the main process, the same one if it can."""
+    try:
+        pickle.loads(pickle.dumps(error))  # noqa: S301
+    except Exception:  # noqa: BLE001
+        if isinstance(error, PartsError):
+            return PartsLifecycleError.from_parts_error(error)
+        return CraftError(str(error) or type(error).__name__)
+    return error
+
+
+def _run_worker(
+    aex: ExecutionContext,
+    actions: Sequence[Action],
+    project_info: ProjectInfo,
+    stream: int | None,
+    conn: Connection,
+) -> None:
+    """Execute the actions of a part in a forked worker process.
+
+    The emitter of the main process can't be used after the fork, so progress,
+    log records and the outcome are sent through a pipe instead, ending with the
+    project variables the part set.
+    """
+    logging.getLogger().handlers = [_PipeHandler(conn)]
+    try:
+        for action in actions:
+            conn.send(("progress", _get_action_message(action)))
+            aex.execute(action, stdout=stream, stderr=stream)
+    except BaseException as error:  # noqa: BLE001
+        conn.send(("error", _get_picklable_error(error)))
+    else:
+        conn.send(("done", project_info.project_vars))
+    finally:
+        conn.close()
+
 
 class ImagecraftLifecycleService(LifecycleService):
     """Imagecraft-specific lifecycle service."""
 
+    _base_layer_dir: Path | None = None
+    _base_layer_digest: str | None = None
+
     @staticmethod
     @override
     def get_plugin_group(
@@ -50,13 +233,43 @@ class ImagecraftLifecycleService(LifecycleService):
         # Configure extra args to the LifecycleManager
         project = cast(models.Project, self._services.get("project").get())
 
-        base_layer_name = "bare_base_layer"
-        base_layer_dir = self._work_dir / Path(base_layer_name)
-        base_layer_dir.mkdir(parents=True, exist_ok=True)
+        if project.base_layer is None:
+            base_layer_name = "bare_base_layer"
+            base_layer_dir = self._work_dir / Path(base_layer_name)
+            base_layer_dir.mkdir(parents=True, exist_ok=True)
+            self._base_layer_dir = None
+            self._base_layer_digest = None
+        else:
+            project_dir = self._services.get("project").resolve_project_file_path()
+            base_layer_dir, base_layer_name = base_layer.get_base_layer(
+                project_dir.parent / project.base_layer,
+                cache_dir=self._cache_dir / "base-layers",
+            )
+            self._base_layer_dir = base_layer_dir
+            self._base_layer_digest = base_layer_name
         hasher = hashlib.sha1()  # noqa: S324
 
         hasher.update(base_layer_name.encode())
 
+        # Images are only created and attached for the parts that may write to
+        # the volume devices, or by pack.
+        self._volume_parts = {
+            name for name, part in project.parts.items() if _uses_volume_devices(part)
+        }
+        # Of those, the parts that name the devices, and may keep their paths.
+        self._device_parts = {
+            name
+            for name, part in project.parts.items()
+            if _mentions(part, "CRAFT_VOLUME_")
+        }
+        self._dependencies = _get_dependencies(project.parts)
+        # Stage packages and snaps are fetched through a shared apt cache.
+        self._package_parts = {
+            name
+            for name, part in project.parts.items()
+            if part.get("stage-packages") or part.get("stage-snaps")
+        }
+
         self._manager_kwargs.update(
             project_name=project.name,
             base_layer_dir=base_layer_dir,
@@ -65,26 +278,230 @@ class ImagecraftLifecycleService(LifecycleService):
         )
 
         super().setup()
-        callbacks.register_prologue(self._prologue_hook)
+        callbacks.register_pre_step(self._pre_step_hook)
+
+    @property
+    def base_layer_dir(self) -> Path | None:
+        """The cached base layer of the project, None if it starts empty."""
+        return self._base_layer_dir
+
+    @property
+    def base_layer_digest(self) -> str | None:
+        """The digest of the root filesystem of the base layer, None without one."""
+        return self._base_layer_digest
+
+    def _pre_step_hook(self, step_info: StepInfo) -> None:
+        """Create and attach images before the steps of parts that use them.
+
+        The loop device paths are exported as ``CRAFT_VOLUME_*`` environment
+        variables, for this step and the ones that follow.
+        """
+        if step_info.part_name not in self._volume_parts:
+            return
+
+        for key, path in self._attach_images().items():
+            env_key = f"CRAFT_VOLUME_{key.upper().replace('/', '_').replace('-', '_')}"
+            step_info.global_environment[env_key] = path
 
-    def _prologue_hook(self, project_info: ProjectInfo) -> None:
-        """Create images and export loop device paths as environment variables."""
+    def _attach_images(self) -> Mapping[str, str]:
+        """Create and attach the images, and get their loop device paths."""
         image_service = cast(ImageService, self._services.get("image"))
         image_service.create_images()
         image_service.attach_images()
+        return image_service.get_loop_paths()
 
-        for key, path in image_service.get_loop_paths().items():
-            env_key = f"CRAFT_VOLUME_{key.upper().replace('/', '_').replace('-', '_')}"
-            project_info.global_environment[env_key] = path
+    @override
+    def run(self, step_name: str | None, part_names: list[str] | None = None) -> None:
+        self._invalidate_layout_changes()
+        super().run(step_name, part_names)
+
+    def _invalidate_layout_changes(self) -> None:
+        """Clean the steps that a change of the volume layout made outdated.
+
+        The layout is compared with the one recorded by the previous run. Parts
+        that refer to an added, removed or renamed partition are cleaned from their
+        overlay step, so their sources aren't pulled again, and every part is if
+        the default partition changed. Parts that refer to the ``CRAFT_VOLUME_*``
+        variables are cleaned when a partition of a volume is renamed or
+        renumbered, which changes the devices they name. Other changes, sizes
+        included, are left to pack.
+        """
+        partitions = self._services.get("project").partitions
+        if not partitions:
+            return
+        project = cast(models.Project, self._services.get("project").get())
+        image_service = cast(ImageService, self._services.get("image"))
+        layout = {
+            "partitions": partitions,
+            "devices": {
+                name: image_service.get_partition_numbers(volume)
+                for name, volume in project.volumes.items()
+            },
+        }
+        layout_path = self._work_dir / _LAYOUT_FILE
+        try:
+            previous = json.loads(layout_path.read_text())
+        except (OSError, ValueError):
+            previous = None
+        if previous == layout:
+            return
+        if isinstance(previous, dict):
+            self._clean_layout_changes(
+                cast(dict[str, Any], previous), layout, project=project
+            )
+
+        self._work_dir.mkdir(parents=True, exist_ok=True)
+        temp_path = layout_path.with_suffix(".tmp")
+        temp_path.write_text(json.dumps(layout, indent=2, sort_keys=True))
+        temp_path.replace(layout_path)
+
+    def _clean_layout_changes(
+        self,
+        previous: Mapping[str, Any],
+        layout: Mapping[str, Any],
+        *,
+        project: models.Project,
+    ) -> None:
+        """Clean the parts outdated by a change from a previous volume layout."""
+        partitions: list[str] = layout["partitions"]
+        old_partitions: list[str] = previous.get("partitions") or partitions
+        if old_partitions[0] != partitions[0]:
+            emit.progress("Default partition changed, cleaning all parts")
+            # This also removes the directories of the other partitions, with the
+            # aliases of the old default partition.
+            self._lcm.clean(Step.OVERLAY)
+            return
+
+        stale = _get_partition_parts(
+            project.parts, set(old_partitions) ^ set(partitions)
+        )
+        if previous.get("devices") != layout["devices"]:
+            stale |= self._device_parts
+        if stale:
+            emit.progress(
+                f"Volume layout changed, cleaning parts: {', '.join(sorted(stale))}"
+            )
+            self._lcm.clean(Step.OVERLAY, part_names=sorted(stale))
+        for partition in set(old_partitions) - set(partitions):
+            shutil.rmtree(self._work_dir / "partitions" / partition, ignore_errors=True)
 
     @override
     def _exec(self, actions: list[Action]) -> None:
-        """Execute actions of the lifecycle."""
+        """Execute actions of the lifecycle.
+
+        Pull and build actions of parts that don't depend on each other run
+        concurrently, in worker processes, up to the ``max_parallel_parts``
+        configuration item.
+        """
+        max_parts = int(self._services.get("config").get("max_parallel_parts"))
         try:
-            super()._exec(actions)
+            with self._lcm.action_executor() as aex:
+                for batch in _get_action_batches(actions):
+                    if max_parts > 1 and len({a.part_name for a in batch}) > 1:
+                        self._exec_concurrently(aex, batch, max_parts=max_parts)
+                    else:
+                        _execute(aex, batch)
         except EnvironmentChangedError as err:
             raise CraftError(
                 message="Partitions changed.",
                 details=str(err),
                 resolution="Run imagecraft clean",
             )
+
+    def _must_follow(self, part_name: str, other: str) -> bool:
+        """Whether the actions of a part can't overlap those of another part."""
+        return (
+            other in self._dependencies.get(part_name, set())
+            or part_name in self._dependencies.get(other, set())
+            or {part_name, other} <= self._volume_parts
+            or {part_name, other} <= self._package_parts
+        )
+
+    def _exec_concurrently(
+        self, aex: ExecutionContext, actions: Sequence[Action], *, max_parts: int
+    ) -> None:
+        """Execute the actions of different parts concurrently.
+
+        The actions of a part run in order, once the parts it must follow are done.
+        If an action fails, no more parts are started, and those running are left
+        to finish, so that their step states are written, before the error is
+        raised.
+
+        :param max_parts: maximum number of parts to run at the same time.
+        """
+        part_actions: dict[str, list[Action]] = {}
+        for action in actions:
+            part_actions.setdefault(action.part_name, []).append(action)
+        # Parts only wait for those planned before them, so there is no deadlock.
+        names = list(part_actions)
+        waits_for = {
+            name: {other for other in names[:index] if self._must_follow(name, other)}
+            for index, name in enumerate(names)
+        }
+
+        done: set[str] = set()
+        running: dict[Future[None], str] = {}
+        errors: list[BaseException] = []
+        with ThreadPoolExecutor(max_workers=max_parts) as executor:
+            while names or running:
+                ready = [name for name in names if waits_for[name] <= done]
+                for name in [] if errors else ready:
+                    names.remove(name)
+                    future = executor.submit(
+                        self._execute_in_worker, aex, part_actions[name]
+                    )
+                    running[future] = name
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    done.add(running.pop(future))
+                    if (error := future.exception()) is not None:
+                        errors.append(error)
+        if errors:
+            raise errors[0]
+
+    def _execute_in_worker(
+        self, aex: ExecutionContext, actions: Sequence[Action]
+    ) -> None:
+        """Execute the actions of a part in a worker process, and wait for it.
+
+        The project variables the part set are copied back to the lifecycle
+        manager, and its error, if any, is raised.
+        """
+        part_name = actions[0].part_name
+        if part_name in self._volume_parts:
+            # Attached in this process, so that the devices outlive the worker.
+            self._attach_images()
+        project_info = self._lcm.project_info
+
+        error: BaseException | None = CraftError(
+            f"Failed to run part {part_name!r}: its process stopped unexpectedly."
+        )
+        receiver, sender = _WORKER_CONTEXT.Pipe(duplex=False)
+        with receiver, emit.open_stream() as stream:
+            worker = _WORKER_CONTEXT.Process(
+                target=_run_worker,
+                args=(aex, actions, project_info, stream, sender),
+            )
+            worker.start()
+            sender.close()
+            while True:
+                try:
+                    kind, value = receiver.recv()
+                except EOFError:
+                    break
+                if kind == "progress":
+                    emit.progress(value)
+                elif kind == "log":
+                    logging.getLogger(value.name).handle(value)
+                elif kind == "error":
+                    error = value
+                    break
+                else:
+                    project_info.project_vars.update_from(value, part_name)
+                    error = None
+                    break
+            worker.join()
+        if error is not None:
+            raise error
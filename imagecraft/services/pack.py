@@ -14,21 +14,53 @@
 
 """Imagecraft Package service."""
 
-from pathlib import Path
+import functools
+import shutil
+from collections.abc import Iterable, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
 from typing import cast
 
 from craft_application import PackageService, models
-from craft_cli import emit
+from craft_cli import CraftError, emit
+from craft_parts import ProjectDirs
+from craft_parts.filesystem_mounts import FilesystemMount
 from typing_extensions import override
 
-from imagecraft.models import Project, get_partition_name
-from imagecraft.pack import Image, diskutil, grubutil
+from imagecraft import base_layer
+from imagecraft.inspection import DiskImage, compare_tree
+from imagecraft.models import Project, Volume, get_partition_name
+from imagecraft.pack import (
+    Image,
+    bootloader,
+    checkpoint,
+    chunkstore,
+    delta,
+    diskutil,
+    grubutil,
+    ownership,
+)
 from imagecraft.services.image import ImageService
+from imagecraft.services.lifecycle import ImagecraftLifecycleService
+from imagecraft.subprocesses import run
+
+# Paths written to by GRUB when it is installed from a chroot of the packed image.
+_GRUB_PATHS = ("/boot/grub", "/boot/efi/EFI")
 
 
 class ImagecraftPackService(PackageService):
     """Package service subclass for Imagecraft."""
 
+    _delta_from: Path | None = None
+
+    def set_delta_from(self, path: Path) -> None:
+        """Write deltas against previous images when packing.
+
+        :param path: the previous image of the volume, or a directory holding a
+            previous ``<volume>.img`` image for each volume.
+        """
+        self._delta_from = path
+
     @override
     def pack(self, prime_dir: Path, dest: Path) -> list[Path]:
         """Pack the image.
@@ -38,56 +70,359 @@ class ImagecraftPackService(PackageService):
         :returns: A list of paths to created packages.
         """
         project = cast(Project, self._services.get("project").get())
-        if len(project.volumes) != 1:
-            raise AssertionError("This code can only handle one volume")
-        volume_name, volume = next(iter(project.volumes.items()))
 
         image_service = cast(ImageService, self._services.get("image"))
-        # Both calls are idempotent — the prologue hook will have run them
-        # already during the lifecycle, but pack may be called standalone.
-        image_service.create_images()
+        # Both calls are idempotent — the lifecycle will have run them already
+        # for parts that use the volume devices, but pack may be called standalone.
+        images = image_service.create_images()
         image_service.attach_images()
 
-        project_dirs = self._services.get("lifecycle").project_info.dirs
+        project_info = self._services.get("lifecycle").project_info
         loop_paths = image_service.get_loop_paths()
+        config = self._services.get("config")
+        rootless = bool(config.get("rootless"))
 
-        try:
-            for structure_item in volume.structure:
-                partition_name = get_partition_name(volume_name, structure_item)
-                emit.progress(f"Preparing partition {partition_name}")
-                partition_prime_dir = project_dirs.get_prime_dir(
-                    partition=partition_name
+        # The bootloader goes on the volume holding the root filesystem,
+        # other volumes are reached through their loop devices.
+        filesystem_mount = project_info.default_filesystem_mount
+        root_volume_name = _get_volume_name(next(iter(filesystem_mount)).device)
+
+        content_dirs, content_sources = self._get_content_dirs(
+            project, project_info.dirs, filesystem_mount
+        )
+
+        reproducibility = diskutil.get_reproducibility(
+            seed=config.get("reproducible_seed"), project_name=project.name
+        )
+
+        # Installing GRUB in the packed image writes to mounted filesystems, which
+        # stamps them with the current time, so reproducible images avoid it.
+        # Rootless builds can't mount the filesystems at all.
+        bootloader_setup = None
+        if (
+            config.get("chroot_free_bootloader")
+            or reproducibility is not None
+            or rootless
+        ):
+            # The bootloader is written to copies, so that prime is left as the
+            # parts produced it.
+            _stage_boot_content(
+                content_dirs,
+                content_sources,
+                filesystem_mount,
+                project_info.dirs.work_dir,
+            )
+            bootloader_setup = bootloader.prepare_bootloader(
+                volume_name=root_volume_name,
+                volume=project.volumes[root_volume_name],
+                arch=project_info.target_arch,
+                filesystem_mount=filesystem_mount,
+                content_dirs={
+                    f"{volume_name}/{item.name}": content_dirs[
+                        get_partition_name(volume_name, item)
+                    ]
+                    for volume_name, volume in project.volumes.items()
+                    for item in volume.structure
+                },
+                workdir=project_info.dirs.work_dir,
+                reproducibility=reproducibility,
+                keep_uuids={
+                    f"{volume_name}/{structure_name}": fs_uuid
+                    for volume_name in project.volumes
+                    for structure_name, fs_uuid in image_service.get_journal(
+                        volume_name
+                    ).fs_uuids.items()
+                },
+            )
+            if bootloader_setup is not None:
+                _add_bootloader_digests(content_sources, content_dirs, filesystem_mount)
+            if bootloader_setup is None and rootless:
+                raise CraftError(
+                    "Cannot provision the bootloader in a rootless build.",
+                    resolution="Stage the GRUB and shim files of the target "
+                    "architecture in the root filesystem, or build as root.",
+                )
+            if bootloader_setup is None:
+                emit.progress(
+                    "Cannot provision the bootloader without a chroot, "
+                    "installing it in the packed image instead",
+                    permanent=True,
                 )
-                loop_path = Path(loop_paths[f"{volume_name}/{structure_item.name}"])
+                if reproducibility is not None:
+                    emit.progress(
+                        "Warning: the image may differ between builds of the same inputs",
+                        permanent=True,
+                    )
 
-                diskutil.format_device(
-                    device_path=loop_path,
-                    fstype=structure_item.filesystem,
-                    label=structure_item.filesystem_label,
-                    content_dir=partition_prime_dir,
+        try:
+            # Volumes are separate images, so they are formatted concurrently.
+            with ThreadPoolExecutor(max_workers=len(project.volumes)) as executor:
+                format_volume = functools.partial(
+                    self._format_volume,
+                    content_dirs=content_dirs,
+                    content_sources=content_sources,
+                    devices=image_service.get_partition_devices(),
+                    uuids=bootloader_setup.uuids if bootloader_setup else {},
+                    reproducibility=reproducibility,
+                    rootless=rootless,
+                    journals={
+                        name: image_service.get_journal(name)
+                        for name in project.volumes
+                    },
+                )
+                list(
+                    executor.map(
+                        format_volume, project.volumes.keys(), project.volumes.values()
+                    )
                 )
 
             image_service.verify_images()
+
+            if bootloader_setup is None:
+                image = Image(
+                    volume=project.volumes[root_volume_name],
+                    disk_path=images[root_volume_name],
+                )
+                grubutil.setup_grub(
+                    image=image,
+                    workdir=project_info.dirs.work_dir,
+                    arch=project_info.target_arch,
+                    filesystem_mount=filesystem_mount,
+                    loop_dev=loop_paths[root_volume_name],
+                    loop_paths=loop_paths,
+                    native_config=bool(config.get("native_grub_config")),
+                )
+
+            image_service.check_filesystems()
         finally:
             image_service.detach_images()
 
-        images = image_service.finalize_images(dest)
-
-        filesystem_mount = self._services.get(
-            "lifecycle"
-        ).project_info.default_filesystem_mount
-        arch = self._services.get("lifecycle").project_info.target_arch
-        for volume_name, path in images.items():
-            volume = project.volumes[volume_name]
-            image = Image(volume=volume, disk_path=path)
-            grubutil.setup_grub(
-                image=image,
-                workdir=project_dirs.work_dir,
-                arch=arch,
-                filesystem_mount=filesystem_mount,
+        if bootloader_setup is not None:
+            bootloader_setup.install(images[root_volume_name])
+
+        # Deltas are written before the images are moved to dest, where the
+        # previous images may still be.
+        deltas: list[Path] = []
+        if self._delta_from is not None:
+            deltas = _write_deltas(images, self._delta_from, dest)
+
+        final_images = image_service.finalize_images(dest)
+        artifacts = [*final_images.values(), *deltas]
+
+        if config.get("verify_contents"):
+            self._verify_contents(
+                project,
+                final_images,
+                content_dirs=content_dirs,
+                skip={} if bootloader_setup else _get_grub_paths(filesystem_mount),
+            )
+
+        if chunk_store_dir := config.get("chunk_store_dir"):
+            artifacts.extend(
+                _write_chunk_indexes(final_images.values(), Path(chunk_store_dir))
+            )
+
+        return artifacts
+
+    @staticmethod
+    def _format_volume(  # noqa: PLR0913
+        volume_name: str,
+        volume: Volume,
+        *,
+        content_dirs: Mapping[str, Path],
+        content_sources: Mapping[str, str],
+        devices: Mapping[str, tuple[Path, diskutil.PartitionExtent | None]],
+        uuids: Mapping[str, str],
+        reproducibility: diskutil.Reproducibility | None,
+        rootless: bool,
+        journals: Mapping[str, checkpoint.Journal],
+    ) -> None:
+        """Format and populate every partition of a volume.
+
+        Partitions completed by an interrupted pack from the same content are
+        kept as they are.
+
+        :param content_dirs: the directory each partition is populated from, by
+            partition name.
+        :param content_sources: the digest of what each content directory was made
+            from, by partition name.
+        :param devices: path to open each partition at, with its extent in that
+            path, by 'volume/structure' key.
+        :param uuids: filesystem UUIDs to use, by 'volume/structure' key. Other
+            filesystems get a random UUID, or a derived one in reproducible mode.
+        :param reproducibility: inputs for a byte-identical image, if enabled.
+        :param rootless: whether the build runs in a user namespace, where the
+            ownership of the content is recorded before it is written.
+        :param journals: the checkpoint journal of each image, by volume name.
+        """
+        journal = journals[volume_name]
+        for structure_item in volume.structure:
+            partition_name = get_partition_name(volume_name, structure_item)
+            partition_prime_dir = content_dirs[partition_name]
+            structure_key = f"{volume_name}/{structure_item.name}"
+            device_path, extent = devices[structure_key]
+            partition_reproducibility = (
+                reproducibility.scoped(volume_name, structure_item.name)
+                if reproducibility
+                else None
+            )
+
+            fs_options = structure_item.filesystem_options
+            content = checkpoint.get_content_digest(
+                content_sources[partition_name],
+                fstype=structure_item.filesystem,
+                label=structure_item.filesystem_label,
+                options={
+                    "fs_uuid": uuids.get(structure_key),
+                    "reproducibility": partition_reproducibility,
+                    "filesystem_options": (
+                        fs_options.resolve().marshal() if fs_options else None
+                    ),
+                },
+            )
+            if journal.is_complete(structure_item.name, content):
+                emit.progress(
+                    f"Keeping partition {partition_name} from the interrupted pack",
+                    permanent=True,
+                )
+                continue
+            emit.progress(f"Preparing partition {partition_name}")
+            journal.start(structure_item.name, content)
+
+            owners = {}
+            if rootless and partition_prime_dir.is_dir():
+                owners = ownership.record_ownership(partition_prime_dir)
+
+            diskutil.format_device(
+                device_path=device_path,
+                fstype=structure_item.filesystem,
+                label=structure_item.filesystem_label,
+                content_dir=partition_prime_dir,
+                fs_uuid=uuids.get(structure_key),
+                reproducibility=partition_reproducibility,
+                extent=extent,
+                options=fs_options,
+            )
+            if "fat" in structure_item.filesystem.value:
+                diskutil.mark_fat_read_only(
+                    device_path, ownership.get_read_only_files(owners), extent=extent
+                )
+            journal.complete(structure_item.name, content, uuids.get(structure_key))
+
+    def _get_content_dirs(
+        self,
+        project: Project,
+        project_dirs: ProjectDirs,
+        filesystem_mount: FilesystemMount,
+    ) -> tuple[dict[str, Path], dict[str, str]]:
+        """Get the directory each partition is populated from, by partition name.
+
+        Partitions are populated from their prime directory. When the project has
+        a base layer, the partitions it is mounted on are populated from the base
+        layer with their prime directory on top, written to the work directory
+        and kept there while neither changes.
+
+        :returns: The content directory of each partition, and the digest of what
+            it was made from, by partition name.
+        """
+        content_dirs = {
+            get_partition_name(volume_name, item): project_dirs.get_prime_dir(
+                partition=get_partition_name(volume_name, item)
+            )
+            for volume_name, volume in project.volumes.items()
+            for item in volume.structure
+        }
+        content_sources = {
+            partition_name: checkpoint.get_metadata_digest(prime_dir)
+            for partition_name, prime_dir in content_dirs.items()
+        }
+        lifecycle = cast(ImagecraftLifecycleService, self._services.get("lifecycle"))
+        layer_dir = lifecycle.base_layer_dir
+        if layer_dir is None:
+            return content_dirs, content_sources
+
+        mounts = {entry.device.strip("()"): entry.mount for entry in filesystem_mount}
+        for partition_name, mount in mounts.items():
+            prime_dir = content_dirs[partition_name]
+            if diskutil.is_content_tarball(prime_dir):
+                continue
+            merged_dir = project_dirs.work_dir / "content" / partition_name
+            nested_mounts = [
+                other
+                for other in mounts.values()
+                if other != mount and PurePosixPath(other).is_relative_to(mount)
+            ]
+            source = checkpoint.get_inputs_digest(
+                lifecycle.base_layer_digest,
+                mount,
+                nested_mounts,
+                content_sources[partition_name],
             )
+            if checkpoint.get_recorded_source(merged_dir) == source:
+                emit.debug(f"Keeping the merged content of {partition_name!r}")
+            else:
+                checkpoint.forget_source(merged_dir)
+                base_layer.merge_content(
+                    layer_dir,
+                    prime_dir,
+                    merged_dir,
+                    mount=mount,
+                    nested_mounts=nested_mounts,
+                )
+                checkpoint.record_source(merged_dir, source)
+            content_dirs[partition_name] = merged_dir
+            content_sources[partition_name] = source
+        return content_dirs, content_sources
+
+    def _verify_contents(
+        self,
+        project: Project,
+        images: Mapping[str, Path],
+        *,
+        content_dirs: Mapping[str, Path],
+        skip: Mapping[str, list[str]],
+    ) -> None:
+        """Compare every partition of the packed images with its prime directory.
+
+        Partitions are read from the image files, without loop devices. Partitions
+        populated from a content tarball aren't compared.
+
+        :param images: the packed images, by volume name.
+        :param content_dirs: the directory each partition was populated from, by
+            partition name.
+        :param skip: paths of each partition not populated from its prime
+            directory, by 'volume/structure' key.
+        :raises CraftError: If a partition doesn't match its prime directory.
+        """
+        image_service = cast(ImageService, self._services.get("image"))
+        differences: list[str] = []
+        for volume_name, volume in project.volumes.items():
+            numbers = image_service.get_partition_numbers(volume)
+            with DiskImage(images[volume_name]) as disk:
+                partitions = {p.number: p for p in disk.partition_table.partitions}
+                for item in volume.structure:
+                    partition_name = get_partition_name(volume_name, item)
+                    prime_dir = content_dirs[partition_name]
+                    if not prime_dir.is_dir() or diskutil.is_content_tarball(prime_dir):
+                        continue
+                    emit.progress(f"Verifying the content of {partition_name}")
+                    filesystem = disk.open_filesystem(partitions[numbers[item.name]])
+                    differences.extend(
+                        f"{partition_name}: {difference}"
+                        for difference in compare_tree(
+                            filesystem,
+                            prime_dir,
+                            skip=skip.get(f"{volume_name}/{item.name}", []),
+                        )
+                    )
 
-        return list(images.values())
+        if differences:
+            raise CraftError(
+                "Packed partitions don't match their prime directories.",
+                details="\n".join(differences),
+                resolution="Check for files the filesystem can't hold, such as "
+                "special files on FAT partitions.",
+            )
 
     @property
     def metadata(self) -> models.BaseMetadata:
@@ -102,3 +437,157 @@ class ImagecraftPackService(PackageService):
         :param path: The path to the prime directory.
         """
         # nop (no metadata file for Imagecraft)
+
+
+def _write_chunk_indexes(images: Iterable[Path], store_dir: Path) -> list[Path]:
+    """Chunk images into a chunk store, writing an index next to each image.
+
+    :returns: The paths of the indexes.
+    """
+    index_paths: list[Path] = []
+    for image_path in images:
+        emit.progress(f"Chunking {image_path.name} into {store_dir}")
+        index_path = image_path.with_name(image_path.name + chunkstore.INDEX_SUFFIX)
+        chunkstore.chunk_image(image_path, store_dir).write(index_path)
+        index_paths.append(index_path)
+    return index_paths
+
+
+def _stage_boot_content(
+    content_dirs: dict[str, Path],
+    content_sources: Mapping[str, str],
+    filesystem_mount: FilesystemMount,
+    work_dir: Path,
+) -> None:
+    """Replace the content directories the bootloader writes to with copies.
+
+    :param content_dirs: the directory each partition is populated from, by
+        partition name, updated in place.
+    :param content_sources: the digest of what each content directory was made
+        from, by partition name.
+    """
+    for key in bootloader.get_boot_devices(filesystem_mount):
+        partition_name = f"volume/{key}"
+        if partition_name in content_dirs:
+            content_dirs[partition_name] = _stage_content(
+                content_dirs[partition_name],
+                work_dir / "content" / partition_name,
+                source=content_sources[partition_name],
+            )
+
+
+def _add_bootloader_digests(
+    content_sources: dict[str, str],
+    content_dirs: Mapping[str, Path],
+    filesystem_mount: FilesystemMount,
+) -> None:
+    """Add the files the bootloader wrote to the digests of the content directories.
+
+    :param content_sources: the digest of what each content directory was made
+        from, by partition name, updated in place.
+    """
+    for key, grub_paths in _get_grub_paths(filesystem_mount).items():
+        partition_name = f"volume/{key}"
+        content_sources[partition_name] = checkpoint.get_inputs_digest(
+            content_sources[partition_name],
+            [
+                checkpoint.get_tree_digest(
+                    content_dirs[partition_name] / path.lstrip("/")
+                ).hex()
+                for path in grub_paths
+            ],
+        )
+
+
+def _stage_content(content_dir: Path, dest: Path, *, source: str) -> Path:
+    """Copy the content of a partition to a directory that pack may write to.
+
+    Content already at ``dest``, such as a base layer merged with its prime
+    directory, and content tarballs are used as they are. A copy made by a
+    previous pack from the same source is kept, as what pack writes to it is
+    written again.
+
+    :param source: the digest of what the content directory was made from.
+    :returns: The directory the partition is populated from.
+    """
+    if content_dir == dest or (
+        content_dir.is_dir() and diskutil.is_content_tarball(content_dir)
+    ):
+        return content_dir
+    if checkpoint.get_recorded_source(dest) == source:
+        emit.debug(f"Keeping the copy of {str(content_dir)!r}")
+        return dest
+    emit.progress(f"Copying the content of {str(content_dir)!r}")
+    checkpoint.forget_source(dest)
+    shutil.rmtree(dest, ignore_errors=True)
+    dest.mkdir(parents=True)
+    if content_dir.is_dir():
+        run("cp", "--archive", "--reflink=auto", f"{content_dir}/.", dest)
+    checkpoint.record_source(dest, source)
+    return dest
+
+
+def _get_grub_paths(filesystem_mount: FilesystemMount) -> dict[str, list[str]]:
+    """Get the paths GRUB writes to in each partition, by 'volume/structure' key."""
+    paths: dict[str, list[str]] = {}
+    for entry in filesystem_mount:
+        mount = PurePosixPath(entry.mount)
+        key = entry.device.strip("()").removeprefix("volume/")
+        for grub_path in map(PurePosixPath, _GRUB_PATHS):
+            if grub_path.is_relative_to(mount):
+                paths.setdefault(key, []).append(
+                    str("/" / grub_path.relative_to(mount))
+                )
+    return paths
+
+
+def _get_delta_sources(
+    delta_from: Path, volume_names: Iterable[str]
+) -> dict[str, Path]:
+    """Find the previous image of each volume.
+
+    :raises CraftError: If no previous image matches a volume.
+    """
+    names = list(volume_names)
+    if delta_from.is_dir():
+        sources = {
+            name: delta_from / f"{name}.img"
+            for name in names
+            if (delta_from / f"{name}.img").is_file()
+        }
+    elif len(names) == 1:
+        sources = {names[0]: delta_from} if delta_from.is_file() else {}
+    else:
+        name = delta_from.name.removesuffix(".img")
+        sources = {name: delta_from} if name in names and delta_from.is_file() else {}
+
+    if not sources:
+        raise CraftError(
+            f"No previous image found in {str(delta_from)!r}.",
+            resolution="Pass the previous image of a volume, named <volume>.img "
+            "when the project has several volumes, or a directory of them.",
+        )
+    return sources
+
+
+def _write_deltas(
+    images: Mapping[str, Path], delta_from: Path, dest: Path
+) -> list[Path]:
+    """Write a delta for each volume with a previous image.
+
+    :param images: the packed images, by volume name.
+    :returns: The paths of the deltas.
+    """
+    dest.mkdir(parents=True, exist_ok=True)
+    delta_paths: list[Path] = []
+    for name, source in _get_delta_sources(delta_from, images.keys()).items():
+        emit.progress(f"Writing delta of {name}.img from {source}")
+        delta_path = dest / f"{name}.img{delta.DELTA_SUFFIX}"
+        delta.generate_delta(source, images[name], delta_path)
+        delta_paths.append(delta_path)
+    return delta_paths
+
+
+def _get_volume_name(device: str) -> str:
+    """Get the volume name from a '(volume/<volume>/<structure>)' device."""
+    return device.strip("()").split("/")[1]
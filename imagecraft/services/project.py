@@ -14,16 +14,28 @@
 
 """Imagecraft Project service."""
 
+import hashlib
+import json
+import os
+import pathlib
 from typing import Any, cast
 
 import craft_cli
 import craft_platforms
+import pydantic
 from craft_application import ProjectService
 from typing_extensions import override
 
+import imagecraft
 from imagecraft import grammar
 from imagecraft.models import VolumeFilesystemsModel
 
+_CacheKey = tuple[str, str, str, str]
+"""A (project file digest, build-on, build-for, platform) tuple."""
+
+# Grammar-resolved volumes and filesystems, kept for the lifetime of the process.
+_volumes_filesystems_cache: dict[_CacheKey, VolumeFilesystemsModel] = {}
+
 
 class ImagecraftProjectService(ProjectService):
     """Imagecraft-specific project service."""
@@ -52,13 +64,93 @@ class ImagecraftProjectService(ProjectService):
         build_for: str,
         build_on: craft_platforms.DebianArchitecture,
     ) -> list[str] | None:
-        project = self._preprocess(
-            build_for=build_for, build_on=cast(str, build_on), platform=platform
+        volumes_filesystems = self.get_volumes_filesystems_for(
+            platform=platform, build_for=build_for, build_on=str(build_on)
         )
-        volumes_filesystems = VolumeFilesystemsModel.unmarshal(project)
 
         return volumes_filesystems.get_partitions()
 
+    def get_volumes_filesystems_for(
+        self, *, platform: str, build_for: str, build_on: str
+    ) -> VolumeFilesystemsModel:
+        """Get the grammar-resolved volumes and filesystems for a destination.
+
+        Results are memoized for the lifetime of the process, keyed by the digest of
+        the project file and the destination. If the ``project_cache_dir``
+        configuration item is set, results are also kept on disk between runs.
+        Each call returns a copy of the memoized model, which callers may modify.
+        """
+        key = (self._get_project_digest(), build_on, build_for, platform)
+        if (cached := _volumes_filesystems_cache.get(key)) is not None:
+            return cached.model_copy(deep=True)
+
+        cache_file = self._get_cache_file(key)
+        volumes_filesystems = (
+            _load_volumes_filesystems(cache_file) if cache_file else None
+        )
+        if volumes_filesystems is None:
+            project = self._preprocess(
+                build_for=build_for, build_on=build_on, platform=platform
+            )
+            volumes_filesystems = VolumeFilesystemsModel.unmarshal(project)
+            if cache_file:
+                _store_volumes_filesystems(cache_file, volumes_filesystems)
+
+        _volumes_filesystems_cache[key] = volumes_filesystems
+        return volumes_filesystems.model_copy(deep=True)
+
+    def _get_project_digest(self) -> str:
+        """Get the SHA-256 digest of the project file."""
+        project_path = self.resolve_project_file_path()
+        return hashlib.sha256(project_path.read_bytes()).hexdigest()
+
+    def _get_cache_file(self, key: _CacheKey) -> pathlib.Path | None:
+        """Get the on-disk cache file for a key, or None if disk caching is off."""
+        # The project service can be used standalone, without a service factory.
+        if self._services is None:  # pyright: ignore[reportUnnecessaryComparison]
+            return None
+
+        cache_dir = cast(
+            str | None, self._services.get("config").get("project_cache_dir")
+        )
+        if not cache_dir:
+            return None
+
+        hasher = hashlib.sha256(imagecraft.__version__.encode())
+        for item in key:
+            hasher.update(b"\0" + item.encode())
+        return pathlib.Path(cache_dir) / f"{hasher.hexdigest()}.json"
+
+
+def _load_volumes_filesystems(
+    cache_file: pathlib.Path,
+) -> VolumeFilesystemsModel | None:
+    """Load cached volumes and filesystems, or None if the cache can't be used."""
+    try:
+        data = json.loads(cache_file.read_text())
+        volumes_filesystems = VolumeFilesystemsModel.unmarshal(data)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, TypeError, pydantic.ValidationError) as err:
+        craft_cli.emit.debug(f"Ignoring unusable project cache {cache_file}: {err}")
+        return None
+
+    craft_cli.emit.debug(f"Using cached volumes and filesystems from {cache_file}")
+    return volumes_filesystems
+
+
+def _store_volumes_filesystems(
+    cache_file: pathlib.Path, volumes_filesystems: VolumeFilesystemsModel
+) -> None:
+    """Write volumes and filesystems to the on-disk cache, atomically."""
+    tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file.write_text(json.dumps(volumes_filesystems.marshal()))
+        tmp_file.replace(cache_file)
+    except OSError as err:
+        craft_cli.emit.debug(f"Could not write project cache {cache_file}: {err}")
+
 
 def transform_yaml(
     build_on: str, build_for: str | None, platform: str, yaml_data: dict[str, Any]
@@ -14,9 +14,25 @@
 
 """Imagecraft provider service."""
 
+import contextlib
+import pathlib
+from collections.abc import Iterator
+from typing import Any
+
+import craft_platforms
 import craft_providers
+import platformdirs
 from craft_application.services.provider import ProviderService
 from craft_cli import CraftError, emit
+from craft_providers.lxd import LXDProvider
+from craft_providers.multipass import MultipassProvider
+from typing_extensions import override
+
+from imagecraft import instance_pool
+
+# Build packages of the imagecraft plugins, installed in pooled instances when
+# they are set up so that builds of any project find them.
+_POOLED_PACKAGES = ("mmdebstrap", "eatmydata", "qemu-user-static", "zstd")
 
 
 class Provider(ProviderService):
@@ -66,3 +82,107 @@ class Provider(ProviderService):
 
         self._provider = self._get_provider_by_name(chosen_provider)
         return self._provider
+
+
+class ImagecraftProviderService(ProviderService):
+    """Imagecraft provider service, running builds in pooled instances if enabled."""
+
+    def __init__(
+        self, *args: Any, provider_name: str | None = None, **kwargs: Any
+    ) -> None:
+        super().__init__(*args, provider_name=provider_name, **kwargs)
+        self._provider_name = provider_name
+        self._pooled_instance: instance_pool.PooledInstance | None = None
+
+    def get_instance_pool(self) -> instance_pool.InstancePool | None:
+        """Get the pool of warm build instances, None if pooling is disabled."""
+        config = self._services.get("config")
+        size = int(config.get("instance_pool_size") or 0)
+        if size <= 0:
+            return None
+
+        provider = self.get_provider(name=self._provider_name)
+        backend: instance_pool.PoolBackend
+        if isinstance(provider, LXDProvider):
+            backend = instance_pool.LXDPoolBackend(
+                project=provider.lxd_project, remote=provider.lxd_remote
+            )
+        elif isinstance(provider, MultipassProvider):
+            backend = instance_pool.MultipassPoolBackend()
+        else:
+            emit.debug(f"No instance pool for provider {provider.name!r}")
+            return None
+
+        return instance_pool.InstancePool(
+            backend,
+            platformdirs.user_cache_path(self._app.name),
+            prefix=f"{self._app.name}-pool",
+            size=size,
+            idle_expiry=int(config.get("instance_pool_idle_mins")) * 60,
+        )
+
+    @override
+    @contextlib.contextmanager
+    def instance(
+        self,
+        build_info: craft_platforms.BuildInfo,
+        *,
+        work_dir: pathlib.Path,
+        clean_existing: bool = False,
+        **kwargs: Any,
+    ) -> Iterator[craft_providers.Executor]:
+        """Get a provider instance, from the instance pool if enabled.
+
+        Pooled instances are set up and snapshotted on first use, then restored
+        to their snapshot before each build. Builds that need a fresh instance, or
+        that find every pooled instance in use, get an instance of their own.
+        """
+        pool = None if clean_existing else self.get_instance_pool()
+        pooled = None
+        if pool is not None:
+            key = instance_pool.get_pool_key(
+                build_info.build_base.distribution,
+                build_info.build_base.series,
+                build_info.build_on.value,
+            )
+            pooled = pool.acquire(key)
+            if pooled is None:
+                emit.debug(f"Every pooled instance for {key!r} is in use")
+
+        if pool is None or pooled is None:
+            with super().instance(
+                build_info, work_dir=work_dir, clean_existing=clean_existing, **kwargs
+            ) as instance:
+                yield instance
+            return
+
+        try:
+            self._pooled_instance = pooled
+            if not pooled.warm:
+                emit.progress(f"Setting up pooled instance {pooled.name!r}")
+                self.packages.extend(
+                    package
+                    for package in _POOLED_PACKAGES
+                    if package not in self.packages
+                )
+                # Set up the instance without building, so that its clean state
+                # can be saved.
+                with super().instance(build_info, work_dir=work_dir, **kwargs):
+                    pass
+                pooled = self._pooled_instance = pool.mark_warm(pooled)
+            with super().instance(build_info, work_dir=work_dir, **kwargs) as instance:
+                yield instance
+        finally:
+            self._pooled_instance = None
+            pool.release(pooled)
+
+    @override
+    def _get_instance_name(
+        self,
+        work_dir: pathlib.Path,
+        build_info: craft_platforms.BuildInfo,
+        project_name: str,
+    ) -> str:
+        if self._pooled_instance is not None:
+            return self._pooled_instance.name
+        return super()._get_instance_name(work_dir, build_info, project_name)
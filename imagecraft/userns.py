@@ -0,0 +1,103 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Running imagecraft in a user namespace, for builds without root.
+
+The current user is mapped to root in the namespace, and the user's first range
+of subordinate IDs to the IDs that follow, so that the lifecycle can chown to the
+users and groups of the image. A mount namespace comes along, so that chroot
+mounts stay private to the build.
+"""
+
+import os
+import pwd
+import shutil
+import sys
+from pathlib import Path
+from typing import NoReturn
+
+from craft_cli import CraftError, emit
+
+SUBUID_PATH = Path("/etc/subuid")
+SUBGID_PATH = Path("/etc/subgid")
+
+_UID_MAP_PATH = Path("/proc/self/uid_map")
+
+
+def in_user_namespace() -> bool:
+    """Whether the process runs in a user namespace other than the initial one."""
+    try:
+        mappings = [line.split() for line in _UID_MAP_PATH.read_text().splitlines()]
+    except OSError:
+        return False
+    # The initial namespace maps the whole ID space onto itself.
+    return mappings != [["0", "0", "4294967295"]]
+
+
+def get_subordinate_range(path: Path, user_id: int) -> tuple[int, int] | None:
+    """Get the first range of subordinate IDs of a user.
+
+    :param path: /etc/subuid or /etc/subgid.
+    :param user_id: the ID of the user.
+    :returns: The first ID of the range and the number of IDs, or None if the
+        user has no subordinate IDs.
+    """
+    try:
+        names = {str(user_id), pwd.getpwuid(user_id).pw_name}
+    except KeyError:
+        names = {str(user_id)}
+    try:
+        lines = path.read_text().splitlines()
+    except OSError:
+        return None
+    for line in lines:
+        name, _, id_range = line.strip().partition(":")
+        start, _, count = id_range.partition(":")
+        if name in names and start.isdigit() and count.isdigit():
+            return int(start), int(count)
+    return None
+
+
+def reexec_in_user_namespace() -> NoReturn:
+    """Run the current command again in a new user and mount namespace.
+
+    :raises CraftError: If unshare is unavailable.
+    """
+    unshare = shutil.which("unshare")
+    if unshare is None:
+        raise CraftError(
+            "Cannot create a user namespace for a rootless build.",
+            details="unshare was not found.",
+            resolution="Install util-linux 2.38 or newer.",
+        )
+
+    args = [unshare, "--user", "--mount", "--propagation=private", "--map-root-user"]
+    uids = get_subordinate_range(SUBUID_PATH, os.getuid())
+    gids = get_subordinate_range(SUBGID_PATH, os.getuid())
+    if uids and gids:
+        args.append(f"--map-users={uids[0]},1,{uids[1]}")
+        args.append(f"--map-groups={gids[0]},1,{gids[1]}")
+    else:
+        emit.progress(
+            "Warning: no subordinate IDs in /etc/subuid and /etc/subgid, files in "
+            "the image can only be owned by root",
+            permanent=True,
+        )
+
+    command = [sys.executable, *sys.orig_argv[1:]]
+    emit.debug(f"Running in a user namespace: {[*args, '--', *command]}")
+    emit.ended_ok()
+    os.execv(unshare, [*args, "--", *command])
@@ -72,6 +72,14 @@ def enable_features(reset_features):
     Features(enable_overlay=True, enable_partitions=True)
 
 
+@pytest.fixture(autouse=True)
+def cache_home(tmp_path_factory, monkeypatch):
+    """Keep the command cache of the application out of the user's cache."""
+    cache_home = tmp_path_factory.mktemp("cache-home")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(cache_home))
+    return cache_home
+
+
 @pytest.fixture(autouse=True, scope="session")
 def setup_plugins():
     plugins.setup_plugins()
@@ -0,0 +1,93 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import mmap
+import os
+import subprocess
+
+import pytest
+from imagecraft.inspection import EntryType, compare_tree
+from imagecraft.inspection.extfs import ExtReader
+
+
+@pytest.fixture
+def content(tmp_path):
+    content = tmp_path / "content"
+    (content / "usr/lib").mkdir(parents=True)
+    (content / "etc").mkdir()
+    (content / "usr/lib/os-release").write_text("NAME=Ubuntu\n")
+    (content / "etc/os-release").symlink_to("../usr/lib/os-release")
+    (content / "long-link").symlink_to("x" * 100)
+    (content / "big").write_bytes(os.urandom(3 << 20))
+    with (content / "sparse").open("wb") as sparse:
+        sparse.truncate(1 << 20)
+        sparse.seek(512 << 10)
+        sparse.write(b"data")
+    (content / "many").mkdir(mode=0o700)
+    for index in range(300):
+        (content / "many" / f"file-{index}").touch()
+    return content
+
+
+@pytest.fixture(
+    params=[("ext4", "4096"), ("ext3", "1024"), ("ext2", "1024")],
+    ids=["ext4", "ext3-1k", "ext2-1k"],
+)
+def reader(request, tmp_path, content):
+    fstype, block_size = request.param
+    image_path = tmp_path / "fs.img"
+    with image_path.open("wb") as image_file:
+        image_file.truncate(32 << 20)
+    subprocess.run(
+        [
+            *("mke2fs", "-q", "-t", fstype, "-b", block_size, "-L", "rootfs"),
+            *("-d", content, image_path),
+        ],
+        check=True,
+    )
+    with image_path.open("rb") as image_file:
+        image = mmap.mmap(image_file.fileno(), 0, access=mmap.ACCESS_READ)
+    yield ExtReader(image, 0, len(image))
+    image.close()
+
+
+def test_ext_reader_metadata(reader, request):
+    assert reader.fstype == request.node.callspec.params["reader"][0]
+    assert reader.label == "rootfs"
+
+
+def test_ext_reader_tree(reader, content):
+    paths = {path for path, _ in reader.walk()}
+
+    expected = {f"/{p.relative_to(content)}" for p in content.rglob("*")}
+    assert paths - {"/lost+found"} == expected
+    assert oct(reader.lookup("/many").mode) == "0o40700"
+
+
+@pytest.mark.parametrize("path", ["/big", "/sparse", "/usr/lib/os-release"])
+def test_ext_reader_read(reader, content, path):
+    assert b"".join(reader.read(path)) == (content / path.lstrip("/")).read_bytes()
+
+
+def test_ext_reader_symlinks(reader):
+    assert b"".join(reader.read("/etc/os-release")) == b"NAME=Ubuntu\n"
+    long_link = reader.lookup("/long-link", follow_symlinks=False)
+    assert long_link.type == EntryType.SYMLINK
+    assert long_link.target == "x" * 100
+
+
+def test_ext_reader_matches_content(reader, content):
+    assert compare_tree(reader, content) == []
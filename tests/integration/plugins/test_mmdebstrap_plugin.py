@@ -51,3 +51,33 @@ def test_mmdebstrap_cleanup(
         path = install_dir / subdir
         if path.exists():
             assert list(path.iterdir()) == []
+
+
+@pytest.mark.slow
+@pytest.mark.requires_root
+def test_mmdebstrap_cache_dir(
+    tmp_path: Path,
+    project_path: Path,
+    custom_project_file: Path,
+    imagecraft_app: application.Imagecraft,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    """Test that cached packages are kept on the host, not in the tree."""
+    cache_dir = tmp_path / "debs"
+    custom_project_file.write_text(
+        custom_project_file.read_text().replace(
+            "    plugin: mmdebstrap\n",
+            f"    plugin: mmdebstrap\n    mmdebstrap-cache-dir: {cache_dir}\n",
+        )
+    )
+    monkeypatch.setattr(
+        "sys.argv",
+        ["imagecraft", "build", "--destructive-mode", "--verbosity", "debug"],
+    )
+    result = imagecraft_app.run()
+
+    assert result == 0
+
+    archives_dir = project_path / "parts/rootfs/install/var/cache/apt/archives"
+    assert list(archives_dir.glob("*.deb")) == []
+    assert list(cache_dir.glob("*.deb")) != []
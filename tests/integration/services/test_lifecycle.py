@@ -16,6 +16,7 @@
 import pathlib
 import re
 from typing import cast
+from unittest.mock import MagicMock
 
 import pytest
 from craft_application import ServiceFactory
@@ -42,18 +43,21 @@ def test_lifecycle_args(
 
 
 @pytest.mark.requires_root
-def test_lifecycle_prologue_hook(
+def test_lifecycle_pre_step_hook(
     lifecycle_service: ImagecraftLifecycleService, default_factory: ServiceFactory
 ):
     lifecycle_service.setup()
+    lifecycle_service._volume_parts = {"my-part"}
 
-    # The project_info is what craft-parts passes to the prologue hook
-    # We can get it from the manager after setup()
+    # The step_info craft-parts passes to the hook shares the environment of the
+    # project_info, which we can get from the manager after setup()
     project_info = lifecycle_service._lcm._project_info
+    step_info = MagicMock(global_environment=project_info.global_environment)
+    step_info.part_name = "my-part"
 
     try:
-        # Trigger the prologue hook manually for verification
-        lifecycle_service._prologue_hook(project_info)
+        # Trigger the pre-step hook manually for verification
+        lifecycle_service._pre_step_hook(step_info)
 
         # Verify environment variables
         # default_project_yaml has volume 'pc' with structures 'efi' and 'rootfs'
@@ -74,3 +78,62 @@ def test_lifecycle_prologue_hook(
 
     finally:
         cast(ImageService, default_factory.get("image")).detach_images()
+
+
+WORKING_DIRECTORY_YAML = """\
+name: default
+version: "1.0"
+summary: "default project"
+description: "default project"
+base: bare
+build-base: devel
+license: "MIT"
+
+platforms:
+  amd64:
+    build-for: [amd64]
+    build-on: [amd64]
+
+filesystems:
+  default:
+  - mount: /
+    device: (volume/pc/rootfs)
+
+volumes:
+  pc:
+    schema: gpt
+    structure:
+      - name: rootfs
+        type: 0FC63DAF-8483-4772-8E79-3D69D8477DE4
+        filesystem: ext4
+        role: system-data
+        size: 1G
+parts:
+  one:
+    plugin: nil
+    build-environment:
+      - PART: one
+    override-build: pwd > "$CRAFT_PART_INSTALL/pwd"
+  two:
+    plugin: nil
+    build-environment:
+      - PART: two
+    override-build: pwd > "$CRAFT_PART_INSTALL/pwd"
+"""
+
+
+@pytest.mark.requires_root
+@pytest.mark.parametrize("default_project_yaml", [WORKING_DIRECTORY_YAML])
+def test_lifecycle_build_working_directory(
+    lifecycle_service: ImagecraftLifecycleService,
+):
+    cwd = pathlib.Path.cwd()
+    lifecycle_service.setup()
+
+    lifecycle_service.run("build")
+
+    # Builds change the working directory, so parts run in their own processes.
+    for part in ("one", "two"):
+        part_dir = lifecycle_service._work_dir.resolve() / "parts" / part
+        assert (part_dir / "install/pwd").read_text() == f"{part_dir / 'build'}\n"
+    assert pathlib.Path.cwd() == cwd
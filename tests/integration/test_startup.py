@@ -0,0 +1,98 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Startup time regression tests."""
+
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+# Time imagecraft may add on top of a bare interpreter start for --version and
+# --help.
+STARTUP_BUDGET_SECONDS = 0.1
+RUNS = 5
+
+HEAVY_MODULES = ["craft_application", "craft_parts", "craft_providers", "pydantic"]
+
+
+def _min_runtime(*args: str, env: dict[str, str] | None = None) -> float:
+    """Return the fastest wall time of several runs, to filter out noise."""
+    runtimes: list[float] = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, *args], check=True, capture_output=True, env=env
+        )
+        runtimes.append(time.perf_counter() - start)
+    return min(runtimes)
+
+
+@pytest.fixture
+def cached_env(tmp_path):
+    """An environment where the commands were cached by a first help request."""
+    env = {**os.environ, "XDG_CACHE_HOME": str(tmp_path / "cache")}
+    subprocess.run(
+        [sys.executable, "-m", "imagecraft", "--help"],
+        check=True,
+        capture_output=True,
+        env=env,
+    )
+    return env
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        pytest.param(["--version"], id="version"),
+        pytest.param(["--help"], id="help"),
+        pytest.param(["pack", "--help"], id="command-help"),
+    ],
+)
+def test_does_not_load_application(cached_env, args):
+    script = (
+        "import sys\n"
+        f"sys.argv = ['imagecraft', *{args!r}]\n"
+        "from imagecraft import cli\n"
+        "cli.run()\n"
+        f"print(sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        check=True,
+        capture_output=True,
+        text=True,
+        env=cached_env,
+    )
+
+    assert result.stdout.splitlines()[-1] == "[]"
+
+
+@pytest.mark.slow
+def test_version_cold_start_budget():
+    baseline = _min_runtime("-c", "pass")
+    startup = _min_runtime("-m", "imagecraft", "--version")
+
+    assert startup - baseline < STARTUP_BUDGET_SECONDS
+
+
+@pytest.mark.slow
+def test_help_cold_start_budget(cached_env):
+    baseline = _min_runtime("-c", "pass", env=cached_env)
+    startup = _min_runtime("-m", "imagecraft", "--help", env=cached_env)
+
+    assert startup - baseline < STARTUP_BUDGET_SECONDS
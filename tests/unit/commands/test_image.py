@@ -0,0 +1,166 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import argparse
+import json
+import os
+
+import pytest
+from craft_cli import ArgumentParsingError
+from imagecraft.commands import ApplyDeltaCommand, AssembleImageCommand, InspectCommand
+from imagecraft.pack import chunkstore, delta
+
+
+def test_assemble_image_command(tmp_path, app_metadata, default_factory):
+    image = tmp_path / "image.img"
+    image.write_bytes(os.urandom(256 * 1024))
+    store_dir = tmp_path / "store"
+    index_path = tmp_path / "image.img.chunks.json"
+    chunkstore.chunk_image(image, store_dir).write(index_path)
+    output = tmp_path / "output.img"
+    command = AssembleImageCommand({"app": app_metadata, "services": default_factory})
+    parser = argparse.ArgumentParser()
+    command.fill_parser(parser)
+
+    command.run(
+        parser.parse_args([str(index_path), str(output), "--store", str(store_dir)])
+    )
+
+    assert output.read_bytes() == image.read_bytes()
+
+
+def test_assemble_image_command_seeds(app_metadata, default_factory):
+    command = AssembleImageCommand({"app": app_metadata, "services": default_factory})
+    parser = argparse.ArgumentParser()
+    command.fill_parser(parser)
+
+    args = parser.parse_args(
+        ["index", "out.img", "--store", "store", "--seed", "a.img", "--seed", "b.img"]
+    )
+
+    assert [str(seed) for seed in args.seeds] == ["a.img", "b.img"]
+
+
+def test_apply_delta_command(tmp_path, app_metadata, default_factory, mocker):
+    source = tmp_path / "source.img"
+    source.write_bytes(os.urandom(64 * 1024))
+    target = tmp_path / "target.img"
+    target.write_bytes(source.read_bytes()[:32768] + os.urandom(32768))
+    mocker.patch.object(delta, "_read_partition_extents", return_value={})
+    delta_path = tmp_path / "target.img.delta"
+    delta.generate_delta(source, target, delta_path)
+    output = tmp_path / "output.img"
+    command = ApplyDeltaCommand({"app": app_metadata, "services": default_factory})
+    parser = argparse.ArgumentParser()
+    command.fill_parser(parser)
+
+    command.run(parser.parse_args([str(delta_path), str(source), str(output)]))
+
+    assert output.read_bytes() == target.read_bytes()
+
+
+@pytest.fixture
+def inspect_image(make_gpt_image, make_fat):
+    return make_gpt_image(
+        [("efi", make_fat({"EFI": {"BOOT": {"grub.cfg": b"set timeout=5\n"}}}))]
+    )
+
+
+def _run_inspect(app_metadata, default_factory, *args: str) -> None:
+    command = InspectCommand({"app": app_metadata, "services": default_factory})
+    parser = argparse.ArgumentParser()
+    command.fill_parser(parser)
+    command.run(parser.parse_args(list(args)))
+
+
+def test_inspect_command_partitions(
+    app_metadata, default_factory, inspect_image, mocker
+):
+    mock_emit = mocker.patch("imagecraft.commands.image.emit")
+
+    _run_inspect(app_metadata, default_factory, str(inspect_image), "--format=json")
+
+    info = json.loads(mock_emit.message.call_args.args[0])
+    assert info["schema"] == "gpt"
+    assert info["partitions"][0]["name"] == "efi"
+    assert info["partitions"][0]["filesystem"] == {
+        "type": "fat16",
+        "label": "EFI",
+        "uuid": "1234-ABCD",
+    }
+
+
+def test_inspect_command_partitions_table(
+    app_metadata, default_factory, inspect_image, mocker
+):
+    mock_emit = mocker.patch("imagecraft.commands.image.emit")
+
+    _run_inspect(app_metadata, default_factory, str(inspect_image))
+
+    table = mock_emit.message.call_args.args[0].splitlines()
+    assert table[0].split() == [
+        *("Number", "Name", "Offset", "Size", "Type", "Filesystem", "Label")
+    ]
+    assert table[1].split()[:2] == ["1", "efi"]
+    assert table[1].split()[-2:] == ["fat16", "EFI"]
+
+
+def test_inspect_command_list(app_metadata, default_factory, inspect_image, mocker):
+    mock_emit = mocker.patch("imagecraft.commands.image.emit")
+
+    _run_inspect(app_metadata, default_factory, str(inspect_image), "efi", "/efi/boot")
+
+    (listing,) = mock_emit.message.call_args.args[0].splitlines()
+    assert listing.startswith("-rw-r--r--")
+    assert listing.endswith(" 2024-01-02 03:04 grub.cfg")
+
+
+def test_inspect_command_cat(
+    app_metadata, default_factory, inspect_image, capsysbinary
+):
+    _run_inspect(
+        app_metadata,
+        default_factory,
+        str(inspect_image),
+        "1",
+        "/EFI/BOOT/grub.cfg",
+        "--cat",
+    )
+
+    assert capsysbinary.readouterr().out == b"set timeout=5\n"
+
+
+def test_inspect_command_extract(
+    app_metadata, default_factory, inspect_image, tmp_path
+):
+    dest = tmp_path / "efi"
+
+    _run_inspect(
+        app_metadata,
+        default_factory,
+        str(inspect_image),
+        "efi",
+        "/",
+        "--extract",
+        str(dest),
+    )
+
+    assert (dest / "EFI/BOOT/grub.cfg").read_text() == "set timeout=5\n"
+
+
+def test_inspect_command_cat_needs_path(app_metadata, default_factory, inspect_image):
+    with pytest.raises(ArgumentParsingError, match="need a path"):
+        _run_inspect(app_metadata, default_factory, str(inspect_image), "efi", "--cat")
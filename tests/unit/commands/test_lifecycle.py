@@ -0,0 +1,81 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import argparse
+from pathlib import Path
+
+import pytest
+from craft_application.commands import lifecycle
+from craft_cli import ArgumentParsingError
+from imagecraft.commands import PackCommand
+
+
+def test_pack_command_delta_from(app_metadata, default_factory, mocker):
+    mock_run_real = mocker.patch.object(lifecycle.PackCommand, "_run_real")
+    mock_set_delta_from = mocker.patch.object(
+        default_factory.get("package"), "set_delta_from", create=True
+    )
+    command = PackCommand({"app": app_metadata, "services": default_factory})
+    parser = argparse.ArgumentParser()
+    command._fill_parser(parser)
+    parsed_args = parser.parse_args(["--delta-from", "previous.img"])
+
+    command._run_real(parsed_args)
+
+    mock_set_delta_from.assert_called_once_with(Path("previous.img").resolve())
+    mock_run_real.assert_called_once_with(parsed_args, None)
+
+
+def test_pack_command_no_delta(app_metadata, default_factory, mocker):
+    mocker.patch.object(lifecycle.PackCommand, "_run_real")
+    mock_set_delta_from = mocker.patch.object(
+        default_factory.get("package"), "set_delta_from", create=True
+    )
+    command = PackCommand({"app": app_metadata, "services": default_factory})
+    parser = argparse.ArgumentParser()
+    command._fill_parser(parser)
+
+    command._run_real(parser.parse_args([]))
+
+    mock_set_delta_from.assert_not_called()
+
+
+def test_pack_command_delta_from_managed(app_metadata, default_factory, mocker):
+    mock_run = mocker.patch.object(lifecycle.PackCommand, "_run")
+    command = PackCommand({"app": app_metadata, "services": default_factory})
+    parser = argparse.ArgumentParser()
+    command._fill_parser(parser)
+    parsed_args = parser.parse_args(["--delta-from", "previous.img"])
+
+    with pytest.raises(ArgumentParsingError, match="--destructive-mode"):
+        command._run(parsed_args)
+
+    # The build never reaches the managed instance.
+    mock_run.assert_not_called()
+
+
+def test_pack_command_delta_from_destructive(app_metadata, default_factory, mocker):
+    mock_run = mocker.patch.object(lifecycle.PackCommand, "_run")
+    command = PackCommand({"app": app_metadata, "services": default_factory})
+    parser = argparse.ArgumentParser()
+    command._fill_parser(parser)
+    parsed_args = parser.parse_args(
+        ["--delta-from", "previous.img", "--destructive-mode"]
+    )
+
+    command._run(parsed_args)
+
+    mock_run.assert_called_once_with(parsed_args, None)
@@ -0,0 +1,223 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Builders of small disk images, for tests of the in-process image readers."""
+
+import struct
+import uuid
+import zlib
+from collections.abc import Callable, Mapping
+from pathlib import Path
+
+import pytest
+
+LINUX_FILESYSTEM_GUID = "0FC63DAF-8483-4772-8E79-3D69D8477DE4"
+
+_SECTOR = 512
+_FAT_TOTAL_SECTORS = 8192
+_FAT_SECTORS = 32
+_FAT_ROOT_ENTRIES = 512
+_FAT_DATA_SECTOR = 1 + _FAT_SECTORS + _FAT_ROOT_ENTRIES * 32 // _SECTOR
+# 2024-01-02 03:04:10
+FAT_DATE = (2024 - 1980) << 9 | 1 << 5 | 2
+FAT_TIME = 3 << 11 | 4 << 5 | 10 // 2
+
+FatTree = Mapping[str, "bytes | FatTree"]
+
+
+def _short_name_checksum(short: bytes) -> int:
+    checksum = 0
+    for byte in short:
+        checksum = ((checksum >> 1) | (checksum & 1) << 7) + byte & 0xFF
+    return checksum
+
+
+def _fat_dirents(name: str, index: int, attr: int, cluster: int, size: int) -> bytes:
+    """Make the directory entries of a file, with a long name unless it is 8.3."""
+    base, _, ext = name.partition(".")
+    is_short = name == name.upper() and len(base) <= 8 and len(ext) <= 3
+    if is_short:
+        short = base.ljust(8).encode() + ext.ljust(3).encode()
+    else:
+        short = f"F{index:07d}".encode() + b"   "
+    entry = bytearray(32)
+    entry[0:11] = short
+    entry[11] = attr
+    struct.pack_into(
+        "<HHHHI", entry, 20, cluster >> 16, FAT_TIME, FAT_DATE, cluster & 0xFFFF, size
+    )
+    if is_short:
+        return bytes(entry)
+
+    units = name.encode("utf-16-le") + b"\0\0"
+    units += b"\xff" * (-len(units) % 26)
+    chunks = [units[i : i + 26] for i in range(0, len(units), 26)]
+    long_entries = []
+    for number, chunk in enumerate(chunks, start=1):
+        long_entry = bytearray(32)
+        long_entry[0] = number | (0x40 if number == len(chunks) else 0)
+        long_entry[1:11] = chunk[:10]
+        long_entry[11] = 0x0F
+        long_entry[13] = _short_name_checksum(short)
+        long_entry[14:26] = chunk[10:22]
+        long_entry[28:32] = chunk[22:26]
+        long_entries.append(bytes(long_entry))
+    return b"".join(reversed(long_entries)) + bytes(entry)
+
+
+class _FatBuilder:
+    def __init__(self) -> None:
+        self.image = bytearray(_FAT_TOTAL_SECTORS * _SECTOR)
+        self.fat = [0xFFF8, 0xFFFF]
+        self.index = 0
+
+    def allocate(self, data: bytes) -> int:
+        if not data:
+            return 0
+        first = len(self.fat)
+        count = -(-len(data) // _SECTOR)
+        for cluster in range(first, first + count):
+            self.fat.append(cluster + 1)
+            offset = (_FAT_DATA_SECTOR + cluster - 2) * _SECTOR
+            chunk = data[(cluster - first) * _SECTOR : (cluster - first + 1) * _SECTOR]
+            self.image[offset : offset + len(chunk)] = chunk
+        self.fat[-1] = 0xFFFF
+        return first
+
+    def directory(self, tree: FatTree) -> bytes:
+        dirents = b""
+        for name, content in tree.items():
+            self.index += 1
+            if isinstance(content, bytes):
+                attr = 0x01 if name.startswith("readonly") else 0x20
+                cluster = self.allocate(content)
+                dirents += _fat_dirents(name, self.index, attr, cluster, len(content))
+            else:
+                cluster = self.allocate(self.directory(content))
+                dirents += _fat_dirents(name, self.index, 0x10, cluster, 0)
+        return dirents
+
+    def build(self, tree: FatTree) -> bytes:
+        # A volume label and a deleted file precede the root directory entries.
+        label = bytearray(32)
+        label[0:11] = b"ROOTLABEL  "
+        label[11] = 0x08
+        deleted = bytearray(_fat_dirents("DELETED.TXT", 0, 0x20, 0, 0))
+        deleted[0] = 0xE5
+        root = bytes(label) + bytes(deleted) + self.directory(tree)
+        root_offset = (1 + _FAT_SECTORS) * _SECTOR
+        self.image[root_offset : root_offset + len(root)] = root
+
+        boot = bytearray(_SECTOR)
+        boot[0:3] = b"\xeb\x3c\x90"
+        boot[3:11] = b"mkfs.fat"
+        struct.pack_into(
+            "<HBHBHHBHHHII",
+            boot,
+            11,
+            _SECTOR,
+            1,
+            1,
+            1,
+            _FAT_ROOT_ENTRIES,
+            _FAT_TOTAL_SECTORS,
+            0xF8,
+            _FAT_SECTORS,
+            32,
+            64,
+            0,
+            0,
+        )
+        boot[36] = 0x80
+        boot[38] = 0x29
+        struct.pack_into("<I", boot, 39, 0x1234ABCD)
+        boot[43:54] = b"EFI        "
+        boot[54:62] = b"FAT16   "
+        boot[510:512] = b"\x55\xaa"
+        self.image[0:_SECTOR] = boot
+        struct.pack_into(f"<{len(self.fat)}H", self.image, _SECTOR, *self.fat)
+        return bytes(self.image)
+
+
+@pytest.fixture
+def make_fat() -> Callable[[FatTree], bytes]:
+    """Build a 4 MiB FAT16 filesystem holding a tree of files.
+
+    Names that aren't upper-case 8.3 names get long file name entries. Files whose
+    name starts with 'readonly' are read-only.
+    """
+    return lambda tree: _FatBuilder().build(tree)
+
+
+@pytest.fixture
+def make_gpt_image(tmp_path) -> Callable[..., Path]:
+    """Write a GPT disk image holding the given (name, filesystem) partitions."""
+
+    def make(partitions: list[tuple[str, bytes]], *, size: int = 32 << 20) -> Path:
+        path = tmp_path / "disk.img"
+        entries = bytearray(128 * 128)
+        lba = 2048
+        with path.open("wb") as image:
+            image.truncate(size)
+            for index, (name, data) in enumerate(partitions):
+                sectors = -(-len(data) // _SECTOR)
+                struct.pack_into(
+                    "<16s16sQQQ72s",
+                    entries,
+                    index * 128,
+                    uuid.UUID(LINUX_FILESYSTEM_GUID).bytes_le,
+                    uuid.UUID(int=index + 1).bytes_le,
+                    lba,
+                    lba + sectors - 1,
+                    0,
+                    name.encode("utf-16-le"),
+                )
+                image.seek(lba * _SECTOR)
+                image.write(data)
+                lba += sectors
+
+            header = bytearray(92)
+            struct.pack_into(
+                "<8sIIIIQQQQ16sQIII",
+                header,
+                0,
+                b"EFI PART",
+                0x10000,
+                92,
+                0,
+                0,
+                1,
+                size // _SECTOR - 1,
+                34,
+                size // _SECTOR - 34,
+                uuid.UUID(int=0xD15C).bytes_le,
+                2,
+                128,
+                128,
+                zlib.crc32(entries),
+            )
+            struct.pack_into("<I", header, 16, zlib.crc32(header))
+            mbr = bytearray(_SECTOR)
+            mbr[446 + 4] = 0xEE
+            struct.pack_into("<II", mbr, 446 + 8, 1, size // _SECTOR - 1)
+            mbr[510:512] = b"\x55\xaa"
+            image.seek(0)
+            image.write(mbr + header)
+            image.seek(2 * _SECTOR)
+            image.write(entries)
+        return path
+
+    return make
@@ -0,0 +1,158 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import mmap
+import struct
+
+import pytest
+from imagecraft.errors import InspectError, PartitionError
+from imagecraft.inspection import DiskImage
+from imagecraft.inspection.fatfs import FatReader
+from imagecraft.models.volume import PartitionSchema
+
+MiB = 1 << 20
+
+
+def _mbr_entry(sector: bytearray, slot: int, part_type: int, start: int, count: int):
+    offset = 446 + 16 * slot
+    sector[offset + 4] = part_type
+    struct.pack_into("<II", sector, offset + 8, start, count)
+    sector[510:512] = b"\x55\xaa"
+
+
+@pytest.fixture
+def mbr_image(tmp_path):
+    """An MBR image with two primary and two logical partitions."""
+    path = tmp_path / "mbr.img"
+    mbr = bytearray(512)
+    struct.pack_into("<I", mbr, 440, 0xDEADBEEF)
+    _mbr_entry(mbr, 0, 0x0C, 2048, 2048)
+    _mbr_entry(mbr, 1, 0x83, 4096, 2048)
+    _mbr_entry(mbr, 2, 0x05, 6144, 8192)
+    first_ebr = bytearray(512)
+    _mbr_entry(first_ebr, 0, 0x83, 2048, 1024)
+    _mbr_entry(first_ebr, 1, 0x05, 4096, 4096)
+    second_ebr = bytearray(512)
+    _mbr_entry(second_ebr, 0, 0x83, 2048, 1024)
+    with path.open("wb") as image:
+        image.truncate(8 * MiB)
+        image.write(mbr)
+        image.seek(6144 * 512)
+        image.write(first_ebr)
+        image.seek((6144 + 4096) * 512)
+        image.write(second_ebr)
+    return path
+
+
+def test_disk_image_gpt(make_gpt_image, make_fat):
+    path = make_gpt_image([("efi", make_fat({})), ("data", b"\0" * MiB)])
+
+    with DiskImage(path) as image:
+        table = image.partition_table
+
+    assert table.schema == PartitionSchema.GPT
+    assert table.sector_size == 512
+    assert table.disk_id == "00000000-0000-0000-0000-00000000D15C"
+    assert [(p.number, p.name, p.offset, p.size) for p in table.partitions] == [
+        (1, "efi", MiB, 4 * MiB),
+        (2, "data", 5 * MiB, MiB),
+    ]
+    assert table.partitions[0].type == "0FC63DAF-8483-4772-8E79-3D69D8477DE4"
+    assert table.partitions[0].uuid == "00000000-0000-0000-0000-000000000001"
+
+
+def test_disk_image_hybrid(make_gpt_image):
+    path = make_gpt_image([("data", b"\0" * MiB)])
+    with path.open("r+b") as image:
+        mbr = bytearray(image.read(512))
+        _mbr_entry(mbr, 1, 0x83, 2048, 2048)
+        image.seek(0)
+        image.write(mbr)
+
+    with DiskImage(path) as image:
+        assert image.partition_table.schema == PartitionSchema.HYBRID
+
+
+def test_disk_image_gpt_corrupt(make_gpt_image):
+    path = make_gpt_image([("data", b"\0" * MiB)])
+    with path.open("r+b") as image:
+        image.seek(512 + 40)
+        image.write(b"\xff")
+
+    with pytest.raises(PartitionError, match="bad header checksum"):
+        DiskImage(path)
+
+
+def test_disk_image_mbr(mbr_image):
+    with DiskImage(mbr_image) as image:
+        table = image.partition_table
+
+    assert table.schema == PartitionSchema.MBR
+    assert table.disk_id == "0xdeadbeef"
+    assert [
+        (p.number, p.type, p.offset // 512, p.size // 512) for p in table.partitions
+    ] == [
+        (1, "0C", 2048, 2048),
+        (2, "83", 4096, 2048),
+        (3, "05", 6144, 8192),
+        (5, "83", 6144 + 2048, 1024),
+        (6, "83", 6144 + 4096 + 2048, 1024),
+    ]
+
+
+def test_disk_image_no_partition_table(tmp_path, mocker):
+    path = tmp_path / "empty.img"
+    path.write_bytes(bytes(MiB))
+    spy_mmap = mocker.spy(mmap, "mmap")
+
+    with pytest.raises(PartitionError, match="No partition table found"):
+        DiskImage(path)
+
+    # The image isn't left mapped when it can't be parsed.
+    assert spy_mmap.spy_return.closed
+
+
+def test_disk_image_missing(tmp_path):
+    with pytest.raises(InspectError, match="Cannot open image"):
+        DiskImage(tmp_path / "missing.img")
+
+
+@pytest.mark.parametrize(("key", "number"), [("efi", 1), ("2", 2), ("1", 1)])
+def test_get_partition(make_gpt_image, key, number):
+    path = make_gpt_image([("efi", b"\0" * MiB), ("data", b"\0" * MiB)])
+
+    with DiskImage(path) as image:
+        assert image.get_partition(key).number == number
+
+
+def test_get_partition_missing(make_gpt_image):
+    path = make_gpt_image([("efi", b"\0" * MiB)])
+
+    with DiskImage(path) as image, pytest.raises(InspectError, match="No partition"):
+        image.get_partition("rootfs")
+
+
+def test_open_filesystem(make_gpt_image, make_fat):
+    path = make_gpt_image([("efi", make_fat({"A.TXT": b"a"})), ("data", bytes(MiB))])
+
+    with DiskImage(path) as image:
+        efi, data = image.partition_table.partitions
+        filesystem = image.open_filesystem(efi)
+        assert isinstance(filesystem, FatReader)
+        assert b"".join(filesystem.read("/a.txt")) == b"a"
+        assert image.detect_filesystem(data) is None
+        with pytest.raises(InspectError, match="holds no supported filesystem"):
+            image.open_filesystem(data)
@@ -0,0 +1,103 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import mmap
+
+import pytest
+from imagecraft.errors import InspectError
+from imagecraft.inspection import EntryType, fatfs
+
+BIG_FILE = bytes(range(256)) * 9  # Spans several clusters.
+
+
+@pytest.fixture
+def reader(tmp_path, make_fat):
+    image_path = tmp_path / "fat.img"
+    image_path.write_bytes(
+        make_fat(
+            {
+                "README.TXT": b"short name\n",
+                "grubx64.efi": BIG_FILE,
+                "readonly.cfg": b"",
+                "EFI": {
+                    "BOOT": {"BOOTX64.EFI": b"shim"},
+                    **{f"entry-{i}.conf": b"x" for i in range(20)},
+                },
+            }
+        )
+    )
+    with image_path.open("rb") as image_file:
+        image = mmap.mmap(image_file.fileno(), 0, access=mmap.ACCESS_READ)
+    yield fatfs.FatReader(image, 0, len(image))
+    image.close()
+
+
+def test_fat_reader_metadata(reader):
+    assert (reader.fstype, reader.label, reader.uuid) == ("fat16", "EFI", "1234-ABCD")
+
+
+def test_fat_reader_listdir(reader):
+    entries = reader.listdir("/")
+
+    # The volume label and the deleted file aren't listed.
+    assert [(e.name, e.type) for e in entries] == [
+        ("EFI", EntryType.DIRECTORY),
+        ("README.TXT", EntryType.FILE),
+        ("grubx64.efi", EntryType.FILE),
+        ("readonly.cfg", EntryType.FILE),
+    ]
+    assert [oct(e.mode) for e in entries] == [
+        "0o40755",
+        "0o100644",
+        "0o100644",
+        "0o100444",
+    ]
+    assert entries[1].mtime == 1704164650  # 2024-01-02 03:04:10
+
+
+def test_fat_reader_multi_cluster_directory(reader):
+    names = [e.name for e in reader.listdir("/EFI")]
+
+    assert len(names) == 21
+    assert "entry-19.conf" in names
+
+
+@pytest.mark.parametrize(
+    ("path", "content"),
+    [
+        ("/README.TXT", b"short name\n"),
+        ("/grubx64.efi", BIG_FILE),
+        ("/readonly.cfg", b""),
+        ("/efi/boot/bootx64.efi", b"shim"),
+    ],
+)
+def test_fat_reader_read(reader, path, content):
+    assert b"".join(reader.read(path)) == content
+
+
+def test_fat_reader_truncated_file(reader, mocker):
+    entry = reader.lookup("/grubx64.efi")
+    mocker.patch.object(reader, "_chain", return_value=iter([entry.ref]))
+
+    with pytest.raises(InspectError, match="is truncated"):
+        b"".join(reader.read_entry(entry))
+
+
+def test_is_fat(tmp_path, make_fat):
+    image = make_fat({})
+
+    assert fatfs.is_fat(image, 0)
+    assert not fatfs.is_fat(bytes(len(image)), 0)
@@ -0,0 +1,184 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import itertools
+import mmap
+from collections.abc import Iterator
+
+import pytest
+from imagecraft.errors import InspectError
+from imagecraft.inspection import Entry, EntryType, FilesystemReader
+
+_refs = itertools.count(1)
+
+
+def _file(name: str, content: bytes, mode: int = 0o100644) -> tuple[Entry, bytes]:
+    entry = Entry(name, EntryType.FILE, len(content), mode, 0, 0, 1000, ref=next(_refs))
+    return entry, content
+
+
+def _dir(name: str, children: list, mode: int = 0o40755) -> tuple[Entry, list]:
+    entry = Entry(name, EntryType.DIRECTORY, 0, mode, 0, 0, 2000, ref=next(_refs))
+    return entry, children
+
+
+def _link(name: str, target: str) -> tuple[Entry, None]:
+    entry = Entry(
+        name, EntryType.SYMLINK, len(target), 0o120777, 0, 0, 0, target, next(_refs)
+    )
+    return entry, None
+
+
+class FakeReader(FilesystemReader):
+    """A filesystem held in memory."""
+
+    fstype = "fake"
+    label = ""
+    uuid = ""
+
+    def __init__(self, root: tuple[Entry, list]) -> None:
+        super().__init__(mmap.mmap(-1, 1), 0, 0)
+        self._root = root[0]
+        self._children: dict[int, list[Entry]] = {}
+        self._content: dict[int, bytes] = {}
+        self._add(root)
+
+    def _add(self, node: tuple[Entry, object]) -> None:
+        entry, data = node
+        if isinstance(data, list):
+            self._children[entry.ref] = [child for child, _ in data]
+            for child in data:
+                self._add(child)
+        elif isinstance(data, bytes):
+            self._content[entry.ref] = data
+
+    def root(self) -> Entry:
+        return self._root
+
+    def _list(self, directory: Entry) -> list[Entry]:
+        return self._children[directory.ref]
+
+    def _read(self, entry: Entry) -> Iterator[bytes]:
+        yield self._content[entry.ref]
+
+
+@pytest.fixture
+def reader():
+    return FakeReader(
+        _dir(
+            "/",
+            [
+                _dir(
+                    "usr",
+                    [
+                        _dir("lib", [_file("os-release", b"NAME=Ubuntu\n")]),
+                        _dir("sbin", [_file("init", b"#!", 0o100755)]),
+                    ],
+                ),
+                _dir("etc", [_link("os-release", "../usr/lib/os-release")]),
+                _link("lib", "/usr/lib"),
+                _link("loop", "loop"),
+                _link("dangling", "nowhere"),
+                _dir("private", [_file("secret", b"s", 0o100600)], 0o40500),
+            ],
+        )
+    )
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "/usr/lib/os-release",
+        "usr/lib/os-release",
+        "/usr/./lib/../lib/os-release",
+        "/../usr/lib/os-release",
+        "/etc/os-release",
+        "/lib/os-release",
+    ],
+)
+def test_read_paths(reader, path):
+    assert b"".join(reader.read(path)) == b"NAME=Ubuntu\n"
+
+
+def test_lookup_no_follow(reader):
+    entry = reader.lookup("/etc/os-release", follow_symlinks=False)
+
+    assert entry.type == EntryType.SYMLINK
+    assert entry.target == "../usr/lib/os-release"
+
+
+@pytest.mark.parametrize(
+    ("path", "message"),
+    [
+        ("/missing", "No such file or directory"),
+        ("/dangling", "No such file or directory"),
+        ("/usr/lib/os-release/x", "Not a directory"),
+        ("/loop", "Too many levels of symbolic links"),
+    ],
+)
+def test_lookup_errors(reader, path, message):
+    with pytest.raises(InspectError, match=message):
+        reader.lookup(path)
+
+
+def test_listdir(reader):
+    assert [e.name for e in reader.listdir("/lib")] == ["os-release"]
+
+    with pytest.raises(InspectError, match="Not a directory"):
+        reader.listdir("/usr/lib/os-release")
+
+
+def test_read_not_a_file(reader):
+    with pytest.raises(InspectError, match="Not a regular file"):
+        reader.read("/usr")
+
+
+def test_walk(reader):
+    assert [path for path, _ in reader.walk("/usr")] == [
+        "/usr/lib",
+        "/usr/lib/os-release",
+        "/usr/sbin",
+        "/usr/sbin/init",
+    ]
+
+
+def test_extract_directory(reader, tmp_path):
+    dest = tmp_path / "out"
+
+    reader.extract("/", dest)
+
+    assert (dest / "usr/lib/os-release").read_bytes() == b"NAME=Ubuntu\n"
+    assert str((dest / "etc/os-release").readlink()) == "../usr/lib/os-release"
+    assert (dest / "usr/sbin/init").stat().st_mode == 0o100755
+    assert (dest / "private").stat().st_mode == 0o40500
+    assert (dest / "private/secret").read_bytes() == b"s"
+    assert (dest / "usr").stat().st_mtime == 2000
+    (dest / "private").chmod(0o700)
+
+
+def test_extract_file(reader, tmp_path):
+    dest = tmp_path / "init"
+
+    reader.extract("/usr/sbin/init", dest)
+
+    assert dest.read_bytes() == b"#!"
+    assert dest.stat().st_mode == 0o100755
+    assert dest.stat().st_mtime == 1000
+
+
+def test_read_bytes_out_of_bounds(reader):
+    with pytest.raises(InspectError, match="out of bounds"):
+        reader._read_bytes(0, 1)
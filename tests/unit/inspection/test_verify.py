@@ -0,0 +1,193 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import dataclasses
+import mmap
+import os
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+from imagecraft.inspection import (
+    Difference,
+    Entry,
+    EntryType,
+    FilesystemReader,
+    compare_tree,
+    fatfs,
+)
+
+
+class SnapshotReader(FilesystemReader):
+    """A filesystem holding a copy of a directory, as taken on creation."""
+
+    fstype = "snapshot"
+    label = ""
+    uuid = ""
+
+    def __init__(self, path: Path) -> None:
+        super().__init__(mmap.mmap(-1, 1), 0, 0)
+        self._children: dict[int, list[Entry]] = {}
+        self._content: dict[int, bytes] = {}
+        self._paths: dict[str, tuple[int, int]] = {}
+        self._root = self._snapshot(path, "", ref=0)
+
+    def _snapshot(self, path: Path, name: str, ref: int) -> Entry:
+        st = path.lstat()
+        entry_type, target = EntryType.OTHER, None
+        if path.is_symlink():
+            entry_type, target = EntryType.SYMLINK, str(path.readlink())
+        elif path.is_dir():
+            entry_type = EntryType.DIRECTORY
+            self._children[ref] = []
+            for index, child in enumerate(sorted(path.iterdir())):
+                child_ref = ref * 100 + index + 1
+                self._paths[str(child)] = (ref, index)
+                self._children[ref].append(self._snapshot(child, child.name, child_ref))
+        elif path.is_file():
+            entry_type = EntryType.FILE
+            self._content[ref] = path.read_bytes()
+        return Entry(
+            name,
+            entry_type,
+            st.st_size,
+            st.st_mode,
+            st.st_uid,
+            st.st_gid,
+            int(st.st_mtime),
+            target,
+            ref,
+        )
+
+    def replace(self, path: Path, **changes: object) -> None:
+        """Change the metadata of the entry taken from a path."""
+        parent, index = self._paths[str(path)]
+        siblings = self._children[parent]
+        siblings[index] = dataclasses.replace(siblings[index], **changes)
+
+    def root(self) -> Entry:
+        return self._root
+
+    def _list(self, directory: Entry) -> list[Entry]:
+        return self._children[directory.ref]
+
+    def _read(self, entry: Entry) -> Iterator[bytes]:
+        yield self._content[entry.ref]
+
+
+@pytest.fixture
+def content_dir(tmp_path):
+    content = tmp_path / "prime"
+    (content / "etc/default").mkdir(parents=True)
+    (content / "etc/hostname").write_text("ubuntu\n")
+    (content / "etc/shadow").write_text("root:*:19000::::::\n")
+    (content / "etc/shadow").chmod(0o640)
+    (content / "etc/empty").touch()
+    (content / "etc/os-release").symlink_to("../usr/lib/os-release")
+    (content / "usr/lib").mkdir(parents=True)
+    (content / "usr/lib/os-release").write_text("NAME=Ubuntu\n")
+    return content
+
+
+def test_compare_tree_identical(content_dir):
+    reader = SnapshotReader(content_dir)
+
+    assert compare_tree(reader, content_dir) == []
+
+
+def test_compare_tree_ignores_extra_entries(content_dir):
+    (content_dir / "lost+found").mkdir()
+    reader = SnapshotReader(content_dir)
+    (content_dir / "lost+found").rmdir()
+
+    assert compare_tree(reader, content_dir) == []
+
+
+def test_compare_tree_differences(content_dir):
+    reader = SnapshotReader(content_dir)
+    (content_dir / "etc/hostname").write_text("debian\n")
+    (content_dir / "etc/empty").write_text("data")
+    (content_dir / "etc/shadow").chmod(0o644)
+    (content_dir / "etc/os-release").unlink()
+    (content_dir / "etc/os-release").symlink_to("/usr/lib/os-release")
+    (content_dir / "usr/lib/os-release").unlink()
+    (content_dir / "usr/lib/os-release").mkdir()
+    (content_dir / "usr/share").mkdir()
+    os.mkfifo(content_dir / "usr/share/fifo")
+
+    assert [str(d) for d in compare_tree(reader, content_dir)] == [
+        "/etc/empty: size is 0 instead of 4",
+        "/etc/hostname: content differs",
+        (
+            "/etc/os-release: symlink target is '../usr/lib/os-release' instead of "
+            "'/usr/lib/os-release'"
+        ),
+        "/etc/shadow: mode is 0640 instead of 0644",
+        "/usr/lib/os-release: is a file instead of a directory",
+        "/usr/share: missing from the image",
+        "/usr/share/fifo: missing from the image",
+    ]
+
+
+def test_compare_tree_ownership(content_dir):
+    reader = SnapshotReader(content_dir)
+    st = (content_dir / "etc/shadow").stat()
+    reader.replace(content_dir / "etc/shadow", gid=st.st_gid + 1)
+
+    assert compare_tree(reader, content_dir) == [
+        Difference(
+            "/etc/shadow",
+            f"owner is {st.st_uid}:{st.st_gid + 1} instead of {st.st_uid}:{st.st_gid}",
+        )
+    ]
+
+
+def test_compare_tree_skip(content_dir):
+    reader = SnapshotReader(content_dir)
+    (content_dir / "etc/hostname").write_text("debian\n")
+    (content_dir / "etc/default/grub").write_text("GRUB_TIMEOUT=0\n")
+
+    assert compare_tree(reader, content_dir, skip=["/etc/default"]) == [
+        Difference("/etc/hostname", "content differs")
+    ]
+
+
+def test_compare_tree_fat(tmp_path, make_fat):
+    image = make_fat(
+        {
+            "EFI": {"BOOT": {"BOOTX64.EFI": b"shim"}},
+            "grub.cfg": b"set timeout=0\n",
+            "readonly.txt": b"",
+        }
+    )
+    fat = mmap.mmap(-1, len(image))
+    fat.write(image)
+    reader = fatfs.FatReader(fat, 0, len(fat))
+    content = tmp_path / "esp"
+    (content / "efi/boot").mkdir(parents=True)
+    (content / "efi/boot/bootx64.efi").write_bytes(b"shim")
+    (tmp_path / "grub.cfg").write_text("set timeout=0\n")
+    (content / "grub.cfg").symlink_to(tmp_path / "grub.cfg")
+    (content / "readonly.txt").touch(mode=0o600)
+    (content / "dangling").symlink_to(tmp_path / "missing")
+    os.mkfifo(content / "fifo")
+
+    # Names are case-insensitive, symlinks are compared with their target, and
+    # modes aren't compared.
+    assert [str(d) for d in compare_tree(reader, content)] == [
+        "/dangling: missing from the image",
+        "/fifo: missing from the image",
+    ]
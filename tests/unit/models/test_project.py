@@ -376,10 +376,6 @@ volumes:
 @pytest.mark.parametrize(
     ("error_value", "yaml_data"),
     [
-        (
-            "Bad myproject.yaml content:\n- dictionary should have at most 1 item after validation, not 2 (in field 'volumes', input: {'pc': {'schema': 'gpt', 'structure': [{'name': 'efi', 'role': 'system-boot', 'type': 'C12A7328-F81F-11D2-BA4B-00A0C93EC93B', 'filesystem': 'vfat', 'size': '500M'}]}, 'pc2': {'schema': 'gpt', 'structure': [{'name': 'efi', 'role': 'system-boot', 'type': 'C12A7328-F81F-11D2-BA4B-00A0C93EC93B', 'filesystem': 'vfat', 'size': '500M'}]}})",
-            IMAGECRAFT_YAML_MULTIPLE_VOLUMES,
-        ),
         (
             "Bad myproject.yaml content:\n- volume names must only contain lowercase letters, numbers, and hyphens, and may not begin or end with a hyphen. (in field 'volumes.invalid_test-.[key]', input: 'invalid_test-')",
             IMAGECRAFT_YAML_INVALID_VOLUME_NAME,
@@ -395,6 +391,13 @@ def test_project_invalid_volumes(error_value, yaml_data):
     assert error_value == str(err.value)
 
 
+def test_project_multiple_volumes():
+    yaml_loaded = yaml.safe_load(IMAGECRAFT_YAML_MULTIPLE_VOLUMES)
+    project = Project.from_yaml_data(yaml_loaded, pathlib.Path("myproject.yaml"))
+
+    assert list(project.volumes) == ["pc", "pc2"]
+
+
 @pytest.mark.parametrize(
     ("error_lines", "filesystems_val"),
     [
@@ -17,7 +17,7 @@
 import re
 
 import pytest
-from imagecraft.models import Role, Volume
+from imagecraft.models import FilesystemOptions, Role, Volume
 from imagecraft.models.volume import (
     GPTVolume,
     HybridVolume,
@@ -650,6 +650,92 @@ def test_min_size_non_null_is_rejected(schema, base_structure):
         )
 
 
+@pytest.mark.parametrize(
+    ("filesystem", "options"),
+    [
+        ("ext4", {"preset": "flash-optimized", "metadata-csum": False}),
+        ("ext3", {"bytes-per-inode": 65536, "reserved-blocks-percent": 0}),
+        ("vfat", {"preset": "fast-build", "cluster-size": 4096}),
+    ],
+)
+def test_filesystem_options_valid(filesystem, options):
+    volume = TypeAdapter(Volume).validate_python(
+        {
+            "schema": "gpt",
+            "structure": [
+                {
+                    **_VALID_GPT_STRUCTURE,
+                    "filesystem": filesystem,
+                    "filesystem-options": options,
+                }
+            ],
+        }
+    )
+
+    assert volume.marshal()["structure"][0]["filesystem-options"] == options
+
+
+@pytest.mark.parametrize(
+    ("filesystem", "options", "error_message"),
+    [
+        pytest.param(
+            "vfat",
+            {"block-size": 4096, "lazy-itable-init": True},
+            "vfat filesystems don't support the 'block-size' and 'lazy-itable-init'",
+            id="ext-on-fat",
+        ),
+        pytest.param(
+            "ext4",
+            {"cluster-size": 4096},
+            "ext4 filesystems don't support the 'cluster-size'",
+            id="fat-on-ext",
+        ),
+        pytest.param(
+            "ext3",
+            {"metadata-csum": True},
+            "ext3 filesystems don't support the 'metadata-csum'",
+            id="metadata-csum-ext3",
+        ),
+        pytest.param(
+            "vfat",
+            {"cluster-size": 3000},
+            "cluster size must be a power of two",
+            id="cluster-size",
+        ),
+        pytest.param("ext4", {"block-size": 8192}, "block-size", id="block-size"),
+        pytest.param("ext4", {"preset": "fastest"}, "preset", id="preset"),
+    ],
+)
+def test_filesystem_options_invalid(filesystem, options, error_message):
+    with pytest.raises(ValidationError, match=error_message):
+        TypeAdapter(Volume).validate_python(
+            {
+                "schema": "gpt",
+                "structure": [
+                    {
+                        **_VALID_GPT_STRUCTURE,
+                        "filesystem": filesystem,
+                        "filesystem-options": options,
+                    }
+                ],
+            }
+        )
+
+
+def test_filesystem_options_resolve():
+    options = FilesystemOptions.unmarshal(
+        {"preset": "flash-optimized", "block-size": 1024}
+    )
+
+    resolved = options.resolve()
+
+    assert resolved.block_size == 1024
+    assert resolved.bytes_per_inode == 16384
+    assert resolved.lazy_itable_init is False
+    assert options.bytes_per_inode is None
+    assert FilesystemOptions(journal_size=8).resolve().journal_size == 8
+
+
 # ---------------------------------------------------------------------------
 # HybridVolume
 # ---------------------------------------------------------------------------
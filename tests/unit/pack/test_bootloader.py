@@ -0,0 +1,277 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import struct
+from pathlib import Path
+
+import pytest
+from craft_parts.filesystem_mounts import FilesystemMount
+from craft_platforms import DebianArchitecture
+from imagecraft.errors import GRUBInstallError
+from imagecraft.models.volume import GPTVolume, MBRVolume
+from imagecraft.pack import bootloader
+
+GPT_VOLUME = GPTVolume.unmarshal(
+    {
+        "schema": "gpt",
+        "structure": [
+            {
+                "name": "efi",
+                "role": "system-boot",
+                "type": "C12A7328-F81F-11D2-BA4B-00A0C93EC93B",
+                "filesystem": "vfat",
+                "size": "256M",
+            },
+            {
+                "name": "rootfs",
+                "role": "system-data",
+                "type": "0FC63DAF-8483-4772-8E79-3D69D8477DE4",
+                "filesystem": "ext4",
+                "size": "6G",
+            },
+        ],
+    }
+)
+
+MBR_VOLUME = MBRVolume.unmarshal(
+    {
+        "schema": "mbr",
+        "structure": [
+            {
+                "name": "rootfs",
+                "role": "system-data",
+                "type": "83",
+                "filesystem": "ext4",
+                "size": "6G",
+            },
+        ],
+    }
+)
+
+
+@pytest.fixture
+def content_dirs(tmp_path):
+    dirs = {
+        "pc/efi": tmp_path / "efi",
+        "pc/rootfs": tmp_path / "rootfs",
+    }
+    for path in dirs.values():
+        path.mkdir()
+    (dirs["pc/rootfs"] / "boot").mkdir()
+    (dirs["pc/rootfs"] / "boot/vmlinuz-6.8.0-10-generic").touch()
+    return dirs
+
+
+def _touch(path: Path, content: bytes = b"") -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+
+
+def test_prepare_bootloader_efi(tmp_path, content_dirs):
+    rootfs = content_dirs["pc/rootfs"]
+    _touch(rootfs / "usr/lib/shim/shimx64.efi.signed.latest", b"shim")
+    _touch(rootfs / "usr/lib/shim/mmx64.efi", b"mm")
+    _touch(rootfs / "usr/lib/shim/fbx64.efi", b"fb")
+    _touch(rootfs / "usr/lib/shim/BOOTX64.CSV", b"csv")
+    _touch(rootfs / "usr/lib/grub/x86_64-efi-signed/grubx64.efi.signed", b"grub")
+
+    setup = bootloader.prepare_bootloader(
+        volume_name="pc",
+        volume=GPT_VOLUME,
+        arch=DebianArchitecture.AMD64,
+        filesystem_mount=FilesystemMount.unmarshal(
+            [
+                {"mount": "/", "device": "(volume/pc/rootfs)"},
+                {"mount": "/boot/efi", "device": "(volume/pc/efi)"},
+            ]
+        ),
+        content_dirs=content_dirs,
+        workdir=tmp_path,
+    )
+
+    assert setup is not None
+    root_uuid = setup.uuids["pc/rootfs"]
+    assert list(setup.uuids) == ["pc/rootfs"]
+    esp = content_dirs["pc/efi"]
+    assert (esp / "EFI/BOOT/BOOTX64.EFI").read_bytes() == b"shim"
+    assert (esp / "EFI/BOOT/fbx64.efi").read_bytes() == b"fb"
+    assert (esp / "EFI/ubuntu/shimx64.efi").read_bytes() == b"shim"
+    assert (esp / "EFI/ubuntu/grubx64.efi").read_bytes() == b"grub"
+    assert (esp / "EFI/ubuntu/mmx64.efi").read_bytes() == b"mm"
+    assert (esp / "EFI/ubuntu/BOOTX64.CSV").read_bytes() == b"csv"
+    assert (esp / "EFI/ubuntu/grub.cfg").read_text() == (
+        f"search.fs_uuid {root_uuid} root\n"
+        "set prefix=($root)'/boot/grub'\n"
+        "configfile $prefix/grub.cfg\n"
+    )
+    grub_cfg = (rootfs / "boot/grub/grub.cfg").read_text()
+    assert f"root=UUID={root_uuid}" in grub_cfg
+    assert "/boot/vmlinuz-6.8.0-10-generic" in grub_cfg
+
+
+def test_prepare_bootloader_keep_uuids(tmp_path, content_dirs):
+    rootfs = content_dirs["pc/rootfs"]
+    _touch(rootfs / "usr/lib/shim/shimx64.efi.signed.latest", b"shim")
+    _touch(rootfs / "usr/lib/grub/x86_64-efi-signed/grubx64.efi.signed", b"grub")
+    root_uuid = "8d2d0a4e-2a3f-4b1e-9d63-0a8e5c1c4b7f"
+
+    setup = bootloader.prepare_bootloader(
+        volume_name="pc",
+        volume=GPT_VOLUME,
+        arch=DebianArchitecture.AMD64,
+        filesystem_mount=FilesystemMount.unmarshal(
+            [
+                {"mount": "/", "device": "(volume/pc/rootfs)"},
+                {"mount": "/boot/efi", "device": "(volume/pc/efi)"},
+            ]
+        ),
+        content_dirs=content_dirs,
+        workdir=tmp_path,
+        keep_uuids={"pc/rootfs": root_uuid},
+    )
+
+    assert setup is not None
+    assert setup.uuids == {"pc/rootfs": root_uuid}
+    assert f"root=UUID={root_uuid}" in (rootfs / "boot/grub/grub.cfg").read_text()
+
+
+def test_prepare_bootloader_efi_missing_shim(tmp_path, content_dirs):
+    setup = bootloader.prepare_bootloader(
+        volume_name="pc",
+        volume=GPT_VOLUME,
+        arch=DebianArchitecture.AMD64,
+        filesystem_mount=FilesystemMount.unmarshal(
+            [
+                {"mount": "/", "device": "(volume/pc/rootfs)"},
+                {"mount": "/boot/efi", "device": "(volume/pc/efi)"},
+            ]
+        ),
+        content_dirs=content_dirs,
+        workdir=tmp_path,
+    )
+
+    assert setup is None
+    assert not (content_dirs["pc/rootfs"] / "boot/grub/grub.cfg").exists()
+
+
+def test_prepare_bootloader_efi_without_esp_mount(tmp_path, content_dirs):
+    setup = bootloader.prepare_bootloader(
+        volume_name="pc",
+        volume=GPT_VOLUME,
+        arch=DebianArchitecture.AMD64,
+        filesystem_mount=FilesystemMount.unmarshal(
+            [{"mount": "/", "device": "(volume/pc/rootfs)"}]
+        ),
+        content_dirs=content_dirs,
+        workdir=tmp_path,
+    )
+
+    assert setup is None
+
+
+def test_prepare_bootloader_bios(tmp_path, content_dirs, mocker):
+    rootfs = content_dirs["pc/rootfs"]
+    modules = rootfs / "usr/lib/grub/i386-pc"
+    _touch(modules / "boot.img", b"boot")
+    _touch(modules / "normal.mod", b"normal")
+    _touch(modules / "moddep.lst", b"deps")
+    mocker.patch("imagecraft.pack.bootloader.shutil.which", return_value="/usr/bin")
+    mock_run = mocker.patch("imagecraft.pack.bootloader.run")
+
+    setup = bootloader.prepare_bootloader(
+        volume_name="pc",
+        volume=MBR_VOLUME,
+        arch=DebianArchitecture.AMD64,
+        filesystem_mount=FilesystemMount.unmarshal(
+            [{"mount": "/", "device": "(volume/pc/rootfs)"}]
+        ),
+        content_dirs=content_dirs,
+        workdir=tmp_path,
+    )
+
+    assert setup is not None
+    assert setup.boot_img == modules / "boot.img"
+    assert setup.core_img == tmp_path / "core.img"
+    assert (rootfs / "boot/grub/i386-pc/normal.mod").read_bytes() == b"normal"
+    assert (rootfs / "boot/grub/i386-pc/moddep.lst").read_bytes() == b"deps"
+    assert (
+        (tmp_path / "load.cfg")
+        .read_text()
+        .startswith(f"search.fs_uuid {setup.uuids['pc/rootfs']} root\n")
+    )
+    assert mock_run.call_args.args[0] == "grub-mkimage"
+    assert "--format=i386-pc" in mock_run.call_args.args
+    assert "insmod part_msdos" in (rootfs / "boot/grub/grub.cfg").read_text()
+
+
+def test_prepare_bootloader_bios_without_mkimage(tmp_path, content_dirs, mocker):
+    _touch(content_dirs["pc/rootfs"] / "usr/lib/grub/i386-pc/boot.img")
+    mocker.patch("imagecraft.pack.bootloader.shutil.which", return_value=None)
+
+    setup = bootloader.prepare_bootloader(
+        volume_name="pc",
+        volume=MBR_VOLUME,
+        arch=DebianArchitecture.AMD64,
+        filesystem_mount=FilesystemMount.unmarshal(
+            [{"mount": "/", "device": "(volume/pc/rootfs)"}]
+        ),
+        content_dirs=content_dirs,
+        workdir=tmp_path,
+    )
+
+    assert setup is None
+
+
+def _mbr_image(path: Path, first_lba: int) -> None:
+    mbr = bytearray(512)
+    mbr[0x1B8:0x1BC] = b"SIGN"
+    struct.pack_into("<I", mbr, 0x1BE + 8, first_lba)
+    mbr[0x1FE:0x200] = b"\x55\xaa"
+    path.write_bytes(bytes(mbr) + bytes(512 * first_lba))
+
+
+def test_write_bios_boot(tmp_path):
+    image_path = tmp_path / "disk.img"
+    _mbr_image(image_path, 2048)
+    boot_img = bytes(range(256)) * 2
+    core_img = b"\x01" * (512 * 2 + 100)
+
+    bootloader.write_bios_boot(
+        image_path=image_path, boot_img=boot_img, core_img=core_img
+    )
+
+    data = image_path.read_bytes()
+    # boot code is written, partition table and disk signature are kept
+    assert data[:0x3] == boot_img[:0x3]
+    assert data[0x1B8:0x1BC] == b"SIGN"
+    assert struct.unpack_from("<I", data, 0x1BE + 8)[0] == 2048
+    assert data[0x1FE:0x200] == b"\x55\xaa"
+    assert struct.unpack_from("<Q", data, 0x5C)[0] == 1
+    assert data[0x66:0x68] == b"\x90\x90"
+    # core.img follows in sector 1, its blocklist loads the 2 remaining sectors
+    assert struct.unpack_from("<QHH", data, 1024 - 12) == (2, 2, 0x820)
+    assert data[1024 : 1024 + 100] == b"\x01" * 100
+    assert data[512 * 4 - 1 : 512 * 4] == b"\x00"
+
+
+def test_write_bios_boot_no_room(tmp_path):
+    image_path = tmp_path / "disk.img"
+    _mbr_image(image_path, 2)
+
+    with pytest.raises(GRUBInstallError, match="needs 3 sectors"):
+        bootloader.write_bios_boot(
+            image_path=image_path, boot_img=bytes(512), core_img=bytes(512 * 3)
+        )
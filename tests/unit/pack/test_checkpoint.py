@@ -0,0 +1,222 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import subprocess
+from pathlib import Path
+
+import pytest
+from imagecraft.models import FileSystem, GPTVolume
+from imagecraft.pack import checkpoint
+from imagecraft.pack.diskutil import Reproducibility
+
+VOLUME_DATA = {
+    "schema": "gpt",
+    "structure": [
+        {
+            "name": "rootfs",
+            "type": "0FC63DAF-8483-4772-8E79-3D69D8477DE4",
+            "filesystem": "ext4",
+            "filesystem-label": "writable",
+            "role": "system-data",
+            "size": "6G",
+        }
+    ],
+}
+
+
+@pytest.fixture
+def content_dir(tmp_path):
+    content = tmp_path / "prime"
+    (content / "boot").mkdir(parents=True)
+    (content / "boot/grub.cfg").write_text("set timeout=0\n")
+    (content / "boot/vmlinuz").symlink_to("vmlinuz-6.8.0")
+    return content
+
+
+def test_get_journal_path(tmp_path):
+    assert checkpoint.get_journal_path(tmp_path / ".pc.img.tmp") == (
+        tmp_path / ".pc.img.tmp.journal.json"
+    )
+
+
+def test_journal_round_trip(tmp_path):
+    path = tmp_path / "journal.json"
+    journal = checkpoint.Journal(path=path, layout="abc")
+    journal.start("efi", "1")
+    journal.complete("rootfs", "2", "8d2d0a4e-2a3f-4b1e-9d63-0a8e5c1c4b7f")
+
+    loaded = checkpoint.Journal.load(path)
+
+    assert loaded == journal
+    assert loaded.fs_uuids == {"rootfs": "8d2d0a4e-2a3f-4b1e-9d63-0a8e5c1c4b7f"}
+    assert not path.with_name("journal.json.tmp").exists()
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        pytest.param(None, id="missing"),
+        pytest.param("{", id="invalid-json"),
+        pytest.param('{"format": "other/1"}', id="other-format"),
+        pytest.param(
+            '{"format": "imagecraft-pack-journal/1", "layout": "abc"}',
+            id="incomplete",
+        ),
+    ],
+)
+def test_journal_load_unreadable(tmp_path, text):
+    path = tmp_path / "journal.json"
+    if text is not None:
+        path.write_text(text)
+
+    assert checkpoint.Journal.load(path) is None
+
+
+def test_journal_is_complete(tmp_path):
+    journal = checkpoint.Journal(path=tmp_path / "journal.json", layout="abc")
+    journal.start("efi", "1")
+    journal.complete("rootfs", "2")
+
+    assert not journal.is_complete("efi", "1")
+    assert journal.is_complete("rootfs", "2")
+    assert not journal.is_complete("rootfs", "3")
+    assert not journal.is_complete("data", "2")
+
+
+def test_journal_invalidate(tmp_path):
+    path = tmp_path / "journal.json"
+    journal = checkpoint.Journal(path=path, layout="abc")
+    journal.complete("rootfs", "2")
+
+    journal.invalidate("rootfs")
+    journal.invalidate("data")
+
+    assert not journal.is_complete("rootfs", "2")
+    assert checkpoint.Journal.load(path).partitions == {}
+
+
+def test_get_layout_digest():
+    volume = GPTVolume.unmarshal(VOLUME_DATA)
+    resized = GPTVolume.unmarshal(
+        {**VOLUME_DATA, "structure": [{**VOLUME_DATA["structure"][0], "size": "8G"}]}
+    )
+    reproducibility = Reproducibility(seed="test", epoch=1700000000)
+
+    digest = checkpoint.get_layout_digest(volume, sector_size=512, reproducibility=None)
+
+    assert digest == checkpoint.get_layout_digest(
+        GPTVolume.unmarshal(VOLUME_DATA), sector_size=512, reproducibility=None
+    )
+    assert digest != checkpoint.get_layout_digest(
+        resized, sector_size=512, reproducibility=None
+    )
+    assert digest != checkpoint.get_layout_digest(
+        volume, sector_size=4096, reproducibility=None
+    )
+    assert digest != checkpoint.get_layout_digest(
+        volume, sector_size=512, reproducibility=reproducibility
+    )
+
+
+def test_get_metadata_digest_stable(content_dir):
+    assert checkpoint.get_metadata_digest(content_dir) == (
+        checkpoint.get_metadata_digest(content_dir)
+    )
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        pytest.param(
+            lambda d: (d / "boot/grub.cfg").write_text("set timeout=10\n"),
+            id="size",
+        ),
+        pytest.param(
+            lambda d: os.utime(d / "boot/grub.cfg", ns=(0, 1_000_000_000)),
+            id="mtime",
+        ),
+        pytest.param(lambda d: (d / "boot/grub.cfg").chmod(0o600), id="mode"),
+        pytest.param(lambda d: (d / "etc").mkdir(), id="new-directory"),
+        pytest.param(lambda d: (d / "boot/grub.cfg").unlink(), id="removed-file"),
+        pytest.param(
+            lambda d: (
+                (d / "boot/vmlinuz").unlink()
+                or (d / "boot/vmlinuz").symlink_to("vmlinuz-6.8.1")
+            ),
+            id="symlink-target",
+        ),
+    ],
+)
+def test_get_metadata_digest_changes(content_dir, change):
+    before = checkpoint.get_metadata_digest(content_dir)
+
+    change(content_dir)
+
+    assert checkpoint.get_metadata_digest(content_dir) != before
+
+
+def test_get_metadata_digest_metadata_only(content_dir, mocker):
+    grub_cfg = content_dir / "boot/grub.cfg"
+    stat = grub_cfg.stat()
+    before = checkpoint.get_metadata_digest(content_dir)
+    spy_read = mocker.spy(Path, "read_bytes")
+
+    # Files are identified by their metadata, their data isn't read.
+    grub_cfg.write_text("set timeout=9\n")
+    os.utime(grub_cfg, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert checkpoint.get_metadata_digest(content_dir) == before
+    spy_read.assert_not_called()
+
+
+def test_get_metadata_digest_copy(content_dir, tmp_path):
+    copy_dir = tmp_path / "copy"
+    subprocess.run(["cp", "--archive", content_dir, copy_dir], check=True)
+
+    # A copy made by pack has new inodes, but the same digest.
+    assert checkpoint.get_metadata_digest(copy_dir) == (
+        checkpoint.get_metadata_digest(content_dir)
+    )
+
+
+def test_get_metadata_digest_missing(tmp_path):
+    (tmp_path / "empty").mkdir()
+
+    assert checkpoint.get_metadata_digest(tmp_path / "missing") == (
+        checkpoint.get_metadata_digest(tmp_path / "empty")
+    )
+
+
+def test_get_content_digest():
+    digest = checkpoint.get_content_digest(
+        "source", fstype=FileSystem.EXT4, label=None, options={"fs_uuid": "a"}
+    )
+
+    assert digest == checkpoint.get_content_digest(
+        "source", fstype=FileSystem.EXT4, label=None, options={"fs_uuid": "a"}
+    )
+    assert digest != checkpoint.get_content_digest(
+        "other", fstype=FileSystem.EXT4, label=None, options={"fs_uuid": "a"}
+    )
+    assert digest != checkpoint.get_content_digest(
+        "source", fstype=FileSystem.EXT4, label=None, options={"fs_uuid": "b"}
+    )
+    assert digest != checkpoint.get_content_digest(
+        "source", fstype=FileSystem.VFAT, label=None, options={"fs_uuid": "a"}
+    )
+    assert digest != checkpoint.get_content_digest(
+        "source", fstype=FileSystem.EXT4, label="data", options={"fs_uuid": "a"}
+    )
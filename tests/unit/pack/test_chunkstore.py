@@ -0,0 +1,183 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import random
+
+import pytest
+from craft_cli import CraftError
+from imagecraft.pack import chunkstore
+
+MiB = 1024**2
+
+
+def _random_bytes(size: int, seed: int = 0) -> bytes:
+    return random.Random(seed).randbytes(size)  # noqa: S311 (reproducible test data)
+
+
+@pytest.fixture
+def image(tmp_path):
+    """A sparse image with two data regions."""
+    path = tmp_path / "image.img"
+    with path.open("wb") as image_file:
+        image_file.truncate(8 * MiB)
+        image_file.seek(1 * MiB)
+        image_file.write(_random_bytes(2 * MiB, seed=1))
+        image_file.seek(5 * MiB)
+        image_file.write(_random_bytes(512 * 1024, seed=2))
+    return path
+
+
+def _stored_chunks(store_dir):
+    return set(store_dir.rglob("*.zst"))
+
+
+def test_chunk_image_covers_image(image, tmp_path):
+    index = chunkstore.chunk_image(image, tmp_path / "store")
+
+    assert index.size == 8 * MiB
+    offset = 0
+    for chunk in index.chunks:
+        assert chunk.offset == offset
+        assert chunk.size <= chunkstore.MAX_CHUNK_BLOCKS * chunkstore.BLOCK_SIZE or (
+            chunk.digest is None
+        )
+        offset += chunk.size
+    assert offset == index.size
+    assert index.stored_size == 2 * MiB + 512 * 1024
+    assert index.chunks[0] == chunkstore.Chunk(offset=0, size=1 * MiB, digest=None)
+
+
+def test_chunk_image_stores_chunks(image, tmp_path):
+    store_dir = tmp_path / "store"
+
+    index = chunkstore.chunk_image(image, store_dir)
+
+    digests = {chunk.digest for chunk in index.chunks if chunk.digest}
+    assert {path.name for path in _stored_chunks(store_dir)} == {
+        f"{digest}.zst" for digest in digests
+    }
+
+
+def test_chunk_image_zero_blocks_not_stored(tmp_path):
+    image = tmp_path / "image.img"
+    image.write_bytes(bytes(1 * MiB))
+
+    index = chunkstore.chunk_image(image, tmp_path / "store")
+
+    assert index.chunks == [chunkstore.Chunk(offset=0, size=1 * MiB, digest=None)]
+    assert not (tmp_path / "store").exists()
+
+
+def test_chunk_image_without_store(image, tmp_path):
+    index = chunkstore.chunk_image(image)
+
+    assert index.stored_size == 2 * MiB + 512 * 1024
+    assert not (tmp_path / "store").exists()
+
+
+def test_chunk_image_shifted_content_dedupes(image, tmp_path):
+    store_dir = tmp_path / "store"
+    chunkstore.chunk_image(image, store_dir)
+    before = _stored_chunks(store_dir)
+
+    # Insert two blocks in the middle of the first data region.
+    data = bytearray(image.read_bytes())
+    data[2 * MiB : 2 * MiB] = _random_bytes(2 * chunkstore.BLOCK_SIZE, seed=3)
+    shifted = tmp_path / "shifted.img"
+    shifted.write_bytes(bytes(data[: 8 * MiB]))
+    index = chunkstore.chunk_image(shifted, store_dir)
+
+    new_chunks = _stored_chunks(store_dir) - before
+    stored = [chunk for chunk in index.chunks if chunk.digest]
+    assert len(new_chunks) <= 3
+    assert len(stored) > 20
+
+
+def test_index_roundtrip(image, tmp_path):
+    index = chunkstore.chunk_image(image)
+    index_path = tmp_path / "image.img.chunks.json"
+
+    index.write(index_path)
+
+    assert chunkstore.ChunkIndex.read(index_path) == index
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "{not json",
+        '{"format": "other/1", "size": 0, "chunks": []}',
+        '{"format": "imagecraft-chunk-index/1", "chunks": []}',
+    ],
+)
+def test_index_read_invalid(tmp_path, content):
+    index_path = tmp_path / "index.json"
+    index_path.write_text(content)
+
+    with pytest.raises(CraftError, match="Cannot read chunk index"):
+        chunkstore.ChunkIndex.read(index_path)
+
+
+def test_assemble_image(image, tmp_path):
+    store_dir = tmp_path / "store"
+    index = chunkstore.chunk_image(image, store_dir)
+    output = tmp_path / "output.img"
+
+    fetched = chunkstore.assemble_image(index, store_dir, output)
+
+    assert output.read_bytes() == image.read_bytes()
+    assert fetched == index.stored_size
+
+
+def test_assemble_image_from_seed(image, tmp_path):
+    store_dir = tmp_path / "store"
+    data = bytearray(image.read_bytes())
+    data[1 * MiB : 1 * MiB + chunkstore.BLOCK_SIZE] = bytes(
+        b ^ 0xFF for b in data[1 * MiB : 1 * MiB + chunkstore.BLOCK_SIZE]
+    )
+    new_image = tmp_path / "new.img"
+    new_image.write_bytes(data)
+    index = chunkstore.chunk_image(new_image, store_dir)
+    output = tmp_path / "output.img"
+
+    fetched = chunkstore.assemble_image(index, store_dir, output, seeds=[image])
+
+    assert output.read_bytes() == new_image.read_bytes()
+    assert 0 < fetched <= chunkstore.MAX_CHUNK_BLOCKS * chunkstore.BLOCK_SIZE
+
+
+def test_assemble_image_missing_chunk(image, tmp_path):
+    store_dir = tmp_path / "store"
+    index = chunkstore.chunk_image(image, store_dir)
+    next(iter(_stored_chunks(store_dir))).unlink()
+
+    with pytest.raises(CraftError, match="Cannot read chunk"):
+        chunkstore.assemble_image(index, store_dir, tmp_path / "output.img")
+
+
+def test_assemble_image_corrupt_chunk(image, tmp_path):
+    store_dir = tmp_path / "store"
+    index = chunkstore.chunk_image(image, store_dir)
+    digest = next(chunk.digest for chunk in index.chunks if chunk.digest)
+    other = next(
+        chunk.digest for chunk in index.chunks if chunk.digest not in (None, digest)
+    )
+    chunkstore.chunk_path(store_dir, digest).write_bytes(
+        chunkstore.chunk_path(store_dir, str(other)).read_bytes()
+    )
+
+    with pytest.raises(CraftError, match="is corrupt"):
+        chunkstore.assemble_image(index, store_dir, tmp_path / "output.img")
@@ -0,0 +1,145 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+
+import pytest
+from craft_cli import CraftError
+from imagecraft.pack import delta
+
+MiB = 1 << 20
+
+
+@pytest.fixture
+def images(tmp_path, mocker):
+    """A source image, and a target image where the "a" partition moved and grew."""
+    source = tmp_path / "source.img"
+    target = tmp_path / "target.img"
+    data_a = os.urandom(2 * MiB)
+    data_b = os.urandom(MiB)
+    header = os.urandom(4096)
+    with source.open("wb") as image:
+        image.truncate(8 * MiB)
+        image.write(header)
+        image.seek(MiB)
+        image.write(data_a)
+        image.seek(4 * MiB)
+        image.write(data_b)
+    changed = bytearray(data_a)
+    changed[MiB : MiB + 10] = os.urandom(10)
+    with target.open("wb") as image:
+        image.truncate(12 * MiB)
+        image.write(header)
+        image.seek(2 * MiB)
+        image.write(changed)
+        image.seek(6 * MiB)
+        image.write(data_b)
+    extents = {
+        source: {"a": (MiB, 3 * MiB), "b": (4 * MiB, 2 * MiB)},
+        target: {"a": (2 * MiB, 4 * MiB), "b": (6 * MiB, 2 * MiB)},
+    }
+    mocker.patch.object(
+        delta, "_read_partition_extents", side_effect=extents.__getitem__
+    )
+    return source, target
+
+
+def test_generate_delta(tmp_path, images):
+    source, target = images
+
+    result = delta.generate_delta(source, target, tmp_path / "target.img.delta")
+
+    # Only the changed block is stored, everything else is copied.
+    assert result.data_size == delta.BLOCK_SIZE
+    copies = [op for op in result.operations if op.source_offset is not None]
+    assert [(op.offset, op.source_offset) for op in copies] == [
+        (0, 0),
+        (2 * MiB, MiB),
+        (3 * MiB + delta.BLOCK_SIZE, 2 * MiB + delta.BLOCK_SIZE),
+        (6 * MiB, 4 * MiB),
+    ]
+
+
+def test_generate_delta_apply(tmp_path, images):
+    source, target = images
+    delta_path = tmp_path / "target.img.delta"
+    output = tmp_path / "output.img"
+    delta.generate_delta(source, target, delta_path)
+
+    delta.apply_delta(delta_path, source, output)
+
+    assert output.read_bytes() == target.read_bytes()
+
+
+def test_generate_delta_unpaired_partition(tmp_path, images, mocker):
+    source, target = images
+    mocker.patch.object(
+        delta,
+        "_read_partition_extents",
+        side_effect=[{"a": (2 * MiB, 4 * MiB), "b": (6 * MiB, 2 * MiB)}, {}],
+    )
+
+    result = delta.generate_delta(source, target, tmp_path / "target.img.delta")
+
+    # Partitions absent from the source are stored in full.
+    assert result.data_size == 3 * MiB
+
+
+def test_read_partition_extents(make_gpt_image):
+    path = make_gpt_image([("a", b"\1" * MiB), ("b", b"\2" * 2 * MiB)])
+
+    assert delta._read_partition_extents(path) == {
+        "a": (MiB, MiB),
+        "b": (2 * MiB, 2 * MiB),
+    }
+
+
+def test_generate_delta_unreadable_table(tmp_path):
+    source = tmp_path / "source.img"
+    source.write_bytes(bytes(MiB))
+
+    with pytest.raises(CraftError, match="Cannot read the partition table"):
+        delta.generate_delta(source, source, tmp_path / "source.img.delta")
+
+
+def test_apply_delta_wrong_source(tmp_path, images):
+    source, target = images
+    delta_path = tmp_path / "target.img.delta"
+    delta.generate_delta(source, target, delta_path)
+    with source.open("r+b") as image:
+        image.seek(MiB)
+        image.write(os.urandom(4096))
+
+    with pytest.raises(CraftError, match="produced unexpected data"):
+        delta.apply_delta(delta_path, source, tmp_path / "output.img")
+
+
+def test_apply_delta_wrong_source_size(tmp_path, images):
+    source, target = images
+    delta_path = tmp_path / "target.img.delta"
+    delta.generate_delta(source, target, delta_path)
+
+    with pytest.raises(CraftError, match="does not apply to"):
+        delta.apply_delta(delta_path, target, tmp_path / "output.img")
+
+
+def test_apply_delta_not_a_delta(tmp_path, images):
+    source, _ = images
+    delta_path = tmp_path / "target.img.delta"
+    delta_path.write_text("{}")
+
+    with pytest.raises(CraftError, match="Cannot read delta"):
+        delta.apply_delta(delta_path, source, tmp_path / "output.img")
@@ -12,11 +12,14 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import os
+import re
+import subprocess
 from unittest.mock import ANY, call
 
 import pytest
 from craft_cli import CraftError
-from imagecraft.models import FileSystem
+from imagecraft.models import FileSystem, FilesystemOptions
 from imagecraft.pack import diskutil
 
 
@@ -149,7 +152,9 @@ def test_format_populate_partition(
 
     create_zero_image.assert_not_called()
 
-    calls = [call(e[0], *e[1:], stdout=ANY, stderr=ANY) for e in expected_values]
+    calls = [
+        call(e[0], *e[1:], stdout=ANY, stderr=ANY, env=None) for e in expected_values
+    ]
     mocked_run.assert_has_calls(calls)
 
 
@@ -184,7 +189,7 @@ def test_format_device(
 
     create_zero_image.assert_not_called()
     expected_calls = [
-        call(f[0], *f[1:], stdout=ANY, stderr=ANY)
+        call(f[0], *f[1:], stdout=ANY, stderr=ANY, env=None)
         for f in [request.getfixturevalue(f) for f in expected_fixtures]
     ]
     mocked_run.assert_has_calls(expected_calls)
@@ -234,3 +239,558 @@ def test_format_device_fat_no_content(mocker, device):
 
     assert mocked_run.call_count == 1
     assert mocked_run.call_args[0][0] == "mkfs.fat"
+
+
+@pytest.mark.parametrize(
+    ("version_output", "expected"),
+    [
+        ("mke2fs 1.47.1 (20-May-2024)", "rootfs.tar"),
+        ("mke2fs 1.48 (01-Jan-2026)", "rootfs.tar"),
+    ],
+)
+def test_format_device_ext_tarball(mocker, device, version_output, expected):
+    """A content dir holding a marked tarball populates the partition from it."""
+    mocked_run = mocker.patch("imagecraft.pack.diskutil.run", autospec=True)
+    mocked_run.return_value.stdout = version_output
+    content_dir = device.parent / "content"
+    content_dir.mkdir()
+    (content_dir / "rootfs.tar").touch()
+    (content_dir / diskutil.CONTENT_TARBALL_MARKER).touch()
+
+    diskutil.format_device(
+        device_path=device,
+        fstype=FileSystem.EXT4,
+        content_dir=content_dir,
+    )
+
+    args = mocked_run.call_args[0]
+    assert args[args.index("-d") + 1] == content_dir / expected
+
+
+def test_format_device_ext_tarball_old_mke2fs(mocker, device):
+    """An mke2fs that can't read tarballs is reported before formatting."""
+    mocked_run = mocker.patch("imagecraft.pack.diskutil.run", autospec=True)
+    mocked_run.return_value.stdout = "mke2fs 1.47.0 (5-Feb-2023)"
+    content_dir = device.parent / "content"
+    content_dir.mkdir()
+    (content_dir / "rootfs.tar").touch()
+    (content_dir / diskutil.CONTENT_TARBALL_MARKER).touch()
+
+    with pytest.raises(CraftError, match="Cannot populate a partition"):
+        diskutil.format_device(
+            device_path=device,
+            fstype=FileSystem.EXT4,
+            content_dir=content_dir,
+        )
+
+    assert mocked_run.call_count == 1
+
+
+def test_format_device_ext_tarball_unmarked(mocker, device):
+    """A tarball without the marker is copied like any other file."""
+    mocked_run = mocker.patch("imagecraft.pack.diskutil.run", autospec=True)
+    content_dir = device.parent / "content"
+    content_dir.mkdir()
+    (content_dir / "rootfs.tar").touch()
+
+    diskutil.format_device(
+        device_path=device,
+        fstype=FileSystem.EXT4,
+        content_dir=content_dir,
+    )
+
+    args = mocked_run.call_args[0]
+    assert args[args.index("-d") + 1] == content_dir
+
+
+def test_format_device_ext_tarball_with_other_content(mocker, device):
+    """Other content can't be added to a partition populated from a tarball."""
+    mocked_run = mocker.patch("imagecraft.pack.diskutil.run", autospec=True)
+    content_dir = device.parent / "content"
+    content_dir.mkdir()
+    (content_dir / "rootfs.tar").touch()
+    (content_dir / diskutil.CONTENT_TARBALL_MARKER).touch()
+    (content_dir / "etc").mkdir()
+
+    with pytest.raises(CraftError, match="Cannot add content") as raised:
+        diskutil.format_device(
+            device_path=device,
+            fstype=FileSystem.EXT4,
+            content_dir=content_dir,
+        )
+
+    assert raised.value.details == "Other content found: etc"
+    mocked_run.assert_not_called()
+
+
+def test_format_device_ext_tarball_missing(mocker, device):
+    """A marker without its tarball is reported."""
+    mocker.patch("imagecraft.pack.diskutil.run", autospec=True)
+    content_dir = device.parent / "content"
+    content_dir.mkdir()
+    (content_dir / diskutil.CONTENT_TARBALL_MARKER).touch()
+
+    with pytest.raises(CraftError, match="Content tarball 'rootfs.tar' not found"):
+        diskutil.format_device(
+            device_path=device,
+            fstype=FileSystem.EXT4,
+            content_dir=content_dir,
+        )
+
+
+@pytest.mark.parametrize(
+    ("fstype", "expected_args"),
+    [
+        (FileSystem.EXT4, ["-U", "0b1c4a6e-3e2f-4d2a-9a51-6f3c8e1b2d4f"]),
+        (FileSystem.VFAT, ["-i", "0B1C4A6E"]),
+    ],
+)
+def test_format_device_fs_uuid(mocker, device, fstype, expected_args):
+    mocked_run = mocker.patch("imagecraft.pack.diskutil.run", autospec=True)
+    fs_uuid = (
+        "0B1C-4A6E"
+        if fstype == FileSystem.VFAT
+        else "0b1c4a6e-3e2f-4d2a-9a51-6f3c8e1b2d4f"
+    )
+
+    diskutil.format_device(device_path=device, fstype=fstype, fs_uuid=fs_uuid)
+
+    args = mocked_run.call_args[0]
+    index = args.index(expected_args[0])
+    assert list(args[index : index + 2]) == expected_args
+
+
+@pytest.mark.parametrize(
+    ("options", "expected_args"),
+    [
+        pytest.param({}, ["mke2fs", "-t", "ext4", ANY], id="default"),
+        pytest.param(
+            {"preset": "fast-build"},
+            [
+                "mke2fs",
+                "-t",
+                "ext4",
+                "-E",
+                "lazy_itable_init=1,lazy_journal_init=1",
+                ANY,
+            ],
+            id="fast-build",
+        ),
+        pytest.param(
+            {"preset": "flash-optimized", "reserved-blocks-percent": 0.5},
+            [
+                "mke2fs",
+                "-t",
+                "ext4",
+                "-b",
+                "4096",
+                "-i",
+                "16384",
+                "-m",
+                "0.5",
+                "-E",
+                "lazy_itable_init=0,lazy_journal_init=0",
+                ANY,
+            ],
+            id="flash-optimized",
+        ),
+        pytest.param(
+            {"inode-count": 8192, "journal-size": 16, "metadata-csum": False},
+            [
+                "mke2fs",
+                "-t",
+                "ext4",
+                "-N",
+                "8192",
+                "-J",
+                "size=16",
+                "-O",
+                "^metadata_csum",
+                ANY,
+            ],
+            id="explicit",
+        ),
+    ],
+)
+def test_format_device_ext_options(mocker, device, options, expected_args):
+    mocked_run = mocker.patch("imagecraft.pack.diskutil.run", autospec=True)
+
+    diskutil.format_device(
+        device_path=device,
+        fstype=FileSystem.EXT4,
+        options=FilesystemOptions.unmarshal(options),
+    )
+
+    assert list(mocked_run.call_args.args) == expected_args
+
+
+def test_format_device_ext_options_extent(mocker, device):
+    mocked_run = mocker.patch("imagecraft.pack.diskutil.run", autospec=True)
+
+    diskutil.format_device(
+        device_path=device,
+        fstype=FileSystem.EXT4,
+        extent=diskutil.PartitionExtent(offset=1 << 20, size=2 << 20),
+        options=FilesystemOptions(lazy_itable_init=True),
+    )
+
+    args = mocked_run.call_args.args
+    assert args[args.index("-E") + 1] == "lazy_itable_init=1,offset=1048576"
+
+
+def test_format_device_fat_options(mocker, device):
+    mocked_run = mocker.patch("imagecraft.pack.diskutil.run", autospec=True)
+
+    diskutil.format_device(
+        device_path=device,
+        fstype=FileSystem.VFAT,
+        options=FilesystemOptions.unmarshal(
+            {"preset": "flash-optimized", "cluster-size": 4096}
+        ),
+    )
+
+    assert list(mocked_run.call_args.args) == ["mkfs.vfat", "-s", "8", device]
+
+
+@pytest.mark.parametrize(
+    ("fstype", "command", "returncode", "passed"),
+    [
+        (FileSystem.EXT4, ["e2fsck", "-f", "-n"], 0, True),
+        (FileSystem.EXT3, ["e2fsck", "-f", "-n"], 4, False),
+        (FileSystem.VFAT, ["fsck.fat", "-n"], 0, True),
+        (FileSystem.FAT16, ["fsck.fat", "-n"], 1, False),
+    ],
+)
+def test_check_filesystem(mocker, device, fstype, command, returncode, passed):
+    mocked_run = mocker.patch(
+        "imagecraft.pack.diskutil.run",
+        autospec=True,
+        return_value=subprocess.CompletedProcess([], returncode, stdout="output\n"),
+    )
+
+    check = diskutil.check_filesystem(device, fstype)
+
+    assert check.passed is passed
+    assert check.output == "output"
+    assert check.duration >= 0
+    mocked_run.assert_called_once_with(
+        *command, device, check=False, stderr=subprocess.STDOUT
+    )
+
+
+def test_generate_filesystem_uuid():
+    assert re.fullmatch(
+        r"[0-9A-F]{4}-[0-9A-F]{4}", diskutil.generate_filesystem_uuid(FileSystem.VFAT)
+    )
+    assert re.fullmatch(
+        r"[0-9a-f]{8}-([0-9a-f]{4}-){3}[0-9a-f]{12}",
+        diskutil.generate_filesystem_uuid(FileSystem.EXT4),
+    )
+
+
+# ── reproducible output ──────────────────────────────────────────────────────
+
+
+def test_get_reproducibility_disabled(monkeypatch):
+    monkeypatch.delenv("SOURCE_DATE_EPOCH", raising=False)
+
+    assert diskutil.get_reproducibility(seed=None, project_name="test") is None
+
+
+@pytest.mark.parametrize(
+    ("seed", "source_date_epoch", "expected"),
+    [
+        ("abc", None, diskutil.Reproducibility(seed="test:abc", epoch=315532800)),
+        (
+            None,
+            "1700000000",
+            diskutil.Reproducibility(seed="test:1700000000", epoch=1700000000),
+        ),
+        (
+            "abc",
+            "1700000000",
+            diskutil.Reproducibility(seed="test:abc", epoch=1700000000),
+        ),
+    ],
+)
+def test_get_reproducibility(monkeypatch, seed, source_date_epoch, expected):
+    monkeypatch.delenv("SOURCE_DATE_EPOCH", raising=False)
+    if source_date_epoch is not None:
+        monkeypatch.setenv("SOURCE_DATE_EPOCH", source_date_epoch)
+
+    assert diskutil.get_reproducibility(seed=seed, project_name="test") == expected
+
+
+def test_get_reproducibility_invalid_epoch(monkeypatch):
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "yesterday")
+
+    with pytest.raises(CraftError, match="Invalid SOURCE_DATE_EPOCH"):
+        diskutil.get_reproducibility(seed=None, project_name="test")
+
+
+def test_reproducibility_uuid():
+    reproducibility = diskutil.Reproducibility(seed="test:abc", epoch=0)
+
+    assert reproducibility.uuid("disk") == reproducibility.uuid("disk")
+    assert reproducibility.uuid("disk") != reproducibility.uuid("partition")
+    assert reproducibility.scoped("pc").uuid("disk") == reproducibility.uuid(
+        "pc", "disk"
+    )
+    assert reproducibility.scoped("pc").uuid("disk") != reproducibility.uuid("disk")
+
+
+@pytest.mark.parametrize("fstype", [FileSystem.EXT4, FileSystem.VFAT])
+def test_generate_filesystem_uuid_reproducible(fstype):
+    reproducibility = diskutil.Reproducibility(seed="test:abc", epoch=0)
+
+    first = diskutil.generate_filesystem_uuid(fstype, reproducibility=reproducibility)
+    second = diskutil.generate_filesystem_uuid(fstype, reproducibility=reproducibility)
+
+    assert first == second
+    assert first != diskutil.generate_filesystem_uuid(
+        fstype, reproducibility=reproducibility.scoped("other")
+    )
+
+
+def test_clamp_timestamps(content):
+    old_file = content / "old"
+    old_file.touch()
+    os.utime(old_file, (50, 50))
+
+    diskutil.clamp_timestamps(content, 100)
+
+    assert (content / "a").stat().st_mtime == 100
+    assert (content / "a").stat().st_atime == 100
+    assert old_file.stat().st_mtime == 50
+    assert content.stat().st_mtime == 100
+
+
+def test_format_device_reproducible_ext(mocker, content, device):
+    mocked_run = mocker.patch("imagecraft.pack.diskutil.run", autospec=True)
+    reproducibility = diskutil.Reproducibility(seed="test:abc", epoch=100)
+    os.utime(content / "a", (50, 50))
+    mtime = (content / "a").stat().st_mtime
+
+    diskutil.format_device(
+        device_path=device,
+        fstype=FileSystem.EXT4,
+        content_dir=content,
+        reproducibility=reproducibility,
+    )
+
+    mke2fs_call, debugfs_call = mocked_run.call_args_list
+    fs_uuid = diskutil.generate_filesystem_uuid(
+        FileSystem.EXT4, reproducibility=reproducibility
+    )
+    args = mke2fs_call.args
+    assert args[args.index("-U") + 1] == fs_uuid
+    assert args[args.index("-E") + 1] == (
+        f"hash_seed={reproducibility.uuid('hash-seed')}"
+    )
+    assert mke2fs_call.kwargs["env"]["SOURCE_DATE_EPOCH"] == "100"
+    assert debugfs_call.args[:5] == ("debugfs", "-w", "-f", "-", device)
+    script = debugfs_call.kwargs["input"].splitlines()
+    assert script[:6] == [
+        'sif "/" atime_extra 0',
+        'sif "/" mtime_extra 0',
+        'sif "/" ctime_extra 0',
+        'sif "/" atime 0x64',
+        'sif "/" mtime 0x64',
+        'sif "/" ctime 0x64',
+    ]
+    assert script[6:] == [
+        'sif "/a" atime_extra 0',
+        'sif "/a" mtime_extra 0',
+        'sif "/a" ctime_extra 0',
+        'sif "/a" atime 0x32',
+        'sif "/a" mtime 0x32',
+        'sif "/a" ctime 0x64',
+    ]
+    # The content directory is left as it is.
+    assert (content / "a").stat().st_mtime == mtime
+
+
+def test_format_device_reproducible_ext_quotes(mocker, content, device):
+    mocked_run = mocker.patch("imagecraft.pack.diskutil.run", autospec=True)
+    (content / 'say "hi"').mkdir()
+    (content / 'say "hi"' / "b").touch()
+
+    diskutil.format_device(
+        device_path=device,
+        fstype=FileSystem.EXT4,
+        content_dir=content,
+        reproducibility=diskutil.Reproducibility(seed="test:abc", epoch=100),
+    )
+
+    script = mocked_run.call_args_list[1].kwargs["input"].splitlines()
+    assert 'sif "/say ""hi""" ctime 0x64' in script
+    assert 'sif "/say ""hi""/b" ctime 0x64' in script
+
+
+def test_format_device_reproducible_ext_newline(mocker, content, device):
+    mocker.patch("imagecraft.pack.diskutil.run", autospec=True)
+    (content / "new\nline").mkdir()
+    (content / "new\nline" / "b").touch()
+
+    with pytest.raises(CraftError, match="has a newline"):
+        diskutil.format_device(
+            device_path=device,
+            fstype=FileSystem.EXT4,
+            content_dir=content,
+            reproducibility=diskutil.Reproducibility(seed="test:abc", epoch=100),
+        )
+
+
+def test_format_device_reproducible_fat(mocker, content, device):
+    mocked_run = mocker.patch("imagecraft.pack.diskutil.run", autospec=True)
+    reproducibility = diskutil.Reproducibility(seed="test:abc", epoch=100)
+    mtime = (content / "a").stat().st_mtime
+
+    diskutil.format_device(
+        device_path=device,
+        fstype=FileSystem.VFAT,
+        content_dir=content,
+        reproducibility=reproducibility,
+    )
+
+    mkfs_call, cp_call, mcopy_call = mocked_run.call_args_list
+    volume_id = diskutil.generate_filesystem_uuid(
+        FileSystem.VFAT, reproducibility=reproducibility
+    )
+    args = mkfs_call.args
+    assert args[args.index("-i") + 1] == volume_id.replace("-", "")
+    # Timestamps are clamped in a copy of the content.
+    temp_dir = cp_call.args[-1]
+    assert cp_call.args[:-1] == ("cp", "--archive", "--reflink=auto", f"{content}/.")
+    assert " -m " in mcopy_call.args[2]
+    assert f" {temp_dir}/* ::" in mcopy_call.args[2]
+    assert mcopy_call.kwargs["env"]["SOURCE_DATE_EPOCH"] == "100"
+    assert (content / "a").stat().st_mtime == mtime
+
+
+@pytest.mark.parametrize(
+    ("fstype", "expected_args"),
+    [
+        (
+            FileSystem.EXT4,
+            ["mke2fs", "-t", "ext4", "-E", "offset=1048576", ANY, "2048k"],
+        ),
+        (
+            FileSystem.VFAT,
+            ["mkfs.vfat", "--offset", "2048", ANY, "2048"],
+        ),
+    ],
+)
+def test_format_device_extent(mocker, device, fstype, expected_args):
+    mocked_run = mocker.patch("imagecraft.pack.diskutil.run", autospec=True)
+
+    diskutil.format_device(
+        device_path=device,
+        fstype=fstype,
+        extent=diskutil.PartitionExtent(offset=1 << 20, size=2 << 20),
+    )
+
+    assert list(mocked_run.call_args_list[0].args) == expected_args
+
+
+def test_format_device_extent_fat_content(mocker, content, device):
+    mocked_run = mocker.patch("imagecraft.pack.diskutil.run", autospec=True)
+
+    diskutil.format_device(
+        device_path=device,
+        fstype=FileSystem.VFAT,
+        content_dir=content,
+        extent=diskutil.PartitionExtent(offset=1 << 20, size=2 << 20),
+    )
+
+    assert f" -i{device}@@1048576 " in mocked_run.call_args_list[1].args[2]
+
+
+def test_format_device_extent_reproducible_ext(mocker, content, device):
+    mocked_run = mocker.patch("imagecraft.pack.diskutil.run", autospec=True)
+    reproducibility = diskutil.Reproducibility(seed="test:abc", epoch=100)
+
+    diskutil.format_device(
+        device_path=device,
+        fstype=FileSystem.EXT4,
+        content_dir=content,
+        reproducibility=reproducibility,
+        extent=diskutil.PartitionExtent(offset=4096, size=1 << 20),
+    )
+
+    mke2fs_call, debugfs_call = mocked_run.call_args_list
+    args = mke2fs_call.args
+    assert args[args.index("-E") + 1] == (
+        f"offset=4096,hash_seed={reproducibility.uuid('hash-seed')}"
+    )
+    assert debugfs_call.args[4] == f"{device}?offset=4096"
+
+
+@pytest.mark.parametrize(
+    ("extent", "expected_image"),
+    [
+        (None, "{device}"),
+        (diskutil.PartitionExtent(offset=512, size=1024), "{device}@@512"),
+    ],
+)
+def test_mark_fat_read_only(mocker, device, extent, expected_image):
+    mocked_run = mocker.patch("imagecraft.pack.diskutil.run", autospec=True)
+
+    diskutil.mark_fat_read_only(device, ["/a", "/EFI/b"], extent=extent)
+
+    mocked_run.assert_called_once_with(
+        "mattrib",
+        f"-i{expected_image.format(device=device)}",
+        "+r",
+        "::/a",
+        "::/EFI/b",
+        stdout=ANY,
+        stderr=ANY,
+    )
+
+
+def test_mark_fat_read_only_nothing(mocker, device):
+    mocked_run = mocker.patch("imagecraft.pack.diskutil.run", autospec=True)
+
+    diskutil.mark_fat_read_only(device, [])
+
+    mocked_run.assert_not_called()
+
+
+def test_check_filesystem_extent_ext(mocker, device):
+    mocked_run = mocker.patch(
+        "imagecraft.pack.diskutil.run",
+        autospec=True,
+        return_value=subprocess.CompletedProcess([], 0, stdout=""),
+    )
+
+    diskutil.check_filesystem(
+        device, FileSystem.EXT4, extent=diskutil.PartitionExtent(4096, 8192)
+    )
+
+    mocked_run.assert_called_once_with(
+        "e2fsck",
+        "-f",
+        "-n",
+        f"{device}?offset=4096",
+        check=False,
+        stderr=subprocess.STDOUT,
+    )
+
+
+def test_check_filesystem_extent_fat(mocker, device):
+    device.write_bytes(b"\0" * 4096 + b"fat" * 1000 + b"\0" * 4096)
+    copies = []
+
+    def fake_run(*args, **_):
+        copies.append(args[2].read_bytes())
+        return subprocess.CompletedProcess([], 0, stdout="")
+
+    mocker.patch("imagecraft.pack.diskutil.run", side_effect=fake_run)
+
+    check = diskutil.check_filesystem(
+        device, FileSystem.VFAT, extent=diskutil.PartitionExtent(4096, 3000)
+    )
+
+    assert check.passed
+    assert copies == [b"fat" * 1000]
@@ -152,6 +152,7 @@ def test_create_empty_gpt_image(mocker, volume, tmp_path):
         imagepath=imagepath,
         sector_size=512,
         layout=volume,
+        reproducibility=None,
     )
     bytesize = 2048 * 512 + 34 * 512 + 6 * 1024**3 + 20 * 1024**2
     # partition reserved size +
@@ -392,3 +393,22 @@ def test_verify_partition_tables(mocker, tmp_path):
         e.value.details
         == "The backup GPT table is corrupt, but the primary appears OK, so that will be used."
     )
+
+
+def test_create_gpt_layout_reproducible(mocker, tmp_path, volume):
+    mocked_run = mocker.patch("imagecraft.pack.gptutil.run", autospec=True)
+    reproducibility = diskutil.Reproducibility(seed="test:abc", epoch=0)
+
+    gptutil._create_gpt_layout(
+        imagepath=tmp_path / "image.img",
+        sector_size=512,
+        layout=volume,
+        reproducibility=reproducibility,
+    )
+
+    stdin = mocked_run.call_args.kwargs["input"].splitlines()
+    assert f"label-id: {str(reproducibility.uuid('disk')).upper()}" in stdin
+    efi_uuid = str(reproducibility.uuid("partition", "efi")).upper()
+    assert f"uuid={efi_uuid}" in stdin[4]
+    # Partitions with an explicit id keep it.
+    assert "uuid=6fa819a0-a35a-487a-82d4-a86d1a46b2bb" in stdin[6]
@@ -0,0 +1,144 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import pytest
+from imagecraft.models.volume import PartitionSchema
+from imagecraft.pack import grubcfg
+
+ROOT_FS = grubcfg.Filesystem(uuid="1111-root", fstype="ext4")
+BOOT_FS = grubcfg.Filesystem(uuid="2222-boot", fstype="ext4")
+
+
+@pytest.fixture
+def rootfs(tmp_path):
+    boot = tmp_path / "boot"
+    boot.mkdir()
+    for name in [
+        "vmlinuz-6.8.0-9-generic",
+        "initrd.img-6.8.0-9-generic",
+        "vmlinuz-6.8.0-10-generic",
+        "initrd.img-6.8.0-10-generic",
+        "config-6.8.0-10-generic",
+    ]:
+        (boot / name).touch()
+    (tmp_path / "etc/default").mkdir(parents=True)
+    (tmp_path / "etc/os-release").write_text('NAME="Ubuntu"\nVERSION_ID="24.04"\n')
+    return tmp_path
+
+
+def test_find_kernels(rootfs):
+    assert grubcfg.find_kernels(rootfs / "boot") == [
+        grubcfg.Kernel(
+            version="6.8.0-10-generic",
+            kernel="vmlinuz-6.8.0-10-generic",
+            initrd="initrd.img-6.8.0-10-generic",
+        ),
+        grubcfg.Kernel(
+            version="6.8.0-9-generic",
+            kernel="vmlinuz-6.8.0-9-generic",
+            initrd="initrd.img-6.8.0-9-generic",
+        ),
+    ]
+
+
+def test_find_kernels_no_boot_dir(tmp_path):
+    assert grubcfg.find_kernels(tmp_path / "boot") == []
+
+
+def test_read_grub_defaults(rootfs):
+    (rootfs / "etc/default/grub").write_text(
+        "# comment\n"
+        "GRUB_DEFAULT=0\n"
+        "GRUB_TIMEOUT=0\n"
+        "GRUB_DISTRIBUTOR=`( . /etc/os-release; echo ${NAME:-Ubuntu} )`\n"
+        'GRUB_CMDLINE_LINUX_DEFAULT="quiet splash"\n'
+    )
+    (rootfs / "etc/default/grub.d").mkdir()
+    (rootfs / "etc/default/grub.d/50-cloud.cfg").write_text(
+        'GRUB_CMDLINE_LINUX_DEFAULT="console=ttyS0"\n'
+    )
+
+    assert grubcfg.read_grub_defaults(rootfs) == {
+        "GRUB_DEFAULT": "0",
+        "GRUB_TIMEOUT": "0",
+        "GRUB_CMDLINE_LINUX_DEFAULT": "console=ttyS0",
+    }
+
+
+def test_render_grub_config(rootfs):
+    (rootfs / "etc/default/grub").write_text(
+        'GRUB_TIMEOUT=1\nGRUB_CMDLINE_LINUX="net.ifnames=0"\n'
+        'GRUB_CMDLINE_LINUX_DEFAULT="quiet"\n'
+    )
+    config = grubcfg.NativeConfig(
+        schema=PartitionSchema.GPT, root=ROOT_FS, boot=ROOT_FS
+    )
+
+    assert grubcfg.render_grub_config(rootfs, config) == (
+        "# Generated by imagecraft. Do not edit.\n"
+        "set default=0\n"
+        "set timeout=1\n"
+        "insmod part_gpt\n"
+        "insmod ext2\n"
+        "search --no-floppy --fs-uuid --set=root 1111-root\n"
+        "menuentry 'Ubuntu, with Linux 6.8.0-10-generic' --class ubuntu --class gnu-linux --class os {\n"
+        "\tinsmod gzio\n"
+        "\tlinux\t/boot/vmlinuz-6.8.0-10-generic root=UUID=1111-root ro net.ifnames=0 quiet\n"
+        "\tinitrd\t/boot/initrd.img-6.8.0-10-generic\n"
+        "}\n"
+        "menuentry 'Ubuntu, with Linux 6.8.0-10-generic (recovery mode)' --class ubuntu --class gnu-linux --class os {\n"
+        "\tinsmod gzio\n"
+        "\tlinux\t/boot/vmlinuz-6.8.0-10-generic root=UUID=1111-root ro single net.ifnames=0\n"
+        "\tinitrd\t/boot/initrd.img-6.8.0-10-generic\n"
+        "}\n"
+        "menuentry 'Ubuntu, with Linux 6.8.0-9-generic' --class ubuntu --class gnu-linux --class os {\n"
+        "\tinsmod gzio\n"
+        "\tlinux\t/boot/vmlinuz-6.8.0-9-generic root=UUID=1111-root ro net.ifnames=0 quiet\n"
+        "\tinitrd\t/boot/initrd.img-6.8.0-9-generic\n"
+        "}\n"
+        "menuentry 'Ubuntu, with Linux 6.8.0-9-generic (recovery mode)' --class ubuntu --class gnu-linux --class os {\n"
+        "\tinsmod gzio\n"
+        "\tlinux\t/boot/vmlinuz-6.8.0-9-generic root=UUID=1111-root ro single net.ifnames=0\n"
+        "\tinitrd\t/boot/initrd.img-6.8.0-9-generic\n"
+        "}\n"
+    )
+
+
+def test_render_grub_config_separate_boot(rootfs):
+    (rootfs / "etc/default/grub").write_text("GRUB_DISABLE_RECOVERY=true\n")
+    config = grubcfg.NativeConfig(
+        schema=PartitionSchema.MBR, root=ROOT_FS, boot=BOOT_FS
+    )
+
+    rendered = grubcfg.render_grub_config(rootfs, config)
+
+    assert "insmod part_msdos\n" in rendered
+    assert "search --no-floppy --fs-uuid --set=root 2222-boot\n" in rendered
+    assert "\tlinux\t/vmlinuz-6.8.0-10-generic root=UUID=1111-root ro\n" in rendered
+    assert "recovery mode" not in rendered
+
+
+def test_write_grub_config_deterministic(rootfs):
+    config = grubcfg.NativeConfig(
+        schema=PartitionSchema.GPT, root=ROOT_FS, boot=ROOT_FS
+    )
+
+    grub_cfg = grubcfg.write_grub_config(rootfs, config)
+    first = grub_cfg.read_text()
+    grubcfg.write_grub_config(rootfs, config)
+
+    assert grub_cfg == rootfs / "boot/grub/grub.cfg"
+    assert grub_cfg.read_text() == first
@@ -29,9 +29,16 @@ from imagecraft.models.volume import (
     MBRStructureItem,
     MBRStructureList,
     MBRVolume,
+    PartitionSchema,
 )
+from imagecraft.pack import grubcfg
 from imagecraft.pack.chroot import Mount
-from imagecraft.pack.grubutil import _image_mounts, _part_num, setup_grub
+from imagecraft.pack.grubutil import (
+    _grub_install,
+    _image_mounts,
+    _part_num,
+    setup_grub,
+)
 from imagecraft.pack.image import Image
 
 
@@ -118,6 +125,70 @@ def test_setup_grub(mocker, new_dir, volume, filesystem_mount):
     )
 
 
+@pytest.mark.parametrize(
+    ("filesystem_mount", "boot_uuid"),
+    [
+        (
+            FilesystemMount.unmarshal(
+                [
+                    {"mount": "/", "device": "(volume/pc/rootfs)"},
+                    {"mount": "/boot", "device": "(volume/pc/boot)"},
+                    {"mount": "/boot/efi", "device": "(volume/pc/efi)"},
+                ]
+            ),
+            "uuid-loop99p2",
+        ),
+        (
+            FilesystemMount.unmarshal(
+                [
+                    {"mount": "/", "device": "(volume/pc/rootfs)"},
+                    {"mount": "/boot/efi", "device": "(volume/pc/efi)"},
+                ]
+            ),
+            "uuid-loop99p3",
+        ),
+    ],
+)
+def test_setup_grub_native_config(mocker, new_dir, volume, filesystem_mount, boot_uuid):
+    disk_path = Path(new_dir, "pc.img")
+    disk_path.touch(exist_ok=True)
+    image = Image(volume=volume, disk_path=disk_path)
+    workdir = Path(new_dir, "workdir")
+    workdir.mkdir()
+    mock_chroot = mocker.patch("imagecraft.pack.grubutil.Chroot")
+    mocker.patch.object(image, "attach_loopdev", side_effect=fake_loopdev_handler)
+    mock_run = mocker.patch("imagecraft.pack.grubutil.run")
+    mock_run.side_effect = lambda *args: MagicMock(
+        stdout=f"DEVNAME={args[-1]}\nUUID=uuid-{args[-1]}\nTYPE=ext4\n"
+    )
+
+    setup_grub(
+        image=image,
+        workdir=workdir,
+        arch=DebianArchitecture.AMD64,
+        filesystem_mount=filesystem_mount,
+        native_config=True,
+    )
+
+    config = mock_chroot.return_value.execute.call_args.kwargs["native_config"]
+    assert config.schema == PartitionSchema.GPT
+    assert config.root == grubcfg.Filesystem(uuid="uuid-loop99p3", fstype="ext4")
+    assert config.boot.uuid == boot_uuid
+
+
+def test_grub_install_native_config(mocker, new_dir):
+    mock_run = mocker.patch("imagecraft.pack.grubutil.run")
+    mock_write = mocker.patch("imagecraft.pack.grubutil.grubcfg.write_grub_config")
+    root = grubcfg.Filesystem(uuid="1234", fstype="ext4")
+    config = grubcfg.NativeConfig(schema=PartitionSchema.GPT, root=root, boot=root)
+
+    _grub_install("x86_64-efi", "/dev/loop99", native_config=config)
+
+    commands = [call.args[0] for call in mock_run.call_args_list]
+    assert commands == ["grub-install", "grub-install"]
+    mock_write.assert_called_once_with(Path("/"), config)
+
+
 @pytest.mark.parametrize(
     ("volume", "arch", "message"),
     [
@@ -405,6 +476,28 @@ def test_image_mounts(
     assert _image_mounts(loop_dev, volume.structure, filesystem_mount) == mounts
 
 
+def test_image_mounts_cross_volume(volume):
+    filesystem_mount = FilesystemMount.unmarshal(
+        [
+            {"mount": "/", "device": "(volume/pc/rootfs)"},
+            {"mount": "/home", "device": "(volume/data/home)"},
+        ]
+    )
+    loop_paths = {
+        "pc": "/dev/loop99",
+        "pc/rootfs": "/dev/loop99p3",
+        "data": "/dev/loop100",
+        "data/home": "/dev/loop100p1",
+    }
+
+    assert _image_mounts(
+        "/dev/loop99", volume.structure, filesystem_mount, loop_paths=loop_paths
+    ) == [
+        Mount(fstype=None, src="/dev/loop99p3", relative_mountpoint="/"),
+        Mount(fstype=None, src="/dev/loop100p1", relative_mountpoint="/home"),
+    ]
+
+
 @pytest.mark.parametrize(
     ("loop_dev", "volume", "filesystem_mount"),
     [
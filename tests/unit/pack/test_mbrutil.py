@@ -205,6 +205,21 @@ def test_create_mbr_layout_calls_sfdisk(mocker, tmp_path, volume):
     assert "bootable" in stdin  # ubuntu-seed has role system-boot
 
 
+def test_create_mbr_layout_reproducible(mocker, tmp_path, volume):
+    mocked_run = mocker.patch("imagecraft.pack.mbrutil.subprocess.run", autospec=True)
+    reproducibility = diskutil.Reproducibility(seed="test:abc", epoch=0)
+
+    mbrutil._create_mbr_layout(
+        imagepath=tmp_path / "image.img",
+        sector_size=512,
+        layout=volume,
+        reproducibility=reproducibility,
+    )
+
+    stdin = mocked_run.call_args.kwargs["input"].splitlines()
+    assert stdin[2] == f"label-id: 0x{reproducibility.uuid('disk').hex[:8]}"
+
+
 def test_create_mbr_layout_sfdisk_failure_raises(mocker, tmp_path, volume):
     mocked_run = mocker.patch("imagecraft.pack.mbrutil.subprocess.run", autospec=True)
     mocked_run.side_effect = subprocess.CalledProcessError(
@@ -379,6 +394,7 @@ def test_create_empty_mbr_image(mocker, tmp_path, volume_spec, expected_bytes):
         imagepath=imagepath,
         sector_size=512,
         layout=layout,
+        reproducibility=None,
     )
     create_zero_image.assert_called_once_with(
         imagepath=imagepath,
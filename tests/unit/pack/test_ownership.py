@@ -0,0 +1,93 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import stat
+
+import pytest
+from craft_cli import CraftError
+from imagecraft.pack import ownership
+
+
+@pytest.fixture
+def content_dir(tmp_path):
+    content = tmp_path / "prime"
+    (content / "etc").mkdir(parents=True)
+    (content / "etc/hostname").write_text("ubuntu\n")
+    (content / "etc/passwd").write_text("root:x:0:0::/root:/bin/sh\n")
+    (content / "etc/passwd").chmod(0o444)
+    (content / "etc/mtab").symlink_to("/proc/self/mounts")
+    return content
+
+
+@pytest.fixture
+def id_maps(tmp_path, monkeypatch):
+    """Fake the ID maps of the namespace and its overflow IDs."""
+
+    def set_maps(*, overflow_id: int, mapped: bool) -> None:
+        first_id = overflow_id if mapped else overflow_id + 1
+        id_map = f"{first_id} 100000 65536\n"
+        for name in ("uid_map", "gid_map"):
+            (tmp_path / name).write_text(id_map)
+        for name in ("overflowuid", "overflowgid"):
+            (tmp_path / name).write_text(f"{overflow_id}\n")
+        monkeypatch.setattr(ownership, "_UID_MAP_PATH", tmp_path / "uid_map")
+        monkeypatch.setattr(ownership, "_GID_MAP_PATH", tmp_path / "gid_map")
+        monkeypatch.setattr(ownership, "_OVERFLOW_UID_PATH", tmp_path / "overflowuid")
+        monkeypatch.setattr(ownership, "_OVERFLOW_GID_PATH", tmp_path / "overflowgid")
+
+    return set_maps
+
+
+def test_record_ownership(content_dir, id_maps):
+    id_maps(overflow_id=65534, mapped=False)
+    uid, gid = os.getuid(), os.getgid()
+
+    recorded = ownership.record_ownership(content_dir)
+
+    assert set(recorded) == {"/etc", "/etc/hostname", "/etc/passwd", "/etc/mtab"}
+    assert recorded["/etc/passwd"] == ownership.Ownership(
+        uid, gid, stat.S_IFREG | 0o444
+    )
+    assert stat.S_ISLNK(recorded["/etc/mtab"].mode)
+    assert ownership.get_read_only_files(recorded) == ["/etc/passwd"]
+
+
+@pytest.mark.parametrize("mapped", [True, False])
+def test_record_ownership_overflow_ids(content_dir, id_maps, mapped):
+    # Pretend the current user's ID is the overflow ID.
+    id_maps(overflow_id=os.getuid(), mapped=mapped)
+
+    if mapped:
+        assert ownership.record_ownership(content_dir)
+    else:
+        with pytest.raises(CraftError, match="owned by IDs outside") as raised:
+            ownership.record_ownership(content_dir)
+        assert raised.value.details == "/etc\n/etc/hostname\n/etc/mtab\n/etc/passwd"
+
+
+@pytest.mark.parametrize(
+    ("mode", "read_only"),
+    [
+        (stat.S_IFREG | 0o444, True),
+        (stat.S_IFREG | 0o400, True),
+        (stat.S_IFREG | 0o644, False),
+        (stat.S_IFDIR | 0o555, False),
+        (stat.S_IFLNK | 0o444, False),
+    ],
+)
+def test_ownership_read_only(mode, read_only):
+    assert ownership.Ownership(0, 0, mode).read_only is read_only
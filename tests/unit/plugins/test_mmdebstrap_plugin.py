@@ -59,6 +59,7 @@ def test_get_build_commands(plugin, arch, mirror):
     assert plugin.get_build_commands() == [
         f'mmdebstrap --arch={arch} --mode=root --variant=apt --format=dir noble "$CRAFT_PART_INSTALL" {mirror}',
         *plugin._get_cleanup_commands(),
+        'sync -f "$CRAFT_PART_INSTALL"',
     ]
 
 
@@ -89,3 +90,147 @@ def test_get_suite_missing(part_info, mocker):
 
     with pytest.raises(ValueError, match="Suite could not be determined"):
         plugin._get_build_base_suite()
+
+
+def test_get_build_commands_cache_dir(part_info):
+    properties = MmdebstrapPluginProperties.unmarshal(
+        {"mmdebstrap-suite": "noble", "mmdebstrap-cache-dir": "/var/cache/debs"}
+    )
+    plugin = MmdebstrapPlugin(properties=properties, part_info=part_info)
+
+    command = plugin.get_build_commands()[0]
+
+    assert "--skip=download/empty --skip=essential/unlink" in command
+    assert "'--setup-hook=sync-in /var/cache/debs /var/cache/apt/archives/'" in command
+    sync_out = "'--customize-hook=sync-out /var/cache/apt/archives /var/cache/debs'"
+    empty = """'--customize-hook=rm -f "$1"/var/cache/apt/archives/*.deb'"""
+    assert sync_out in command
+    assert empty in command
+    assert command.index(sync_out) < command.index(empty)
+
+
+def test_cache_dir_must_be_absolute():
+    with pytest.raises(ValueError, match="must be an absolute path"):
+        MmdebstrapPluginProperties.unmarshal({"mmdebstrap-cache-dir": "debs"})
+
+
+def test_get_build_commands_mirrors(part_info):
+    properties = MmdebstrapPluginProperties.unmarshal(
+        {
+            "mmdebstrap-suite": "noble",
+            "mmdebstrap-mirrors": ["file:///srv/mirror", "copy:///srv/other"],
+        }
+    )
+    plugin = MmdebstrapPlugin(properties=properties, part_info=part_info)
+
+    assert plugin.get_build_commands()[0].endswith(
+        'noble "$CRAFT_PART_INSTALL" file:///srv/mirror copy:///srv/other'
+    )
+
+
+@pytest.mark.parametrize("mirror", ["ftp://example.com/ubuntu", "/srv/mirror"])
+def test_invalid_mirrors(mirror):
+    with pytest.raises(ValueError, match="Invalid mirror"):
+        MmdebstrapPluginProperties.unmarshal({"mmdebstrap-mirrors": [mirror]})
+
+
+def test_get_build_commands_tar_format(part_info):
+    properties = MmdebstrapPluginProperties.unmarshal(
+        {"mmdebstrap-suite": "noble", "mmdebstrap-format": "tar"}
+    )
+    plugin = MmdebstrapPlugin(properties=properties, part_info=part_info)
+
+    commands = plugin.get_build_commands()
+
+    assert len(commands) == 3
+    assert commands[1] == 'touch "$CRAFT_PART_INSTALL"/.imagecraft-content-tarball'
+    assert commands[-1] == 'sync -f "$CRAFT_PART_INSTALL"'
+    assert "--format=tar --skip=output/dev" in commands[0]
+    assert "/etc/apt/sources.list" in commands[0]
+    assert 'noble "$CRAFT_PART_INSTALL"/rootfs.tar ' in commands[0]
+
+
+def test_invalid_format():
+    with pytest.raises(ValueError, match="mmdebstrap-format"):
+        MmdebstrapPluginProperties.unmarshal({"mmdebstrap-format": "squashfs"})
+
+
+def test_get_build_commands_fast_io(part_info):
+    properties = MmdebstrapPluginProperties.unmarshal(
+        {"mmdebstrap-suite": "noble", "mmdebstrap-fast-io": True}
+    )
+    plugin = MmdebstrapPlugin(properties=properties, part_info=part_info)
+
+    command = plugin.get_build_commands()[0]
+
+    assert plugin.get_build_packages() == {"mmdebstrap", "eatmydata"}
+    assert "--hook-dir=/usr/share/mmdebstrap/hooks/eatmydata" in command
+    assert "--dpkgopt=force-unsafe-io" in command
+    assert "'--dpkgopt=path-exclude=/usr/share/doc/*'" in command
+    assert "'--dpkgopt=path-include=/usr/share/doc/*/copyright'" in command
+    assert "'--dpkgopt=path-exclude=/usr/share/locale/*'" in command
+    assert "sed -i /^force-unsafe-io$/d" in command
+    assert plugin.get_build_commands()[-1] == 'sync -f "$CRAFT_PART_INSTALL"'
+
+
+def test_get_build_commands_no_fast_io(plugin):
+    command = plugin.get_build_commands()[0]
+
+    assert "--dpkgopt" not in command
+    assert "eatmydata" not in command
+
+
+def _snapshot_plugin(part_info, **extra):
+    properties = MmdebstrapPluginProperties.unmarshal(
+        {
+            "mmdebstrap-suite": "noble",
+            "mmdebstrap-snapshot-dir": "/var/cache/snapshots",
+            **extra,
+        }
+    )
+    return MmdebstrapPlugin(properties=properties, part_info=part_info)
+
+
+def test_get_build_commands_snapshot(part_info):
+    plugin = _snapshot_plugin(part_info, **{"mmdebstrap-snapshot-max-size": "1GiB"})
+
+    commands = plugin.get_build_commands()
+    script = "\n".join(commands)
+
+    assert plugin.get_build_packages() == {"mmdebstrap", "curl", "zstd"}
+    assert "http://archive.ubuntu.com/ubuntu/dists/noble/InRelease;" in commands[1]
+    tar_options = "--zstd --numeric-owner --xattrs --xattrs-include='*' --acls"
+    assert f'tar {tar_options} -xpf "$snapshot" -C "$CRAFT_PART_INSTALL"' in script
+    assert f'tar {tar_options} -cpf "$snapshot.$$" -C "$CRAFT_PART_INSTALL" .' in script
+    assert '[ "$total" -gt 1073741824 ]' in script
+    # The bootstrap and cleanup only run on a snapshot miss.
+    else_index = commands.index("else")
+    assert commands[else_index + 1].lstrip().startswith("mmdebstrap ")
+    assert commands[-1] == 'sync -f "$CRAFT_PART_INSTALL"'
+
+
+def test_snapshot_key_depends_on_inputs(part_info):
+    def snapshot_path(**extra):
+        commands = _snapshot_plugin(part_info, **extra).get_build_commands()
+        return commands[2]
+
+    base = snapshot_path()
+
+    assert snapshot_path() == base
+    assert snapshot_path(**{"mmdebstrap-packages": ["curl"]}) != base
+    assert snapshot_path(**{"mmdebstrap-variant": "minbase"}) != base
+    assert snapshot_path(**{"mmdebstrap-fast-io": True}) != base
+    assert snapshot_path(**{"mmdebstrap-snapshot-max-size": "1GiB"}) == base
+
+
+def test_snapshot_copy_mirror(part_info):
+    plugin = _snapshot_plugin(
+        part_info, **{"mmdebstrap-mirrors": ["copy:///srv/mirror"]}
+    )
+
+    assert "file:///srv/mirror/dists/noble/InRelease" in plugin.get_build_commands()[1]
+
+
+def test_snapshot_dir_must_be_absolute():
+    with pytest.raises(ValueError, match="mmdebstrap-snapshot-dir must be an absolute"):
+        MmdebstrapPluginProperties.unmarshal({"mmdebstrap-snapshot-dir": "snapshots"})
@@ -175,3 +175,30 @@ def test_get_build_commands_with_validation_enforce(part_info):
         plugin.get_build_commands()[0]
         == f"snap prepare-image --classic --arch={part_info.target_arch} --validation=enforce --snap=core24 '' {part_info.part_install_dir}"
     )
+
+
+def test_get_build_commands_with_snap_cache_dir(part_info, cmd_prefix):
+    properties = SnapPreseedPluginProperties.unmarshal(
+        {
+            "snap-preseed-snaps": ["core24"],
+            "snap-preseed-snap-cache-dir": "/var/cache/snaps",
+        }
+    )
+
+    plugin = SnapPreseedPlugin(properties=properties, part_info=part_info)
+    commands = plugin.get_build_commands()
+    snaps_dir = part_info.part_build_dir / "snaps"
+
+    assert plugin.get_build_packages() == {"openssl"}
+    assert any(command.startswith("fetch_snap ") for command in commands)
+    assert commands[-1] == (
+        f"{cmd_prefix} --snap={snaps_dir}/core24.snap "
+        f"--assert={snaps_dir}/core24.assert '' {part_info.part_install_dir}"
+    )
+
+
+def test_snap_cache_dir_must_be_absolute():
+    with pytest.raises(ValidationError, match="must be an absolute path"):
+        SnapPreseedPluginProperties.unmarshal(
+            {"snap-preseed-snaps": ["core24"], "snap-preseed-snap-cache-dir": "snaps"}
+        )
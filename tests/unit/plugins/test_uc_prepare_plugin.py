@@ -14,6 +14,9 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import shutil
+import subprocess
+from pathlib import Path
 
 import pytest
 from craft_parts import PartInfo, ProjectInfo
@@ -285,3 +288,172 @@ def test_get_build_commands_with_write_revisions_path(part_info):
         plugin.get_build_commands()[1]
         == f"snap prepare-image --validation=enforce --write-revisions={part_info.part_install_dir}/revisions.txt model.assert {part_info.part_build_dir}/prepare-image"
     )
+
+
+def test_get_build_commands_with_snap_cache_dir(part_info):
+    properties = UcPreparePluginProperties.unmarshal(
+        {
+            "uc-prepare-model-assert": "model.assert",
+            "uc-prepare-snaps": ["hello-world@latest/stable"],
+            "uc-prepare-snap-cache-dir": "/var/cache/snaps",
+        }
+    )
+
+    plugin = UcPreparePlugin(properties=properties, part_info=part_info)
+    commands = plugin.get_build_commands()
+    snaps_dir = part_info.part_build_dir / "snaps"
+
+    assert plugin.get_build_packages() == {"openssl"}
+    assert any(
+        command.startswith("fetch_snap /var/cache/snaps ")
+        and " hello-world latest/stable " in command
+        for command in commands
+    )
+    # The snaps of the model are prefetched too.
+    assert "  done < <(model_snaps model.assert '')" in commands
+    assert (
+        f"--snap={snaps_dir}/hello-world.snap "
+        f"--assert={snaps_dir}/hello-world.assert "
+        '"${model_snap_args[@]}" model.assert' in commands[-2]
+    )
+
+
+def test_snap_cache_dir_must_be_absolute():
+    with pytest.raises(ValidationError, match="must be an absolute path"):
+        UcPreparePluginProperties.unmarshal(
+            {
+                "uc-prepare-model-assert": "model.assert",
+                "uc-prepare-snap-cache-dir": "snaps",
+            }
+        )
+
+
+def test_get_build_commands_with_seed_cache_dir(part_info):
+    properties = UcPreparePluginProperties.unmarshal(
+        {
+            "uc-prepare-model-assert": "model.assert",
+            "uc-prepare-snaps": ["./local.snap"],
+            "uc-prepare-assertions": ["extra.assert"],
+            "uc-prepare-revisions": "revisions.txt",
+            "uc-prepare-write-revisions": True,
+            "uc-prepare-seed-cache-dir": "/var/cache/seeds",
+        }
+    )
+
+    plugin = UcPreparePlugin(properties=properties, part_info=part_info)
+    commands = plugin.get_build_commands()
+    install_dir = part_info.part_install_dir
+    seed_cache = "/var/cache/seeds/my-part"
+    index = commands.index('seed_inputs=""')
+
+    assert commands[0] == "seed_revisions=$("
+    assert commands[index + 2].startswith("  seed_inputs=$({ echo 'snap prepare-image ")
+    assert (
+        'cat model.assert extra.assert ./local.snap; printf "%s" "$seed_revisions"; }'
+        in commands[index + 2]
+    )
+    assert commands[index + 5] == (
+        f'if [ -n "$seed_inputs" ] && '
+        f'[ "$(cat {seed_cache}/inputs 2>/dev/null)" = "$seed_inputs" ]; then'
+    )
+    assert commands[index + 6] == (
+        f"  cp -a --reflink=auto {seed_cache}/system-seed {install_dir}/"
+    )
+    assert commands[index + 7] == (
+        f"  cp {seed_cache}/seed.manifest {install_dir}/seed.manifest"
+    )
+    assert commands[index + 8] == "else"
+    assert commands[index + 10].startswith("  snap prepare-image ")
+    assert commands[index + 11] == '  if [ -n "$seed_inputs" ]; then'
+    assert commands[-1] == "fi"
+
+
+def test_get_build_commands_with_seed_cache_dir_unpinned(part_info):
+    properties = UcPreparePluginProperties.unmarshal(
+        {
+            "uc-prepare-model-assert": "model.assert",
+            "uc-prepare-seed-cache-dir": "/var/cache/seeds",
+        }
+    )
+
+    plugin = UcPreparePlugin(properties=properties, part_info=part_info)
+    commands = plugin.get_build_commands()
+
+    # Revisions resolved by the store aren't known before prepare-image runs.
+    assert commands[0] == 'seed_revisions=""'
+
+
+def test_get_build_commands_with_seed_and_snap_cache_dir(part_info):
+    properties = UcPreparePluginProperties.unmarshal(
+        {
+            "uc-prepare-model-assert": "model.assert",
+            "uc-prepare-snaps": ["core24"],
+            "uc-prepare-snap-cache-dir": "/var/cache/snaps",
+            "uc-prepare-seed-cache-dir": "/var/cache/seeds",
+        }
+    )
+
+    plugin = UcPreparePlugin(properties=properties, part_info=part_info)
+    commands = plugin.get_build_commands()
+    seed_index = commands.index("seed_revisions=$(")
+
+    # Snaps are prefetched before their revisions are resolved.
+    assert any(command.startswith("fetch_snap ") for command in commands[:seed_index])
+    assert f"{part_info.part_build_dir}/snaps/" in commands[seed_index + 3]
+
+
+_MODEL = """\
+type: model
+snaps:
+  -
+    name: pc
+    type: gadget
+  -
+    name: snapd
+    type: snapd
+"""
+
+
+@pytest.mark.parametrize(
+    ("model", "revisions", "expected"),
+    [
+        pytest.param(
+            _MODEL,
+            "pc 10\nsnapd 20\nhello 3\n",
+            "core24 5\nhello 3\npc 10\nsnapd 20",
+            id="pinned",
+        ),
+        pytest.param(_MODEL, "pc 10\nhello 3\n", "", id="model-snap-unpinned"),
+        pytest.param(_MODEL, "pc 10\nsnapd 20\n", "", id="listed-snap-unpinned"),
+        pytest.param(
+            "type: model\ngadget: pc\n", "pc 10\nhello 3\n", "", id="legacy-model"
+        ),
+    ],
+)
+@pytest.mark.skipif(not shutil.which("bash"), reason="requires bash")
+def test_seed_revisions(part_info, model, revisions, expected):
+    properties = UcPreparePluginProperties.unmarshal(
+        {
+            "uc-prepare-model-assert": "model.assert",
+            "uc-prepare-snaps": ["hello @ edge", "core24"],
+            "uc-prepare-revisions": "revisions.txt",
+            "uc-prepare-snap-cache-dir": "/var/cache/snaps",
+            "uc-prepare-seed-cache-dir": "/var/cache/seeds",
+        }
+    )
+    Path("model.assert").write_text(model)
+    Path("revisions.txt").write_text(revisions)
+    snaps_dir = part_info.part_build_dir / "snaps"
+    snaps_dir.mkdir(parents=True)
+    (snaps_dir / "core24.assert").write_text("snap-id: abc\nsnap-revision: 5\n")
+
+    plugin = UcPreparePlugin(properties=properties, part_info=part_info)
+    commands = plugin._get_seed_revisions_commands()
+    result = subprocess.run(
+        ["bash", "-c", "\n".join([*commands, 'printf "%s" "$seed_revisions"'])],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.stdout == expected
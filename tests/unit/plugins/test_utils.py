@@ -14,8 +14,22 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import base64
+import hashlib
+import os
+import shutil
+import subprocess
+from pathlib import Path
+
 import pytest
-from imagecraft.plugins._utils import resolve_snap, validate_snap_refs
+from imagecraft.plugins._utils import (
+    _FETCH_SNAP_FUNCTION,
+    MODEL_SNAP_ARGS,
+    get_snap_prefetch_commands,
+    join_command,
+    resolve_snap,
+    validate_snap_refs,
+)
 
 
 @pytest.mark.parametrize(
@@ -63,3 +77,180 @@ def test_validate_snap_ref_valid():
 def test_validate_snap_ref_invalid(invalid_ref):
     with pytest.raises(ValueError, match="Invalid snap reference"):
         validate_snap_refs([invalid_ref])
+
+
+def test_get_snap_prefetch_commands():
+    commands, args = get_snap_prefetch_commands(
+        ["core24", "pc @ 24/edge", "./local_1.0_amd64.snap"],
+        cache_dir="/var/cache/snaps",
+        target_dir=Path("/build/snaps"),
+        arch="arm64",
+        channel=None,
+    )
+
+    assert commands[0].startswith("fetch_snap() {")
+    assert commands[1:] == [
+        "rm -rf /build/snaps",
+        "mkdir -p /var/cache/snaps/refs /build/snaps",
+        "fetch_pids=()",
+        "fetch_snap /var/cache/snaps arm64 core24 stable /build/snaps/core24 & fetch_pids+=($!)",
+        "fetch_snap /var/cache/snaps arm64 pc 24/edge /build/snaps/pc & fetch_pids+=($!)",
+        'for pid in "${fetch_pids[@]}"; do wait "$pid"; done',
+    ]
+    assert args == [
+        "--snap=/build/snaps/core24.snap",
+        "--assert=/build/snaps/core24.assert",
+        "--snap=/build/snaps/pc.snap",
+        "--assert=/build/snaps/pc.assert",
+        "--snap=./local_1.0_amd64.snap",
+    ]
+
+
+def test_get_snap_prefetch_commands_default_channel():
+    commands, _ = get_snap_prefetch_commands(
+        ["core24"],
+        cache_dir="/var/cache/snaps",
+        target_dir=Path("/build/snaps"),
+        arch="amd64",
+        channel="edge",
+    )
+
+    assert (
+        "fetch_snap /var/cache/snaps amd64 core24 edge /build/snaps/core24"
+        in (commands[4])
+    )
+
+
+@pytest.fixture
+def fake_snap(tmp_path, monkeypatch):
+    """A snap command whose download writes a snap and its assertion."""
+    # Its digest has characters that differ between base64 and base64url.
+    content = b"snap content \xfb\xff"
+    digest = base64.urlsafe_b64encode(hashlib.sha3_384(content).digest())
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    (tmp_path / "content.snap").write_bytes(content)
+    script = bin_dir / "snap"
+    script.write_text(
+        "#!/bin/sh\n"
+        f'echo "$@" >> {tmp_path / "calls"}\n'
+        'target=$(echo "$@" | sed -n "s/.*--target-directory=\\([^ ]*\\).*/\\1/p")\n'
+        f'cp {tmp_path / "content.snap"} "$target/snap.snap"\n'
+        f'printf "snap-id: abc\\nsnap-revision: 7\\nsnap-sha3-384: {digest.decode().rstrip("=")}\\n"'
+        ' > "$target/snap.assert"\n'
+    )
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}:{os.environ['PATH']}")
+    return content
+
+
+@pytest.mark.skipif(
+    not (shutil.which("bash") and shutil.which("openssl")),
+    reason="requires bash and openssl",
+)
+def test_fetch_snap_checks_digest(tmp_path, fake_snap):
+    """Snaps are checked with tools the oldest supported build base has."""
+    cache_dir = tmp_path / "cache"
+    (cache_dir / "refs").mkdir(parents=True)
+    script = f"{_FETCH_SNAP_FUNCTION}\nfetch_snap {cache_dir} amd64 core24 stable {tmp_path / 'core24'}\n"
+
+    subprocess.run(["bash", "-e", "-c", script], check=True)
+
+    assert "basenc" not in _FETCH_SNAP_FUNCTION
+    assert (tmp_path / "core24.snap").read_bytes() == fake_snap
+    assert (cache_dir / "abc_7.snap").is_file()
+
+
+_MODEL = """\
+type: model
+grade: signed
+snaps:
+  -
+    default-channel: 24/stable
+    name: pc
+    type: gadget
+  -
+    default-channel: 24/edge
+    name: pc-kernel
+    type: kernel
+  -
+    name: snapd
+    type: snapd
+timestamp: 2026-01-01T00:00:00+00:00
+
+AcLBUgQAAQoABgUCZ1
+"""
+
+
+def test_get_snap_prefetch_commands_model():
+    commands, args = get_snap_prefetch_commands(
+        ["core24", "./pc_24_amd64.snap"],
+        cache_dir="/var/cache/snaps",
+        target_dir=Path("/build/snaps"),
+        arch="amd64",
+        channel=None,
+        model="model.assert",
+        revisions="seed.manifest",
+    )
+
+    assert (
+        "fetch_snap /var/cache/snaps amd64 core24 stable /build/snaps/core24 "
+        "seed.manifest & fetch_pids+=($!)"
+    ) in commands
+    # Snaps of the snap list, local ones included, aren't fetched again.
+    assert '    case " core24 pc " in *" $name "*) continue ;; esac' in commands
+    assert args[-1] == MODEL_SNAP_ARGS
+    assert join_command(["snap", *args[-2:], "model.assert"]) == (
+        'snap --snap=./pc_24_amd64.snap "${model_snap_args[@]}" model.assert'
+    )
+
+
+@pytest.mark.skipif(
+    not (shutil.which("bash") and shutil.which("openssl")),
+    reason="requires bash and openssl",
+)
+@pytest.mark.parametrize(
+    ("channel", "expected"),
+    [
+        (None, ["24/stable", "24/edge"]),
+        ("beta", ["24/beta", "24/beta"]),
+        ("latest/edge", ["latest/edge", "latest/edge"]),
+    ],
+)
+def test_fetch_model_snaps(tmp_path, fake_snap, channel, expected):
+    (tmp_path / "model.assert").write_text(_MODEL)
+    (tmp_path / "seed.manifest").write_text("# pinned\nsnapd 21\n")
+    commands, args = get_snap_prefetch_commands(
+        ["core24"],
+        cache_dir=str(tmp_path / "cache"),
+        target_dir=tmp_path / "snaps",
+        arch="amd64",
+        channel=channel,
+        model=str(tmp_path / "model.assert"),
+        revisions=str(tmp_path / "seed.manifest"),
+    )
+    script = "\n".join(
+        [*commands, f"printf '%s\\n' {join_command(args)} > {tmp_path / 'args'}"]
+    )
+
+    subprocess.run(["bash", "-e", "-c", script], check=True)
+
+    calls = sorted((tmp_path / "calls").read_text().splitlines())
+    assert [call.split()[:2] for call in calls] == [
+        ["download", "core24"],
+        ["download", "pc"],
+        ["download", "pc-kernel"],
+        ["download", "snapd"],
+    ]
+    # Pinned snaps are fetched at their revision, others from their channel.
+    assert calls[3].split()[2] == "--revision=21"
+    assert [call.split()[2] for call in calls[1:3]] == [
+        f"--channel={ch}" for ch in expected
+    ]
+    snaps_dir = tmp_path / "snaps"
+    assert (snaps_dir / "pc-kernel.snap").read_bytes() == fake_snap
+    assert (tmp_path / "args").read_text().splitlines() == [
+        f"--{kind}={snaps_dir}/{name}.{kind}"
+        for name in ("core24", "pc", "pc-kernel", "snapd")
+        for kind in ("snap", "assert")
+    ]
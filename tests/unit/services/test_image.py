@@ -12,14 +12,24 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import pathlib
 import subprocess
 from typing import cast
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, call, patch
 
 import pytest
 from craft_application import ServiceFactory
+from craft_cli import CraftError
+from imagecraft.inspection import Partition
 from imagecraft.models import Project, Volume
-from imagecraft.models.volume import GPTStructureItem, MBRVolume, PartitionSchema
+from imagecraft.models.volume import (
+    FileSystem,
+    GPTStructureItem,
+    MBRVolume,
+    PartitionSchema,
+)
+from imagecraft.pack import checkpoint
+from imagecraft.pack.diskutil import FilesystemCheck, PartitionExtent, Reproducibility
 from imagecraft.services.image import ImageService
 
 
@@ -46,8 +56,10 @@ def mock_project():
     ]
     vol.structure[0].name = "efi"
     vol.structure[1].name = "rootfs"
+    vol.marshal = MagicMock(return_value={"schema": "gpt"})
 
     project = MagicMock(spec=Project)
+    project.name = "test"
     project.volumes = {"pc": vol}
     return project
 
@@ -98,6 +110,7 @@ def test_create_images_mbr(image_service, default_factory, project_dir, mocker):
         }
     )
     mock_project = MagicMock(spec=Project)
+    mock_project.name = "test"
     mock_project.volumes = {"pi": mbr_vol}
     mocker.patch.object(
         default_factory.get("project"), "get", return_value=mock_project
@@ -111,6 +124,46 @@ def test_create_images_mbr(image_service, default_factory, project_dir, mocker):
         mock_create.assert_called_once()
 
 
+def test_create_images_multiple_volumes(
+    image_service, default_factory, mock_project, project_dir, mocker
+):
+    mock_project.volumes = {
+        "pc": mock_project.volumes["pc"],
+        "data": mock_project.volumes["pc"],
+    }
+    mocker.patch.object(
+        default_factory.get("project"), "get", return_value=mock_project
+    )
+
+    with patch("imagecraft.pack.gptutil.create_empty_gpt_image") as mock_create:
+        images = image_service.create_images()
+
+    assert images == {
+        "pc": project_dir / ".pc.img.tmp",
+        "data": project_dir / ".data.img.tmp",
+    }
+    assert {call.kwargs["imagepath"] for call in mock_create.call_args_list} == {
+        project_dir / ".pc.img.tmp",
+        project_dir / ".data.img.tmp",
+    }
+
+
+def test_create_images_reproducible(
+    image_service, default_factory, mock_project, monkeypatch, mocker
+):
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "1700000000")
+    mocker.patch.object(
+        default_factory.get("project"), "get", return_value=mock_project
+    )
+
+    with patch("imagecraft.pack.gptutil.create_empty_gpt_image") as mock_create:
+        image_service.create_images()
+
+    assert mock_create.call_args.kwargs["reproducibility"] == Reproducibility(
+        seed="test:1700000000/pc", epoch=1700000000
+    )
+
+
 def test_create_images_idempotent(image_service, default_factory, mock_project, mocker):
     project_service = default_factory.get("project")
     mock_get = mocker.patch.object(project_service, "get", return_value=mock_project)
@@ -123,6 +176,47 @@ def test_create_images_idempotent(image_service, default_factory, mock_project,
         mock_get.assert_called_once()  # Only called once
 
 
+def test_create_images_resumes(
+    image_service, default_factory, mock_project, project_dir, mocker
+):
+    mocker.patch.object(
+        default_factory.get("project"), "get", return_value=mock_project
+    )
+    with patch("imagecraft.pack.gptutil.create_empty_gpt_image") as mock_create:
+        image_service.create_images()
+    (project_dir / ".pc.img.tmp").touch()
+    image_service.get_journal("pc").complete("efi", "digest")
+
+    resumed = ImageService(
+        app=image_service._app,
+        services=default_factory,
+        project_dir=project_dir,
+    )
+    with patch("imagecraft.pack.gptutil.create_empty_gpt_image") as mock_create:
+        resumed.create_images()
+
+    mock_create.assert_not_called()
+    assert resumed.get_journal("pc").is_complete("efi", "digest")
+
+
+def test_create_images_layout_changed(
+    image_service, default_factory, mock_project, project_dir, mocker
+):
+    mocker.patch.object(
+        default_factory.get("project"), "get", return_value=mock_project
+    )
+    (project_dir / ".pc.img.tmp").touch()
+    checkpoint.Journal(
+        path=project_dir / ".pc.img.tmp.journal.json", layout="old"
+    ).complete("efi", "digest")
+
+    with patch("imagecraft.pack.gptutil.create_empty_gpt_image") as mock_create:
+        image_service.create_images()
+
+    mock_create.assert_called_once()
+    assert image_service.get_journal("pc").partitions == {}
+
+
 def test_attach_images_new(image_service, project_dir, mocker):
     image_service._images = {"pc": project_dir / ".pc.img.tmp"}
 
@@ -146,6 +240,27 @@ def test_attach_images_new(image_service, project_dir, mocker):
         mock_atexit.assert_called_once_with(image_service.detach_images)
 
 
+def test_attach_images_multiple_volumes(image_service, project_dir, mocker):
+    image_service._images = {
+        "pc": project_dir / ".pc.img.tmp",
+        "data": project_dir / ".data.img.tmp",
+    }
+    mocker.patch.object(image_service, "_get_all_loop_devices", return_value=[])
+
+    def fake_losetup(*args, **kwargs):
+        result = MagicMock()
+        result.stdout = "/dev/loop9\n" if "data" in args[-1] else "/dev/loop8\n"
+        return result
+
+    mocker.patch("imagecraft.services.image.run", side_effect=fake_losetup)
+
+    with patch("atexit.register"):
+        devices = image_service.attach_images()
+
+    assert devices == {"pc": "/dev/loop8", "data": "/dev/loop9"}
+    assert list(devices) == ["pc", "data"]
+
+
 def test_attach_images_reuse(image_service, project_dir, mocker):
     image_path = project_dir / ".pc.img.tmp"
     image_path.touch()
@@ -356,6 +471,133 @@ def test_verify_images_gpt(
         mock_verify.assert_called_once_with(project_dir / ".pc.img.tmp")
 
 
+@pytest.fixture
+def attached_project(image_service, default_factory, mock_project, mocker):
+    mock_project.volumes["pc"].structure[0].filesystem = FileSystem.VFAT
+    mock_project.volumes["pc"].structure[1].filesystem = FileSystem.EXT4
+    mocker.patch.object(
+        default_factory.get("project"), "get", return_value=mock_project
+    )
+    image_service._loop_devices = {"pc": "/dev/loop8"}
+    return mock_project
+
+
+@pytest.mark.usefixtures("attached_project")
+def test_check_filesystems(image_service, mocker):
+    mock_check = mocker.patch(
+        "imagecraft.pack.diskutil.check_filesystem",
+        return_value=FilesystemCheck(passed=True, output="", duration=0.5),
+    )
+
+    checks = image_service.check_filesystems()
+
+    assert set(checks) == {"pc/efi", "pc/rootfs"}
+    assert sorted(mock_check.call_args_list) == [
+        call(pathlib.Path("/dev/loop8p1"), FileSystem.VFAT, extent=None),
+        call(pathlib.Path("/dev/loop8p2"), FileSystem.EXT4, extent=None),
+    ]
+
+
+@pytest.mark.usefixtures("attached_project")
+def test_check_filesystems_failure_warns(image_service, project_dir, mocker):
+    mocker.patch(
+        "imagecraft.pack.diskutil.check_filesystem",
+        return_value=FilesystemCheck(passed=False, output="bad inode", duration=0.5),
+    )
+
+    image_service._images = {"pc": project_dir / ".pc.img.tmp"}
+    journal = image_service.get_journal("pc")
+    journal.complete("efi", "digest")
+
+    checks = image_service.check_filesystems()
+
+    assert not any(check.passed for check in checks.values())
+    assert not journal.is_complete("efi", "digest")
+
+
+@pytest.mark.usefixtures("attached_project")
+def test_check_filesystems_failure_fatal(image_service, monkeypatch, mocker):
+    monkeypatch.setenv("IMAGECRAFT_FATAL_FILESYSTEM_CHECKS", "true")
+    mocker.patch(
+        "imagecraft.pack.diskutil.check_filesystem",
+        side_effect=lambda path, *_, **__: FilesystemCheck(
+            passed=path.name != "loop8p2", output="bad inode", duration=0.5
+        ),
+    )
+
+    with pytest.raises(CraftError, match=r"Filesystem check failed for pc/rootfs\."):
+        image_service.check_filesystems()
+
+
+@pytest.fixture
+def rootless_project(image_service, project_dir, attached_project, monkeypatch, mocker):
+    monkeypatch.setenv("IMAGECRAFT_ROOTLESS", "true")
+    image_service._images = {"pc": project_dir / ".pc.img.tmp"}
+    image_service._loop_devices = {}
+    disk = mocker.patch("imagecraft.services.image.DiskImage").return_value
+    disk.__enter__.return_value.partition_table.partitions = [
+        Partition(1, "efi", 1 << 20, 512 << 20, "", None),
+        Partition(2, "rootfs", 513 << 20, 5 << 30, "", None),
+    ]
+    return attached_project
+
+
+@pytest.mark.usefixtures("rootless_project")
+def test_attach_images_rootless(image_service, mocker):
+    mock_run = mocker.patch("imagecraft.services.image.run")
+
+    assert image_service.attach_images() == {}
+    mock_run.assert_not_called()
+
+
+@pytest.mark.usefixtures("attached_project")
+def test_get_partition_devices(image_service):
+    assert image_service.get_partition_devices() == {
+        "pc/efi": (pathlib.Path("/dev/loop8p1"), None),
+        "pc/rootfs": (pathlib.Path("/dev/loop8p2"), None),
+    }
+
+
+@pytest.mark.usefixtures("rootless_project")
+def test_get_partition_devices_rootless(image_service, project_dir):
+    image_path = project_dir / ".pc.img.tmp"
+
+    assert image_service.get_partition_devices() == {
+        "pc/efi": (image_path, PartitionExtent(1 << 20, 512 << 20)),
+        "pc/rootfs": (image_path, PartitionExtent(513 << 20, 5 << 30)),
+    }
+
+
+@pytest.mark.usefixtures("rootless_project")
+def test_check_filesystems_rootless(image_service, project_dir, mocker):
+    mock_check = mocker.patch(
+        "imagecraft.pack.diskutil.check_filesystem",
+        return_value=FilesystemCheck(passed=True, output="", duration=0.5),
+    )
+
+    image_service.check_filesystems()
+
+    image_path = project_dir / ".pc.img.tmp"
+    mock_check.assert_has_calls(
+        [
+            call(
+                image_path, FileSystem.VFAT, extent=PartitionExtent(1 << 20, 512 << 20)
+            ),
+            call(
+                image_path, FileSystem.EXT4, extent=PartitionExtent(513 << 20, 5 << 30)
+            ),
+        ],
+        any_order=True,
+    )
+
+
+def test_check_filesystems_not_attached(image_service, mocker):
+    mock_check = mocker.patch("imagecraft.pack.diskutil.check_filesystem")
+
+    assert image_service.check_filesystems() == {}
+    mock_check.assert_not_called()
+
+
 def test_verify_images_mbr(image_service, default_factory, project_dir, mocker):
     mbr_vol = MBRVolume.unmarshal(
         {
@@ -379,6 +621,7 @@ def test_verify_images_mbr(image_service, default_factory, project_dir, mocker):
         }
     )
     mock_project = MagicMock(spec=Project)
+    mock_project.name = "test"
     mock_project.volumes = {"pi": mbr_vol}
     mocker.patch.object(
         default_factory.get("project"), "get", return_value=mock_project
@@ -394,6 +637,7 @@ def test_finalize_images(image_service, project_dir, mocker):
     hidden = project_dir / ".pc.img.tmp"
     hidden.touch()
     image_service._images = {"pc": hidden}
+    image_service.get_journal("pc").save()
 
     dest = project_dir / "dest"
     mock_move = mocker.patch("imagecraft.services.image.shutil.move")
@@ -404,6 +648,7 @@ def test_finalize_images(image_service, project_dir, mocker):
     mock_move.assert_called_once_with(str(hidden), final_path)
     assert result == {"pc": final_path}
     assert dest.exists()
+    assert not (project_dir / ".pc.img.tmp.journal.json").exists()
 
 
 def test_finalize_images_multiple_volumes(image_service, project_dir, mocker):
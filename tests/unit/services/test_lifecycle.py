@@ -14,13 +14,35 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import hashlib
+import json
+import logging
+import os
+import re
+import time
 from pathlib import Path
+from typing import Any
 from unittest.mock import ANY, MagicMock
 
-from craft_parts import LifecycleManager, ProjectVar, ProjectVarInfo, callbacks
-from craft_parts.infos import ProjectInfo
+import pytest
+from craft_cli import CraftError
+from craft_parts import (
+    Action,
+    LifecycleManager,
+    ProjectVar,
+    ProjectVarInfo,
+    Step,
+    callbacks,
+)
+from craft_parts.errors import FileOrganizeError
+from craft_parts.infos import StepInfo
 from craft_platforms import DebianArchitecture
-from imagecraft.services.lifecycle import ImagecraftLifecycleService
+from imagecraft.services.lifecycle import (
+    ImagecraftLifecycleService,
+    _get_action_batches,
+    _get_dependencies,
+    _uses_volume_devices,
+)
 
 
 def test_lifecycle_args(
@@ -78,22 +100,78 @@ def test_lifecycle_args(
     )
 
 
-def test_lifecycle_setup_registers_prologue(
+def test_lifecycle_base_layer(
     lifecycle_service: ImagecraftLifecycleService,
+    default_factory,
     mocker,
 ):
-    mocker.patch.object(LifecycleManager, "__init__", return_value=None)
-    mock_register = mocker.patch.object(callbacks, "register_prologue")
+    mock_lifecycle = mocker.patch.object(
+        LifecycleManager, "__init__", return_value=None
+    )
+    project_service = default_factory.get("project")
+    project_service.get().base_layer = "rootfs.tar.gz"
+    layer_dir = Path("cache/base-layers/abc")
+    mock_get_base_layer = mocker.patch(
+        "imagecraft.base_layer.get_base_layer", return_value=(layer_dir, "abc")
+    )
 
     lifecycle_service.setup()
 
-    mock_register.assert_called_once_with(lifecycle_service._prologue_hook)
+    mock_get_base_layer.assert_called_once_with(
+        project_service.resolve_project_file_path().parent / "rootfs.tar.gz",
+        cache_dir=Path("cache/base-layers"),
+    )
+    kwargs = mock_lifecycle.call_args.kwargs
+    assert kwargs["base_layer_dir"] == layer_dir
+    assert kwargs["base_layer_hash"] == hashlib.sha1(b"abc").digest()  # noqa: S324
+    assert lifecycle_service.base_layer_dir == layer_dir
 
 
-def test_lifecycle_prologue_hook(
+def test_lifecycle_setup_registers_pre_step(
     lifecycle_service: ImagecraftLifecycleService,
     mocker,
 ):
+    mocker.patch.object(LifecycleManager, "__init__", return_value=None)
+    mock_register = mocker.patch.object(callbacks, "register_pre_step")
+
+    lifecycle_service.setup()
+
+    mock_register.assert_called_once_with(lifecycle_service._pre_step_hook)
+    assert lifecycle_service._volume_parts == set()
+
+
+@pytest.mark.parametrize(
+    ("part", "expected"),
+    [
+        pytest.param({"plugin": "nil"}, False, id="nil"),
+        pytest.param(
+            {"plugin": "nil", "override-build": 'dd of="$CRAFT_VOLUME_PC" seek=100'},
+            True,
+            id="scriptlet",
+        ),
+        pytest.param(
+            {"plugin": "dump", "build-environment": [{"DISK": "${CRAFT_VOLUME_PC}"}]},
+            True,
+            id="build-environment",
+        ),
+        pytest.param(
+            {"plugin": "nil", "override-prime": ". $CRAFT_PROJECT_DIR/write-disk.sh"},
+            True,
+            id="sourced-script",
+        ),
+        pytest.param(
+            {"plugin": "dump", "organize": {"*": "(volume/pc/efi)/"}},
+            False,
+            id="plugin-only",
+        ),
+    ],
+)
+def test_uses_volume_devices(part, expected):
+    assert _uses_volume_devices(part) is expected
+
+
+@pytest.fixture
+def mock_image_service(lifecycle_service: ImagecraftLifecycleService, mocker):
     mock_image_service = MagicMock()
     mock_image_service.get_loop_paths.return_value = {
         "pc": "/dev/loop8",
@@ -103,16 +181,369 @@ def test_lifecycle_prologue_hook(
     mocker.patch.object(
         lifecycle_service._services, "get", return_value=mock_image_service
     )
+    lifecycle_service._volume_parts = {"bootloader"}
+    return mock_image_service
 
-    project_info = MagicMock(spec=ProjectInfo)
-    project_info.global_environment = {}
 
-    lifecycle_service._prologue_hook(project_info)
+def test_lifecycle_pre_step_hook(
+    lifecycle_service: ImagecraftLifecycleService, mock_image_service
+):
+    step_info = MagicMock(spec=StepInfo, part_name="bootloader")
+    step_info.global_environment = {}
+
+    lifecycle_service._pre_step_hook(step_info)
 
-    assert project_info.global_environment == {
+    assert step_info.global_environment == {
         "CRAFT_VOLUME_PC": "/dev/loop8",
         "CRAFT_VOLUME_PC_EFI": "/dev/loop8p1",
         "CRAFT_VOLUME_PC_ROOTFS": "/dev/loop8p2",
     }
     mock_image_service.create_images.assert_called_once()
     mock_image_service.attach_images.assert_called_once()
+
+
+def test_lifecycle_pre_step_hook_other_part(
+    lifecycle_service: ImagecraftLifecycleService, mock_image_service
+):
+    step_info = MagicMock(spec=StepInfo, part_name="rootfs")
+    step_info.global_environment = {}
+
+    lifecycle_service._pre_step_hook(step_info)
+
+    assert step_info.global_environment == {}
+    mock_image_service.create_images.assert_not_called()
+    mock_image_service.attach_images.assert_not_called()
+
+
+def test_get_dependencies():
+    parts = {
+        "rootfs": {"plugin": "mmdebstrap"},
+        "seed": {"plugin": "nil", "after": ["rootfs"]},
+        "bootloader": {"plugin": "nil", "after": ["seed"]},
+        "firmware": {"plugin": "nil"},
+    }
+
+    assert _get_dependencies(parts) == {
+        "rootfs": set(),
+        "seed": {"rootfs"},
+        "bootloader": {"rootfs", "seed"},
+        "firmware": set(),
+    }
+
+
+def test_get_action_batches():
+    actions = [
+        Action("a", Step.PULL),
+        Action("b", Step.PULL),
+        Action("a", Step.BUILD),
+        Action("a", Step.STAGE),
+        Action("b", Step.BUILD),
+        Action("a", Step.PRIME),
+        Action("b", Step.STAGE),
+    ]
+
+    assert _get_action_batches(actions) == [
+        actions[0:3],
+        [actions[3]],
+        [actions[4]],
+        [actions[5]],
+        [actions[6]],
+    ]
+
+
+class FakeExecutionContext:
+    """Records the actions executed, and when the parts overlapped.
+
+    Parts run in worker processes, so events are recorded in a file.
+    """
+
+    def __init__(self, log_path: Path, fail: str | None = None) -> None:
+        self._log_path = log_path
+        self._fail = fail
+        self.project_vars = ProjectVarInfo.unmarshal(
+            {"version": {"value": None, "part-name": "rootfs"}}
+        )
+
+    def _record(self, event: str, action: Action) -> None:
+        with self._log_path.open("a") as log:
+            log.write(f"{event} {action.part_name} {action.step.name}\n")
+
+    def execute(self, action: Action, **_: Any) -> None:
+        self._record("start", action)
+        # craft-parts changes the working directory to prepare build environments.
+        work_dir = self._log_path.parent / action.part_name
+        work_dir.mkdir(exist_ok=True)
+        os.chdir(work_dir)
+        time.sleep(0.05)
+        assert Path.cwd() == work_dir
+        if action.part_name == "rootfs":
+            self.project_vars.set("version", value="1.0", overwrite=True)
+        self._record("end", action)
+        if action.part_name == self._fail:
+            raise RuntimeError(f"{action.part_name} failed")
+
+    @property
+    def executed(self) -> list[Action]:
+        return [
+            Action(name, Step[step])
+            for event, name, step in self._events()
+            if event == "end"
+        ]
+
+    @property
+    def overlaps(self) -> set[frozenset[str]]:
+        running: set[str] = set()
+        overlaps: set[frozenset[str]] = set()
+        for event, name, _ in self._events():
+            if event == "start":
+                overlaps.update(frozenset((name, other)) for other in running)
+                running.add(name)
+            else:
+                running.discard(name)
+        return overlaps
+
+    def _events(self) -> list[list[str]]:
+        if not self._log_path.exists():
+            return []
+        return [line.split() for line in self._log_path.read_text().splitlines()]
+
+
+@pytest.fixture
+def concurrent_service(lifecycle_service: ImagecraftLifecycleService):
+    lifecycle_service._dependencies = {
+        "rootfs": set(),
+        "seed": {"rootfs"},
+        "firmware": set(),
+        "bootloader": set(),
+    }
+    lifecycle_service._volume_parts = set()
+    lifecycle_service._package_parts = set()
+    lifecycle_service._lcm = MagicMock()
+    return lifecycle_service
+
+
+@pytest.fixture
+def fake_aex(concurrent_service: ImagecraftLifecycleService, tmp_path):
+    aex = FakeExecutionContext(tmp_path / "events")
+    concurrent_service._lcm.project_info.project_vars = aex.project_vars
+    return aex
+
+
+def test_exec_concurrently(
+    concurrent_service: ImagecraftLifecycleService, fake_aex: FakeExecutionContext
+):
+    cwd = Path.cwd()
+    actions = [
+        Action(name, step)
+        for step in (Step.PULL, Step.BUILD)
+        for name in ("rootfs", "seed", "firmware", "bootloader")
+    ]
+
+    concurrent_service._exec_concurrently(fake_aex, actions, max_parts=4)
+
+    assert sorted(fake_aex.executed, key=str) == sorted(actions, key=str)
+    assert frozenset(("rootfs", "firmware")) in fake_aex.overlaps
+    assert frozenset(("rootfs", "seed")) not in fake_aex.overlaps
+    # The actions of each part ran in order.
+    for name in ("rootfs", "seed", "firmware", "bootloader"):
+        assert [a.step for a in fake_aex.executed if a.part_name == name] == [
+            Step.PULL,
+            Step.BUILD,
+        ]
+    # Parts ran in their own processes, with their own working directory.
+    assert Path.cwd() == cwd
+
+
+def test_exec_concurrently_project_vars(
+    concurrent_service: ImagecraftLifecycleService, fake_aex: FakeExecutionContext
+):
+    actions = [Action(name, Step.BUILD) for name in ("rootfs", "firmware")]
+
+    concurrent_service._exec_concurrently(fake_aex, actions, max_parts=2)
+
+    # The variables set by a part in its worker are copied back.
+    project_vars = concurrent_service._lcm.project_info.project_vars
+    assert project_vars.get("version").value == "1.0"
+
+
+def test_exec_concurrently_shared_devices(
+    concurrent_service: ImagecraftLifecycleService,
+    fake_aex: FakeExecutionContext,
+    mocker,
+):
+    concurrent_service._volume_parts = {"firmware", "bootloader"}
+    mock_attach = mocker.patch.object(concurrent_service, "_attach_images")
+    actions = [Action(name, Step.BUILD) for name in ("firmware", "bootloader")]
+
+    concurrent_service._exec_concurrently(fake_aex, actions, max_parts=4)
+
+    assert fake_aex.executed == actions
+    assert fake_aex.overlaps == set()
+    # The devices are attached before the workers start, so that they outlive them.
+    assert mock_attach.call_count == 2
+
+
+def test_exec_concurrently_error(
+    concurrent_service: ImagecraftLifecycleService, tmp_path
+):
+    aex = FakeExecutionContext(tmp_path / "events", fail="rootfs")
+    actions = [Action(name, Step.PULL) for name in ("rootfs", "firmware", "seed")]
+
+    with pytest.raises(RuntimeError, match="rootfs failed"):
+        concurrent_service._exec_concurrently(aex, actions, max_parts=2)
+
+    # The part running alongside finished, the one waiting for rootfs never started.
+    assert {a.part_name for a in aex.executed} == {"rootfs", "firmware"}
+
+
+class _KeywordError(Exception):
+    def __init__(self, *, part: str) -> None:
+        super().__init__(f"{part} failed")
+
+
+@pytest.mark.parametrize(
+    ("error", "message"),
+    [
+        pytest.param(_KeywordError(part="rootfs"), "rootfs failed", id="other"),
+        pytest.param(
+            FileOrganizeError(part_name="rootfs", message="conflict"),
+            "Failed to organize part 'rootfs': conflict",
+            id="parts-error",
+        ),
+    ],
+)
+def test_exec_concurrently_unpicklable_error(
+    concurrent_service: ImagecraftLifecycleService, tmp_path, mocker, error, message
+):
+    aex = FakeExecutionContext(tmp_path / "events")
+    mocker.patch.object(aex, "execute", side_effect=error)
+    actions = [Action(name, Step.PULL) for name in ("rootfs", "firmware")]
+
+    with pytest.raises(CraftError, match=re.escape(message)):
+        concurrent_service._exec_concurrently(aex, actions, max_parts=2)
+
+
+def test_exec_concurrently_logs(
+    concurrent_service: ImagecraftLifecycleService,
+    fake_aex: FakeExecutionContext,
+    mocker,
+    emitter,
+    caplog,
+):
+    caplog.set_level(logging.INFO, logger="craft_parts")
+
+    def _execute(action: Action, **_: Any) -> None:
+        logging.getLogger("craft_parts").info("Running %s", action.part_name)
+
+    mocker.patch.object(fake_aex, "execute", side_effect=_execute)
+    actions = [Action(name, Step.PULL) for name in ("rootfs", "firmware")]
+
+    concurrent_service._exec_concurrently(fake_aex, actions, max_parts=2)
+
+    # Progress and log records of the workers go through the main emitter.
+    emitter.assert_progress("Pulling rootfs")
+    emitter.assert_progress("Pulling firmware")
+    assert sorted(r.getMessage() for r in caplog.records) == [
+        "Running firmware",
+        "Running rootfs",
+    ]
+
+
+def test_exec_sequential(
+    lifecycle_service: ImagecraftLifecycleService, monkeypatch, mocker, tmp_path
+):
+    monkeypatch.setenv("IMAGECRAFT_MAX_PARALLEL_PARTS", "1")
+    mocker.patch.object(LifecycleManager, "__init__", return_value=None)
+    lifecycle_service.setup()
+    aex = FakeExecutionContext(tmp_path / "events")
+    lifecycle_service._lcm = MagicMock()
+    lifecycle_service._lcm.action_executor.return_value.__enter__.return_value = aex
+    mock_concurrently = mocker.patch.object(lifecycle_service, "_exec_concurrently")
+    actions = [Action("a", Step.PULL), Action("b", Step.PULL)]
+
+    lifecycle_service._exec(actions)
+
+    assert aex.executed == actions
+    mock_concurrently.assert_not_called()
+
+
+@pytest.fixture
+def layout_service(
+    lifecycle_service: ImagecraftLifecycleService, default_factory, mocker, tmp_path
+):
+    mocker.patch.object(LifecycleManager, "__init__", return_value=None)
+    default_factory.get("project").get().parts = {
+        "rootfs": {"plugin": "nil"},
+        "efi": {"plugin": "nil", "organize": {"boot": "(volume/pc/efi)/boot"}},
+        "bootloader": {"plugin": "nil", "override-prime": 'dd of="$CRAFT_VOLUME_PC"'},
+        "firmware": {"plugin": "nil", "override-build": "make install"},
+    }
+    lifecycle_service.setup()
+    lifecycle_service._work_dir = tmp_path
+    lifecycle_service._lcm = MagicMock()
+    lifecycle_service._invalidate_layout_changes()
+    return lifecycle_service
+
+
+def _record_layout(service: ImagecraftLifecycleService, **changes: Any) -> None:
+    layout_path = service._work_dir / "layout.json"
+    layout = json.loads(layout_path.read_text())
+    layout.update(changes)
+    layout_path.write_text(json.dumps(layout))
+
+
+def test_invalidate_layout_unchanged(layout_service: ImagecraftLifecycleService):
+    assert json.loads((layout_service._work_dir / "layout.json").read_text())[
+        "partitions"
+    ] == ["volume/pc/rootfs", "volume/pc/efi"]
+
+    layout_service._invalidate_layout_changes()
+
+    layout_service._lcm.clean.assert_not_called()
+
+
+def test_invalidate_layout_resized(
+    layout_service: ImagecraftLifecycleService, default_factory
+):
+    volume = default_factory.get("project").get().volumes["pc"]
+    volume.structure[0].size = volume.structure[0].size * 2
+
+    layout_service._invalidate_layout_changes()
+
+    # The devices the parts refer to are the same, the images are left to pack.
+    layout_service._lcm.clean.assert_not_called()
+
+
+def test_invalidate_layout_renumbered(layout_service: ImagecraftLifecycleService):
+    _record_layout(layout_service, devices={"pc": {"efi": 2, "rootfs": 1}})
+
+    layout_service._invalidate_layout_changes()
+
+    # Only the parts that name the devices are outdated.
+    layout_service._lcm.clean.assert_called_once_with(
+        Step.OVERLAY, part_names=["bootloader"]
+    )
+    layout_service._lcm.clean.reset_mock()
+    layout_service._invalidate_layout_changes()
+    layout_service._lcm.clean.assert_not_called()
+
+
+def test_invalidate_layout_renamed(layout_service: ImagecraftLifecycleService):
+    _record_layout(layout_service, partitions=["volume/pc/rootfs", "volume/pc/esp"])
+    old_dir = layout_service._work_dir / "partitions/volume/pc/esp/prime"
+    old_dir.mkdir(parents=True)
+
+    layout_service._invalidate_layout_changes()
+
+    layout_service._lcm.clean.assert_called_once_with(Step.OVERLAY, part_names=["efi"])
+    assert not old_dir.parent.exists()
+
+
+def test_invalidate_layout_default_changed(
+    layout_service: ImagecraftLifecycleService,
+):
+    _record_layout(layout_service, partitions=["volume/pc/efi", "volume/pc/rootfs"])
+
+    layout_service._invalidate_layout_changes()
+
+    layout_service._lcm.clean.assert_called_once_with(Step.OVERLAY)
@@ -15,6 +15,11 @@ from typing import cast
 
 import pytest
 from craft_application import ServiceFactory
+from craft_cli import CraftError
+from imagecraft.inspection import Difference, Partition
+from imagecraft.models import FileSystem, FilesystemOptions, FilesystemPreset
+from imagecraft.pack import checkpoint, diskutil
+from imagecraft.services import pack as pack_module
 from imagecraft.services.image import ImageService
 from imagecraft.services.pack import ImagecraftPackService
 
@@ -46,6 +51,7 @@ def test_pack(
     mocker.patch.object(mock_image_service, "create_images")
     mocker.patch.object(mock_image_service, "attach_images")
     mock_verify = mocker.patch.object(mock_image_service, "verify_images")
+    mock_check = mocker.patch.object(mock_image_service, "check_filesystems")
     mock_detach = mocker.patch.object(mock_image_service, "detach_images")
     mock_finalize = mocker.patch.object(
         mock_image_service,
@@ -63,11 +69,13 @@ def test_pack(
 
     # Verify called before detach
     mock_verify.assert_called_once()
+    mock_check.assert_called_once()
     mock_detach.assert_called_once()
     mock_finalize.assert_called_once_with(dest_path)
 
     # grubutil called on the final image
     mock_grubutil.setup_grub.assert_called_once()
+    assert mock_grubutil.setup_grub.call_args.kwargs["native_config"] is False
     mock_image_cls.assert_called_once()
 
     # Old functions must NOT be called
@@ -78,6 +86,542 @@ def test_pack(
     assert result == [dest_path / "pc.img"]
 
 
+def test_pack_native_grub_config(
+    tmp_path,
+    enable_features,
+    pack_service: ImagecraftPackService,
+    mock_image_service: ImageService,
+    monkeypatch,
+    mocker,
+):
+    monkeypatch.setenv("IMAGECRAFT_NATIVE_GRUB_CONFIG", "1")
+    mocker.patch.object(mock_image_service, "create_images")
+    mocker.patch.object(mock_image_service, "attach_images")
+    mocker.patch.object(mock_image_service, "verify_images")
+    mocker.patch.object(mock_image_service, "check_filesystems")
+    mocker.patch.object(mock_image_service, "detach_images")
+    mocker.patch.object(mock_image_service, "finalize_images", return_value={})
+    mocker.patch("imagecraft.services.pack.diskutil", autospec=True)
+    mock_grubutil = mocker.patch("imagecraft.services.pack.grubutil", autospec=True)
+    mocker.patch("imagecraft.services.pack.Image", autospec=True)
+
+    pack_service.pack(prime_dir=tmp_path / "prime", dest=tmp_path / "dest")
+
+    assert mock_grubutil.setup_grub.call_args.kwargs["native_config"] is True
+
+
+def test_pack_chroot_free_bootloader(
+    tmp_path,
+    enable_features,
+    pack_service: ImagecraftPackService,
+    mock_image_service: ImageService,
+    monkeypatch,
+    mocker,
+):
+    monkeypatch.setenv("IMAGECRAFT_CHROOT_FREE_BOOTLOADER", "1")
+    mocker.patch.object(
+        mock_image_service,
+        "create_images",
+        return_value={"pc": tmp_path / ".pc.img.tmp"},
+    )
+    mocker.patch.object(mock_image_service, "attach_images")
+    mocker.patch.object(mock_image_service, "verify_images")
+    mocker.patch.object(mock_image_service, "check_filesystems")
+    mock_detach = mocker.patch.object(mock_image_service, "detach_images")
+    mocker.patch.object(mock_image_service, "finalize_images", return_value={})
+    mock_diskutil = mocker.patch("imagecraft.services.pack.diskutil", autospec=True)
+    mock_grubutil = mocker.patch("imagecraft.services.pack.grubutil", autospec=True)
+    mock_bootloader = mocker.patch("imagecraft.services.pack.bootloader", autospec=True)
+    setup = mock_bootloader.prepare_bootloader.return_value
+    setup.uuids = {"pc/rootfs": "1234"}
+    setup.install.side_effect = lambda _: mock_detach.assert_called_once()
+
+    pack_service.pack(prime_dir=tmp_path / "prime", dest=tmp_path / "dest")
+
+    mock_grubutil.setup_grub.assert_not_called()
+    setup.install.assert_called_once_with(tmp_path / ".pc.img.tmp")
+    content_dirs = mock_bootloader.prepare_bootloader.call_args.kwargs["content_dirs"]
+    assert set(content_dirs) == {"pc/efi", "pc/rootfs"}
+    fs_uuids = {
+        call.kwargs["fs_uuid"] for call in mock_diskutil.format_device.call_args_list
+    }
+    assert fs_uuids == {None, "1234"}
+
+
+def test_pack_chroot_free_bootloader_leaves_prime(
+    tmp_path,
+    enable_features,
+    pack_service: ImagecraftPackService,
+    mock_image_service: ImageService,
+    monkeypatch,
+    mocker,
+):
+    monkeypatch.setenv("IMAGECRAFT_CHROOT_FREE_BOOTLOADER", "1")
+    mocker.patch.object(mock_image_service, "create_images")
+    mocker.patch.object(mock_image_service, "attach_images")
+    mocker.patch.object(mock_image_service, "verify_images")
+    mocker.patch.object(mock_image_service, "check_filesystems")
+    mocker.patch.object(mock_image_service, "detach_images")
+    mocker.patch.object(mock_image_service, "finalize_images", return_value={})
+    mock_format = mocker.patch("imagecraft.pack.diskutil.format_device")
+    mocker.patch("imagecraft.pack.diskutil.mark_fat_read_only")
+    mock_run = mocker.spy(pack_module, "run")
+
+    def _prepare_bootloader(*, content_dirs, **_):
+        (content_dirs["pc/rootfs"] / "boot/grub").mkdir(parents=True, exist_ok=True)
+        (content_dirs["pc/rootfs"] / "boot/grub/grub.cfg").write_text("grub")
+        (content_dirs["pc/efi"] / "EFI").mkdir(exist_ok=True)
+        return mocker.Mock(uuids={})
+
+    mocker.patch(
+        "imagecraft.pack.bootloader.prepare_bootloader",
+        side_effect=_prepare_bootloader,
+    )
+    dirs = pack_service._services.get("lifecycle").project_info.dirs
+    rootfs_dir = dirs.get_prime_dir(partition="volume/pc/rootfs")
+    (rootfs_dir / "etc").mkdir(parents=True)
+    (rootfs_dir / "etc/hostname").write_text("host")
+
+    pack_service.pack(prime_dir=tmp_path / "prime", dest=tmp_path / "dest")
+    # Packing again starts from prime, not from the previous copy.
+    pack_service.pack(prime_dir=tmp_path / "prime", dest=tmp_path / "dest")
+
+    assert sorted(p.name for p in rootfs_dir.rglob("*")) == ["etc", "hostname"]
+    assert not dirs.get_prime_dir(partition="volume/pc/efi").exists()
+    content_dirs = {
+        call.kwargs["fstype"]: call.kwargs["content_dir"]
+        for call in mock_format.call_args_list
+    }
+    staged_dir = dirs.work_dir / "content/volume/pc/rootfs"
+    assert content_dirs == {
+        FileSystem.VFAT: dirs.work_dir / "content/volume/pc/efi",
+        FileSystem.EXT4: staged_dir,
+    }
+    assert (staged_dir / "etc/hostname").read_text() == "host"
+    assert (staged_dir / "boot/grub/grub.cfg").read_text() == "grub"
+    # The copies are identified by what they were made from, so the second pack
+    # kept the copies and the partitions of the first.
+    assert mock_format.call_count == 2
+    assert [c.args[0] for c in mock_run.call_args_list].count("cp") == 1
+
+
+def test_pack_chroot_free_bootloader_fallback(
+    tmp_path,
+    enable_features,
+    pack_service: ImagecraftPackService,
+    mock_image_service: ImageService,
+    monkeypatch,
+    mocker,
+):
+    monkeypatch.setenv("IMAGECRAFT_CHROOT_FREE_BOOTLOADER", "1")
+    mocker.patch.object(mock_image_service, "create_images")
+    mocker.patch.object(mock_image_service, "attach_images")
+    mocker.patch.object(mock_image_service, "verify_images")
+    mocker.patch.object(mock_image_service, "check_filesystems")
+    mocker.patch.object(mock_image_service, "detach_images")
+    mocker.patch.object(mock_image_service, "finalize_images", return_value={})
+    mocker.patch("imagecraft.services.pack.diskutil", autospec=True)
+    mocker.patch("imagecraft.services.pack.Image", autospec=True)
+    mock_grubutil = mocker.patch("imagecraft.services.pack.grubutil", autospec=True)
+    mock_bootloader = mocker.patch("imagecraft.services.pack.bootloader", autospec=True)
+    mock_bootloader.prepare_bootloader.return_value = None
+
+    pack_service.pack(prime_dir=tmp_path / "prime", dest=tmp_path / "dest")
+
+    mock_grubutil.setup_grub.assert_called_once()
+
+
+def test_pack_resumes(
+    tmp_path,
+    enable_features,
+    pack_service: ImagecraftPackService,
+    mock_image_service: ImageService,
+    monkeypatch,
+    mocker,
+):
+    monkeypatch.setenv("IMAGECRAFT_CHROOT_FREE_BOOTLOADER", "1")
+    mocker.patch.object(mock_image_service, "create_images")
+    mocker.patch.object(mock_image_service, "attach_images")
+    mocker.patch.object(mock_image_service, "verify_images")
+    mocker.patch.object(mock_image_service, "check_filesystems")
+    mocker.patch.object(mock_image_service, "detach_images")
+    mocker.patch.object(mock_image_service, "finalize_images", return_value={})
+    mock_diskutil = mocker.patch("imagecraft.services.pack.diskutil", autospec=True)
+    mock_bootloader = mocker.patch("imagecraft.services.pack.bootloader", autospec=True)
+    mock_bootloader.prepare_bootloader.return_value.uuids = {"pc/rootfs": "5678"}
+    mocker.patch("imagecraft.pack.checkpoint.get_content_digest", return_value="digest")
+    journal = mock_image_service.get_journal("pc")
+    journal.complete("rootfs", "digest", "5678")
+
+    pack_service.pack(prime_dir=tmp_path / "prime", dest=tmp_path / "dest")
+
+    assert mock_bootloader.prepare_bootloader.call_args.kwargs["keep_uuids"] == {
+        "pc/rootfs": "5678"
+    }
+    # Only the partition the interrupted pack didn't complete is formatted.
+    mock_diskutil.format_device.assert_called_once()
+    assert mock_diskutil.format_device.call_args.kwargs["fstype"] == FileSystem.VFAT
+    assert journal.is_complete("efi", "digest")
+
+
+def test_pack_rootless(
+    tmp_path,
+    enable_features,
+    pack_service: ImagecraftPackService,
+    mock_image_service: ImageService,
+    monkeypatch,
+    mocker,
+):
+    monkeypatch.setenv("IMAGECRAFT_ROOTLESS", "1")
+    image_path = tmp_path / ".pc.img.tmp"
+    extents = {
+        "pc/efi": diskutil.PartitionExtent(1 << 20, 1 << 20),
+        "pc/rootfs": diskutil.PartitionExtent(2 << 20, 1 << 20),
+    }
+    mocker.patch.object(
+        mock_image_service, "create_images", return_value={"pc": image_path}
+    )
+    mocker.patch.object(mock_image_service, "attach_images")
+    mocker.patch.object(
+        mock_image_service,
+        "get_partition_devices",
+        return_value={key: (image_path, extent) for key, extent in extents.items()},
+    )
+    mocker.patch.object(mock_image_service, "verify_images")
+    mocker.patch.object(mock_image_service, "check_filesystems")
+    mocker.patch.object(mock_image_service, "detach_images")
+    mocker.patch.object(mock_image_service, "finalize_images", return_value={})
+    mock_format = mocker.patch("imagecraft.pack.diskutil.format_device")
+    mock_mark = mocker.patch("imagecraft.pack.diskutil.mark_fat_read_only")
+    mock_grubutil = mocker.patch("imagecraft.services.pack.grubutil", autospec=True)
+    mock_bootloader = mocker.patch("imagecraft.services.pack.bootloader", autospec=True)
+    mock_bootloader.prepare_bootloader.return_value.uuids = {}
+    dirs = pack_service._services.get("lifecycle").project_info.dirs
+    efi_dir = dirs.get_prime_dir(partition="volume/pc/efi")
+    (efi_dir / "EFI").mkdir(parents=True)
+    (efi_dir / "EFI/grub.cfg").touch(mode=0o444)
+    (efi_dir / "EFI/shimx64.efi").touch(mode=0o644)
+
+    pack_service.pack(prime_dir=tmp_path / "prime", dest=tmp_path / "dest")
+
+    mock_grubutil.setup_grub.assert_not_called()
+    assert [
+        (call.kwargs["device_path"], call.kwargs["extent"])
+        for call in mock_format.call_args_list
+    ] == [(image_path, extents["pc/efi"]), (image_path, extents["pc/rootfs"])]
+    mock_mark.assert_called_once_with(
+        image_path, ["/EFI/grub.cfg"], extent=extents["pc/efi"]
+    )
+
+
+def test_pack_rootless_needs_chroot_free_bootloader(
+    tmp_path,
+    enable_features,
+    pack_service: ImagecraftPackService,
+    mock_image_service: ImageService,
+    monkeypatch,
+    mocker,
+):
+    monkeypatch.setenv("IMAGECRAFT_ROOTLESS", "1")
+    mocker.patch.object(mock_image_service, "create_images")
+    mocker.patch.object(mock_image_service, "attach_images")
+    mock_format = mocker.patch("imagecraft.pack.diskutil.format_device")
+    mock_bootloader = mocker.patch("imagecraft.services.pack.bootloader", autospec=True)
+    mock_bootloader.prepare_bootloader.return_value = None
+
+    with pytest.raises(CraftError, match="Cannot provision the bootloader"):
+        pack_service.pack(prime_dir=tmp_path / "prime", dest=tmp_path / "dest")
+
+    mock_format.assert_not_called()
+
+
+def test_pack_reproducible(
+    tmp_path,
+    enable_features,
+    pack_service: ImagecraftPackService,
+    mock_image_service: ImageService,
+    monkeypatch,
+    mocker,
+):
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "1700000000")
+    mocker.patch.object(mock_image_service, "create_images")
+    mocker.patch.object(mock_image_service, "attach_images")
+    mocker.patch.object(mock_image_service, "verify_images")
+    mocker.patch.object(mock_image_service, "check_filesystems")
+    mocker.patch.object(mock_image_service, "detach_images")
+    mocker.patch.object(mock_image_service, "finalize_images", return_value={})
+    mock_diskutil = mocker.patch("imagecraft.services.pack.diskutil", autospec=True)
+    mocker.patch("imagecraft.services.pack.grubutil", autospec=True)
+    mock_bootloader = mocker.patch("imagecraft.services.pack.bootloader", autospec=True)
+    reproducibility = mock_diskutil.get_reproducibility.return_value
+
+    pack_service.pack(prime_dir=tmp_path / "prime", dest=tmp_path / "dest")
+
+    # Reproducible images never install the bootloader from a chroot.
+    assert (
+        mock_bootloader.prepare_bootloader.call_args.kwargs["reproducibility"]
+        is reproducibility
+    )
+    reproducibility.scoped.assert_has_calls(
+        [mocker.call("pc", "efi"), mocker.call("pc", "rootfs")], any_order=True
+    )
+    for format_call in mock_diskutil.format_device.call_args_list:
+        assert format_call.kwargs["reproducibility"] is reproducibility.scoped()
+
+
+def test_pack_chunk_store(
+    tmp_path,
+    enable_features,
+    pack_service: ImagecraftPackService,
+    mock_image_service: ImageService,
+    monkeypatch,
+    mocker,
+):
+    store_dir = tmp_path / "store"
+    monkeypatch.setenv("IMAGECRAFT_CHUNK_STORE_DIR", str(store_dir))
+    dest_path = tmp_path / "dest"
+    image_path = dest_path / "pc.img"
+    mocker.patch.object(mock_image_service, "create_images")
+    mocker.patch.object(mock_image_service, "attach_images")
+    mocker.patch.object(mock_image_service, "verify_images")
+    mocker.patch.object(mock_image_service, "check_filesystems")
+    mocker.patch.object(mock_image_service, "detach_images")
+    mocker.patch.object(
+        mock_image_service, "finalize_images", return_value={"pc": image_path}
+    )
+    mocker.patch("imagecraft.services.pack.diskutil", autospec=True)
+    mocker.patch("imagecraft.services.pack.grubutil", autospec=True)
+    mocker.patch("imagecraft.services.pack.Image", autospec=True)
+    mock_chunk_image = mocker.patch(
+        "imagecraft.services.pack.chunkstore.chunk_image", autospec=True
+    )
+
+    result = pack_service.pack(prime_dir=tmp_path / "prime", dest=dest_path)
+
+    index_path = dest_path / "pc.img.chunks.json"
+    assert result == [image_path, index_path]
+    mock_chunk_image.assert_called_once_with(image_path, store_dir)
+    mock_chunk_image.return_value.write.assert_called_once_with(index_path)
+
+
+def test_pack_delta_from(
+    tmp_path,
+    enable_features,
+    pack_service: ImagecraftPackService,
+    mock_image_service: ImageService,
+    mocker,
+):
+    previous_image = tmp_path / "previous.img"
+    previous_image.touch()
+    packed_image = tmp_path / ".pc.img.tmp"
+    dest_path = tmp_path / "dest"
+    image_path = dest_path / "pc.img"
+    mocker.patch.object(
+        mock_image_service, "create_images", return_value={"pc": packed_image}
+    )
+    mocker.patch.object(mock_image_service, "attach_images")
+    mocker.patch.object(mock_image_service, "verify_images")
+    mocker.patch.object(mock_image_service, "check_filesystems")
+    mocker.patch.object(mock_image_service, "detach_images")
+    mock_finalize = mocker.patch.object(
+        mock_image_service, "finalize_images", return_value={"pc": image_path}
+    )
+    mocker.patch("imagecraft.services.pack.diskutil", autospec=True)
+    mocker.patch("imagecraft.services.pack.grubutil", autospec=True)
+    mocker.patch("imagecraft.services.pack.Image", autospec=True)
+    mock_generate_delta = mocker.patch(
+        "imagecraft.services.pack.delta.generate_delta",
+        autospec=True,
+        side_effect=lambda *_: mock_finalize.assert_not_called(),
+    )
+    pack_service.set_delta_from(previous_image)
+
+    result = pack_service.pack(prime_dir=tmp_path / "prime", dest=dest_path)
+
+    delta_path = dest_path / "pc.img.delta"
+    assert result == [image_path, delta_path]
+    mock_generate_delta.assert_called_once_with(
+        previous_image, packed_image, delta_path
+    )
+
+
+def test_pack_verify_contents(
+    tmp_path,
+    enable_features,
+    pack_service: ImagecraftPackService,
+    mock_image_service: ImageService,
+    monkeypatch,
+    mocker,
+):
+    monkeypatch.setenv("IMAGECRAFT_VERIFY_CONTENTS", "1")
+    image_path = tmp_path / "dest" / "pc.img"
+    mocker.patch.object(mock_image_service, "create_images")
+    mocker.patch.object(mock_image_service, "attach_images")
+    mocker.patch.object(mock_image_service, "verify_images")
+    mocker.patch.object(mock_image_service, "check_filesystems")
+    mocker.patch.object(mock_image_service, "detach_images")
+    mocker.patch.object(
+        mock_image_service, "finalize_images", return_value={"pc": image_path}
+    )
+    mock_diskutil = mocker.patch("imagecraft.services.pack.diskutil", autospec=True)
+    mock_diskutil.is_content_tarball.return_value = False
+    mocker.patch("imagecraft.services.pack.grubutil", autospec=True)
+    mocker.patch("imagecraft.services.pack.Image", autospec=True)
+    mock_disk_image = mocker.patch("imagecraft.services.pack.DiskImage")
+    disk = mock_disk_image.return_value.__enter__.return_value
+    disk.partition_table.partitions = [
+        Partition(number, name, 0, 0, "") for number, name in [(1, "efi"), (2, "")]
+    ]
+    mock_compare_tree = mocker.patch(
+        "imagecraft.services.pack.compare_tree",
+        side_effect=[[], [Difference("/etc/shadow", "mode is 0644 instead of 0640")]],
+    )
+    dirs = pack_service._services.get("lifecycle").project_info.dirs
+    for partition in ["volume/pc/efi", "volume/pc/rootfs"]:
+        dirs.get_prime_dir(partition=partition).mkdir(parents=True)
+
+    with pytest.raises(CraftError, match="don't match") as raised:
+        pack_service.pack(prime_dir=tmp_path / "prime", dest=tmp_path / "dest")
+
+    assert raised.value.details == (
+        "volume/pc/rootfs: /etc/shadow: mode is 0644 instead of 0640"
+    )
+    mock_disk_image.assert_called_once_with(image_path)
+    assert [c.args[0] for c in disk.open_filesystem.call_args_list] == (
+        disk.partition_table.partitions
+    )
+    # GRUB was installed from a chroot, writing files that aren't in prime.
+    assert [c.kwargs["skip"] for c in mock_compare_tree.call_args_list] == [
+        ["/EFI"],
+        ["/boot/grub", "/boot/efi/EFI"],
+    ]
+
+
+def test_get_content_dirs(
+    enable_features, pack_service: ImagecraftPackService, tmp_path, mocker
+):
+    lifecycle = pack_service._services.get("lifecycle")
+    project_info = lifecycle.project_info
+    dirs = project_info.dirs
+    mocker.patch.object(
+        type(lifecycle), "base_layer_dir", mocker.PropertyMock(return_value=tmp_path)
+    )
+    mock_digest = mocker.patch.object(
+        type(lifecycle), "base_layer_digest", mocker.PropertyMock(return_value="a")
+    )
+    mock_merge = mocker.patch(
+        "imagecraft.base_layer.merge_content",
+        side_effect=lambda _layer, _prime, dest, **_: dest.mkdir(
+            parents=True, exist_ok=True
+        ),
+    )
+    project = pack_service._services.get("project").get()
+
+    content_dirs, content_sources = pack_service._get_content_dirs(
+        project, dirs, project_info.default_filesystem_mount
+    )
+
+    assert content_dirs == {
+        "volume/pc/efi": dirs.work_dir / "content/volume/pc/efi",
+        "volume/pc/rootfs": dirs.work_dir / "content/volume/pc/rootfs",
+    }
+    mock_merge.assert_has_calls(
+        [
+            mocker.call(
+                tmp_path,
+                dirs.get_prime_dir(partition="volume/pc/rootfs"),
+                content_dirs["volume/pc/rootfs"],
+                mount="/",
+                nested_mounts=["/boot/efi"],
+            ),
+            mocker.call(
+                tmp_path,
+                dirs.get_prime_dir(partition="volume/pc/efi"),
+                content_dirs["volume/pc/efi"],
+                mount="/boot/efi",
+                nested_mounts=[],
+            ),
+        ]
+    )
+    # The merged directories are identified by what they are made from.
+    mock_digest.return_value = "b"
+    _, other_sources = pack_service._get_content_dirs(
+        project, dirs, project_info.default_filesystem_mount
+    )
+    assert content_sources.keys() == other_sources.keys() == content_dirs.keys()
+    for partition_name, source in content_sources.items():
+        assert source != other_sources[partition_name]
+    assert mock_merge.call_count == 4
+
+    # The merged directories are kept while what they are made from is unchanged.
+    pack_service._get_content_dirs(project, dirs, project_info.default_filesystem_mount)
+    assert mock_merge.call_count == 4
+
+
+def test_get_content_dirs_bare(
+    enable_features, pack_service: ImagecraftPackService, mocker
+):
+    project_info = pack_service._services.get("lifecycle").project_info
+    mock_merge = mocker.patch("imagecraft.base_layer.merge_content")
+
+    content_dirs, content_sources = pack_service._get_content_dirs(
+        pack_service._services.get("project").get(),
+        project_info.dirs,
+        project_info.default_filesystem_mount,
+    )
+
+    assert content_dirs == {
+        partition: project_info.dirs.get_prime_dir(partition=partition)
+        for partition in ["volume/pc/efi", "volume/pc/rootfs"]
+    }
+    assert content_sources == {
+        partition: checkpoint.get_metadata_digest(prime_dir)
+        for partition, prime_dir in content_dirs.items()
+    }
+    mock_merge.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    ("existing", "delta_from", "volumes", "expected"),
+    [
+        (["old.img"], "old.img", ["pc"], {"pc": "old.img"}),
+        (["pc.img"], "pc.img", ["pc", "data"], {"pc": "pc.img"}),
+        (
+            ["prev/pc.img", "prev/data.img"],
+            "prev",
+            ["pc", "data"],
+            {"pc": "prev/pc.img", "data": "prev/data.img"},
+        ),
+        (["prev/pc.img"], "prev", ["pc", "data"], {"pc": "prev/pc.img"}),
+    ],
+)
+def test_get_delta_sources(tmp_path, existing, delta_from, volumes, expected):
+    for path in existing:
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).touch()
+
+    sources = pack_module._get_delta_sources(tmp_path / delta_from, volumes)
+
+    assert sources == {name: tmp_path / path for name, path in expected.items()}
+
+
+@pytest.mark.parametrize(
+    ("existing", "delta_from", "volumes"),
+    [
+        ([], "old.img", ["pc"]),
+        (["old.img"], "old.img", ["pc", "data"]),
+        (["prev/other.img"], "prev", ["pc"]),
+    ],
+)
+def test_get_delta_sources_not_found(tmp_path, existing, delta_from, volumes):
+    for path in existing:
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).touch()
+
+    with pytest.raises(CraftError, match="No previous image found"):
+        pack_module._get_delta_sources(tmp_path / delta_from, volumes)
+
+
 def test_pack_detaches_on_error(
     tmp_path,
     enable_features,
@@ -93,6 +637,7 @@ def test_pack_detaches_on_error(
     mocker.patch.object(mock_image_service, "attach_images")
     mock_detach = mocker.patch.object(mock_image_service, "detach_images")
     mocker.patch.object(mock_image_service, "verify_images")
+    mocker.patch.object(mock_image_service, "check_filesystems")
     mocker.patch.object(mock_image_service, "finalize_images")
     mocker.patch(
         "imagecraft.services.pack.diskutil.format_device",
@@ -105,3 +650,142 @@ def test_pack_detaches_on_error(
         pack_service.pack(prime_dir=tmp_path / "prime", dest=dest_path)
 
     mock_detach.assert_called_once()
+
+
+MULTIPLE_VOLUMES_YAML = """\
+name: default
+version: "1.0"
+summary: "default project"
+description: "default project"
+base: bare
+build-base: devel
+license: "MIT"
+
+platforms:
+  amd64:
+    build-for: [amd64]
+    build-on: [amd64]
+
+filesystems:
+  default:
+  - mount: /
+    device: (volume/pc/rootfs)
+  - mount: /srv
+    device: (volume/data/srv)
+
+volumes:
+  pc:
+    schema: gpt
+    structure:
+      - name: efi
+        role: system-boot
+        type: C12A7328-F81F-11D2-BA4B-00A0C93EC93B
+        filesystem: vfat
+        size: 500M
+      - name: rootfs
+        type: 0FC63DAF-8483-4772-8E79-3D69D8477DE4
+        filesystem: ext4
+        role: system-data
+        size: 6G
+  data:
+    schema: gpt
+    structure:
+      - name: srv
+        type: 0FC63DAF-8483-4772-8E79-3D69D8477DE4
+        filesystem: ext4
+        role: system-data
+        size: 10G
+parts:
+  my-part:
+    plugin: nil
+"""
+
+
+@pytest.mark.parametrize("default_project_yaml", [MULTIPLE_VOLUMES_YAML])
+def test_pack_multiple_volumes(
+    tmp_path,
+    enable_features,
+    default_factory: ServiceFactory,
+    pack_service: ImagecraftPackService,
+    mock_image_service: ImageService,
+    mocker,
+):
+    mock_image_service._images = {
+        "pc": tmp_path / ".pc.img.tmp",
+        "data": tmp_path / ".data.img.tmp",
+    }
+    mock_image_service._loop_devices = {"pc": "/dev/loop8", "data": "/dev/loop9"}
+    dest_path = tmp_path / "dest"
+
+    mocker.patch.object(mock_image_service, "create_images")
+    mocker.patch.object(mock_image_service, "attach_images")
+    mocker.patch.object(mock_image_service, "verify_images")
+    mocker.patch.object(mock_image_service, "check_filesystems")
+    mocker.patch.object(mock_image_service, "detach_images")
+    mocker.patch.object(
+        mock_image_service,
+        "finalize_images",
+        return_value={"pc": dest_path / "pc.img", "data": dest_path / "data.img"},
+    )
+    mock_diskutil = mocker.patch("imagecraft.services.pack.diskutil", autospec=True)
+    mock_grubutil = mocker.patch("imagecraft.services.pack.grubutil", autospec=True)
+    mocker.patch("imagecraft.services.pack.Image", autospec=True)
+
+    result = pack_service.pack(prime_dir=tmp_path / "prime", dest=dest_path)
+
+    assert {
+        str(call.kwargs["device_path"])
+        for call in mock_diskutil.format_device.call_args_list
+    } == {"/dev/loop8p1", "/dev/loop8p2", "/dev/loop9p1"}
+    # The bootloader is only set up on the volume holding the root filesystem.
+    mock_grubutil.setup_grub.assert_called_once()
+    setup_grub_kwargs = mock_grubutil.setup_grub.call_args.kwargs
+    assert setup_grub_kwargs["loop_dev"] == "/dev/loop8"
+    assert setup_grub_kwargs["loop_paths"]["data/srv"] == "/dev/loop9p1"
+    assert result == [dest_path / "pc.img", dest_path / "data.img"]
+
+
+def test_pack_filesystem_options(
+    tmp_path,
+    enable_features,
+    default_factory,
+    pack_service: ImagecraftPackService,
+    mock_image_service: ImageService,
+    monkeypatch,
+    mocker,
+):
+    monkeypatch.setenv("IMAGECRAFT_CHROOT_FREE_BOOTLOADER", "1")
+    project = default_factory.get("project").get()
+    rootfs = next(s for s in project.volumes["pc"].structure if s.name == "rootfs")
+    rootfs.filesystem_options = FilesystemOptions(preset=FilesystemPreset.FAST_BUILD)
+    mocker.patch.object(mock_image_service, "create_images")
+    mocker.patch.object(mock_image_service, "attach_images")
+    mocker.patch.object(mock_image_service, "verify_images")
+    mocker.patch.object(mock_image_service, "check_filesystems")
+    mocker.patch.object(mock_image_service, "detach_images")
+    mocker.patch.object(mock_image_service, "finalize_images", return_value={})
+    mock_diskutil = mocker.patch("imagecraft.services.pack.diskutil", autospec=True)
+    mocker.patch("imagecraft.services.pack.bootloader", autospec=True)
+    mock_digest = mocker.patch(
+        "imagecraft.pack.checkpoint.get_content_digest", return_value="digest"
+    )
+
+    pack_service.pack(prime_dir=tmp_path / "prime", dest=tmp_path / "dest")
+
+    options = {
+        call.kwargs["fstype"]: call.kwargs["options"]
+        for call in mock_diskutil.format_device.call_args_list
+    }
+    assert options[FileSystem.EXT4] == rootfs.filesystem_options
+    assert options[FileSystem.VFAT] is None
+    # The resolved options are part of the content digests.
+    fs_options = {
+        call.kwargs["fstype"]: call.kwargs["options"]["filesystem_options"]
+        for call in mock_digest.call_args_list
+    }
+    assert fs_options[FileSystem.EXT4] == {
+        "preset": "fast-build",
+        "lazy-itable-init": True,
+        "lazy-journal-init": True,
+    }
+    assert fs_options[FileSystem.VFAT] is None
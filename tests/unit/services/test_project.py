@@ -0,0 +1,117 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from typing import cast
+
+import pytest
+from craft_application import ServiceFactory
+from craft_platforms import DebianArchitecture
+from imagecraft.services import project as project_module
+from imagecraft.services.project import ImagecraftProjectService
+
+EXPECTED_PARTITIONS = ["volume/pc/rootfs", "volume/pc/efi"]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    project_module._volumes_filesystems_cache.clear()
+    yield
+    project_module._volumes_filesystems_cache.clear()
+
+
+@pytest.fixture
+def project_service(default_factory: ServiceFactory) -> ImagecraftProjectService:
+    return cast(ImagecraftProjectService, default_factory.get("project"))
+
+
+def _get_partitions(service: ImagecraftProjectService, platform: str = "amd64"):
+    return service.get_partitions_for(
+        platform=platform, build_for="amd64", build_on=DebianArchitecture.AMD64
+    )
+
+
+def test_get_partitions_for_memoized(project_service, mocker):
+    spy_preprocess = mocker.spy(project_service, "_preprocess")
+
+    assert _get_partitions(project_service) == EXPECTED_PARTITIONS
+    assert _get_partitions(project_service) == EXPECTED_PARTITIONS
+
+    spy_preprocess.assert_called_once()
+
+
+def test_get_volumes_filesystems_for_copies(project_service):
+    kwargs = {"platform": "amd64", "build_for": "amd64", "build_on": "amd64"}
+    first = project_service.get_volumes_filesystems_for(**kwargs)
+    first.volumes["pc"].structure.clear()
+
+    second = project_service.get_volumes_filesystems_for(**kwargs)
+
+    assert second is not first
+    assert second.volumes["pc"].structure
+
+
+def test_get_partitions_for_keyed_by_platform(project_service, mocker):
+    spy_preprocess = mocker.spy(project_service, "_preprocess")
+
+    _get_partitions(project_service, platform="amd64")
+    _get_partitions(project_service, platform="arm64")
+
+    assert spy_preprocess.call_count == 2
+
+
+def test_get_partitions_for_project_file_changed(
+    project_service, default_project_file, mocker
+):
+    spy_preprocess = mocker.spy(project_service, "_preprocess")
+
+    _get_partitions(project_service)
+    default_project_file.write_text(
+        default_project_file.read_text().replace("size: 6G", "size: 7G")
+    )
+    _get_partitions(project_service)
+
+    assert spy_preprocess.call_count == 2
+
+
+def test_get_partitions_for_disk_cache(project_service, tmp_path, monkeypatch, mocker):
+    cache_dir = tmp_path / "project-cache"
+    monkeypatch.setenv("IMAGECRAFT_PROJECT_CACHE_DIR", str(cache_dir))
+    spy_preprocess = mocker.spy(project_service, "_preprocess")
+
+    assert _get_partitions(project_service) == EXPECTED_PARTITIONS
+    assert len(list(cache_dir.glob("*.json"))) == 1
+
+    # Simulate a new invocation.
+    project_module._volumes_filesystems_cache.clear()
+    assert _get_partitions(project_service) == EXPECTED_PARTITIONS
+
+    spy_preprocess.assert_called_once()
+
+
+def test_get_partitions_for_corrupt_disk_cache(
+    project_service, tmp_path, monkeypatch, mocker
+):
+    cache_dir = tmp_path / "project-cache"
+    monkeypatch.setenv("IMAGECRAFT_PROJECT_CACHE_DIR", str(cache_dir))
+    _get_partitions(project_service)
+    project_module._volumes_filesystems_cache.clear()
+    for cache_file in cache_dir.glob("*.json"):
+        cache_file.write_text("{not json")
+    spy_preprocess = mocker.spy(project_service, "_preprocess")
+
+    assert _get_partitions(project_service) == EXPECTED_PARTITIONS
+
+    spy_preprocess.assert_called_once()
@@ -0,0 +1,153 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import contextlib
+from typing import cast
+
+import craft_platforms
+import pytest
+from craft_application import ServiceFactory
+from craft_application.services.provider import ProviderService
+from craft_providers.lxd import LXDProvider
+from imagecraft import instance_pool
+from imagecraft.instance_pool import PooledInstance
+from imagecraft.services.provider import ImagecraftProviderService
+
+BUILD_INFO = craft_platforms.BuildInfo(
+    platform="amd64",
+    build_on=craft_platforms.DebianArchitecture.AMD64,
+    build_for=craft_platforms.DebianArchitecture.AMD64,
+    build_base=craft_platforms.DistroBase("ubuntu", "24.04"),
+)
+
+KEY = "ubuntu-24-04-amd64"
+
+
+@pytest.fixture
+def provider_service(default_factory: ServiceFactory, tmp_path):
+    default_factory.update_kwargs("provider", work_dir=tmp_path)
+    return cast(ImagecraftProviderService, default_factory.get("provider"))
+
+
+@pytest.fixture
+def launched(provider_service, tmp_path, mocker):
+    """Instance names launched by the craft-application provider service."""
+    names = []
+
+    @contextlib.contextmanager
+    def fake_instance(self, build_info, *, work_dir, **_):
+        names.append(self._get_instance_name(work_dir, build_info, "project"))
+        yield names[-1]
+
+    mocker.patch.object(ProviderService, "instance", fake_instance)
+    return names
+
+
+@pytest.fixture
+def mock_pool(provider_service, mocker):
+    pool = mocker.Mock(spec=instance_pool.InstancePool)
+    mocker.patch.object(provider_service, "get_instance_pool", return_value=pool)
+    return pool
+
+
+def test_get_instance_pool_disabled(provider_service):
+    assert provider_service.get_instance_pool() is None
+
+
+def test_get_instance_pool(provider_service, monkeypatch, mocker):
+    monkeypatch.setenv("IMAGECRAFT_INSTANCE_POOL_SIZE", "2")
+    monkeypatch.setenv("IMAGECRAFT_INSTANCE_POOL_IDLE_MINS", "30")
+    mocker.patch.object(
+        provider_service,
+        "get_provider",
+        return_value=LXDProvider(lxd_project="imagecraft"),
+    )
+    mock_pool_cls = mocker.patch.object(instance_pool, "InstancePool")
+
+    assert provider_service.get_instance_pool() is mock_pool_cls.return_value
+
+    backend = mock_pool_cls.call_args.args[0]
+    assert isinstance(backend, instance_pool.LXDPoolBackend)
+    assert mock_pool_cls.call_args.kwargs == {
+        "prefix": "imagecraft-pool",
+        "size": 2,
+        "idle_expiry": 1800,
+    }
+
+
+def test_instance_without_pool(provider_service, launched, tmp_path):
+    with provider_service.instance(BUILD_INFO, work_dir=tmp_path) as instance:
+        assert instance.startswith("imagecraft-")
+        assert "pool" not in instance
+
+
+def test_instance_warm(provider_service, launched, mock_pool, tmp_path):
+    pooled = PooledInstance("imagecraft-pool-ubuntu-24-04-amd64-0", KEY, warm=True)
+    mock_pool.acquire.return_value = pooled
+
+    with provider_service.instance(BUILD_INFO, work_dir=tmp_path) as instance:
+        assert instance == pooled.name
+
+    mock_pool.acquire.assert_called_once_with(KEY)
+    mock_pool.mark_warm.assert_not_called()
+    mock_pool.release.assert_called_once_with(pooled)
+    assert launched == [pooled.name]
+
+
+def test_instance_cold(provider_service, launched, mock_pool, tmp_path):
+    cold = PooledInstance("imagecraft-pool-ubuntu-24-04-amd64-0", KEY, warm=False)
+    warm = PooledInstance(cold.name, KEY, warm=True)
+    mock_pool.acquire.return_value = cold
+    mock_pool.mark_warm.return_value = warm
+
+    with provider_service.instance(BUILD_INFO, work_dir=tmp_path):
+        mock_pool.mark_warm.assert_called_once_with(cold)
+
+    # Set up once to be snapshotted, then launched again for the build.
+    assert launched == [cold.name, cold.name]
+    assert "mmdebstrap" in provider_service.packages
+    mock_pool.release.assert_called_once_with(warm)
+
+
+def test_instance_build_failure(provider_service, launched, mock_pool, tmp_path):
+    pooled = PooledInstance("imagecraft-pool-ubuntu-24-04-amd64-0", KEY, warm=True)
+    mock_pool.acquire.return_value = pooled
+
+    with (
+        pytest.raises(RuntimeError),
+        provider_service.instance(BUILD_INFO, work_dir=tmp_path),
+    ):
+        raise RuntimeError("build failed")
+
+    mock_pool.release.assert_called_once_with(pooled)
+
+
+def test_instance_pool_full(provider_service, launched, mock_pool, tmp_path):
+    mock_pool.acquire.return_value = None
+
+    with provider_service.instance(BUILD_INFO, work_dir=tmp_path) as instance:
+        assert "pool" not in instance
+
+    mock_pool.release.assert_not_called()
+
+
+def test_instance_clean_existing(provider_service, launched, mock_pool, tmp_path):
+    with provider_service.instance(
+        BUILD_INFO, work_dir=tmp_path, clean_existing=True
+    ) as instance:
+        assert "pool" not in instance
+
+    mock_pool.acquire.assert_not_called()
@@ -14,6 +14,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import argparse
 from pathlib import Path
 from typing import cast
 
@@ -186,3 +187,42 @@ def test_application_image_service_wiring(
     image_service = cast(ImageService, default_application.services.get("image"))
     assert isinstance(image_service, ImageService)
     assert image_service._project_dir == custom_project_file.parent
+
+
+@pytest.mark.parametrize(
+    ("env", "euid", "in_namespace", "destructive_mode", "expected"),
+    [
+        ({}, 1000, False, True, False),
+        ({"IMAGECRAFT_ROOTLESS": "1"}, 1000, False, True, True),
+        ({"IMAGECRAFT_ROOTLESS": "1"}, 1000, False, False, False),
+        (
+            {"IMAGECRAFT_ROOTLESS": "1", "CRAFT_BUILD_ENVIRONMENT": "host"},
+            1000,
+            False,
+            False,
+            True,
+        ),
+        ({"IMAGECRAFT_ROOTLESS": "1"}, 0, False, True, False),
+        ({"IMAGECRAFT_ROOTLESS": "1"}, 1000, True, True, False),
+    ],
+)
+def test_application_needs_user_namespace(
+    mocker,
+    monkeypatch,
+    default_application: Imagecraft,
+    env,
+    euid,
+    in_namespace,
+    destructive_mode,
+    expected,
+):
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    mocker.patch("os.geteuid", return_value=euid)
+    mocker.patch("imagecraft.userns.in_user_namespace", return_value=in_namespace)
+    dispatcher = mocker.Mock()
+    dispatcher.parsed_args.return_value = argparse.Namespace(
+        destructive_mode=destructive_mode
+    )
+
+    assert default_application._needs_user_namespace(dispatcher) is expected
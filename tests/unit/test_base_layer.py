@@ -0,0 +1,156 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import hashlib
+import os
+import tarfile
+
+import pytest
+from craft_cli import CraftError
+from imagecraft import base_layer
+
+
+@pytest.fixture
+def rootfs(tmp_path):
+    root = tmp_path / "rootfs"
+    (root / "etc").mkdir(parents=True)
+    (root / "etc/hostname").write_text("ubuntu\n")
+    (root / "etc/os-release").write_text("NAME=Ubuntu\n")
+    (root / "usr/lib").mkdir(parents=True)
+    (root / "usr/lib/os-release").symlink_to("../../etc/os-release")
+    (root / "boot/efi/EFI").mkdir(parents=True)
+    (root / "boot/efi/EFI/BOOTX64.EFI").write_bytes(b"shim")
+    return root
+
+
+@pytest.fixture
+def tarball(tmp_path, rootfs):
+    path = tmp_path / "rootfs.tar.gz"
+    with tarfile.open(path, "w:gz") as tar:
+        tar.add(rootfs, arcname=".")
+    return path
+
+
+def test_get_source_digest_tarball(tmp_path, tarball, mocker):
+    cache_dir = tmp_path / "cache"
+    expected = hashlib.sha256(tarball.read_bytes()).hexdigest()
+
+    assert base_layer.get_source_digest(tarball, cache_dir) == expected
+
+    # The digest is then taken from the cache, until the tarball changes.
+    spy = mocker.spy(hashlib, "file_digest")
+    assert base_layer.get_source_digest(tarball, cache_dir) == expected
+    spy.assert_not_called()
+
+    os.utime(tarball, ns=(0, 0))
+    assert base_layer.get_source_digest(tarball, cache_dir) == expected
+    spy.assert_called_once()
+
+
+def test_get_source_digest_directory(tmp_path, rootfs):
+    cache_dir = tmp_path / "cache"
+    digest = base_layer.get_source_digest(rootfs, cache_dir)
+
+    (rootfs / "etc/hostname").write_text("other\n")
+
+    assert base_layer.get_source_digest(rootfs, cache_dir) != digest
+    assert not cache_dir.exists()
+
+
+@pytest.mark.parametrize("source_name", ["tarball", "rootfs"])
+def test_get_base_layer(tmp_path, source_name, request, mocker):
+    source = request.getfixturevalue(source_name)
+    cache_dir = tmp_path / "cache"
+
+    layer_dir, digest = base_layer.get_base_layer(source, cache_dir)
+
+    assert layer_dir == cache_dir / digest
+    assert (layer_dir / "etc/hostname").read_text() == "ubuntu\n"
+    assert (layer_dir / "usr/lib/os-release").readlink().as_posix() == (
+        "../../etc/os-release"
+    )
+    assert layer_dir.stat().st_mode & 0o777 == 0o755
+    assert [p.name for p in cache_dir.iterdir() if p.name.startswith(".")] == []
+
+    # A cached base layer isn't extracted again.
+    mock_run = mocker.patch("imagecraft.base_layer.run")
+    assert base_layer.get_base_layer(source, cache_dir) == (layer_dir, digest)
+    mock_run.assert_not_called()
+
+
+def test_get_base_layer_missing(tmp_path):
+    with pytest.raises(CraftError, match="does not exist"):
+        base_layer.get_base_layer(tmp_path / "missing.tar", tmp_path / "cache")
+
+
+def test_get_base_layer_invalid_tarball(tmp_path):
+    source = tmp_path / "rootfs.tar"
+    source.write_text("not a tarball")
+
+    with pytest.raises(CraftError, match="Cannot extract base layer"):
+        base_layer.get_base_layer(source, tmp_path / "cache")
+
+    assert [p.name for p in (tmp_path / "cache").iterdir()] == ["sources.json"]
+
+
+def test_merge_content(tmp_path, rootfs):
+    prime_dir = tmp_path / "prime"
+    (prime_dir / "etc").mkdir(parents=True)
+    (prime_dir / "etc/hostname").write_text("image\n")
+    (prime_dir / "etc/.wh.os-release").touch()
+    (prime_dir / "usr/lib/os-release").mkdir(parents=True)
+    (prime_dir / "var/log").mkdir(parents=True)
+    dest = tmp_path / "content"
+
+    base_layer.merge_content(
+        rootfs, prime_dir, dest, mount="/", nested_mounts=["/boot/efi"]
+    )
+
+    assert (dest / "etc/hostname").read_text() == "image\n"
+    assert not (dest / "etc/os-release").exists()
+    assert not (dest / "etc/.wh.os-release").exists()
+    # A directory replaces the symlink of the base layer.
+    assert (dest / "usr/lib/os-release").is_dir()
+    assert (dest / "var/log").is_dir()
+    # Other partitions are mounted on /boot/efi.
+    assert [*(dest / "boot/efi").iterdir()] == []
+    # The prime directory is left as it is.
+    assert (prime_dir / "etc/.wh.os-release").exists()
+
+
+def test_merge_content_opaque(tmp_path, rootfs):
+    prime_dir = tmp_path / "prime"
+    (prime_dir / "etc").mkdir(parents=True)
+    (prime_dir / "etc/.wh..wh..opq").touch()
+    (prime_dir / "etc/fstab").write_text("LABEL=writable / ext4 defaults 0 1\n")
+    dest = tmp_path / "content"
+    (dest / "stale").mkdir(parents=True)
+
+    base_layer.merge_content(rootfs, prime_dir, dest, mount="/")
+
+    assert sorted(p.name for p in (dest / "etc").iterdir()) == ["fstab"]
+    assert not (dest / "stale").exists()
+
+
+def test_merge_content_nested_mount(tmp_path, rootfs):
+    dest = tmp_path / "content"
+
+    base_layer.merge_content(rootfs, tmp_path / "prime", dest, mount="/boot/efi")
+
+    assert [p.relative_to(dest).as_posix() for p in dest.rglob("*")] == [
+        "EFI",
+        "EFI/BOOTX64.EFI",
+    ]
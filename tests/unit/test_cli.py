@@ -14,11 +14,14 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import os
 import sys
 from unittest.mock import call
 
+import pytest
 from craft_cli import emit
-from imagecraft import cli
+from craft_parts import Features
+from imagecraft import cli, command_cache
 
 
 def test_run_init(mocker):
@@ -26,3 +29,111 @@ def test_run_init(mocker):
     mocker.patch.object(sys, "argv", ["imagecraft", "version"])
     cli.run()
     assert mock_ended_ok.mock_calls == [call()]
+
+
+def test_run_version_flag(mocker, capsys, project_main_module):
+    mock_create_app = mocker.patch.object(cli, "_create_app")
+    mocker.patch.object(sys, "argv", ["imagecraft", "--version"])
+
+    assert cli.run() == 0
+
+    mock_create_app.assert_not_called()
+    assert capsys.readouterr().out == f"imagecraft {project_main_module.__version__}\n"
+
+
+def _run_help(mocker, *args: str) -> int:
+    mocker.patch.object(sys, "argv", ["imagecraft", *args])
+    return cli.run()
+
+
+def test_run_help_records_commands(mocker, capsys):
+    with pytest.raises(SystemExit) as exc_info:
+        _run_help(mocker, "--help")
+    full_help = capsys.readouterr().err
+    mock_create_app = mocker.patch.object(cli, "_create_app")
+
+    assert exc_info.value.code == 0
+    assert _run_help(mocker, "--help") == 0
+    mock_create_app.assert_not_called()
+    assert capsys.readouterr().err == full_help
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        pytest.param(["pack", "--help"], id="command-option"),
+        pytest.param(["help", "inspect"], id="help-command"),
+        pytest.param(["help", "--all"], id="all"),
+    ],
+)
+def test_run_help_cached(mocker, capsys, args):
+    with pytest.raises(SystemExit):
+        _run_help(mocker, *args)
+    full_help = capsys.readouterr().err
+    mocker.patch.object(cli, "_create_app")
+
+    assert _run_help(mocker, *args) == 0
+
+    assert capsys.readouterr().err == full_help
+
+
+def test_run_help_cached_invalid(mocker, capsys):
+    with pytest.raises(SystemExit):
+        _run_help(mocker, "--help")
+    mocker.patch.object(cli, "_create_app")
+
+    assert _run_help(mocker, "help", "nosuch") == os.EX_USAGE
+
+    assert "command 'nosuch' not found" in capsys.readouterr().err
+
+
+def test_run_not_help(mocker):
+    with pytest.raises(SystemExit):
+        _run_help(mocker, "--help")
+    mock_create_app = mocker.patch.object(cli, "_create_app")
+
+    _run_help(mocker, "version")
+
+    mock_create_app.assert_called_once()
+
+
+@pytest.mark.usefixtures("reset_features")
+def test_run_help_cached_not_help(mocker, capsys, project_main_module):
+    with pytest.raises(SystemExit):
+        _run_help(mocker, "--help")
+    capsys.readouterr()
+    Features.reset()
+    # Arguments taken for a help request, that the cached commands can run.
+    mocker.patch.object(cli, "_is_help_request", return_value=True)
+    spy_create_app = mocker.spy(cli, "_create_app")
+
+    assert _run_help(mocker, "version") == 0
+
+    # The application runs them in the same process, with a fresh emitter.
+    spy_create_app.assert_called_once()
+    assert project_main_module.__version__ in capsys.readouterr().out
+
+
+def test_command_cache_path(tmp_path, monkeypatch):
+    commands_dir = tmp_path / "commands"
+    commands_dir.mkdir()
+    (commands_dir / "pack.py").write_text("")
+    (tmp_path / "cli.py").write_text("")
+    monkeypatch.setattr(command_cache, "_PACKAGE_DIR", tmp_path)
+    cache_path = command_cache.get_cache_path()
+
+    assert command_cache.get_cache_path() == cache_path
+    os.utime(commands_dir / "pack.py", ns=(0, 0))
+    assert command_cache.get_cache_path() != cache_path
+
+
+def test_get_app_info_cached(mocker):
+    with pytest.raises(SystemExit):
+        _run_help(mocker, "--help")
+    mock_create_app = mocker.patch.object(cli, "_create_app")
+
+    dispatcher, app_config = cli.get_app_info()
+
+    mock_create_app.assert_not_called()
+    assert app_config == {}
+    assert {"pack", "inspect", "clean"} <= set(dispatcher.commands)
@@ -0,0 +1,187 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import subprocess
+import time
+
+import pytest
+from imagecraft import instance_pool
+from imagecraft.instance_pool import InstancePool, PooledInstance
+
+KEY = "ubuntu-24-04-amd64"
+
+
+class FakeBackend:
+    """A local provider whose instances are dictionaries of files."""
+
+    def __init__(self) -> None:
+        self.instances: dict[str, dict[str, str]] = {}
+        self.snapshots: dict[str, dict[str, str]] = {}
+        self.fail_restore = False
+
+    def launch(self, name: str) -> None:
+        """Create and set up an instance, as the provider service would."""
+        self.instances[name] = {"/usr/bin/mmdebstrap": "set up"}
+
+    def list_instances(self) -> list[str]:
+        return list(self.instances)
+
+    def snapshot(self, instance_name: str) -> None:
+        self.snapshots[instance_name] = dict(self.instances[instance_name])
+
+    def restore(self, instance_name: str) -> None:
+        if self.fail_restore:
+            raise subprocess.CalledProcessError(1, ["restore"])
+        self.instances[instance_name] = dict(self.snapshots[instance_name])
+
+    def delete(self, instance_name: str) -> None:
+        del self.instances[instance_name]
+        self.snapshots.pop(instance_name, None)
+
+
+@pytest.fixture
+def backend():
+    return FakeBackend()
+
+
+@pytest.fixture
+def pool(backend, tmp_path):
+    return InstancePool(
+        backend, tmp_path / "state", prefix="imagecraft-pool", size=2, idle_expiry=60
+    )
+
+
+def build(pool, backend, key=KEY) -> PooledInstance:
+    """Run a build in a pooled instance, leaving it dirty, and return it."""
+    instance = pool.acquire(key)
+    assert instance is not None
+    if not instance.warm:
+        backend.launch(instance.name)
+        instance = pool.mark_warm(instance)
+    backend.instances[instance.name]["/root/project/output"] = "built"
+    pool.release(instance)
+    return instance
+
+
+@pytest.mark.parametrize(
+    ("base", "expected"),
+    [
+        (("ubuntu", "24.04", "amd64"), "ubuntu-24-04-amd64"),
+        (("Ubuntu", "devel", "arm64"), "ubuntu-devel-arm64"),
+    ],
+)
+def test_get_pool_key(base, expected):
+    assert instance_pool.get_pool_key(*base) == expected
+
+
+def test_acquire_cold(pool):
+    assert pool.acquire(KEY) == PooledInstance(
+        "imagecraft-pool-ubuntu-24-04-amd64-0", KEY, warm=False
+    )
+
+
+def test_acquire_restores_warm_instance(pool, backend):
+    first = build(pool, backend)
+
+    second = pool.acquire(KEY)
+
+    assert second == PooledInstance(first.name, KEY, warm=True)
+    assert backend.instances[first.name] == {"/usr/bin/mmdebstrap": "set up"}
+
+
+def test_acquire_keys(pool, backend):
+    build(pool, backend)
+
+    instance = pool.acquire("ubuntu-22-04-amd64")
+
+    assert instance == PooledInstance(
+        "imagecraft-pool-ubuntu-22-04-amd64-0", "ubuntu-22-04-amd64", warm=False
+    )
+
+
+def test_acquire_full(pool):
+    first = pool.acquire(KEY)
+    second = pool.acquire(KEY)
+
+    assert first is not None
+    assert second is not None
+    assert first.name != second.name
+    assert pool.acquire(KEY) is None
+
+
+def test_acquire_stale_lease(pool, backend, mocker):
+    build(pool, backend)
+    pool.acquire(KEY)
+    pool.acquire(KEY)
+    mocker.patch.object(instance_pool, "_is_alive", return_value=False)
+
+    instance = pool.acquire(KEY)
+
+    # The warm instance is leased again, the cold one is cleaned up.
+    assert instance is not None
+    assert instance.warm
+
+
+def test_release_cold_discards(pool, backend):
+    instance = pool.acquire(KEY)
+    assert instance is not None
+    backend.launch(instance.name)
+
+    pool.release(instance)
+
+    assert backend.instances == {}
+    assert pool.acquire(KEY) == instance
+
+
+def test_acquire_restore_failure(pool, backend):
+    first = build(pool, backend)
+    backend.fail_restore = True
+
+    instance = pool.acquire(KEY)
+
+    assert instance == PooledInstance(first.name, KEY, warm=False)
+    assert first.name not in backend.instances
+
+
+def test_acquire_forgets_deleted_instances(pool, backend):
+    first = build(pool, backend)
+    backend.delete(first.name)
+
+    assert pool.acquire(KEY) == PooledInstance(first.name, KEY, warm=False)
+
+
+def test_acquire_expires_idle_instances(pool, backend, mocker):
+    first = build(pool, backend)
+    mocker.patch("time.time", return_value=time.time() + 120)
+
+    assert pool.acquire("ubuntu-22-04-amd64") is not None
+    assert first.name not in backend.instances
+
+
+def test_acquire_shrinks_pool(pool, backend, tmp_path):
+    first = pool.acquire(KEY)
+    second = pool.acquire(KEY)
+    for instance in (first, second):
+        backend.launch(instance.name)
+        pool.release(pool.mark_warm(instance))
+    smaller_pool = InstancePool(
+        backend, tmp_path / "state", prefix="imagecraft-pool", size=1, idle_expiry=60
+    )
+
+    instance = smaller_pool.acquire(KEY)
+
+    assert instance is not None
+    assert list(backend.instances) == [instance.name]
@@ -0,0 +1,119 @@
+# This file is part of imagecraft.
+#
+# Copyright 2026 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import pwd
+import sys
+
+import pytest
+from craft_cli import CraftError
+from imagecraft import userns
+
+
+@pytest.mark.parametrize(
+    ("uid_map", "expected"),
+    [
+        ("         0          0 4294967295\n", False),
+        ("         0       1000          1\n", True),
+        ("         0       1000          1\n         1     100000      65536\n", True),
+    ],
+)
+def test_in_user_namespace(tmp_path, monkeypatch, uid_map, expected):
+    uid_map_path = tmp_path / "uid_map"
+    uid_map_path.write_text(uid_map)
+    monkeypatch.setattr(userns, "_UID_MAP_PATH", uid_map_path)
+
+    assert userns.in_user_namespace() is expected
+
+
+@pytest.mark.parametrize(
+    ("subuid", "expected"),
+    [
+        ("{name}:100000:65536\n{name}:300000:1000\n", (100000, 65536)),
+        ("other:100000:65536\n{uid}:200000:1000\n", (200000, 1000)),
+        ("other:100000:65536\n", None),
+        ("{name}:invalid\n", None),
+        ("", None),
+    ],
+)
+def test_get_subordinate_range(tmp_path, subuid, expected):
+    uid = os.getuid()
+    subuid_path = tmp_path / "subuid"
+    subuid_path.write_text(subuid.format(name=pwd.getpwuid(uid).pw_name, uid=uid))
+
+    assert userns.get_subordinate_range(subuid_path, uid) == expected
+
+
+def test_get_subordinate_range_no_file(tmp_path):
+    assert userns.get_subordinate_range(tmp_path / "subuid", os.getuid()) is None
+
+
+@pytest.fixture
+def subordinate_ids(tmp_path, monkeypatch):
+    uid = os.getuid()
+    for name in ("subuid", "subgid"):
+        (tmp_path / name).write_text(f"{uid}:100000:65536\n")
+    monkeypatch.setattr(userns, "SUBUID_PATH", tmp_path / "subuid")
+    monkeypatch.setattr(userns, "SUBGID_PATH", tmp_path / "subgid")
+
+
+@pytest.mark.usefixtures("subordinate_ids")
+def test_reexec_in_user_namespace(mocker, monkeypatch):
+    mocker.patch("shutil.which", return_value="/usr/bin/unshare")
+    mocker.patch("craft_cli.emit.ended_ok")
+    mock_execv = mocker.patch("os.execv")
+    monkeypatch.setattr(sys, "orig_argv", ["python3", "-m", "imagecraft", "pack"])
+
+    userns.reexec_in_user_namespace()
+
+    mock_execv.assert_called_once_with(
+        "/usr/bin/unshare",
+        [
+            "/usr/bin/unshare",
+            "--user",
+            "--mount",
+            "--propagation=private",
+            "--map-root-user",
+            "--map-users=100000,1,65536",
+            "--map-groups=100000,1,65536",
+            "--",
+            sys.executable,
+            "-m",
+            "imagecraft",
+            "pack",
+        ],
+    )
+
+
+def test_reexec_in_user_namespace_no_subordinate_ids(tmp_path, mocker, monkeypatch):
+    monkeypatch.setattr(userns, "SUBUID_PATH", tmp_path / "subuid")
+    monkeypatch.setattr(userns, "SUBGID_PATH", tmp_path / "subgid")
+    mocker.patch("shutil.which", return_value="/usr/bin/unshare")
+    mocker.patch("craft_cli.emit.ended_ok")
+    mock_execv = mocker.patch("os.execv")
+
+    userns.reexec_in_user_namespace()
+
+    args = mock_execv.call_args.args[1]
+    assert not [arg for arg in args if arg.startswith("--map-users")]
+    assert "--map-root-user" in args
+
+
+def test_reexec_in_user_namespace_no_unshare(mocker):
+    mocker.patch("shutil.which", return_value=None)
+
+    with pytest.raises(CraftError, match="Cannot create a user namespace"):
+        userns.reexec_in_user_namespace()
@@ -1,5 +1,8 @@
 #!/usr/bin/env python3
-"""Utility to mount and unmount imagecraft images."""
+"""Utility to mount and unmount imagecraft images.
+
+To look inside an image without root or loop devices, use ``imagecraft inspect``.
+"""
 # Various invocations here can have multiple numbers of args, so magic values are ok.
 # ruff: noqa: PLR2004
 